@@ -0,0 +1,76 @@
+# accounts/authentication.py
+"""
+JWT-аутентификация без запроса к таблице users на каждый запрос.
+
+Стандартный JWTAuthentication после проверки подписи загружает пользователя
+целиком (SELECT * FROM users). Здесь в кэше (CACHES['default']) хранится
+«principal» — Users.PRINCIPAL_FIELDS: id, роль, флаги и версия токена.
+request.user собирается из него через Users.principal(); остальные поля
+подгружаются одним запросом только если view к ним обращается.
+
+Отзыв: в токен кладётся claim `tv` = Users.token_version. Смена пароля
+увеличивает версию (Users.revoke_tokens), и старые токены перестают проходить.
+Любое сохранение пользователя сбрасывает запись кэша (сигнал в models.py),
+так что блокировка и смена роли видны не позже чем через PRINCIPAL_CACHE_TTL_SECONDS
+даже при обновлении в обход ORM.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Users
+
+PRINCIPAL_CACHE_KEY = 'accounts:principal:{user_id}'
+TOKEN_VERSION_CLAIM = 'tv'
+
+
+def _timeout():
+    return getattr(settings, 'PRINCIPAL_CACHE_TTL_SECONDS', 60)
+
+
+def issue_tokens(user):
+    """Пара refresh/access с версией токена пользователя (access наследует claim от refresh)."""
+    refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    return refresh
+
+
+def invalidate_principal(user_id):
+    key = PRINCIPAL_CACHE_KEY.format(user_id=user_id)
+    cache.delete(key)
+    # повторно после коммита: параллельный запрос мог успеть закэшировать ещё старую строку
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def load_principal(user_id):
+    """Состояние principal из кэша или одним узким запросом к БД. None — пользователя нет."""
+    key = PRINCIPAL_CACHE_KEY.format(user_id=user_id)
+    state = cache.get(key)
+    if state is None:
+        state = Users.objects.filter(pk=user_id).values(*Users.PRINCIPAL_FIELDS).first()
+        if state is None:
+            return None
+        cache.set(key, state, timeout=_timeout())
+    return state
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Токен не содержит идентификатор пользователя")
+
+        state = load_principal(user_id)
+        if state is None:
+            raise AuthenticationFailed("Пользователь не найден", code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed("Пользователь заблокирован", code='user_inactive')
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != state['token_version']:
+            raise InvalidToken("Токен отозван")
+        return Users.principal(state)
@@ -0,0 +1,186 @@
+# accounts/captcha_pool.py
+"""
+Пул заранее отрисованных капч.
+
+Фоновый процесс (manage.py refill_captcha_pool) заранее создаёт записи CaptchaStore
+и PNG-картинки к ним в CAPTCHA_POOL_ROOT/ready/<hashkey>.png. CaptchaGenerateView
+забирает готовую капчу атомарным os.rename() в CAPTCHA_POOL_ROOT/served/ — без
+запросов к БД и без отрисовки; два воркера не могут получить одну и ту же капчу.
+Картинка отдаётся с диска (CaptchaPoolImageView). Если пул пуст, капча
+генерируется как раньше.
+
+purge_expired() удаляет просроченные CaptchaStore пачками и чистит файлы пула.
+"""
+import datetime
+import os
+import random
+import secrets
+import time
+from pathlib import Path
+
+from captcha.conf import settings as captcha_settings
+from captcha.models import CaptchaStore
+from captcha.views import captcha_image
+from django.conf import settings
+from django.utils import timezone
+
+PURGE_BATCH_SIZE = 1000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enabled():
+    return _setting('CAPTCHA_POOL_ENABLED', True)
+
+
+def _root():
+    return Path(_setting('CAPTCHA_POOL_ROOT', Path(settings.BASE_DIR) / 'var' / 'captcha_pool'))
+
+
+def _dir(name):
+    path = _root() / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _item_ttl():
+    """Сколько секунд готовая капча может лежать в пуле."""
+    return _setting('CAPTCHA_POOL_ITEM_TTL_MINUTES', 60) * 60
+
+
+def _answer_ttl():
+    """Сколько секунд у пользователя на ввод после выдачи."""
+    return int(captcha_settings.CAPTCHA_TIMEOUT) * 60
+
+
+def is_valid_key(key):
+    return len(key) == 40 and all(c in '0123456789abcdef' for c in key)
+
+
+def _ready_names(ready):
+    """Только готовые картинки: посторонние и недописанные файлы в ready/ не выдаются и не считаются."""
+    return [name for name in os.listdir(ready) if name.endswith('.png') and is_valid_key(name[:-len('.png')])]
+
+
+# -----------------------------
+# Выдача
+# -----------------------------
+def claim():
+    """Забирает готовую капчу из пула. Возвращает hashkey или None, если пул пуст."""
+    if not enabled():
+        return None
+    ready, served = _dir('ready'), _dir('served')
+    names = _ready_names(ready)
+    # разные воркеры начинают с разных файлов — меньше проигранных гонок за rename
+    random.shuffle(names)
+    stale_before = time.time() - _item_ttl()
+    for name in names:
+        target = served / name
+        try:
+            os.rename(ready / name, target)
+        except FileNotFoundError:
+            continue  # забрал другой воркер
+        if os.stat(target).st_mtime < stale_before:
+            target.unlink(missing_ok=True)
+            continue
+        # mtime = момент выдачи: по нему purge_expired() удаляет отданные картинки
+        os.utime(target)
+        return name[:-len('.png')]
+    return None
+
+
+def image_path(key):
+    """Путь к отданной из пула картинке или None (капча не из пула / уже удалена)."""
+    if not is_valid_key(key):
+        return None
+    path = _root() / 'served' / f'{key}.png'
+    return path if path.exists() else None
+
+
+def size():
+    return len(_ready_names(_dir('ready')))
+
+
+# -----------------------------
+# Пополнение
+# -----------------------------
+def _render(key):
+    # request капча-вьюхе не нужен; картинка детерминирована по ключу
+    return captcha_image(None, key).content
+
+
+def refill(target=None):
+    """Дополняет пул до target капч. Возвращает число добавленных."""
+    target = target if target is not None else _setting('CAPTCHA_POOL_SIZE', 500)
+    ready, staging = _dir('ready'), _dir('tmp')
+    missing = target - size()
+    if missing <= 0:
+        return 0
+
+    # запись живёт, пока капча лежит в пуле, плюс время на ввод после выдачи
+    expiration = timezone.now() + datetime.timedelta(seconds=_item_ttl() + _answer_ttl())
+    stores = []
+    for _ in range(missing):
+        challenge, response = captcha_settings.get_challenge()()
+        stores.append(CaptchaStore(
+            challenge=challenge, response=response.lower(),
+            hashkey=secrets.token_hex(20), expiration=expiration,
+        ))
+    CaptchaStore.objects.bulk_create(stores, batch_size=PURGE_BATCH_SIZE)
+
+    for store in stores:
+        tmp = staging / f'{store.hashkey}.tmp'
+        tmp.write_bytes(_render(store.hashkey))
+        # в ready/ файл появляется только целиком (tmp/ на той же файловой системе)
+        os.replace(tmp, ready / f'{store.hashkey}.png')
+    return len(stores)
+
+
+# -----------------------------
+# Очистка
+# -----------------------------
+def _remove_older(directory, seconds):
+    cutoff = time.time() - seconds
+    removed = 0
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def purge_expired(batch_size=PURGE_BATCH_SIZE, max_batches=None, dry_run=False):
+    """
+    Удаляет просроченные CaptchaStore пачками по batch_size (короткие транзакции
+    вместо одного DELETE на всю таблицу), не больше max_batches пачек за вызов
+    (None — до конца), и устаревшие файлы пула.
+    Возвращает {'captchas': n, 'files': n}.
+    """
+    expired = CaptchaStore.objects.filter(expiration__lte=timezone.now())
+    if dry_run:
+        count = expired.count()
+        if max_batches is not None:
+            count = min(count, batch_size * max_batches)
+        return {'captchas': count, 'files': 0}
+
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted += CaptchaStore.objects.filter(pk__in=ids).delete()[0]
+
+    files = 0
+    if _root().exists():
+        files += _remove_older(_dir('ready'), _item_ttl())
+        files += _remove_older(_dir('served'), _answer_ttl())
+        # недописанные файлы упавшего refill()
+        files += _remove_older(_dir('tmp'), _item_ttl())
+    return {'captchas': deleted, 'files': files}
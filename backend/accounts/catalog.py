@@ -0,0 +1,66 @@
+# accounts/catalog.py
+"""
+Версионированный кэш справочника характеристик.
+
+Номер версии справочника хранится в БД (CatalogVersion) и меняется в той же
+транзакции, что и сам справочник, поэтому все воркеры видят его одинаково —
+и с Redis, и с кэшем в памяти процесса. В кэше (CACHES['default']) лежат
+готовые байты JSON-ответа для каждой версии.
+ETag ответа строится из версии: If-None-Match проверяется одним чтением версии,
+без сборки справочника. Старые записи кэша просто перестают читаться и истекают по таймауту.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+
+from .models import CatalogVersion, Characteristics
+from .serializers_profile import CharacteristicSerializer
+
+CATALOG_BODY_KEY = 'accounts:characteristics:body:{version}'
+CATALOG_TIMEOUT = 24 * 60 * 60
+
+
+def _initial_version():
+    # не начинаем с 1: после пересоздания БД версии не должны совпасть со старыми ETag у клиентов
+    return int(time.time() * 1000)
+
+
+def _create_version():
+    try:
+        with transaction.atomic():
+            CatalogVersion.objects.create(pk=1, version=_initial_version())
+    except IntegrityError:
+        pass  # строку уже создал другой процесс
+
+
+def get_version():
+    version = CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+    if version is None:
+        _create_version()
+        version = CatalogVersion.objects.values_list('version', flat=True).get(pk=1)
+    return version
+
+
+def bump_version():
+    """Инвалидирует справочник (вызывать при любом изменении Characteristics, в той же транзакции)."""
+    if not CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        _create_version()
+
+
+def etag_for(version):
+    return f'"characteristics-{version}"'
+
+
+def get_catalog(version=None):
+    """Возвращает (etag, body) — тело строится из БД только при промахе кэша."""
+    version = get_version() if version is None else version
+    key = CATALOG_BODY_KEY.format(version=version)
+    body = cache.get(key)
+    if body is None:
+        queryset = Characteristics.objects.order_by('characteristic_id')
+        body = JSONRenderer().render(CharacteristicSerializer(queryset, many=True).data)
+        cache.set(key, body, timeout=CATALOG_TIMEOUT)
+    return etag_for(version), body
@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from accounts import captcha_pool
+from accounts.views_auth import CaptchaGenerateView, CaptchaPoolImageView
+
+
+class Command(BaseCommand):
+    help = (
+        "Пропускная способность страницы входа (новая капча + её картинка) "
+        "с пулом готовых капч и без него"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Число загрузок страницы на режим")
+        parser.add_argument('--concurrency', type=int, default=4)
+
+    def _page_load(self, factory):
+        generate, image = CaptchaGenerateView.as_view(), CaptchaPoolImageView.as_view()
+        try:
+            resp = generate(factory.get('/api/auth/captcha/new/'))
+            key = resp.data['captcha_key']
+            resp = image(factory.get(f'/api/auth/captcha/image/{key}/'), key=key)
+            if hasattr(resp, 'close'):
+                resp.close()
+            return resp.status_code
+        finally:
+            connection.close()
+
+    def _run(self, total, concurrency):
+        factory = APIRequestFactory()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            codes = list(pool.map(lambda _: self._page_load(factory), range(total)))
+        elapsed = time.perf_counter() - started
+        failed = sum(code != 200 for code in codes)
+        return total / elapsed, elapsed, failed
+
+    def handle(self, *args, **options):
+        total, concurrency = options['requests'], options['concurrency']
+
+        with override_settings(CAPTCHA_POOL_ENABLED=False):
+            rps, elapsed, failed = self._run(total, concurrency)
+        self.stdout.write(f"[BENCH] без пула: {rps:.1f} стр/с ({elapsed:.2f} с, ошибок: {failed})")
+
+        # пул пополняется заранее — в замер попадает только выдача
+        captcha_pool.refill(captcha_pool.size() + total)
+        rps_pool, elapsed, failed = self._run(total, concurrency)
+        self.stdout.write(f"[BENCH] с пулом:  {rps_pool:.1f} стр/с ({elapsed:.2f} с, ошибок: {failed})")
+        self.stdout.write(self.style.SUCCESS(f"[BENCH] ускорение: x{rps_pool / rps:.1f}"))
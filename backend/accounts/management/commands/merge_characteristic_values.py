@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Characteristics
+from accounts.normalization import plan_merge, apply_merge
+
+
+class Command(BaseCommand):
+    help = "Сливает дубликаты значений строковых характеристик (нормализация + fuzzy-сравнение)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--characteristic', type=int, action='append', dest='characteristics',
+                            help="ID характеристики (можно несколько раз); по умолчанию — все строковые")
+        parser.add_argument('--threshold', type=float, default=None,
+                            help="Порог сходства rapidfuzz 0–100 (по умолчанию CHARACTERISTIC_FUZZY_THRESHOLD)")
+        parser.add_argument('--dry-run', action='store_true', help="Только показать, что будет слито")
+
+    def handle(self, *args, **options):
+        characteristics = Characteristics.objects.filter(value_type='string')
+        if options['characteristics']:
+            characteristics = characteristics.filter(pk__in=options['characteristics'])
+
+        for characteristic in characteristics.order_by('characteristic_id'):
+            merges, aliases = plan_merge(characteristic, options['threshold'])
+            if options['dry_run']:
+                self.stdout.write(f"[MERGE] {characteristic.name}: будет слито значений — {len(merges)}")
+                continue
+            stats = apply_merge(characteristic, merges, aliases)
+            self.stdout.write(self.style.SUCCESS(f"[MERGE] {characteristic.name}: {stats}"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accounts.captcha_pool import PURGE_BATCH_SIZE, purge_expired
+
+
+class Command(BaseCommand):
+    help = "Удаление просроченных CaptchaStore пачками и устаревших файлов пула капч"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Только посчитать просроченные записи")
+
+    def handle(self, *args, **options):
+        purged = purge_expired(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        prefix = "[CAPTCHA] (dry-run) " if options['dry_run'] else "[CAPTCHA] "
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}капч: {purged['captchas']}, файлов: {purged['files']}"
+        ))
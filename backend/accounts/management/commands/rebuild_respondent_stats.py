@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Полный пересчёт счётчиков RespondentStats по статусам прохождения и выплатам"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help="ID пользователя (можно несколько раз); по умолчанию — все")
+
+    def handle(self, *args, **options):
+        count = rebuild_stats(options['users'])
+        self.stdout.write(self.style.SUCCESS(f"[STATS] Пересчитано записей: {count}"))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import captcha_pool
+
+
+class Command(BaseCommand):
+    help = "Фоновое пополнение пула готовых капч (и очистка просроченных)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None,
+                            help="Целевой размер пула (по умолчанию CAPTCHA_POOL_SIZE)")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Пауза между проверками пула (сек)")
+        parser.add_argument('--purge-every', type=int, default=60,
+                            help="Очищать просроченные капчи раз в N проверок")
+        parser.add_argument('--once', action='store_true', help="Пополнить один раз и выйти")
+
+    def handle(self, *args, **options):
+        cycle = 0
+        while True:
+            added = captcha_pool.refill(options['size'])
+            if added:
+                self.stdout.write(f"[CAPTCHA POOL] добавлено: {added}, в пуле: {captcha_pool.size()}")
+            if cycle % options['purge_every'] == 0:
+                purged = captcha_pool.purge_expired()
+                if any(purged.values()):
+                    self.stdout.write(f"[CAPTCHA POOL] удалено просроченных: {purged}")
+            if options['once']:
+                return
+            cycle += 1
+            time.sleep(options['interval'])
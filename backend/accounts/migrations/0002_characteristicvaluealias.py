@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CharacteristicValueAlias',
+            fields=[
+                ('alias_id', models.AutoField(primary_key=True, serialize=False)),
+                ('normalized_text', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('canonical_value', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='accounts.characteristicvalues')),
+                ('characteristic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='value_aliases', to='accounts.characteristics')),
+            ],
+            options={
+                'db_table': 'characteristic_value_aliases',
+                'unique_together': {('characteristic', 'normalized_text')},
+            },
+        ),
+    ]
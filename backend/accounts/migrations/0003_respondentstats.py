@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_characteristicvaluealias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespondentStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('completed_surveys', models.PositiveIntegerField(default=0)),
+                ('in_progress_surveys', models.PositiveIntegerField(default=0)),
+                ('earned_money', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'respondent_stats',
+            },
+        ),
+    ]
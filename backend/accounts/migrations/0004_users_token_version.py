@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_respondentstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='users',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
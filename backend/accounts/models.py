@@ -1,7 +1,7 @@
-from django.db import models
+from django.db import models, router
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.dispatch import receiver
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, post_save, post_delete
 
 class UsersManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -50,6 +50,9 @@ class Users(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
 
+    # версия JWT: увеличивается при смене пароля — все ранее выданные токены становятся недействительными
+    token_version = models.PositiveIntegerField(default=0)
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['name', 'role']
 
@@ -62,10 +65,68 @@ class Users(AbstractBaseUser, PermissionsMixin):
     class Meta:
         db_table = 'users'
 
+    # Поля, которые известны о пользователе без запроса к БД (см. accounts/authentication.py)
+    PRINCIPAL_FIELDS = ('user_id', 'role', 'is_active', 'is_staff', 'is_superuser', 'token_version')
+
+    @classmethod
+    def principal(cls, state):
+        """
+        Экземпляр пользователя только с PRINCIPAL_FIELDS; остальные поля отложены
+        и подгружаются одним запросом при первом обращении к любому из них.
+        """
+        # from_db ждёт значения в порядке полей модели
+        names = [f.attname for f in cls._meta.concrete_fields if f.attname in cls.PRINCIPAL_FIELDS]
+        user = cls.from_db(router.db_for_read(cls), names, [state[name] for name in names])
+        user._is_principal = True
+        return user
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if fields is not None and getattr(self, '_is_principal', False):
+            # обращение к отложенному полю principal — грузим сразу все отложенные поля
+            fields = list(self.get_deferred_fields() | set(fields))
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+    def revoke_tokens(self):
+        """Отзывает все выданные JWT пользователя."""
+        Users.objects.filter(pk=self.pk).update(token_version=models.F('token_version') + 1)
+        self.refresh_from_db(fields=['token_version'])
+        invalidate_principal(self.pk)
+
     def __str__(self):
         return f"{self.email} ({self.role})"
 
 
+def invalidate_principal(user_id):
+    from .authentication import invalidate_principal as invalidate
+    invalidate(user_id)
+
+
+@receiver([post_save, post_delete], sender=Users)
+def drop_cached_principal(sender, instance, **kwargs):
+    """Роль, активность и версия токена в кэше аутентификации должны следовать за БД."""
+    invalidate_principal(instance.pk)
+
+
+class RespondentStats(models.Model):
+    """
+    Предрасчитанные счётчики респондента для личного кабинета.
+    Обновляются при смене статуса прохождения и при выплате (accounts/stats.py);
+    полный пересчёт — manage.py rebuild_respondent_stats.
+    """
+    user = models.OneToOneField(Users, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    completed_surveys = models.PositiveIntegerField(default=0)
+    in_progress_surveys = models.PositiveIntegerField(default=0)
+    earned_money = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'respondent_stats'
+
+    def __str__(self):
+        return f"Stats({self.user_id}): {self.completed_surveys} пройдено, {self.earned_money} заработано"
+
+
 class Characteristics(models.Model):
     TYPE_CHOICES = [
         ('numeric', 'Числовой'),
@@ -82,6 +143,18 @@ class Characteristics(models.Model):
         db_table = 'characteristics'
 
 
+class CatalogVersion(models.Model):
+    """
+    Версия справочника характеристик (accounts/catalog.py) — одна строка.
+    Хранится в БД, а не в кэше: без Redis кэш у каждого воркера свой, а версия должна быть общей.
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    version = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'characteristics_catalog_version'
+
+
 class CharacteristicValues(models.Model):
     characteristic_value_id = models.AutoField(primary_key=True)
     characteristic = models.ForeignKey(Characteristics, on_delete=models.CASCADE)
@@ -91,6 +164,25 @@ class CharacteristicValues(models.Model):
         db_table = 'characteristic_values'
 
 
+class CharacteristicValueAlias(models.Model):
+    """
+    Нормализованное написание значения строковой характеристики → каноническое значение.
+    Например «г. москва», «москва» → CharacteristicValues(«Москва»).
+    """
+    alias_id = models.AutoField(primary_key=True)
+    characteristic = models.ForeignKey(Characteristics, on_delete=models.CASCADE, related_name='value_aliases')
+    normalized_text = models.CharField(max_length=255)
+    canonical_value = models.ForeignKey(CharacteristicValues, on_delete=models.CASCADE, related_name='aliases')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'characteristic_value_aliases'
+        unique_together = (('characteristic', 'normalized_text'),)
+
+    def __str__(self):
+        return f"{self.normalized_text} → {self.canonical_value_id}"
+
+
 class RespondentCharacteristics(models.Model):
     user = models.ForeignKey(Users, on_delete=models.CASCADE)
     characteristic_value = models.ForeignKey(CharacteristicValues, on_delete=models.CASCADE)
@@ -182,6 +274,7 @@ def create_default_characteristics(sender, **kwargs):
         },
     ]
 
+    created_any = False
     for item in defaults:
         obj, created = Characteristics.objects.get_or_create(
             name=item["name"],
@@ -191,4 +284,9 @@ def create_default_characteristics(sender, **kwargs):
             },
         )
         if created:
-            print(f"[INIT] ✅ Добавлена характеристика: {obj.name}")
\ No newline at end of file
+            created_any = True
+            print(f"[INIT] ✅ Добавлена характеристика: {obj.name}")
+
+    if created_any:
+        from .catalog import bump_version
+        bump_version()
\ No newline at end of file
@@ -0,0 +1,277 @@
+# accounts/normalization.py
+"""
+Канонизация значений строковых характеристик («Город», «Профессия» ...).
+
+Запись значения проходит через конвейер:
+1. normalize_text() — регистр, ё→е, пунктуация, пробелы, служебные префиксы («г.», «город»);
+2. точное совпадение нормализованного текста с каноническим значением или алиасом;
+3. нечёткое совпадение (rapidfuzz) по индексу в памяти для данной характеристики;
+4. иначе создаётся новое каноническое значение.
+
+Каждое встреченное написание запоминается в CharacteristicValueAlias, поэтому
+повторный ввод разрешается точным совпадением без fuzzy-поиска.
+Индексы кэшируются в памяти процесса и перечитываются раз в
+CHARACTERISTIC_INDEX_TTL_SECONDS (или сразу после merge_characteristic_values).
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from rapidfuzz import fuzz, process
+
+from .models import CharacteristicValues, CharacteristicValueAlias, RespondentCharacteristics
+
+# Служебные слова, которые отбрасываются в начале значения (по имени характеристики)
+NOISE_PREFIXES = {
+    'Город': ('г', 'гор', 'город'),
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s-]+")
+_SPACES = re.compile(r"\s+")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize_text(text, characteristic_name=None):
+    """Ключ сравнения: «  Г. Москва » → «москва»."""
+    text = (text or '').casefold().replace('ё', 'е')
+    text = _PUNCTUATION.sub(' ', text)
+    text = _SPACES.sub(' ', text).strip(' -')
+    prefixes = NOISE_PREFIXES.get(characteristic_name)
+    if prefixes:
+        head, _, rest = text.partition(' ')
+        if rest and head in prefixes:
+            text = rest
+    return text
+
+
+def display_text(text, characteristic_name=None):
+    """Отображаемая форма нового канонического значения: без лишних пробелов и префиксов."""
+    text = _SPACES.sub(' ', (text or '').strip())
+    prefixes = NOISE_PREFIXES.get(characteristic_name)
+    if prefixes:
+        head, _, rest = text.partition(' ')
+        if rest and head.casefold().rstrip('.') in prefixes:
+            text = rest
+    return text[:1].upper() + text[1:]
+
+
+class ValueIndex:
+    """Индекс канонических значений одной характеристики: точный словарь + список для fuzzy-поиска."""
+
+    def __init__(self, characteristic):
+        self.characteristic = characteristic
+        self.exact = {}       # normalized → value_id
+        self.choices = []     # normalized-ключи канонических значений
+        self.choice_ids = []  # value_id для choices
+        self.loaded_at = time.monotonic()
+
+    def add_canonical(self, normalized, value_id):
+        self.exact.setdefault(normalized, value_id)
+        self.choices.append(normalized)
+        self.choice_ids.append(value_id)
+
+    def add_alias(self, normalized, value_id):
+        self.exact[normalized] = value_id
+
+    def match(self, normalized, threshold=None):
+        """Возвращает (value_id, exact) или (None, False)."""
+        value_id = self.exact.get(normalized)
+        if value_id is not None:
+            return value_id, True
+        if not normalized or not self.choices:
+            return None, False
+        threshold = threshold if threshold is not None else _setting('CHARACTERISTIC_FUZZY_THRESHOLD', 90)
+        found = process.extractOne(normalized, self.choices, scorer=fuzz.ratio, score_cutoff=threshold)
+        if found is None:
+            return None, False
+        return self.choice_ids[found[2]], False
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def invalidate_indexes(characteristic_ids=None):
+    with _lock:
+        if characteristic_ids is None:
+            _indexes.clear()
+        else:
+            for char_id in characteristic_ids:
+                _indexes.pop(char_id, None)
+
+
+def get_indexes(characteristics):
+    """
+    Индексы для набора характеристик. Отсутствующие/устаревшие индексы
+    загружаются двумя запросами на все характеристики сразу.
+    """
+    ttl = _setting('CHARACTERISTIC_INDEX_TTL_SECONDS', 300)
+    now = time.monotonic()
+    with _lock:
+        result = {c.pk: _indexes.get(c.pk) for c in characteristics}
+    stale = [c for c in characteristics if result[c.pk] is None or now - result[c.pk].loaded_at > ttl]
+    if stale:
+        fresh = {c.pk: ValueIndex(c) for c in stale}
+        for value_id, char_id, value_text in (
+                CharacteristicValues.objects.filter(characteristic_id__in=fresh)
+                .order_by('characteristic_value_id')
+                .values_list('characteristic_value_id', 'characteristic_id', 'value_text')
+        ):
+            index = fresh[char_id]
+            index.add_canonical(normalize_text(value_text, index.characteristic.name), value_id)
+        for char_id, normalized, value_id in (
+                CharacteristicValueAlias.objects.filter(characteristic_id__in=fresh)
+                .values_list('characteristic_id', 'normalized_text', 'canonical_value_id')
+        ):
+            fresh[char_id].add_alias(normalized, value_id)
+        with _lock:
+            _indexes.update(fresh)
+        result.update(fresh)
+    return result
+
+
+def canonicalize(characteristics, requested):
+    """
+    Разрешает значения строковых характеристик в канонические CharacteristicValues.
+    characteristics: {char_id: Characteristics}, requested: {char_id: text}.
+    Возвращает {char_id: CharacteristicValues}. Число запросов не зависит от размера пачки.
+    """
+    indexes = get_indexes(list(characteristics.values()))
+    normalized = {
+        char_id: normalize_text(text, characteristics[char_id].name) for char_id, text in requested.items()
+    }
+    matches = {char_id: indexes[char_id].match(key) for char_id, key in normalized.items()}
+    values = CharacteristicValues.objects.in_bulk(
+        {value_id for value_id, _ in matches.values() if value_id is not None}
+    )
+
+    result = {}
+    new_canonical = {}   # (char_id, normalized) → новый CharacteristicValues
+    aliases = {}         # (char_id, normalized) → каноническое значение
+    for char_id, (value_id, exact) in matches.items():
+        key = (char_id, normalized[char_id])
+        if value_id in values:
+            result[char_id] = values[value_id]
+            if not exact:
+                aliases[key] = values[value_id]
+            continue
+        # нет совпадения (или индекс устарел после слияния) — новое каноническое значение
+        if key not in new_canonical:
+            characteristic = characteristics[char_id]
+            new_canonical[key] = CharacteristicValues(
+                characteristic=characteristic, value_text=display_text(requested[char_id], characteristic.name)
+            )
+        result[char_id] = aliases[key] = new_canonical[key]
+
+    CharacteristicValues.objects.bulk_create(list(new_canonical.values()))
+    for (char_id, key), value in new_canonical.items():
+        indexes[char_id].add_canonical(key, value.pk)
+
+    alias_rows = []
+    for (char_id, key), canonical in aliases.items():
+        indexes[char_id].add_alias(key, canonical.pk)
+        alias_rows.append(CharacteristicValueAlias(
+            characteristic_id=char_id, normalized_text=key[:255], canonical_value_id=canonical.pk,
+        ))
+    CharacteristicValueAlias.objects.bulk_create(alias_rows, ignore_conflicts=True)
+    return result
+
+
+# -----------------------------
+# Слияние накопленных дубликатов
+# -----------------------------
+MERGE_BATCH_SIZE = 1000
+
+
+def _chunks(items, size=MERGE_BATCH_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def plan_merge(characteristic, threshold=None):
+    """
+    Группирует значения характеристики: самое используемое написание становится
+    каноническим, остальные (точное или fuzzy-совпадение ключа) сливаются в него.
+    Возвращает ({dup_id: canonical_id}, {(normalized, canonical_id)}).
+    """
+    values = (
+        CharacteristicValues.objects.filter(characteristic=characteristic)
+        .annotate(usage=Count('respondentcharacteristics'))
+        .order_by('-usage', 'characteristic_value_id')
+        .values_list('characteristic_value_id', 'value_text')
+    )
+    index = ValueIndex(characteristic)
+    merges, aliases = {}, set()
+    for value_id, value_text in values.iterator(chunk_size=MERGE_BATCH_SIZE):
+        normalized = normalize_text(value_text, characteristic.name)
+        canonical_id, _ = index.match(normalized, threshold)
+        if canonical_id is None:
+            index.add_canonical(normalized, value_id)
+            canonical_id = value_id
+        else:
+            merges[value_id] = canonical_id
+        if normalized:
+            aliases.add((normalized, canonical_id))
+    return merges, aliases
+
+
+@transaction.atomic
+def apply_merge(characteristic, merges, aliases):
+    """Переносит записи респондентов и алиасы на канонические значения и удаляет дубликаты."""
+    removed = repointed = 0
+    if merges:
+        involved = set(merges) | set(merges.values())
+        keep = {}      # (user_id, canonical_id) → (row_id, already_canonical)
+        redundant = []
+        for row_id, user_id, value_id in (
+                RespondentCharacteristics.objects.filter(characteristic_value_id__in=involved)
+                .order_by('id').values_list('id', 'user_id', 'characteristic_value_id')
+                .iterator(chunk_size=MERGE_BATCH_SIZE)
+        ):
+            canonical_id = merges.get(value_id, value_id)
+            key = (user_id, canonical_id)
+            current = keep.get(key)
+            is_canonical = value_id == canonical_id
+            if current is None:
+                keep[key] = (row_id, is_canonical)
+            elif is_canonical and not current[1]:
+                redundant.append(current[0])
+                keep[key] = (row_id, True)
+            else:
+                redundant.append(row_id)
+
+        for chunk in _chunks(redundant):
+            removed += RespondentCharacteristics.objects.filter(pk__in=chunk).delete()[0]
+
+        by_canonical = defaultdict(list)
+        for (_, canonical_id), (row_id, is_canonical) in keep.items():
+            if not is_canonical:
+                by_canonical[canonical_id].append(row_id)
+        for canonical_id, row_ids in by_canonical.items():
+            for chunk in _chunks(row_ids):
+                repointed += RespondentCharacteristics.objects.filter(pk__in=chunk).update(
+                    characteristic_value_id=canonical_id
+                )
+
+        for dup_id, canonical_id in merges.items():
+            CharacteristicValueAlias.objects.filter(canonical_value_id=dup_id).update(canonical_value_id=canonical_id)
+
+    CharacteristicValueAlias.objects.bulk_create([
+        CharacteristicValueAlias(characteristic=characteristic, normalized_text=normalized[:255],
+                                 canonical_value_id=canonical_id)
+        for normalized, canonical_id in aliases
+    ], batch_size=MERGE_BATCH_SIZE, ignore_conflicts=True)
+
+    for chunk in _chunks(merges):
+        CharacteristicValues.objects.filter(pk__in=chunk).delete()
+
+    transaction.on_commit(lambda: invalidate_indexes([characteristic.pk]))
+    return {'merged_values': len(merges), 'repointed': repointed, 'removed_duplicates': removed}
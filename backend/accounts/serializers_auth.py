@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Users
 from captcha.models import CaptchaStore
+from django.utils import timezone
 
 class UserRegistrationSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -21,19 +22,17 @@ class UserRegistrationSerializer(serializers.Serializer):
         if not key or not value:
             raise serializers.ValidationError("Требуется ввести капчу.")
 
-        # Проверка существования ключа
-        try:
-            captcha = CaptchaStore.objects.get(hashkey=key)
-        except CaptchaStore.DoesNotExist:
-            raise serializers.ValidationError("Ключ капчи не найден или устарел. Обновите капчу.")
-
-        # Проверка совпадения
-        if captcha.response != value.strip().lower():
-            raise serializers.ValidationError("Неверно введена капча. Попробуйте снова.")
+        # Один DELETE: капча верна и не просрочена — она же сразу и погашена
+        deleted, _ = CaptchaStore.objects.filter(
+            hashkey=key, response=value.strip().lower(), expiration__gt=timezone.now()
+        ).delete()
+        if deleted:
+            return data
 
-        # Капча проверена успешно — удаляем её
-        captcha.delete()
-        return data
+        # Неудача — уточняем причину
+        if not CaptchaStore.objects.filter(hashkey=key, expiration__gt=timezone.now()).exists():
+            raise serializers.ValidationError("Ключ капчи не найден или устарел. Обновите капчу.")
+        raise serializers.ValidationError("Неверно введена капча. Попробуйте снова.")
 
     def create(self, validated_data):
         password = validated_data.pop('password')
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Users, Characteristics, CharacteristicValues, RespondentCharacteristics
 from django.db import transaction
+from .normalization import canonicalize
 
 class UserMeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,7 +11,9 @@ class UserMeSerializer(serializers.ModelSerializer):
 
 class UserStatsSerializer(serializers.Serializer):
     completed_surveys = serializers.IntegerField()
-    earned_money = serializers.DecimalField(max_digits=10, decimal_places=2)
+    in_progress_surveys = serializers.IntegerField()
+    earned_money = serializers.DecimalField(max_digits=12, decimal_places=2)
+    last_activity_at = serializers.DateTimeField(allow_null=True)
 
 
 # ---------- ХАРАКТЕРИСТИКИ ----------
@@ -52,42 +55,104 @@ class CharacteristicSerializer(serializers.ModelSerializer):
         return data
 
 
+def choice_options(requirements):
+    """Варианты для типа 'choice': через ';' (как требует CharacteristicSerializer) или ',' (стандартные)."""
+    separator = ";" if ";" in requirements else ","
+    return [v.strip() for v in requirements.split(separator)]
+
+
+def validate_characteristic_value(characteristic, value_text):
+    """Проверка значения по типу характеристики."""
+    if characteristic.value_type == "numeric":
+        try:
+            num_value = float(value_text)
+            limits = [float(x.strip()) for x in characteristic.requirements.split(",")]
+        except ValueError:
+            raise serializers.ValidationError(f"Поле '{characteristic.name}' должно быть числом.")
+        if not (limits[0] <= num_value <= limits[1]):
+            raise serializers.ValidationError(
+                f"Значение '{value_text}' не входит в диапазон {limits[0]}–{limits[1]}"
+            )
+
+    elif characteristic.value_type == "choice":
+        allowed = choice_options(characteristic.requirements or "")
+        if value_text not in allowed:
+            raise serializers.ValidationError(
+                f"Недопустимое значение '{value_text}'. Разрешено: {', '.join(allowed)}"
+            )
+
+    # Строковый тип — без ограничений
+
+
 class RespondentCharacteristicListSerializer(serializers.ListSerializer):
     """✅ Кастомный ListSerializer с поддержкой batch create_or_update"""
 
+    @transaction.atomic
     def create_or_update(self, user, data):
-        for item in data:
-            char_id = item['characteristic_id']
-            value_text = item['value']
-            characteristic = Characteristics.objects.get(characteristic_id=char_id)
-
-            # 🔍 Проверка по типу
-            if characteristic.value_type == "numeric":
-                try:
-                    num_value = float(value_text)
-                    limits = [float(x.strip()) for x in characteristic.requirements.split(",")]
-                    if not (limits[0] <= num_value <= limits[1]):
-                        raise serializers.ValidationError(
-                            f"Значение '{value_text}' не входит в диапазон {limits[0]}–{limits[1]}"
-                        )
-                except ValueError:
-                    raise serializers.ValidationError(f"Поле '{characteristic.name}' должно быть числом.")
-
-            elif characteristic.value_type == "choice":
-                allowed = [v.strip() for v in characteristic.requirements.split(";")]
-                if value_text not in allowed:
-                    raise serializers.ValidationError(
-                        f"Недопустимое значение '{value_text}'. Разрешено: {', '.join(allowed)}"
-                    )
-
-            # Строковый тип — без ограничений
-            value_obj, _ = CharacteristicValues.objects.get_or_create(
-                characteristic=characteristic,
-                value_text=value_text
-            )
-            RespondentCharacteristics.objects.update_or_create(
-                user=user, characteristic_value=value_obj
-            )
+        """
+        Пакетное добавление/обновление характеристик пользователя.
+        Число запросов не зависит от количества переданных характеристик:
+        характеристики, значения и записи пользователя читаются и пишутся пачками.
+        """
+        # последнее значение для характеристики побеждает
+        requested = {item['characteristic_id']: item['value'] for item in data}
+        characteristics = Characteristics.objects.in_bulk(list(requested))
+
+        missing = [str(char_id) for char_id in requested if char_id not in characteristics]
+        if missing:
+            raise serializers.ValidationError(f"Характеристики не найдены: {', '.join(missing)}")
+        for char_id, value_text in requested.items():
+            validate_characteristic_value(characteristics[char_id], value_text)
+
+        # 1) значения: строковые — через канонизацию (алиасы + fuzzy-индекс),
+        #    остальные — берём существующие, недостающие создаём одной пачкой
+        free_text = {
+            char_id: value_text for char_id, value_text in requested.items()
+            if characteristics[char_id].value_type == "string"
+        }
+        values = canonicalize(
+            {char_id: characteristics[char_id] for char_id in free_text}, free_text
+        ) if free_text else {}
+        exact = {char_id: value_text for char_id, value_text in requested.items() if char_id not in free_text}
+        if exact:
+            for value in CharacteristicValues.objects.filter(
+                    characteristic_id__in=exact, value_text__in=set(exact.values())
+            ).order_by('characteristic_value_id'):
+                if exact.get(value.characteristic_id) == value.value_text:
+                    values.setdefault(value.characteristic_id, value)
+            new_values = [
+                CharacteristicValues(characteristic=characteristics[char_id], value_text=value_text)
+                for char_id, value_text in exact.items() if char_id not in values
+            ]
+            for value in CharacteristicValues.objects.bulk_create(new_values):
+                values[value.characteristic_id] = value
+
+        # 2) записи пользователя: одна на характеристику — обновляем, лишние удаляем, новые создаём
+        existing = {}
+        duplicates = []
+        for row in RespondentCharacteristics.objects.filter(
+                user=user, characteristic_value__characteristic_id__in=requested
+        ).select_related('characteristic_value').order_by('id'):
+            char_id = row.characteristic_value.characteristic_id
+            if char_id in existing:
+                duplicates.append(row.pk)
+            else:
+                existing[char_id] = row
+
+        changed = []
+        for char_id, row in existing.items():
+            if row.characteristic_value_id != values[char_id].pk:
+                row.characteristic_value = values[char_id]
+                changed.append(row)
+
+        if duplicates:
+            RespondentCharacteristics.objects.filter(pk__in=duplicates).delete()
+        if changed:
+            RespondentCharacteristics.objects.bulk_update(changed, ['characteristic_value'])
+        RespondentCharacteristics.objects.bulk_create([
+            RespondentCharacteristics(user=user, characteristic_value=values[char_id])
+            for char_id in requested if char_id not in existing
+        ])
 
         return RespondentCharacteristics.objects.filter(user=user)
 
@@ -109,6 +174,7 @@ class RespondentCharacteristicSerializer(serializers.ModelSerializer):
     class Meta:
         model = RespondentCharacteristics
         fields = ['characteristic_id', 'value', 'characteristic_name', 'value_text']
+        list_serializer_class = RespondentCharacteristicListSerializer
 
     def to_representation(self, instance):
         """⚙️ Преобразование модели → JSON"""
@@ -118,48 +184,3 @@ class RespondentCharacteristicSerializer(serializers.ModelSerializer):
             'characteristic_name': char.name,
             'value': instance.characteristic_value.value_text
         }
-
-    # ✅ Добавляем метод create_or_update
-    @staticmethod
-    @transaction.atomic
-    def create_or_update(user, validated_data_list):
-        """
-        Создание или обновление характеристик пользователя.
-        Если такая характеристика уже есть — обновляем значение.
-        """
-        from accounts.models import CharacteristicValues  # импорт здесь для избежания циклических зависимостей
-
-        for data in validated_data_list:
-            characteristic_id = data.get('characteristic_id')
-            value_text = data.get('value')
-
-            try:
-                characteristic = Characteristics.objects.get(pk=characteristic_id)
-            except Characteristics.DoesNotExist:
-                print(f"⚠️ Характеристика ID={characteristic_id} не найдена — пропуск.")
-                continue
-
-            # Проверяем, существует ли значение с таким текстом
-            value_obj, _ = CharacteristicValues.objects.get_or_create(
-                characteristic=characteristic,
-                value_text=value_text
-            )
-
-            # Проверяем, есть ли у пользователя уже запись с этой характеристикой
-            existing = RespondentCharacteristics.objects.filter(
-                user=user,
-                characteristic_value__characteristic=characteristic
-            ).first()
-
-            if existing:
-                # Обновляем значение
-                existing.characteristic_value = value_obj
-                existing.save()
-                print(f"🔄 Обновлена характеристика пользователя ({user.id}): {characteristic.name} → {value_text}")
-            else:
-                # Создаём новую запись
-                RespondentCharacteristics.objects.create(
-                    user=user,
-                    characteristic_value=value_obj
-                )
-                print(f"🆕 Добавлена новая характеристика пользователю ({user.id}): {characteristic.name} = {value_text}")
@@ -0,0 +1,109 @@
+# accounts/stats.py
+"""
+Счётчики RespondentStats.
+
+Инкрементальные обновления вызываются на путях записи:
+- record_status_change() — SurveyProgressUpdateView (смена статуса прохождения);
+- record_earning() — payments.services.perform_payout (успешная выплата);
+- record_abandoned() — housekeeping (зависшие прохождения переведены в `abandoned`).
+Обновление — одно атомарное UPDATE ... SET x = x + delta, поэтому параллельные
+запросы не теряют изменения. rebuild_stats() пересчитывает счётчики с нуля.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from payments.models import PaymentTransaction
+from surveys.models import RespondentSurveyStatus
+from .models import RespondentStats
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def _apply(user_id, at=None, **deltas):
+    at = at or timezone.now()
+    RespondentStats.objects.get_or_create(user_id=user_id)
+    # счётчики могли разойтись с данными (записи до rebuild_stats) — не уходим ниже нуля
+    updates = {field: Greatest(F(field) + delta, 0) if delta < 0 else F(field) + delta
+               for field, delta in deltas.items() if delta}
+    RespondentStats.objects.filter(user_id=user_id).update(
+        last_activity_at=at, updated_at=timezone.now(), **updates
+    )
+
+
+def record_status_change(user_id, previous, current, at=None):
+    """Учитывает переход статуса previous → current (previous=None — новая запись)."""
+    if previous == current:
+        _apply(user_id, at)
+        return
+    completed = (current == 'completed') - (previous == 'completed')
+    in_progress = (current == 'in_progress') - (previous == 'in_progress')
+    _apply(user_id, at, completed_surveys=completed, in_progress_surveys=in_progress)
+
+
+def record_earning(user_id, amount, at=None):
+    _apply(user_id, at, earned_money=Decimal(amount))
+
+
+def record_abandoned(counts):
+    """counts: {user_id: сколько прохождений in_progress стали abandoned}. Активность не обновляется."""
+    for user_id, count in counts.items():
+        RespondentStats.objects.filter(user_id=user_id).update(
+            in_progress_surveys=Greatest(F('in_progress_surveys') - count, 0), updated_at=timezone.now()
+        )
+
+
+def rebuild_stats(user_ids=None):
+    """Полный пересчёт счётчиков по статусам и успешным выплатам. Возвращает число записей."""
+    statuses = RespondentSurveyStatus.objects.all()
+    payouts = PaymentTransaction.objects.filter(type='payout', status='success')
+    if user_ids is not None:
+        statuses = statuses.filter(respondent_id__in=user_ids)
+        payouts = payouts.filter(user_id__in=user_ids)
+
+    rows = {}
+
+    def row(user_id):
+        return rows.setdefault(user_id, RespondentStats(
+            user_id=user_id, completed_surveys=0, in_progress_surveys=0,
+            earned_money=Decimal('0.00'), last_activity_at=None,
+        ))
+
+    def touch(stats, at):
+        if at and (stats.last_activity_at is None or at > stats.last_activity_at):
+            stats.last_activity_at = at
+
+    for item in (
+            statuses.values('respondent_id')
+            .annotate(completed=Count('pk', filter=Q(status='completed')),
+                      in_progress=Count('pk', filter=Q(status='in_progress')),
+                      last=Max('updated_at'))
+            .order_by()
+    ):
+        stats = row(item['respondent_id'])
+        stats.completed_surveys = item['completed']
+        stats.in_progress_surveys = item['in_progress']
+        touch(stats, item['last'])
+
+    for item in payouts.values('user_id').annotate(total=Sum('amount'), last=Max('processed_at')).order_by():
+        stats = row(item['user_id'])
+        stats.earned_money = item['total'] or Decimal('0.00')
+        touch(stats, item['last'])
+
+    with transaction.atomic():
+        # сначала обнуляем (у кого-то могли пропасть все статусы/выплаты), затем upsert посчитанного
+        scope = RespondentStats.objects.all()
+        if user_ids is not None:
+            scope = scope.filter(user_id__in=user_ids)
+        scope.update(completed_surveys=0, in_progress_surveys=0, earned_money=Decimal('0.00'),
+                     last_activity_at=None, updated_at=timezone.now())
+        RespondentStats.objects.bulk_create(
+            list(rows.values()), batch_size=REBUILD_BATCH_SIZE,
+            update_conflicts=True, unique_fields=['user'],
+            update_fields=['completed_surveys', 'in_progress_surveys', 'earned_money', 'last_activity_at',
+                           'updated_at'],
+        )
+    return len(rows)
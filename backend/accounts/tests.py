@@ -1,3 +1,9 @@
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
@@ -5,12 +11,24 @@ from rest_framework.test import APIClient
 from django.contrib.auth.tokens import default_token_generator
 from django.core import mail
 from captcha.models import CaptchaStore
-from accounts.models import Users, Characteristics
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.core.management import call_command
+from accounts.models import (
+    Users, Characteristics, CharacteristicValues, CharacteristicValueAlias, RespondentCharacteristics
+)
+from accounts import captcha_pool
+from accounts.normalization import invalidate_indexes
+from notifications.outbox import dispatch_emails
+from django.utils import timezone
 
 
 @override_settings(
     EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
-    FRONTEND_URL='http://127.0.0.1:3000'
+    FRONTEND_URL='http://127.0.0.1:3000',
+    CAPTCHA_POOL_ENABLED=False,  # классическая капча; пул проверяется в CaptchaPoolTests на временном каталоге
 )
 class AuthFlowTests(TestCase):
     """🔒 Полный сценарий проверки регистрации, логина, смены и восстановления пароля."""
@@ -77,7 +95,10 @@ class AuthFlowTests(TestCase):
         url = reverse('forgot-password')
         resp = self.client.post(url, {'email': 'test@example.com'}, format='json')
         self.assertEqual(resp.status_code, status.HTTP_200_OK, f"[Ошибка] Ошибка при forgot-password: {resp}")
+        self.assertEqual(len(mail.outbox), 0, "[Ошибка] Письмо отправлено прямо в запросе.")
+        self.assertEqual(dispatch_emails(), {'sent': 1})
         self.assertEqual(len(mail.outbox), 1, "[Ошибка] Письмо не было отправлено.")
+        self.assertIn('reset-password?token=', mail.outbox[0].body)
 
         token = default_token_generator.make_token(self.user)
         url = reverse('reset-password') + f'?email={self.user.email}'
@@ -88,6 +109,128 @@ class AuthFlowTests(TestCase):
         self.assertTrue(self.user.check_password('ResetPass789'), "[Ошибка] Новый пароль не применился.")
 
 
+class CaptchaPoolTests(TestCase):
+    """🧩 Пул готовых капч и очистка CaptchaStore"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        overrides = override_settings(CAPTCHA_POOL_ROOT=self.root, CAPTCHA_POOL_ENABLED=True)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client = APIClient()
+
+    def test_01_pooled_captcha_served_without_rendering(self):
+        """✅ Капча из пула выдаётся без запросов к БД, картинка — с диска, регистрация проходит"""
+        self.assertEqual(captcha_pool.refill(3), 3)
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse('generate-captcha'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        key = resp.data['captcha_key']
+        self.assertEqual(resp.data['captcha_image_url'], reverse('captcha-pool-image', kwargs={'key': key}))
+        self.assertEqual(captcha_pool.size(), 2)
+
+        with self.assertNumQueries(0):
+            resp = self.client.get(resp.data['captcha_image_url'])
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'image/png')
+        self.assertTrue(b''.join(resp.streaming_content).startswith(b'\x89PNG'))
+
+        answer = CaptchaStore.objects.get(hashkey=key).response
+        resp = self.client.post(reverse('register'), {
+            'email': 'pooled@example.com', 'role': 'respondent', 'password': 'Pass12345',
+            'captcha_key': key, 'captcha_value': answer.upper(),
+        }, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED, f"[Ошибка] Регистрация: {resp.data}")
+        self.assertFalse(CaptchaStore.objects.filter(hashkey=key).exists(), "[Ошибка] Капча не погашена")
+
+        # пул пуст — капча генерируется по-старому
+        captcha_pool.claim(), captcha_pool.claim()
+        resp = self.client.get(reverse('generate-captcha'))
+        self.assertIn('/captcha/image/', resp.data['captcha_image_url'])
+
+    def test_02_purge_expired_in_batches(self):
+        """✅ Просроченные капчи удаляются пачками, живые остаются"""
+        past = timezone.now() - datetime.timedelta(minutes=1)
+        CaptchaStore.objects.bulk_create([
+            CaptchaStore(challenge='X', response='x', hashkey=f'{i:040x}', expiration=past) for i in range(7)
+        ])
+        alive = CaptchaStore.generate_key()
+
+        self.assertEqual(captcha_pool.purge_expired(dry_run=True)['captchas'], 7)
+        with self.assertNumQueries(7):  # 3 пачки × (SELECT + DELETE) + финальный пустой SELECT
+            purged = captcha_pool.purge_expired(batch_size=3)
+        self.assertEqual(purged['captchas'], 7)
+        self.assertEqual(list(CaptchaStore.objects.values_list('hashkey', flat=True)), [alive])
+
+    def test_03_partial_files_not_claimed(self):
+        """✅ Недописанные и посторонние файлы в ready/ не выдаются и не считаются"""
+        ready = os.path.join(self.root, 'ready')
+        os.makedirs(ready, exist_ok=True)
+        for name in (f'.{"a" * 40}.tmp', f'{"b" * 40}.png.tmp', 'notes.png'):
+            with open(os.path.join(ready, name), 'wb') as f:
+                f.write(b'partial')
+        self.assertEqual(captcha_pool.size(), 0)
+        self.assertIsNone(captcha_pool.claim())
+
+        self.assertEqual(captcha_pool.refill(2), 2)
+        self.assertEqual(captcha_pool.size(), 2)
+        self.assertTrue(captcha_pool.is_valid_key(captcha_pool.claim()))
+        self.assertEqual(os.listdir(os.path.join(self.root, 'tmp')), [])
+
+
+class JWTPrincipalCacheTests(TestCase):
+    """🔑 Аутентификация по JWT из кэша и отзыв токенов"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = Users.objects.create_user(
+            email='jwt@example.com', name='Jwt', role='respondent', password='OldPass123'
+        )
+
+    def login(self, password):
+        resp = self.client.post(reverse('login'), {'email': 'jwt@example.com', 'password': password}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, f"[Ошибка] Логин не удался: {resp}")
+        return resp.data['access']
+
+    def test_01_warm_principal_skips_users_table(self):
+        """✅ Повторный запрос с токеном не обращается к таблице пользователей"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.login("OldPass123")}')
+        url = '/api/users/characteristics/all/'
+        etag = self.client.get(url)['ETag']
+        # остаётся только чтение версии справочника
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual([q['sql'] for q in queries if '"users"' in q['sql']], [])
+        self.assertEqual(len(queries), 1)
+
+        # блокировка пользователя сбрасывает кэш
+        self.user.is_active = False
+        self.user.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_02_password_change_revokes_tokens(self):
+        """✅ После смены пароля старый токен отклоняется, новый работает"""
+        old = self.login('OldPass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {old}')
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(reverse('change-password'),
+                                    {'old_password': 'OldPass123', 'new_password': 'NewPass456'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, f"[Ошибка] Ошибка при смене пароля: {resp}")
+
+        resp = self.client.get(reverse('user-me'))
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED, "[Ошибка] Старый токен принят")
+
+        self.client.credentials()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.login("NewPass456")}')
+        resp = self.client.get(reverse('user-me'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, f"[Ошибка] Новый токен отклонён: {resp}")
+        self.assertEqual(resp.data['email'], 'jwt@example.com')
+
+
 class ProfileTests(TestCase):
     """👤 Проверка профиля и статистики"""
 
@@ -122,6 +265,40 @@ class ProfileTests(TestCase):
         self.assertEqual(resp.status_code, status.HTTP_200_OK, f"[Ошибка] /users/me/stats → {resp}")
         self.assertIn('completed_surveys', resp.data)
 
+    def test_03_user_stats_counters(self):
+        """✅ Счётчики обновляются при смене статуса и выплате, пересчёт даёт тот же результат"""
+        from decimal import Decimal
+        from surveys.models import Surveys
+        from payments.models import SurveyAccount
+
+        customer = Users.objects.create_user(email='stats_customer@example.com', name='C', role='customer',
+                                             password='Pass123')
+        surveys = [Surveys.objects.create(name=f"S{i}", creator=customer, status="active", max_residents=5,
+                                          cost=Decimal('10.00')) for i in range(2)]
+        SurveyAccount.objects.create(survey=surveys[0], balance=Decimal('100.00'))
+
+        for survey in surveys:
+            self.client.post(reverse('survey-progress-update', args=[survey.survey_id]),
+                             {'status': 'in_progress'}, format='json')
+        self.client.post(reverse('survey-progress-update', args=[surveys[0].survey_id]),
+                         {'status': 'completed', 'score': 0.9}, format='json')
+        resp = self.client.post(reverse('payments-payout'),
+                                {'survey_id': surveys[0].survey_id, 'respondent_id': self.user.pk}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, f"[Ошибка] payout → {resp.data}")
+
+        url = reverse('user-stats')
+        with self.assertNumQueries(1):
+            resp = self.client.get(url)
+        self.assertEqual(resp.data['completed_surveys'], 1)
+        self.assertEqual(resp.data['in_progress_surveys'], 1)
+        self.assertEqual(Decimal(resp.data['earned_money']), Decimal('10.00'))
+        self.assertIsNotNone(resp.data['last_activity_at'])
+
+        call_command('rebuild_respondent_stats', stdout=io.StringIO())
+        rebuilt = self.client.get(url).data
+        for field in ('completed_surveys', 'in_progress_surveys', 'earned_money'):
+            self.assertEqual(rebuilt[field], resp.data[field], f"[Ошибка] Пересчёт {field} не совпал")
+
 
 class CharacteristicsTests(TestCase):
     """🧩 Проверка CRUD характеристик и пользовательского заполнения"""
@@ -195,3 +372,140 @@ class CharacteristicsTests(TestCase):
         bad = [{'characteristic_id': c2.characteristic_id, 'value': 'другое'}]
         resp = self.client.post('/api/users/characteristics/update/', bad, format='json')
         self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST, f"[Ошибка] Ожидался 400 при неверном выборе → {resp}")
+
+    def test_03_batch_update_constant_queries(self):
+        """✅ Пакетное обновление: число запросов не зависит от количества характеристик"""
+        chars = [
+            Characteristics.objects.create(name=f"Пакет{i}", value_type="numeric", requirements="0,100")
+            for i in range(8)
+        ]
+        other = Users.objects.create_user(
+            email='respondent2@example.com', name='User2', role='respondent', password='User123'
+        )
+        url = '/api/users/characteristics/update/'
+
+        def post(user, chars_, value):
+            self.client.force_authenticate(user)
+            items = [{'characteristic_id': c.characteristic_id, 'value': value} for c in chars_]
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.post(url, items, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_200_OK, f"[Ошибка] POST update → {resp.data}")
+            return len(ctx.captured_queries)
+
+        # создание
+        self.assertEqual(post(other, chars[:2], '1'), post(self.user, chars, '1'),
+                         "[Ошибка] Число запросов растёт с количеством характеристик")
+        # обновление
+        self.assertEqual(post(other, chars[:2], '2'), post(self.user, chars, '2'),
+                         "[Ошибка] Число запросов растёт с количеством характеристик")
+
+        # повторное заполнение обновляет значения, а не добавляет записи
+        self.assertEqual(RespondentCharacteristics.objects.filter(user=self.user).count(), 8)
+        self.assertEqual(
+            set(RespondentCharacteristics.objects.filter(user=self.user)
+                .values_list('characteristic_value__value_text', flat=True)),
+            {'2'}
+        )
+
+
+class CharacteristicNormalizationTests(TestCase):
+    """🧹 Канонизация строковых значений и слияние дубликатов"""
+
+    def setUp(self):
+        invalidate_indexes()
+        self.client = APIClient()
+        self.city, _ = Characteristics.objects.get_or_create(
+            name="Город", defaults={'value_type': 'string', 'requirements': ''}
+        )
+        self.users = [
+            Users.objects.create_user(email=f'city{i}@example.com', name=f'U{i}', role='respondent', password='x')
+            for i in range(4)
+        ]
+
+    def test_01_spelling_variants_resolve_to_one_value(self):
+        """✅ «Москва», « москва », «г. Москва», «Моска» → одно каноническое значение"""
+        for user, text in zip(self.users, ["Москва", " москва ", "г. Москва", "Моска"]):
+            self.client.force_authenticate(user)
+            resp = self.client.post('/api/users/characteristics/update/',
+                                    [{'characteristic_id': self.city.characteristic_id, 'value': text}], format='json')
+            self.assertEqual(resp.status_code, status.HTTP_200_OK, f"[Ошибка] POST update → {resp.data}")
+            self.assertEqual(resp.data[0]['value'], "Москва")
+
+        self.assertEqual(CharacteristicValues.objects.filter(characteristic=self.city).count(), 1)
+        self.assertTrue(CharacteristicValueAlias.objects.filter(characteristic=self.city,
+                                                                normalized_text="моска").exists())
+
+    def test_02_merge_command_folds_duplicates(self):
+        """✅ merge_characteristic_values сливает накопленные дубликаты и переносит записи"""
+        values = [CharacteristicValues.objects.create(characteristic=self.city, value_text=t)
+                  for t in ["Москва", "москва ", "г. Москва", "Казань"]]
+        RespondentCharacteristics.objects.create(user=self.users[0], characteristic_value=values[0])
+        RespondentCharacteristics.objects.create(user=self.users[1], characteristic_value=values[0])
+        RespondentCharacteristics.objects.create(user=self.users[2], characteristic_value=values[1])
+        # у пользователя обе формы — после слияния должна остаться одна запись
+        RespondentCharacteristics.objects.create(user=self.users[0], characteristic_value=values[2])
+        RespondentCharacteristics.objects.create(user=self.users[3], characteristic_value=values[3])
+
+        call_command('merge_characteristic_values', stdout=io.StringIO())
+
+        self.assertEqual(
+            sorted(CharacteristicValues.objects.filter(characteristic=self.city).values_list('value_text', flat=True)),
+            ["Казань", "Москва"]
+        )
+        self.assertEqual(
+            RespondentCharacteristics.objects.filter(characteristic_value=values[0]).count(), 3
+        )
+        self.assertEqual(RespondentCharacteristics.objects.filter(user=self.users[0]).count(), 1)
+
+
+class CharacteristicsCatalogCacheTests(TestCase):
+    """🗂️ Кэш справочника характеристик и ETag"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = Users.objects.create_superuser(
+            email='catalog_admin@example.com', name='Admin', role='moderator', password='Admin123'
+        )
+        self.client.force_authenticate(self.admin)
+
+    def test_01_etag_revalidation_and_invalidation(self):
+        """✅ 304 без запросов к БД; изменение справочника меняет ETag"""
+        url = '/api/users/characteristics/all/'
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        etag = resp['ETag']
+        names = {c['name'] for c in json.loads(resp.content)}
+
+        # только чтение общей версии справочника
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # админский список отдаёт те же байты с тем же ETag
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/admin/characteristics/')
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.post('/api/admin/characteristics/',
+                                {'name': 'Хобби', 'value_type': 'string', 'requirements': ''}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED, f"[Ошибка] POST → {resp.data}")
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp['ETag'], etag)
+        self.assertEqual({c['name'] for c in json.loads(resp.content)}, names | {'Хобби'})
+
+    def test_02_version_shared_between_workers(self):
+        """✅ Изменение справочника в другом воркере видно и при кэше в памяти процесса"""
+        from accounts.models import CatalogVersion
+
+        url = '/api/users/characteristics/all/'
+        etag = self.client.get(url)['ETag']
+        # другой воркер: свой кэш, общая БД — сюда доходит только новая версия в БД
+        Characteristics.objects.create(name='Питомцы', value_type='string')
+        CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1)
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('Питомцы', {c['name'] for c in json.loads(resp.content)})
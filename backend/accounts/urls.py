@@ -1,7 +1,7 @@
 from django.urls import path
 from .views_auth import (
     UserRegistration, UserLogin, UserChangePassword,
-    ForgotPassword, ResetPassword, CaptchaGenerateView
+    ForgotPassword, ResetPassword, CaptchaGenerateView, CaptchaPoolImageView
 )
 from .views_profile import (
     UserMeView, UserStatsView,
@@ -19,16 +19,17 @@ urlpatterns = [
     path('auth/forgot-password/', ForgotPassword.as_view(), name='forgot-password'),
     path('auth/reset-password/', ResetPassword.as_view(), name='reset-password'),
     path('auth/captcha/new/', CaptchaGenerateView.as_view(), name='generate-captcha'),
+    path('auth/captcha/image/<str:key>/', CaptchaPoolImageView.as_view(), name='captcha-pool-image'),
 
     # Личный кабинет
     path('users/me/', UserMeView.as_view(), name='user-me'),
     path('users/me/stats/', UserStatsView.as_view(), name='user-stats'),
 
-    path('users/characteristics/all/', AllCharacteristicsView.as_view()),
-    path('users/characteristics/mine/', UserCharacteristicsView.as_view()),
-    path('users/characteristics/update/', UpdateUserCharacteristicsView.as_view()),
+    path('users/characteristics/all/', AllCharacteristicsView.as_view(), name='characteristics-all'),
+    path('users/characteristics/mine/', UserCharacteristicsView.as_view(), name='characteristics-mine'),
+    path('users/characteristics/update/', UpdateUserCharacteristicsView.as_view(), name='characteristics-update'),
 
     path('admin/characteristics/', CharacteristicAdminView.as_view(), name='characteristicadminview'),
-    path('admin/characteristics/<int:pk>/', CharacteristicDetailView.as_view()),
+    path('admin/characteristics/<int:pk>/', CharacteristicDetailView.as_view(), name='characteristic-detail'),
 
 ]
@@ -4,15 +4,18 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import authenticate
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.http import FileResponse
 from django.urls import reverse
 from django.conf import settings
 from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
 from captcha.models import CaptchaStore
 from captcha.helpers import captcha_image_url
+from captcha.views import captcha_image
+from notifications.outbox import enqueue_email
 
+from . import captcha_pool
+from .authentication import issue_tokens
 from .models import Users
 from .serializers_auth import (
     UserRegistrationSerializer,
@@ -84,7 +87,7 @@ class UserLogin(APIView):
         if not user:
             return Response({"error": "Неверный email или пароль"},
                             status=status.HTTP_401_UNAUTHORIZED)
-        refresh = RefreshToken.for_user(user)
+        refresh = issue_tokens(user)
         return Response({
             "refresh": str(refresh),
             "access": str(refresh.access_token)
@@ -119,6 +122,7 @@ class UserChangePassword(APIView):
                             status=status.HTTP_401_UNAUTHORIZED)
         request.user.set_password(new_password)
         request.user.save()
+        request.user.revoke_tokens()
         return Response({"message": "Пароль успешно изменен"})
 
 class ForgotPassword(APIView):
@@ -153,12 +157,12 @@ class ForgotPassword(APIView):
         token = default_token_generator.make_token(user)
         reset_link = f"{settings.FRONTEND_URL}/reset-password?token={token}&email={email}"
 
-        send_mail(
+        # SMTP не задерживает ответ: письмо отправит run_email_sender
+        enqueue_email(
+            to_email=email,
             subject="Восстановление пароля",
-            message=f"Для смены пароля перейдите по ссылке: {reset_link}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=True,
+            body=f"Для смены пароля перейдите по ссылке: {reset_link}",
+            kind='password_reset',
         )
         return Response({"message": "Если email зарегистрирован, письмо отправлено"},
                         status=status.HTTP_200_OK)
@@ -203,6 +207,7 @@ class ResetPassword(APIView):
 
         user.set_password(new_password)
         user.save()
+        user.revoke_tokens()
         return Response({"message": "Пароль успешно изменен"},
                         status=status.HTTP_200_OK)
 
@@ -235,12 +240,36 @@ class CaptchaGenerateView(APIView):
         tags=tag_auth
     )
     def get(self, request):
-        new_captcha = CaptchaStore.generate_key()
-        image_url = captcha_image_url(new_captcha)
+        # готовая капча из пула: без записи в БД и отрисовки на запросе
+        new_captcha = captcha_pool.claim()
+        if new_captcha:
+            image_url = reverse('captcha-pool-image', kwargs={'key': new_captcha})
+        else:
+            new_captcha = CaptchaStore.generate_key()
+            image_url = captcha_image_url(new_captcha)
 
         print(f"[DEBUG ✅] Сгенерирована капча: key={new_captcha}, url={image_url}")
 
         return Response({
             "captcha_key": new_captcha,
             "captcha_image_url": image_url
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+class CaptchaPoolImageView(APIView):
+    """Картинка капчи из пула — отдаётся с диска; иначе отрисовывается django-simple-captcha."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    @extend_schema(
+        summary="Изображение капчи",
+        responses={200: OpenApiResponse(description="PNG-изображение"), 410: OpenApiResponse(description="Капча устарела")},
+        tags=tag_auth
+    )
+    def get(self, request, key):
+        path = captcha_pool.image_path(key)
+        if path is None:
+            return captcha_image(request, key)
+        response = FileResponse(open(path, 'rb'), content_type='image/png')
+        response['Cache-Control'] = 'private, no-store'
+        return response
@@ -1,3 +1,6 @@
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -7,11 +10,26 @@ from .serializers_profile import (
     UserMeSerializer, UserStatsSerializer,
     CharacteristicSerializer, RespondentCharacteristicSerializer
 )
-from .models import Characteristics, RespondentCharacteristics
+from .models import Characteristics, RespondentCharacteristics, RespondentStats
+from .catalog import get_catalog, bump_version, get_version, etag_for
 
 tag_profile = ['Личный кабинет']
 
 
+def catalog_response(request):
+    """Справочник характеристик из кэша; при совпадении If-None-Match — 304 по одному чтению версии."""
+    version = get_version()
+    etag = etag_for(version)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        etag, body = get_catalog(version)
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 class UserMeView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -35,7 +53,12 @@ class UserStatsView(APIView):
         if request.user.role != 'respondent':
             return Response({"detail": "Статистика доступна только респондентам."},
                             status=status.HTTP_403_FORBIDDEN)
-        data = {"completed_surveys": 12, "earned_money": "345.50"}
+        # одна строка предрасчитанных счётчиков (см. accounts/stats.py)
+        data = RespondentStats.objects.filter(user=request.user).values(
+            'completed_surveys', 'in_progress_surveys', 'earned_money', 'last_activity_at'
+        ).first() or {
+            'completed_surveys': 0, 'in_progress_surveys': 0, 'earned_money': '0.00', 'last_activity_at': None
+        }
         return Response(UserStatsSerializer(data).data)
 
 
@@ -46,8 +69,7 @@ class AllCharacteristicsView(APIView):
 
     @extend_schema(summary="Список всех характеристик для заполнения", responses=CharacteristicSerializer(many=True), tags=tag_profile)
     def get(self, request):
-        queryset = Characteristics.objects.all()
-        return Response(CharacteristicSerializer(queryset, many=True).data)
+        return catalog_response(request)
 
 
 class UserCharacteristicsView(APIView):
@@ -55,7 +77,9 @@ class UserCharacteristicsView(APIView):
 
     @extend_schema(summary="Получить заполненные пользователем характеристики", responses=RespondentCharacteristicSerializer(many=True), tags=tag_profile)
     def get(self, request):
-        queryset = RespondentCharacteristics.objects.filter(user=request.user)
+        queryset = RespondentCharacteristics.objects.filter(user=request.user).select_related(
+            'characteristic_value__characteristic'
+        )
         return Response(RespondentCharacteristicSerializer(queryset, many=True).data)
 
 
@@ -72,14 +96,12 @@ class UpdateUserCharacteristicsView(APIView):
         serializer = RespondentCharacteristicSerializer(data=request.data, many=True)
         serializer.is_valid(raise_exception=True)
 
-        # ✅ Обновляем/добавляем характеристики
-        RespondentCharacteristicSerializer.create_or_update(request.user, serializer.validated_data)
+        # ✅ Обновляем/добавляем характеристики одной пачкой
+        serializer.create_or_update(request.user, serializer.validated_data)
 
         updated = RespondentCharacteristics.objects.filter(user=request.user).select_related(
             'characteristic_value__characteristic'
         )
-
-        print(f"✅ У пользователя ID={request.user.id} теперь {updated.count()} характеристик.")
         return Response(RespondentCharacteristicSerializer(updated, many=True).data, status=200)
 
 # ============ CRUD для Characteristics (админ) ============
@@ -89,14 +111,15 @@ class CharacteristicAdminView(APIView):
 
     @extend_schema(summary="Получить все характеристики", responses=CharacteristicSerializer(many=True), tags=['Характеристики'])
     def get(self, request):
-        queryset = Characteristics.objects.all()
-        return Response(CharacteristicSerializer(queryset, many=True).data)
+        return catalog_response(request)
 
     @extend_schema(summary="Создать характеристику", request=CharacteristicSerializer, responses=CharacteristicSerializer, tags=['Характеристики'])
     def post(self, request):
         serializer = CharacteristicSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            bump_version()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -108,10 +131,14 @@ class CharacteristicDetailView(APIView):
         characteristic = Characteristics.objects.get(pk=pk)
         serializer = CharacteristicSerializer(characteristic, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            bump_version()
         return Response(serializer.data)
 
     @extend_schema(summary="Удалить характеристику", tags=['Характеристики'])
     def delete(self, request, pk):
-        Characteristics.objects.filter(pk=pk).delete()
+        with transaction.atomic():
+            Characteristics.objects.filter(pk=pk).delete()
+            bump_version()
         return Response(status=status.HTTP_204_NO_CONTENT)
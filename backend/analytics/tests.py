@@ -202,3 +202,36 @@ class AnalyticsEndpointsTest(APITestCase):
         dist2 = age_data["distribution"]
         found2 = any(d["value"] == "30" and d["percent"] == 100.0 for d in dist2)
         self.assertTrue(found2, f"Не найден возраст 30 в {dist2}")
+
+
+class TypedAnswersDashboardTest(APITestCase):
+    """🔢 Дашборд по типизированным колонкам ответов: агрегаты в SQL"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email="typed_c@example.com", password="pass1234", name="Customer", role="customer"
+        )
+        self.survey = Surveys.objects.create(name="Типы", creator=self.customer, status="active")
+        rating = Questions.objects.create(text_question="Оценка?", type_question="rating")
+        moment = Questions.objects.create(text_question="Когда?", type_question="date_time")
+        rating_link = SurveyQuestions.objects.create(survey=self.survey, question=rating, order=1)
+        moment_link = SurveyQuestions.objects.create(survey=self.survey, question=moment, order=2)
+        for i, (score, when) in enumerate([("4", "2026-01-05T10:00"), ("5,5", "2026-03-01"), ("nan", "вчера")]):
+            respondent = User.objects.create_user(
+                email=f"typed_r{i}@example.com", password="x", name="R", role="respondent"
+            )
+            RespondentAnswers.objects.create(survey_question=rating_link, respondent=respondent, text_answer=score)
+            RespondentAnswers.objects.create(survey_question=moment_link, respondent=respondent, text_answer=when)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_rating_and_date_aggregates(self):
+        """✅ Среднее/мин/макс оценки и первая/последняя дата считаются по разобранным значениям"""
+        resp = self.client.get(reverse("dashboard-data", args=[self.survey.survey_id]))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        dashboard = resp.data["dashboard"]
+        self.assertEqual(sorted(dashboard["Оценка?"]["values"]), [4.0, 5.5])
+        self.assertEqual(dashboard["Оценка?"]["average"], 4.75)
+        self.assertEqual((dashboard["Оценка?"]["min"], dashboard["Оценка?"]["max"]), (4.0, 5.5))
+        self.assertEqual(dashboard["Когда?"]["first"].date().isoformat(), "2026-01-05")
+        self.assertEqual(dashboard["Когда?"]["last"].date().isoformat(), "2026-03-01")
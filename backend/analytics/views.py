@@ -4,11 +4,10 @@ import requests
 import re
 import time
 from collections import Counter
-from statistics import mean, median
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils.timezone import is_aware
-from django.db.models import Avg, Count, FloatField
+from django.db.models import Avg, Count, FloatField, Max, Min
 from django.db.models.functions import Cast
 
 from rest_framework import permissions, serializers, status
@@ -25,6 +24,40 @@ from surveys.models import (
     Surveys, RespondentSurveyStatus, RespondentAnswers, SurveyQuestions
 )
 from accounts.models import RespondentCharacteristics
+from core.renderers import LIST_RENDERERS
+
+
+def completed_rows(survey, naive_dates=False):
+    """
+    Строки «респондент → ответы» по завершённым прохождениям опроса.
+    Три запроса (прохождения, вопросы, ответы) независимо от числа респондентов и вопросов.
+    """
+    statuses = RespondentSurveyStatus.objects.filter(survey=survey, status="completed").select_related("respondent")
+    questions = list(SurveyQuestions.objects.filter(survey=survey).select_related("question").order_by("order"))
+
+    answers = {}
+    for respondent_id, survey_question_id, text_answer in (
+        RespondentAnswers.objects
+        .filter(survey=survey, respondent_id__in=statuses.values("respondent_id"))
+        .order_by("answer_id")
+        .values_list("respondent_id", "survey_question_id", "text_answer")
+    ):
+        answers.setdefault((respondent_id, survey_question_id), text_answer)
+
+    data_rows = []
+    for st in statuses:
+        completed_at = st.updated_at
+        if naive_dates and is_aware(completed_at):
+            completed_at = completed_at.replace(tzinfo=None)
+        row = {
+            "email": st.respondent.email,
+            "score": st.score,
+            "completed_at": completed_at,
+        }
+        for sq in questions:
+            row[sq.question.text_question] = answers.get((st.respondent_id, sq.survey_question_id), "")
+        data_rows.append(row)
+    return data_rows
 
 
 # ==========================================================
@@ -32,6 +65,7 @@ from accounts.models import RespondentCharacteristics
 # ==========================================================
 class AnonymizedDataView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = LIST_RENDERERS
 
     @extend_schema(
         summary="📄 Получение обезличенных ответов опроса",
@@ -67,29 +101,8 @@ class AnonymizedDataView(APIView):
     )
     def get(self, request, survey_id: int):
         survey = get_object_or_404(Surveys, pk=survey_id)
-        statuses = RespondentSurveyStatus.objects.filter(survey=survey, status="completed")
-        questions = SurveyQuestions.objects.filter(survey=survey).select_related("question").order_by("order")
-
-        data_rows = []
-        for status in statuses:
-            respondent_answers = RespondentAnswers.objects.filter(
-                respondent=status.respondent, survey_question__survey=survey
-            ).select_related("survey_question__question")
-
-            row = {
-                "email": status.respondent.email,
-                "score": status.score,
-                "completed_at": status.updated_at,
-            }
-
-            for sq in questions:
-                answer_obj = next((a for a in respondent_answers if a.survey_question == sq), None)
-                row[sq.question.text_question] = answer_obj.text_answer if answer_obj else ""
-
-            data_rows.append(row)
-
-        df = pd.DataFrame(data_rows)
-        return JsonResponse(df.to_dict(orient="records"), safe=False)
+        # строки отдаются как есть, без промежуточного DataFrame: пустая оценка — null, а не NaN
+        return Response(completed_rows(survey))
 
 
 # ==========================================================
@@ -123,31 +136,8 @@ class ExportDataView(APIView):
     def post(self, request, survey_id: int):
         fmt = request.data.get("format", "csv")
         survey = get_object_or_404(Surveys, pk=survey_id)
-
-        statuses = RespondentSurveyStatus.objects.filter(survey=survey, status="completed")
-        questions = SurveyQuestions.objects.filter(survey=survey).select_related("question").order_by("order")
-
-        data_rows = []
-        for status in statuses:
-            respondent_answers = RespondentAnswers.objects.filter(
-                respondent=status.respondent, survey_question__survey=survey
-            ).select_related("survey_question__question")
-
-            row = {
-                "email": status.respondent.email,
-                "score": status.score,
-                "completed_at": status.updated_at.replace(tzinfo=None)
-                if is_aware(status.updated_at)
-                else status.updated_at,
-            }
-
-            for sq in questions:
-                answer_obj = next((a for a in respondent_answers if a.survey_question == sq), None)
-                row[sq.question.text_question] = answer_obj.text_answer if answer_obj else ""
-
-            data_rows.append(row)
-
-        df = pd.DataFrame(data_rows)
+        # Excel не принимает даты с часовым поясом
+        df = pd.DataFrame(completed_rows(survey, naive_dates=True))
 
         if fmt == "xlsx":
             buffer = BytesIO()
@@ -209,51 +199,79 @@ class DashboardDataView(APIView):
         survey = get_object_or_404(Surveys, pk=survey_id)
         questions = SurveyQuestions.objects.filter(survey=survey).select_related("question").order_by("order")
 
+        # Ответы на все вопросы одним запросом: (вопрос, значение) → количество
+        grouped = {}
+        for row in (
+            RespondentAnswers.objects.filter(survey=survey)
+            .values("survey_question_id", "text_answer", "number_value")
+            .annotate(answers=Count("answer_id"))
+            .order_by("survey_question_id", "text_answer")
+        ):
+            grouped.setdefault(row["survey_question_id"], []).append(row)
+
+        # Агрегаты по типизированным колонкам (surveys/answer_values.py) — в SQL, одним запросом
+        aggregates = {
+            row["survey_question_id"]: row
+            for row in (
+                RespondentAnswers.objects.filter(survey=survey)
+                .values("survey_question_id")
+                .annotate(
+                    average=Avg("number_value"), minimum=Min("number_value"), maximum=Max("number_value"),
+                    first=Min("datetime_value"), last=Max("datetime_value"),
+                )
+                .order_by()
+            )
+        }
+
         dashboard_data = {}
 
         for sq in questions:
             q = sq.question
-            answers = RespondentAnswers.objects.filter(survey_question=sq)
+            groups = grouped.get(sq.survey_question_id)
 
-            if not answers.exists():
+            if not groups:
                 continue
 
+            # все значения (с повторами) и распределение без пустых ответов, как Count("text_answer")
+            raw_vals = [g["text_answer"] for g in groups for _ in range(g["answers"])]
+            distribution = [
+                {"text_answer": g["text_answer"], "count": g["answers"] if g["text_answer"] is not None else 0}
+                for g in groups
+            ]
+
             if q.type_question in ["single_choice", "multi_choice", "dropdown"]:
-                distribution = answers.values("text_answer").annotate(count=Count("text_answer"))
                 total = sum(item["count"] for item in distribution)
                 for item in distribution:
                     item["percent"] = round(item["count"] / total * 100, 2)
                 dashboard_data[q.text_question] = {
                     "type": q.type_question,
-                    "distribution": list(distribution),
+                    "distribution": distribution,
                 }
 
             elif q.type_question == "rating":
-                raw_vals = list(answers.values_list("text_answer", flat=True))
-                nums = []
-                for v in raw_vals:
-                    try:
-                        nums.append(float(v))
-                    except Exception:
-                        continue
-                avg_value = round(mean(nums), 4) if nums else None
+                stats = aggregates.get(sq.survey_question_id, {})
+                average = stats.get("average")
                 dashboard_data[q.text_question] = {
                     "type": "rating",
-                    "values": nums,
-                    "average": avg_value,
+                    "values": [g["number_value"] for g in groups if g["number_value"] is not None
+                               for _ in range(g["answers"])],
+                    "average": round(average, 4) if average is not None else None,
+                    "min": stats.get("minimum"),
+                    "max": stats.get("maximum"),
                 }
 
             elif q.type_question == "date_time":
-                raw_vals = list(answers.values_list("text_answer", flat=True))
-                distribution = answers.values("text_answer").annotate(count=Count("text_answer"))
+                stats = aggregates.get(sq.survey_question_id, {})
                 dashboard_data[q.text_question] = {
                     "type": "date_time",
                     "values": raw_vals,
-                    "distribution": list(distribution),
+                    "distribution": distribution,
+                    "first": stats.get("first"),
+                    "last": stats.get("last"),
                 }
 
             else:
-                text_list = [a.text_answer for a in answers if a.text_answer]
+                text_list = [v for v in raw_vals if v]
                 if text_list:
                     summary = ""
                     try:
@@ -334,25 +352,24 @@ class RespondentDashboardView(APIView):
     )
     def get(self, request, survey_id: int):
         survey = get_object_or_404(Surveys, pk=survey_id)
-        completed = RespondentSurveyStatus.objects.filter(survey=survey, status='completed').select_related('respondent')
+        completed = RespondentSurveyStatus.objects.filter(survey=survey, status='completed')
 
         respondents_count = completed.count()
         all_characteristics = {}
 
-        # Сбор значений характеристик
-        for st in completed:
-            user = st.respondent
-            chars = RespondentCharacteristics.objects.filter(user=user).select_related('characteristic_value__characteristic')
+        # Сбор значений характеристик всех завершивших — одним запросом
+        chars = RespondentCharacteristics.objects.filter(
+            user_id__in=completed.values('respondent_id')
+        ).select_related('characteristic_value__characteristic').order_by('user_id', 'id')
 
-            for rc in chars:
-                
-                characteristic = rc.characteristic_value.characteristic
-                value = rc.characteristic_value.value_text
-                vtype = characteristic.value_type
+        for rc in chars:
+            characteristic = rc.characteristic_value.characteristic
+            value = rc.characteristic_value.value_text
+            vtype = characteristic.value_type
 
-                if characteristic.name not in all_characteristics:
-                    all_characteristics[characteristic.name] = {"value_type": vtype, "values": []}
-                all_characteristics[characteristic.name]["values"].append(value)
+            if characteristic.name not in all_characteristics:
+                all_characteristics[characteristic.name] = {"value_type": vtype, "values": []}
+            all_characteristics[characteristic.name]["values"].append(value)
 
         # 🔹 агрегированная аналитика
         characteristics_summary = {}
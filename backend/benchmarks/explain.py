@@ -0,0 +1,98 @@
+# benchmarks/explain.py
+"""
+Планы выполнения горячих запросов на синтетических данных.
+
+Для каждого запроса из HOT_QUERIES — план (QuerySet.explain(): на PostgreSQL
+с ANALYZE и BUFFERS), использованные индексы и медиана времени выполнения.
+Отчёт до и после миграции с индексами сравнивается compare():
+    manage.py migrate surveys 0002 && manage.py explain_hot_queries --output before.json
+    manage.py migrate && manage.py explain_hot_queries --compare before.json
+"""
+import re
+import statistics
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.utils import timezone
+
+from payments.models import PaymentTransaction
+from surveys.availability import available_surveys
+from surveys.models import RespondentAnswers, RespondentSurveyStatus, SurveyQuestions, Surveys
+
+from .suite import build_context
+
+# SQLite: «SEARCH t USING [COVERING] INDEX name»; PostgreSQL: «Index [Only] Scan using name», «Bitmap Index Scan on name»
+INDEX_PATTERNS = (
+    re.compile(r'USING (?:COVERING )?INDEX (\w+)'),
+    re.compile(r'Index (?:Only )?Scan (?:Backward )?using (\w+)'),
+    re.compile(r'Bitmap Index Scan on (\w+)'),
+)
+
+HOT_QUERIES = {
+    'answers_by_survey': lambda ctx: RespondentAnswers.objects.filter(survey=ctx['survey']),
+    'answers_by_survey_respondent': lambda ctx: RespondentAnswers.objects.filter(
+        survey=ctx['survey'], respondent=ctx['users']['respondent']),
+    'completed_statuses': lambda ctx: RespondentSurveyStatus.objects.filter(survey=ctx['survey'], status='completed'),
+    'stale_in_progress': lambda ctx: RespondentSurveyStatus.objects.filter(
+        status='in_progress', updated_at__lt=timezone.now() - timedelta(days=30)),
+    'available_surveys': lambda ctx: available_surveys(),
+    'creator_surveys': lambda ctx: Surveys.objects.filter(creator=ctx['users']['customer']),
+    'survey_questions_ordered': lambda ctx: SurveyQuestions.objects.filter(survey=ctx['survey']).order_by('order'),
+    'payout_exists': lambda ctx: PaymentTransaction.objects.filter(
+        type='payout', status='success', related_survey_id=ctx['survey'].survey_id,
+        related_respondent_id=ctx['users']['respondent'].user_id),
+}
+
+
+def indexes_used(plan):
+    return sorted({name for pattern in INDEX_PATTERNS for name in pattern.findall(plan)})
+
+
+def explain(queryset):
+    if connection.vendor == 'postgresql':
+        return queryset.explain(analyze=True, buffers=True)
+    return queryset.explain()
+
+
+def _median_ms(queryset, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def run(iterations=5, names=None):
+    ctx = build_context()
+    report = {
+        'meta': {
+            'created_at': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'survey_id': ctx['survey'].survey_id,
+        },
+        'queries': {},
+    }
+    for name, build in HOT_QUERIES.items():
+        if names and name not in names:
+            continue
+        queryset = build(ctx)
+        plan = explain(queryset)
+        report['queries'][name] = {
+            'plan': plan,
+            'indexes': indexes_used(plan),
+            'median_ms': _median_ms(queryset, iterations),
+        }
+    return report
+
+
+def compare(baseline, current):
+    """[(запрос, индексы было, индексы стало, мс было, мс стало)]."""
+    rows = []
+    for name, now in current['queries'].items():
+        before = baseline['queries'].get(name)
+        if before is None:
+            continue
+        rows.append((name, before['indexes'], now['indexes'], before['median_ms'], now['median_ms']))
+    return rows
@@ -0,0 +1,114 @@
+# benchmarks/factories.py
+"""
+factory_boy-фабрики для синтетических данных.
+
+Фабрики используются через .build(): объекты собираются в памяти и
+сохраняются пачками bulk_create (см. benchmarks/synthetic.py) —
+.create() по одной строке на миллионах записей слишком медленный.
+"""
+import random
+from decimal import Decimal
+
+import factory
+from django.contrib.auth.hashers import make_password
+from faker import Faker
+
+from accounts.models import Users, CharacteristicValues
+from payments.models import PaymentTransaction, SurveyAccount, Wallet
+from surveys.models import Surveys, Questions
+
+SYNTHETIC_DOMAIN = 'synthetic.test'
+CHOICE_TYPES = ('single_choice', 'multi_choice', 'dropdown')
+# текстовые вопросы и likert дашборд отправляет на суммаризацию в AI — в синтетике их нет
+QUESTION_TYPES = CHOICE_TYPES + ('rating', 'date_time')
+
+fake = Faker('ru_RU')
+_password = None
+
+
+def synthetic_password():
+    """Один хэш на всех синтетических пользователей: PBKDF2 на каждого — минуты на тысячи строк."""
+    global _password
+    if _password is None:
+        _password = make_password('synthetic')
+    return _password
+
+
+class UserFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Users
+
+    name = factory.Faker('name', locale='ru_RU')
+    email = factory.Sequence(lambda n: f'user{n}@{SYNTHETIC_DOMAIN}')
+    role = 'respondent'
+    is_profile_complete = True
+    password = factory.LazyFunction(synthetic_password)
+
+
+class SurveyFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Surveys
+
+    name = factory.Faker('catch_phrase', locale='ru_RU')
+    status = 'active'
+    type_survey = 'simple'
+    max_residents = factory.LazyFunction(lambda: random.choice([None, 1000, 10000]))
+    cost = factory.LazyFunction(lambda: Decimal(random.randrange(10, 101)))
+
+
+class SurveyAccountFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = SurveyAccount
+
+    balance = factory.LazyFunction(lambda: Decimal(random.randrange(1000, 100000)))
+
+
+def _extra_data(type_question):
+    if type_question in CHOICE_TYPES:
+        return {'options': [fake.word() for _ in range(random.randint(3, 6))]}
+    if type_question == 'rating':
+        return {'min': 1, 'max': 10}
+    return {}
+
+
+class QuestionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Questions
+
+    text_question = factory.LazyFunction(lambda: fake.sentence(nb_words=6).rstrip('.') + '?')
+    type_question = factory.LazyFunction(lambda: random.choice(QUESTION_TYPES))
+    extra_data = factory.LazyAttribute(lambda o: _extra_data(o.type_question))
+
+
+def answer_text(question):
+    """Правдоподобный ответ на вопрос данного типа."""
+    if question.type_question in CHOICE_TYPES:
+        return random.choice(question.extra_data['options'])
+    if question.type_question == 'rating':
+        return str(random.randint(1, 10))
+    return fake.date_time_this_year().isoformat(timespec='minutes')
+
+
+class CharacteristicValueFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = CharacteristicValues
+
+    value_text = factory.Faker('city', locale='ru_RU')
+
+
+class WalletFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Wallet
+
+    balance = factory.LazyFunction(lambda: Decimal(random.randrange(0, 5000)))
+
+
+class TransactionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = PaymentTransaction
+
+    type = 'payout'
+    status = 'success'
+    amount = factory.LazyFunction(lambda: Decimal(random.randrange(10, 101)))
+    currency = 'RUB'
+    description = factory.Faker('sentence', nb_words=5, locale='ru_RU')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.validation import run
+
+
+class Command(BaseCommand):
+    help = "Микробенчмарк проверки ответов: без проверки / сборка валидатора на ответ / кэш"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--questions-per-type', type=int, default=50)
+
+    def handle(self, *args, **options):
+        result = run(options['iterations'], options['questions_per_type'])
+        for mode in ('none', 'compile', 'cached'):
+            self.stdout.write(f"[VALIDATION BENCH] {mode:<8} {result[mode]:>10.1f} нс/ответ")
+        self.stdout.write(self.style.SUCCESS(
+            f"[VALIDATION BENCH] накладные расходы проверки: {result['overhead_ns']:.1f} нс/ответ "
+            f"({result['answers']} ответов)"
+        ))
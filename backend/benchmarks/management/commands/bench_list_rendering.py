@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.rendering import MODES, SIZES, run
+from benchmarks.suite import BenchmarkError
+
+
+class Command(BaseCommand):
+    help = "Большие списки: прежняя сериализация против values_list-проекции и быстрого JSON (10k и 100k строк)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, action='append', dest='sizes', help="Число строк (можно несколько раз)")
+        parser.add_argument('--iterations', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            report = run(options['sizes'] or SIZES, options['iterations'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+        if not report['orjson']:
+            self.stdout.write("[LIST BENCH] orjson не установлен — режим projection_orjson пропущен")
+        for size, result in report['sizes'].items():
+            timings = '  '.join(f"{name}={result[name]:.1f} мс" for name in MODES if name in result)
+            self.stdout.write(f"[LIST BENCH] {size:>7} строк ({result['bytes'] // 1024} КБ): {timings}")
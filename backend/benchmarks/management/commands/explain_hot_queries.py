@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.explain import HOT_QUERIES, compare, run
+from benchmarks.suite import BenchmarkError
+
+
+class Command(BaseCommand):
+    help = "Планы выполнения горячих запросов на синтетических данных: индексы и время → JSON-отчёт"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5, help="Прогонов для медианы времени")
+        parser.add_argument('--query', action='append', dest='queries', choices=list(HOT_QUERIES),
+                            help="Запрос (можно несколько раз)")
+        parser.add_argument('--plans', action='store_true', help="Печатать планы целиком")
+        parser.add_argument('--output', help="Куда сохранить JSON-отчёт")
+        parser.add_argument('--compare', help="Отчёт до изменения индексов для сравнения")
+
+    def handle(self, *args, **options):
+        try:
+            report = run(options['iterations'], options['queries'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        for name, result in report['queries'].items():
+            indexes = ', '.join(result['indexes']) or 'без индекса'
+            self.stdout.write(f"[EXPLAIN] {name:<30} {result['median_ms']:>8.2f} мс  {indexes}")
+            if options['plans']:
+                for line in result['plan'].splitlines():
+                    self.stdout.write(f"    {line}")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"[EXPLAIN] отчёт сохранён: {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            for name, before, after, ms_before, ms_after in compare(baseline, report):
+                line = (f"[EXPLAIN] {name:<30} {', '.join(before) or '-'} → {', '.join(after) or '-'}; "
+                        f"{ms_before:.2f} → {ms_after:.2f} мс")
+                self.stdout.write(self.style.ERROR(line) if ms_after > ms_before * 1.1 else line)
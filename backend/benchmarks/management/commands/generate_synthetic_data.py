@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.synthetic import SCALES, generate, purge
+
+
+class Command(BaseCommand):
+    help = "Синтетические данные для нагрузочных замеров (Faker + factory_boy)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                            help="Пресет объёма: small (разработка), medium (~1 млн ответов), large (~20 млн)")
+        parser.add_argument('--customers', type=int)
+        parser.add_argument('--respondents', type=int)
+        parser.add_argument('--surveys', type=int)
+        parser.add_argument('--questions', type=int, help="Вопросов в опросе")
+        parser.add_argument('--respondents-per-survey', type=int)
+        parser.add_argument('--survey-batch', type=int, default=100, help="Опросов в одной транзакции")
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--purge', action='store_true', help="Удалить ранее созданные синтетические данные")
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            deleted = purge(verbose=True)
+            self.stdout.write(self.style.SUCCESS(f"[SYNTHETIC] удалено строк: {deleted}"))
+            return
+        counts = generate(
+            scale=options['scale'], seed=options['seed'], survey_batch=options['survey_batch'], verbose=True,
+            customers=options['customers'], respondents=options['respondents'], surveys=options['surveys'],
+            questions=options['questions'], respondents_per_survey=options['respondents_per_survey'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"[SYNTHETIC] готово: {counts}"))
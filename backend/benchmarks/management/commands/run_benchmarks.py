@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.suite import SCENARIOS, BenchmarkError, compare, run
+
+
+class Command(BaseCommand):
+    help = "Замеры горячих эндпоинтов: перцентили задержки, SQL-запросы, пиковая память → JSON-отчёт"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[s.name for s in SCENARIOS], help="Сценарий (можно несколько раз)")
+        parser.add_argument('--output', help="Куда сохранить JSON-отчёт")
+        parser.add_argument('--compare', help="Отчёт предыдущего прогона для сравнения")
+
+    def _write(self, name, result):
+        self.stdout.write(
+            f"[BENCH] {name:<22} p50={result['p50_ms']:>8.2f} мс  p95={result['p95_ms']:>8.2f} мс  "
+            f"SQL={result['queries_mean']:>6.1f}  память={result['peak_memory_kb']:>8.1f} КБ  "
+            f"ошибок: {result['errors']}"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = run(options['iterations'], options['scenarios'], options['warmup'], on_result=self._write)
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"[BENCH] отчёт сохранён: {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            for name, before, after, change, q_before, q_after in compare(baseline, report):
+                line = f"[BENCH] {name:<22} p50 {before:.2f} → {after:.2f} мс ({change:+.1f}%), SQL {q_before} → {q_after}"
+                self.stdout.write(self.style.ERROR(line) if change > 10 else line)
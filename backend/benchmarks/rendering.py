@@ -0,0 +1,96 @@
+# benchmarks/rendering.py
+"""
+Большие списки: выборка + сериализация + JSON на синтетических ответах.
+
+Для каждого размера (по умолчанию 10k и 100k строк respondent_answers) медиана
+времени, мс:
+- loop             — прежний SurveyAnswersView: select_related, dict в цикле, JSONRenderer;
+- model_serializer — ModelSerializer по тем же полям + JSONRenderer (как TransactionsListView, MySurveysView);
+- projection       — SURVEY_ANSWER_ROWS (values_list) + core.renderers.dumps_stdlib;
+- projection_orjson — то же с orjson (если установлен).
+"""
+import statistics
+import time
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from surveys.models import RespondentAnswers
+from surveys.serializers import SURVEY_ANSWER_ROWS
+
+from .suite import BenchmarkError
+
+SIZES = (10_000, 100_000)
+
+
+class _AnswerSerializer(serializers.ModelSerializer):
+    survey_question_id = serializers.IntegerField(source='survey_question.survey_question_id')
+    question_id = serializers.IntegerField(source='survey_question.question.question_id')
+    respondent_id = serializers.IntegerField(source='respondent.user_id')
+
+    class Meta:
+        model = RespondentAnswers
+        fields = ['answer_id', 'survey_question_id', 'question_id', 'respondent_id', 'text_answer', 'created_at']
+
+
+def _loop(queryset):
+    answers = queryset.select_related('respondent', 'survey_question', 'survey_question__question')
+    out = [{
+        'answer_id': a.answer_id,
+        'survey_question_id': a.survey_question.survey_question_id,
+        'question_id': a.survey_question.question.question_id,
+        'respondent_id': a.respondent.user_id,
+        'text_answer': a.text_answer,
+        'created_at': a.created_at,
+    } for a in answers]
+    return JSONRenderer().render({'answers': out})
+
+
+def _model_serializer(queryset):
+    answers = queryset.select_related('respondent', 'survey_question', 'survey_question__question')
+    return JSONRenderer().render({'answers': _AnswerSerializer(answers, many=True).data})
+
+
+def _projection(queryset):
+    return renderers.dumps_stdlib({'answers': SURVEY_ANSWER_ROWS.rows(queryset)})
+
+
+def _projection_orjson(queryset):
+    return renderers.dumps_orjson({'answers': SURVEY_ANSWER_ROWS.rows(queryset)})
+
+
+MODES = {
+    'loop': _loop,
+    'model_serializer': _model_serializer,
+    'projection': _projection,
+    'projection_orjson': _projection_orjson,
+}
+
+
+def _median_ms(build, queryset, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        build(queryset)
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 1)
+
+
+def run(sizes=SIZES, iterations=3):
+    total = RespondentAnswers.objects.count()
+    if total < max(sizes):
+        raise BenchmarkError(f"Нужно не меньше {max(sizes)} ответов, есть {total} — "
+                             "manage.py generate_synthetic_data --scale medium")
+    modes = {name: build for name, build in MODES.items()
+             if name != 'projection_orjson' or renderers.orjson is not None}
+    report = {'orjson': renderers.orjson is not None, 'sizes': {}}
+    for size in sizes:
+        queryset = RespondentAnswers.objects.order_by('answer_id')[:size]
+        bodies = {name: build(queryset) for name, build in modes.items()}
+        if len(set(bodies.values())) != 1:
+            raise BenchmarkError(f"{size} строк: режимы дают разный JSON")
+        result = {name: _median_ms(build, queryset, iterations) for name, build in modes.items()}
+        result['bytes'] = len(bodies['loop'])
+        report['sizes'][size] = result
+    return report
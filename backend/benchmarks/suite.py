@@ -0,0 +1,217 @@
+# benchmarks/suite.py
+"""
+Сценарный набор замеров горячих эндпоинтов на синтетических данных.
+
+Каждый сценарий выполняется через полный стек (middleware, JWT-аутентификация,
+view) с помощью APIClient. Для каждого сценария в отчёт попадают перцентили
+задержки, число SQL-запросов и пиковая память Python (tracemalloc — отдельным
+прогоном, чтобы не искажать задержку). Пишущие сценарии выполняются в
+savepoint, который откатывается после каждой итерации, — данные не меняются
+и прогоны сравнимы между собой.
+
+Отчёт — JSON (см. run()); compare() сравнивает два отчёта.
+"""
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.authentication import issue_tokens
+from surveys.models import RespondentSurveyStatus, Surveys
+
+from .factories import SYNTHETIC_DOMAIN
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Scenario:
+    """
+    request(ctx) → (method, url, data); prepare(ctx) выполняется до замера
+    внутри того же savepoint (только для пишущих сценариев).
+    """
+
+    def __init__(self, name, user, request, expected=200, write=False, prepare=None):
+        self.name = name
+        self.user = user
+        self.request = request
+        self.expected = expected
+        self.write = write
+        self.prepare = prepare
+
+
+def _mark_completed(ctx):
+    RespondentSurveyStatus.objects.filter(pk=ctx['open_status'].pk).update(status='completed', score=0.9)
+
+
+SCENARIOS = [
+    Scenario('answer_submit', 'respondent', write=True, expected=201, request=lambda ctx: (
+        'post', '/api/surveys/answer/', {'question_id': ctx['question'].question_id, 'text_answer': ctx['answer']}
+    )),
+    Scenario('available_surveys', 'respondent', request=lambda ctx: ('get', '/api/surveys/available/', None)),
+    Scenario('respondent_home', 'respondent', request=lambda ctx: ('get', '/api/surveys/home/', None)),
+    Scenario('survey_dashboard', 'customer', request=lambda ctx: (
+        'get', f"/api/analytics/{ctx['survey'].survey_id}/dashboard/", None
+    )),
+    Scenario('respondent_dashboard', 'customer', request=lambda ctx: (
+        'get', f"/api/analytics/{ctx['survey'].survey_id}/respondent-dashboard/", None
+    )),
+    Scenario('export_csv', 'customer', request=lambda ctx: (
+        'post', f"/api/analytics/{ctx['survey'].survey_id}/export/", {'format': 'csv'}
+    )),
+    Scenario('payout', 'payout_respondent', write=True, prepare=_mark_completed, request=lambda ctx: (
+        'post', '/api/payments/payout/',
+        {'survey_id': ctx['open_status'].survey_id, 'respondent_id': ctx['open_status'].respondent_id},
+    )),
+]
+
+
+def build_context():
+    """Выбирает самый «тяжёлый» синтетический опрос и участников для сценариев."""
+    synthetic = Surveys.objects.filter(creator__email__endswith=f'@{SYNTHETIC_DOMAIN}', status='active')
+    survey = (synthetic.annotate(answer_count=Count('answers'))
+              .order_by('-answer_count').select_related('creator').first())
+    if survey is None:
+        raise BenchmarkError("Нет синтетических данных — сначала manage.py generate_synthetic_data")
+    completed = (RespondentSurveyStatus.objects.filter(survey=survey, status='completed')
+                 .select_related('respondent').first())
+    open_status = (RespondentSurveyStatus.objects
+                   .filter(survey__in=synthetic, status='in_progress', survey__cost__gt=0)
+                   .select_related('respondent').first())
+    link = survey.survey_questions.select_related('question').order_by('order').first()
+    if completed is None or open_status is None or link is None:
+        raise BenchmarkError("Синтетических данных недостаточно для всех сценариев")
+    question = link.question
+    answer = (question.extra_data or {}).get('options', ['5'])[0]
+    return {
+        'survey': survey, 'question': question, 'answer': answer, 'open_status': open_status,
+        'users': {
+            'customer': survey.creator,
+            'respondent': completed.respondent,
+            'payout_respondent': open_status.respondent,
+        },
+    }
+
+
+def _client(user):
+    client = APIClient(HTTP_HOST='localhost')
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(user).access_token}')
+    return client
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _call(client, scenario, ctx):
+    method, url, data = scenario.request(ctx)
+    kwargs = {'format': 'json'} if data is not None else {}
+    if not scenario.write:
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data, **kwargs)
+        return response, time.perf_counter() - started
+
+    # пишущий сценарий: замер внутри savepoint, который затем откатывается
+    result = {}
+    try:
+        with transaction.atomic():
+            if scenario.prepare:
+                scenario.prepare(ctx)
+            started = time.perf_counter()
+            result['response'] = getattr(client, method)(url, data, **kwargs)
+            result['seconds'] = time.perf_counter() - started
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result['response'], result['seconds']
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_scenario(scenario, ctx, iterations, warmup=2):
+    client = _client(ctx['users'][scenario.user])
+    for _ in range(warmup):
+        _call(client, scenario, ctx)
+
+    timings, queries, errors = [], [], 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            response, seconds = _call(client, scenario, ctx)
+        timings.append(seconds * 1000)
+        # SAVEPOINT/RELEASE/ROLLBACK пишущих сценариев — не запросы эндпоинта
+        queries.append(sum(1 for q in captured.captured_queries if 'SAVEPOINT' not in q['sql'].upper()))
+        errors += response.status_code != scenario.expected
+
+    tracemalloc.start()
+    try:
+        _call(client, scenario, ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ordered = sorted(timings)
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(_percentile(ordered, 0.50), 3),
+        'p95_ms': round(_percentile(ordered, 0.95), 3),
+        'p99_ms': round(_percentile(ordered, 0.99), 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'max_ms': round(ordered[-1], 3),
+        'queries_mean': round(statistics.fmean(queries), 2),
+        'queries_max': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(iterations=30, names=None, warmup=2, on_result=None):
+    ctx = build_context()
+    scenarios = [s for s in SCENARIOS if not names or s.name in names]
+    report = {
+        'meta': {
+            'created_at': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'iterations': iterations,
+            'survey_id': ctx['survey'].survey_id,
+        },
+        'scenarios': {},
+    }
+    for scenario in scenarios:
+        result = run_scenario(scenario, ctx, iterations, warmup)
+        report['scenarios'][scenario.name] = result
+        if on_result:
+            on_result(scenario.name, result)
+    return report
+
+
+def compare(baseline, current):
+    """[(сценарий, p50 было, p50 стало, изменение %, запросов было, запросов стало)]."""
+    rows = []
+    for name, now in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        change = (now['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+        rows.append((name, before['p50_ms'], now['p50_ms'], round(change, 1),
+                     before['queries_mean'], now['queries_mean']))
+    return rows
@@ -0,0 +1,192 @@
+# benchmarks/synthetic.py
+"""
+Генератор синтетических данных для нагрузочных замеров.
+
+Объём задаётся пресетом (SCALES) и отдельными параметрами. Опросы создаются
+пачками по survey_batch: вопросы, связи, статусы, ответы и выплаты каждой
+пачки пишутся bulk_create и сразу отпускаются — память не растёт с объёмом.
+Все синтетические пользователи — на домене SYNTHETIC_DOMAIN; purge() удаляет
+их вместе со всеми зависимыми строками (каскад), а также вопросы их опросов и
+значения характеристик их респондентов — на пользователей эти строки не ссылаются.
+"""
+import random
+import time
+from decimal import Decimal
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Characteristics, CharacteristicValues, RespondentCharacteristics, Users
+from accounts.stats import rebuild_stats
+from payments.models import PaymentTransaction, SurveyAccount, Wallet
+from surveys.answer_values import fill
+from surveys.models import Questions, RespondentAnswers, RespondentSurveyStatus, SurveyQuestions, Surveys
+
+from .factories import (
+    SYNTHETIC_DOMAIN, fake, answer_text,
+    UserFactory, SurveyFactory, SurveyAccountFactory, QuestionFactory,
+    CharacteristicValueFactory, WalletFactory, TransactionFactory,
+)
+
+SCALES = {
+    # customers, respondents, surveys, questions/survey, respondents/survey
+    'small': dict(customers=5, respondents=60, surveys=20, questions=5, respondents_per_survey=10),
+    'medium': dict(customers=50, respondents=5000, surveys=2000, questions=10, respondents_per_survey=50),
+    'large': dict(customers=200, respondents=50000, surveys=10000, questions=10, respondents_per_survey=200),
+}
+VALUES_PER_CHARACTERISTIC = 25
+BATCH_SIZE = 5000
+
+
+def _log(verbose, message):
+    if verbose:
+        print(f"[SYNTHETIC] {message}")
+
+
+def _users(count, role, offset):
+    users = UserFactory.build_batch(count, role=role)
+    for i, user in enumerate(users):
+        user.email = f'{role}{offset + i}@{SYNTHETIC_DOMAIN}'
+    return Users.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+
+def _characteristics(respondents, verbose):
+    """
+    Пул значений на каждую характеристику и по одному значению на респондента.
+    В БД пишутся только выбранные значения — purge() находит их через респондентов.
+    """
+    rows = []
+    for characteristic in Characteristics.objects.all():
+        if characteristic.value_type in ('int', 'float', 'number'):
+            texts = {str(random.randint(18, 80)) for _ in range(VALUES_PER_CHARACTERISTIC)}
+            pool = [CharacteristicValues(characteristic=characteristic, value_text=t) for t in texts]
+        else:
+            pool = CharacteristicValueFactory.build_batch(VALUES_PER_CHARACTERISTIC, characteristic=characteristic)
+        picks = [random.choice(pool) for _ in respondents]
+        CharacteristicValues.objects.bulk_create(list({id(value): value for value in picks}.values()))
+        rows.extend(
+            RespondentCharacteristics(user=user, characteristic_value=value) for user, value in zip(respondents, picks)
+        )
+
+    RespondentCharacteristics.objects.bulk_create(rows, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    _log(verbose, f"характеристики: {len(rows)} значений у респондентов")
+    return len(rows)
+
+
+def _survey_batch(surveys, respondents, questions_per_survey, per_survey, completed_share):
+    """Вопросы, статусы, ответы и выплаты для пачки уже созданных опросов."""
+    SurveyAccount.objects.bulk_create([SurveyAccountFactory.build(survey=s) for s in surveys])
+
+    questions = Questions.objects.bulk_create(
+        QuestionFactory.build_batch(len(surveys) * questions_per_survey), batch_size=BATCH_SIZE
+    )
+    links = SurveyQuestions.objects.bulk_create([
+        SurveyQuestions(survey=survey, question=questions[i * questions_per_survey + order], order=order)
+        for i, survey in enumerate(surveys) for order in range(questions_per_survey)
+    ], batch_size=BATCH_SIZE)
+
+    statuses, answers, payouts = [], [], []
+    now = timezone.now()
+    for i, survey in enumerate(surveys):
+        survey_links = links[i * questions_per_survey:(i + 1) * questions_per_survey]
+        for respondent in random.sample(respondents, min(per_survey, len(respondents))):
+            completed = random.random() < completed_share
+            statuses.append(RespondentSurveyStatus(
+                respondent=respondent, survey=survey,
+                status='completed' if completed else 'in_progress',
+                score=round(random.uniform(0.3, 1.0), 2) if completed else None,
+            ))
+            answered = survey_links if completed else survey_links[:random.randint(0, len(survey_links))]
+            answers.extend(
+                fill(RespondentAnswers(survey_question=link, survey=survey, respondent=respondent,
+                                       text_answer=answer_text(link.question)), link.question)
+                for link in answered
+            )
+            if completed:
+                payouts.append(TransactionFactory.build(
+                    user=respondent, amount=survey.cost, related_survey_id=survey.survey_id,
+                    related_respondent_id=respondent.user_id,
+                    processed_at=now - timedelta(minutes=random.randint(60, 90 * 24 * 60)),
+                ))
+    RespondentSurveyStatus.objects.bulk_create(statuses, batch_size=BATCH_SIZE)
+    RespondentAnswers.objects.bulk_create(answers, batch_size=BATCH_SIZE)
+    PaymentTransaction.objects.bulk_create(payouts, batch_size=BATCH_SIZE)
+    return len(questions), len(statuses), len(answers), len(payouts)
+
+
+def generate(scale='small', seed=None, survey_batch=100, completed_share=0.7, verbose=False, **overrides):
+    """
+    Создаёт синтетические данные. Параметры пресета можно переопределить:
+    customers, respondents, surveys, questions, respondents_per_survey.
+    Возвращает словарь с количеством созданных строк.
+    """
+    params = {**SCALES[scale], **{k: v for k, v in overrides.items() if v is not None}}
+    if seed is not None:
+        random.seed(seed)
+        fake.seed_instance(seed)
+    started = time.perf_counter()
+    offset = Users.objects.filter(email__endswith=f'@{SYNTHETIC_DOMAIN}').count()
+
+    with transaction.atomic():
+        customers = _users(params['customers'], 'customer', offset)
+        respondents = _users(params['respondents'], 'respondent', offset + params['customers'])
+        Wallet.objects.bulk_create([WalletFactory.build(user=u) for u in customers + respondents],
+                                   batch_size=BATCH_SIZE)
+        PaymentTransaction.objects.bulk_create([
+            TransactionFactory.build(user=c, type='topup', amount=Decimal(random.randrange(1000, 100000)))
+            for c in customers for _ in range(3)
+        ], batch_size=BATCH_SIZE)
+    _log(verbose, f"пользователи: {len(customers)} заказчиков, {len(respondents)} респондентов")
+
+    counts = {
+        'customers': len(customers), 'respondents': len(respondents), 'surveys': 0, 'questions': 0,
+        'statuses': 0, 'answers': 0, 'transactions': len(customers) * 3,
+        'characteristics': _characteristics(respondents, verbose),
+    }
+    remaining = params['surveys']
+    while remaining > 0:
+        size = min(survey_batch, remaining)
+        with transaction.atomic():
+            surveys = Surveys.objects.bulk_create(
+                [SurveyFactory.build(creator=random.choice(customers)) for _ in range(size)]
+            )
+            questions, statuses, answers, payouts = _survey_batch(
+                surveys, respondents, params['questions'], params['respondents_per_survey'], completed_share
+            )
+        remaining -= size
+        counts['surveys'] += size
+        counts['questions'] += questions
+        counts['statuses'] += statuses
+        counts['answers'] += answers
+        counts['transactions'] += payouts
+        _log(verbose, f"опросы: {counts['surveys']}/{params['surveys']}, ответов: {counts['answers']}")
+
+    rebuild_stats([u.user_id for u in respondents])
+    counts['seconds'] = round(time.perf_counter() - started, 2)
+    return counts
+
+
+def purge(verbose=False):
+    """
+    Удаляет всех синтетических пользователей (и каскадом их опросы, ответы, транзакции),
+    вопросы синтетических опросов и значения характеристик синтетических респондентов.
+    Строки, на которые ссылаются и несинтетические опросы или пользователи, остаются.
+    """
+    users = Users.objects.filter(email__endswith=f'@{SYNTHETIC_DOMAIN}')
+    others = Users.objects.exclude(email__endswith=f'@{SYNTHETIC_DOMAIN}')
+    questions = (
+        Questions.objects.filter(survey_questions__survey__creator__in=users)
+        .exclude(survey_questions__survey__creator__in=others)
+    )
+    values = (
+        CharacteristicValues.objects.filter(respondentcharacteristics__user__in=users)
+        .exclude(respondentcharacteristics__user__in=others)
+    )
+    with transaction.atomic():
+        # до пользователей: после каскада связи с синтетическими опросами и респондентами уже не найти
+        deleted = Questions.objects.filter(pk__in=questions.values('pk')).delete()[0]
+        deleted += CharacteristicValues.objects.filter(pk__in=values.values('pk')).delete()[0]
+        deleted += users.delete()[0]
+    _log(verbose, f"удалено строк: {deleted}")
+    return deleted
@@ -0,0 +1,102 @@
+# benchmarks/tests.py
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from accounts.models import CharacteristicValues, Users
+from benchmarks import explain
+from benchmarks.factories import SYNTHETIC_DOMAIN
+from benchmarks.suite import SCENARIOS, compare, run
+from benchmarks.synthetic import generate, purge
+from surveys.models import Questions, RespondentAnswers, RespondentSurveyStatus
+
+
+class BenchmarkSuiteTest(TestCase):
+    """⏱ Синтетические данные и нагрузочный набор"""
+
+    def setUp(self):
+        self.values = set(CharacteristicValues.objects.values_list('pk', flat=True))
+        self.counts = generate(scale='small', seed=7, surveys=4, respondents=12, respondents_per_survey=6)
+
+    def test_generate_and_purge(self):
+        """✅ Генератор создаёт заданный объём, purge удаляет всё синтетическое"""
+        self.assertEqual(self.counts['surveys'], 4)
+        self.assertEqual(RespondentSurveyStatus.objects.count(), 24)
+        self.assertEqual(RespondentAnswers.objects.count(), self.counts['answers'])
+        self.assertGreater(CharacteristicValues.objects.count(), len(self.values))
+
+        purge()
+        self.assertFalse(Users.objects.filter(email__endswith=f'@{SYNTHETIC_DOMAIN}').exists())
+        self.assertEqual(RespondentAnswers.objects.count(), 0)
+        self.assertEqual(Questions.objects.count(), 0)
+        # значения, созданные не генератором, остаются
+        self.assertEqual(set(CharacteristicValues.objects.values_list('pk', flat=True)), self.values)
+
+    def test_run_report_and_rollback(self):
+        """✅ Все сценарии без ошибок, пишущие сценарии не меняют данные, compare() считает дельты"""
+        answers = RespondentAnswers.objects.count()
+        report = run(iterations=2, warmup=0)
+
+        self.assertEqual(set(report['scenarios']), {s.name for s in SCENARIOS})
+        for name, result in report['scenarios'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertLessEqual(result['p50_ms'], result['max_ms'])
+            self.assertGreater(result['queries_mean'], 0)
+        self.assertEqual(RespondentAnswers.objects.count(), answers)
+
+        rows = compare(report, report)
+        self.assertTrue(all(row[3] == 0 for row in rows))
+
+    def test_command_writes_json(self):
+        """✅ run_benchmarks сохраняет JSON-отчёт"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'report.json')
+            call_command('run_benchmarks', iterations=1, warmup=0, scenarios=['available_surveys'],
+                         output=path, stdout=io.StringIO())
+            with open(path, encoding='utf-8') as f:
+                report = json.load(f)
+        self.assertEqual(list(report['scenarios']), ['available_surveys'])
+        self.assertIn('git_revision', report['meta'])
+
+    def test_list_rendering_modes_agree(self):
+        """✅ Прежняя сериализация и проекция дают один и тот же JSON; мало данных — BenchmarkError"""
+        from benchmarks import rendering
+        from benchmarks.suite import BenchmarkError
+
+        report = rendering.run(sizes=(10,), iterations=1)
+        self.assertIn('projection', report['sizes'][10])
+        self.assertGreater(report['sizes'][10]['bytes'], 0)
+        with self.assertRaises(BenchmarkError):
+            rendering.run(sizes=(10 ** 7,), iterations=1)
+
+    def test_explain_report_uses_composite_indexes(self):
+        """✅ Горячие запросы идут по составным индексам; ответы знают свой опрос без JOIN"""
+        report = explain.run(iterations=1)
+        self.assertEqual(set(report['queries']), set(explain.HOT_QUERIES))
+        self.assertIn('rss_survey_status_idx', report['queries']['completed_statuses']['indexes'])
+        self.assertIn('survey_questions_order_idx', report['queries']['survey_questions_ordered']['indexes'])
+        self.assertNotIn('survey_questions', str(RespondentAnswers.objects.filter(survey_id=1).query))
+        self.assertFalse(RespondentAnswers.objects.exclude(survey=F('survey_question__survey')).exists())
+        self.assertEqual(explain.compare(report, report)[0][1], explain.compare(report, report)[0][2])
+
+
+class AnswerValidationBenchTest(TestCase):
+    """⏱ Микробенчмарк проверки ответов"""
+
+    def test_report(self):
+        """✅ Все режимы замерены, образцовые ответы проходят проверку"""
+        from benchmarks.validation import run
+
+        result = run(iterations=2, questions_per_type=3)
+        self.assertEqual(result['answers'], 18)
+        for mode in ('none', 'compile', 'cached'):
+            self.assertGreater(result[mode], 0)
+
+        out = io.StringIO()
+        call_command('bench_answer_validation', iterations=1, questions_per_type=1, stdout=out)
+        self.assertIn('накладные расходы проверки', out.getvalue())
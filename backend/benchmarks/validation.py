@@ -0,0 +1,65 @@
+# benchmarks/validation.py
+"""
+Микробенчмарк проверки ответов (surveys/answer_validators.py) без БД и HTTP.
+
+На одинаковом наборе пар (вопрос, ответ) сравниваются три режима, в нс на ответ:
+- none    — без проверки (стоимость самого цикла);
+- compile — валидатор собирается для каждого ответа (extra_data разбирается заново);
+- cached  — validate_answer(): валидатор из кэша по question_id/version.
+overhead_ns = cached − none — то, что проверка добавляет к записи ответа.
+"""
+import json
+import statistics
+import time
+
+from surveys import answer_validators
+from surveys.models import Questions
+
+SAMPLES = [
+    ('single_choice', {'options': ['Красный', 'Зелёный', 'Синий', 'Жёлтый', 'Белый']}, 'Синий'),
+    ('multi_choice', {'options': ['Кино', 'Театр', 'Музей', 'Концерт']}, 'Театр;Музей'),
+    ('likert', {'scale': 7, 'min_label': 'Плохо', 'max_label': 'Отлично'}, '6'),
+    ('rating', {'min': 1, 'max': 10}, '8'),
+    ('date_time', {}, '2026-05-17T12:30'),
+    ('text', {}, 'Свободный ответ'),
+]
+
+
+def _answers(questions_per_type):
+    answers, pk = [], 0
+    for type_question, extra, text in SAMPLES:
+        for _ in range(questions_per_type):
+            pk += 1
+            # extra_data строкой — как приходит из импорта; разбор входит в стоимость компиляции
+            question = Questions(pk=pk, type_question=type_question, extra_data=json.dumps(extra, ensure_ascii=False))
+            answers.append((question, text))
+    return answers
+
+
+def _ns_per_answer(check, answers, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        for question, text in answers:
+            check(question, text)
+        timings.append((time.perf_counter_ns() - started) / len(answers))
+    return round(statistics.median(timings), 1)
+
+
+def run(iterations=20, questions_per_type=50):
+    answers = _answers(questions_per_type)
+    answer_validators.clear()
+    for question, text in answers:
+        error = answer_validators.validate_answer(question, text)
+        if error:
+            raise AssertionError(f"{question.type_question}: {error}")
+
+    modes = {
+        'none': lambda question, text: None,
+        'compile': lambda question, text: answer_validators.compile_validator(question).check(text),
+        'cached': answer_validators.validate_answer,
+    }
+    result = {name: _ns_per_answer(check, answers, iterations) for name, check in modes.items()}
+    result['overhead_ns'] = round(result['cached'] - result['none'], 1)
+    result['answers'] = len(answers)
+    return result
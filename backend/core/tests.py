@@ -1,3 +1,49 @@
+# core/tests.py
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import Users
+from core import renderers
+from payments.models import PaymentTransaction
+from payments.serializers import TRANSACTION_ROWS, TransactionSerializer
+from surveys.models import Surveys
+from surveys.serializers import SURVEY_DETAIL_ROWS, SurveyDetailSerializer
+
+
+class FastListPathTest(TestCase):
+    """⚡ Проекция values_list() и быстрый рендерер дают тот же JSON, что сериализаторы DRF"""
+
+    def setUp(self):
+        self.customer = Users.objects.create_user(email='fast@example.com', password='pass', name='C', role='customer')
+        Surveys.objects.create(name='Первый', creator=self.customer, cost=Decimal('12.50'),
+                               date_finished=datetime(2026, 5, 1, 12, 0, 30, 250000, tzinfo=dt_timezone.utc))
+        Surveys.objects.create(name='Второй', creator=self.customer, cost=None)
+        PaymentTransaction.objects.create(user=self.customer, type='topup', amount=Decimal('100'), currency='RUB',
+                                          gateway_data={'ключ': [1, 2.5, None]})
+
+    def test_projection_matches_serializers(self):
+        """✅ Строки проекции совпадают с ModelSerializer, включая Decimal, FK и JSON"""
+        surveys = Surveys.objects.order_by('survey_id')
+        for rows, serialized in (
+            (SURVEY_DETAIL_ROWS.rows(surveys), SurveyDetailSerializer(surveys, many=True).data),
+            (TRANSACTION_ROWS.rows(PaymentTransaction.objects.all()),
+             TransactionSerializer(PaymentTransaction.objects.all(), many=True).data),
+        ):
+            self.assertEqual(renderers.dumps(rows), JSONRenderer().render(serialized))
+            self.assertEqual(renderers.dumps_stdlib(rows), JSONRenderer().render(serialized))
 
-# Create your tests here.
+    def test_content_negotiation(self):
+        """✅ application/json — быстрый рендерер, text/html — браузерный API"""
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        url = reverse('survey-my')
+        resp = client.get(url, HTTP_ACCEPT='application/json')
+        self.assertIsInstance(resp.accepted_renderer, renderers.FastJSONRenderer)
+        self.assertEqual(sorted(row['name'] for row in resp.json()), ['Второй', 'Первый'])
+        resp = client.get(url, HTTP_ACCEPT='text/html')
+        self.assertEqual(resp['Content-Type'], 'text/html; charset=utf-8')
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class HousekeepingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'housekeeping'
+
+    def ready(self):
+        # фоновый планировщик в процессе веб-сервера (по умолчанию выключен — используйте run_housekeeping)
+        if getattr(settings, 'HOUSEKEEPING_IN_PROCESS', False):
+            from .scheduler import start_in_background
+            start_in_background()
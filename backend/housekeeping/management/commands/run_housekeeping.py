@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from housekeeping.scheduler import Scheduler, get_metrics, get_tasks, run_task
+
+
+class Command(BaseCommand):
+    help = "Обслуживание растущих таблиц: капчи, истёкшие токены, зависшие прохождения, старые письма"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--task', action='append', dest='tasks',
+                            help="Имя задачи (можно несколько раз); по умолчанию — все")
+        parser.add_argument('--dry-run', action='store_true', help="Только посчитать, ничего не менять")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help="Работать постоянно по интервалам задач")
+
+    def _write(self, result):
+        prefix = "(dry-run) " if result['dry_run'] else ""
+        line = f"[HOUSEKEEPING] {prefix}{result['task']}: {result['affected']} строк за {result['seconds']:.3f} с"
+        if result['error']:
+            self.stdout.write(self.style.ERROR(f"{line} — ошибка: {result['error']}"))
+        else:
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        available = get_tasks()
+        names = options['tasks'] or list(available)
+        unknown = set(names) - set(available)
+        if unknown:
+            raise CommandError(f"Неизвестные задачи: {', '.join(sorted(unknown))}. Доступны: {', '.join(available)}")
+
+        if options['loop']:
+            try:
+                Scheduler(names, dry_run=options['dry_run']).run_forever(on_result=self._write)
+            except KeyboardInterrupt:
+                pass
+            return
+
+        for name in names:
+            self._write(run_task(name, dry_run=options['dry_run'],
+                                 batch_size=options['batch_size'], max_batches=options['max_batches']))
+        if not options['dry_run']:
+            total = sum(m['total_seconds'] for m in get_metrics().values())
+            self.stdout.write(self.style.SUCCESS(f"[HOUSEKEEPING] готово за {total:.3f} с"))
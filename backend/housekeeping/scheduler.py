@@ -0,0 +1,124 @@
+# housekeeping/scheduler.py
+"""
+Лёгкий периодический планировщик задач обслуживания (housekeeping/tasks.py).
+
+- run_task() выполняет одну задачу и записывает метрики (время, число строк, ошибка);
+- Scheduler.run_pending() запускает задачи, у которых наступил интервал;
+- manage.py run_housekeeping — разовый запуск или цикл в отдельном процессе;
+- HOUSEKEEPING_IN_PROCESS=True — тот же цикл в фоновом потоке веб-процесса.
+
+Если задача запущена в нескольких процессах, выполняется только один запуск за интервал:
+перед запуском берётся lock в CACHES['default'] (общий при Redis).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+LOCK_KEY = 'housekeeping:lock:{name}'
+
+_registry = {}          # имя → (функция, интервал в секундах)
+_metrics = {}           # имя → накопленные метрики
+_metrics_lock = threading.Lock()
+_background = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def register(name, interval):
+    """Декоратор задачи: func(batch_size, max_batches, dry_run=False) -> число строк."""
+    def decorator(func):
+        _registry[name] = (func, interval)
+        return func
+    return decorator
+
+
+def get_tasks():
+    from . import tasks  # noqa: F401 — регистрация задач
+    intervals = _setting('HOUSEKEEPING_INTERVALS', {})
+    return {name: (func, intervals.get(name, interval)) for name, (func, interval) in _registry.items()}
+
+
+def get_metrics():
+    with _metrics_lock:
+        return {name: dict(values) for name, values in _metrics.items()}
+
+
+def _record(name, seconds, affected, error):
+    with _metrics_lock:
+        values = _metrics.setdefault(name, {
+            'runs': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'total_affected': 0,
+        })
+        values['runs'] += 1
+        values['errors'] += error is not None
+        values['total_seconds'] += seconds
+        values['max_seconds'] = max(values['max_seconds'], seconds)
+        values['total_affected'] += affected
+        values.update(last_seconds=seconds, last_affected=affected, last_error=error, last_run_at=time.time())
+
+
+def run_task(name, dry_run=False, batch_size=None, max_batches=None):
+    """Выполняет задачу и возвращает {'task', 'affected', 'seconds', 'dry_run', 'error'}."""
+    func, _ = get_tasks()[name]
+    batch_size = batch_size or _setting('HOUSEKEEPING_BATCH_SIZE', 1000)
+    max_batches = max_batches or _setting('HOUSEKEEPING_MAX_BATCHES', 50)
+    started = time.perf_counter()
+    affected, error = 0, None
+    try:
+        affected = func(batch_size, max_batches, dry_run=dry_run)
+    except Exception as e:
+        error = str(e)
+        print(f"[HOUSEKEEPING ❌] {name}: {e}")
+    seconds = time.perf_counter() - started
+    if not dry_run:
+        _record(name, seconds, affected, error)
+    return {'task': name, 'affected': affected, 'seconds': seconds, 'dry_run': dry_run, 'error': error}
+
+
+class Scheduler:
+
+    def __init__(self, names=None, dry_run=False):
+        tasks = get_tasks()
+        self.tasks = {name: tasks[name] for name in (names or tasks)}
+        self.dry_run = dry_run
+        self.next_run = {name: 0.0 for name in self.tasks}
+
+    def run_pending(self, now=None):
+        """Запускает задачи, у которых наступило время. Возвращает результаты run_task()."""
+        now = now if now is not None else time.monotonic()
+        results = []
+        for name, (_, interval) in self.tasks.items():
+            if now < self.next_run[name]:
+                continue
+            self.next_run[name] = now + interval
+            # задачу за этот интервал уже выполнил другой процесс
+            if not self.dry_run and not cache.add(LOCK_KEY.format(name=name), 1, timeout=interval):
+                continue
+            results.append(run_task(name, dry_run=self.dry_run))
+        return results
+
+    def seconds_until_next(self, now=None):
+        now = now if now is not None else time.monotonic()
+        return max(0.0, min(self.next_run.values()) - now)
+
+    def run_forever(self, stop_event=None, on_result=None):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            for result in self.run_pending():
+                if on_result:
+                    on_result(result)
+            connection.close()
+            stop_event.wait(max(1.0, self.seconds_until_next()))
+
+
+def start_in_background():
+    """Запускает планировщик в daemon-потоке текущего процесса (один раз)."""
+    global _background
+    if _background is None:
+        _background = threading.Thread(target=Scheduler().run_forever, name='housekeeping', daemon=True)
+        _background.start()
+    return _background
@@ -0,0 +1,137 @@
+# housekeeping/tasks.py
+"""
+Задачи обслуживания растущих таблиц. Каждая задача обрабатывает не больше
+batch_size × max_batches строк за запуск (короткие транзакции, без долгих блокировок)
+и возвращает число затронутых строк; при dry_run — число строк, которые были бы затронуты.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts import captcha_pool
+from accounts.stats import record_abandoned
+from monitoring.models import SlowQuery, StoredProfile
+from payments import gateway
+from notifications.models import EmailOutbox
+from surveys import partitioning
+from surveys.models import RespondentSurveyStatus
+
+from .scheduler import register
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def delete_in_batches(queryset, batch_size, max_batches, dry_run=False):
+    """DELETE по batch_size первичных ключей за раз. Возвращает число удалённых строк."""
+    if dry_run:
+        return min(queryset.count(), batch_size * max_batches)
+    deleted = 0
+    for _ in range(max_batches):
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted += queryset.model.objects.filter(pk__in=ids).delete()[0]
+    return deleted
+
+
+@register('purge_captchas', interval=300)
+def purge_captchas(batch_size, max_batches, dry_run=False):
+    """Просроченные CaptchaStore и устаревшие файлы пула капч."""
+    if dry_run:
+        return captcha_pool.purge_expired(batch_size, max_batches, dry_run=True)['captchas']
+    purged = captcha_pool.purge_expired(batch_size, max_batches)
+    return purged['captchas'] + purged['files']
+
+
+@register('resubmit_gateway_requests', interval=60)
+def resubmit_gateway_requests(batch_size, max_batches, dry_run=False):
+    """
+    Повторная отправка в шлюз `pending` пополнений и выводов без результата;
+    после PAYMENT_GATEWAY_SUBMIT_MAX_ATTEMPTS попыток — `failed` с возвратом удержания.
+    """
+    if dry_run:
+        return min(gateway.stale_transactions().count(), batch_size * max_batches)
+    total = 0
+    for _ in range(max_batches):
+        summary = gateway.resubmit_stale(batch_size)
+        if not summary:
+            break
+        total += summary['resubmitted'] + summary['failed']
+    return total
+
+
+@register('purge_expired_tokens', interval=3600)
+def purge_expired_tokens(batch_size, max_batches, dry_run=False):
+    """
+    Истёкшие refresh-токены (OutstandingToken, а с ними каскадом BlacklistedToken).
+    Таблицы есть, только если установлен rest_framework_simplejwt.token_blacklist.
+    """
+    if not apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+        return 0
+    OutstandingToken = apps.get_model('token_blacklist', 'OutstandingToken')
+    expired = OutstandingToken.objects.filter(expires_at__lt=timezone.now())
+    return delete_in_batches(expired, batch_size, max_batches, dry_run)
+
+
+@register('abandon_stale_progress', interval=3600)
+def abandon_stale_progress(batch_size, max_batches, dry_run=False):
+    """
+    Прохождения `in_progress` без активности дольше HOUSEKEEPING_STALE_PROGRESS_DAYS
+    переводятся в `abandoned`; счётчики RespondentStats уменьшаются на то же число.
+    Строки не удаляются: респондент может вернуться, и его статус снова станет in_progress.
+    """
+    cutoff = timezone.now() - timedelta(days=_setting('HOUSEKEEPING_STALE_PROGRESS_DAYS', 30))
+    stale = RespondentSurveyStatus.objects.filter(status='in_progress', updated_at__lt=cutoff)
+    if dry_run:
+        return min(stale.count(), batch_size * max_batches)
+
+    total = 0
+    for _ in range(max_batches):
+        with transaction.atomic():
+            rows = list(
+                stale.select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+                .order_by('pk').values_list('pk', 'respondent_id')[:batch_size]
+            )
+            if not rows:
+                break
+            # update() не трогает updated_at (auto_now) — остаётся время последней активности
+            RespondentSurveyStatus.objects.filter(pk__in=[pk for pk, _ in rows]).update(status='abandoned')
+            record_abandoned(Counter(respondent_id for _, respondent_id in rows))
+        total += len(rows)
+    return total
+
+
+@register('purge_sent_emails', interval=3600)
+def purge_sent_emails(batch_size, max_batches, dry_run=False):
+    """Отправленные письма старше HOUSEKEEPING_SENT_EMAIL_RETENTION_DAYS."""
+    cutoff = timezone.now() - timedelta(days=_setting('HOUSEKEEPING_SENT_EMAIL_RETENTION_DAYS', 14))
+    sent = EmailOutbox.objects.filter(status='sent', sent_at__lt=cutoff)
+    return delete_in_batches(sent, batch_size, max_batches, dry_run)
+
+
+@register('purge_profiles', interval=3600)
+def purge_profiles(batch_size, max_batches, dry_run=False):
+    """Профили запросов старше HOUSEKEEPING_PROFILE_RETENTION_DAYS."""
+    cutoff = timezone.now() - timedelta(days=_setting('HOUSEKEEPING_PROFILE_RETENTION_DAYS', 7))
+    return delete_in_batches(StoredProfile.objects.filter(created_at__lt=cutoff), batch_size, max_batches, dry_run)
+
+
+@register('purge_slow_queries', interval=3600)
+def purge_slow_queries(batch_size, max_batches, dry_run=False):
+    """Медленные запросы (с планами) старше HOUSEKEEPING_SLOW_QUERY_RETENTION_DAYS; отпечатки остаются."""
+    cutoff = timezone.now() - timedelta(days=_setting('HOUSEKEEPING_SLOW_QUERY_RETENTION_DAYS', 14))
+    return delete_in_batches(SlowQuery.objects.filter(created_at__lt=cutoff), batch_size, max_batches, dry_run)
+
+
+@register('answer_partitions', interval=3600)
+def answer_partitions(batch_size, max_batches, dry_run=False):
+    """Секции respondent_answers для следующих диапазонов опросов (PostgreSQL; иначе — 0)."""
+    if dry_run:
+        return 0
+    return partitioning.ensure_partitions()
@@ -0,0 +1,83 @@
+# housekeeping/tests.py
+import io
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from captcha.models import CaptchaStore
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Users, RespondentStats
+from housekeeping.scheduler import Scheduler, get_metrics, run_task
+from notifications.models import EmailOutbox
+from surveys.models import Surveys, RespondentSurveyStatus
+
+
+class HousekeepingTestCase(TestCase):
+    """🧹 Задачи обслуживания: пачки, dry-run, метрики, интервалы"""
+
+    def setUp(self):
+        cache.clear()
+        customer = Users.objects.create_user(email='hk_c@example.com', name='C', role='customer', password='x')
+        self.respondent = Users.objects.create_user(email='hk_r@example.com', name='R', role='respondent',
+                                                    password='x')
+        surveys = [Surveys.objects.create(name=f"HK{i}", creator=customer, status='active') for i in range(3)]
+        for survey in surveys:
+            RespondentSurveyStatus.objects.create(respondent=self.respondent, survey=survey, status='in_progress')
+        RespondentStats.objects.create(user=self.respondent, in_progress_surveys=3)
+        # два прохождения брошены давно, одно — свежее
+        RespondentSurveyStatus.objects.filter(survey__in=surveys[:2]).update(
+            updated_at=timezone.now() - timedelta(days=45)
+        )
+
+    def test_abandon_stale_progress_in_batches(self):
+        """✅ Зависшие прохождения → abandoned пачками, счётчик in_progress уменьшается"""
+        result = run_task('abandon_stale_progress', dry_run=True)
+        self.assertEqual((result['affected'], result['dry_run']), (2, True))
+        self.assertEqual(RespondentSurveyStatus.objects.filter(status='in_progress').count(), 3)
+
+        # одна пачка из одной строки за запуск — ограничение соблюдается
+        self.assertEqual(run_task('abandon_stale_progress', batch_size=1, max_batches=1)['affected'], 1)
+        self.assertEqual(run_task('abandon_stale_progress', batch_size=1, max_batches=5)['affected'], 1)
+        self.assertEqual(run_task('abandon_stale_progress')['affected'], 0)
+
+        self.assertEqual(RespondentSurveyStatus.objects.filter(status='abandoned').count(), 2)
+        self.assertEqual(RespondentStats.objects.get(user=self.respondent).in_progress_surveys, 1)
+        metrics = get_metrics()['abandon_stale_progress']
+        self.assertGreaterEqual(metrics['runs'], 3)
+        self.assertEqual(metrics['last_affected'], 0)
+
+    def test_purge_captchas_respects_max_batches(self):
+        """✅ purge_captchas удаляет не больше batch_size × max_batches капч за запуск"""
+        past = timezone.now() - timedelta(minutes=1)
+        CaptchaStore.objects.bulk_create([
+            CaptchaStore(challenge='X', response='x', hashkey=f'{i:040x}', expiration=past) for i in range(5)
+        ])
+        # файлов пула нет: каталог не существует
+        with self.settings(CAPTCHA_POOL_ROOT=os.path.join(tempfile.gettempdir(), 'hk-no-captcha-pool')):
+            self.assertEqual(run_task('purge_captchas', batch_size=2, max_batches=1, dry_run=True)['affected'], 2)
+            self.assertEqual(run_task('purge_captchas', batch_size=2, max_batches=1)['affected'], 2)
+            self.assertEqual(CaptchaStore.objects.count(), 3)
+            self.assertEqual(run_task('purge_captchas', batch_size=2, max_batches=5)['affected'], 3)
+        self.assertEqual(CaptchaStore.objects.count(), 0)
+
+    def test_scheduler_respects_intervals_and_command(self):
+        """✅ Планировщик запускает задачу раз в интервал; команда печатает метрики"""
+        old = timezone.now() - timedelta(days=30)
+        EmailOutbox.objects.create(to_email='a@example.com', subject='s', body='b', status='sent', sent_at=old)
+        EmailOutbox.objects.create(to_email='b@example.com', subject='s', body='b', status='pending')
+
+        scheduler = Scheduler(['purge_sent_emails'])
+        results = scheduler.run_pending(now=0)
+        self.assertEqual([r['affected'] for r in results], [1])
+        self.assertEqual(scheduler.run_pending(now=1), [], "[Ошибка] Задача запущена раньше интервала")
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+        out = io.StringIO()
+        call_command('run_housekeeping', '--dry-run', stdout=out)
+        self.assertIn('(dry-run) abandon_stale_progress: 2', out.getvalue())
+        self.assertIn('purge_expired_tokens: 0', out.getvalue())
+        self.assertEqual(RespondentSurveyStatus.objects.filter(status='abandoned').count(), 0)
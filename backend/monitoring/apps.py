@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        # журнал SQL-запросов (monitoring/query_log.py): обёртка на каждое новое соединение
+        if getattr(settings, 'MONITORING_QUERY_LOG_ENABLED', False):
+            from django.core.signals import request_finished
+            from django.db.backends.signals import connection_created
+            from . import query_log
+            connection_created.connect(query_log.install, dispatch_uid='monitoring.query_log.install')
+            request_finished.connect(query_log.flush_if_due, dispatch_uid='monitoring.query_log.flush')
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from monitoring import query_log
+from monitoring.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = "Самые дорогие SQL-запросы по отпечаткам: задержки, места вызова, планы медленных запросов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=list(query_log.SORT_FIELDS), default='total',
+                            help="Сортировка: суммарное время, максимум, число вызовов, медленные, последние")
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--plans', action='store_true',
+                            help="Показать последний план EXPLAIN для каждого отпечатка")
+        parser.add_argument('--flush', action='store_true',
+                            help="Сначала сохранить статистику, накопленную этим процессом")
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            query_log.flush()
+        rows = query_log.report(options['sort'], options['limit'])
+        if not rows:
+            self.stdout.write("[QUERY LOG] Статистики пока нет")
+            return
+
+        for i, row in enumerate(rows, 1):
+            p95 = '-' if row['p95_ms'] is None else f"≤{row['p95_ms']}"
+            self.stdout.write(
+                f"{i:>3}. {row['hash'][:12]} выз.={row['calls']} всего={row['total_ms']:.1f} мс "
+                f"ср.={row['mean_ms'] or 0:.2f} p95={p95} макс.={row['max_ms']:.1f} медл.={row['slow_calls']}"
+            )
+            self.stdout.write(f"     {row['fingerprint'][:300]}")
+            for where, count in row['sources'][:3]:
+                self.stdout.write(f"     ×{count}  {where}")
+            if options['plans']:
+                slow = (SlowQuery.objects.filter(fingerprint_id=row['hash']).exclude(plan='')
+                        .only('plan', 'duration_ms').first())
+                if slow:
+                    self.stdout.write(self.style.WARNING(f"     план ({slow.duration_ms:.0f} мс):"))
+                    for line in slow.plan.splitlines():
+                        self.stdout.write(f"       {line}")
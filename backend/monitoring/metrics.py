@@ -0,0 +1,100 @@
+# monitoring/metrics.py
+"""
+Метрики запросов: скользящие окна в памяти процесса + экспорт в statsd.
+
+Для каждого эндпоинта (имя view из sociophobe.urls) хранятся последние
+MONITORING_WINDOW_SIZE измерений; перцентили считаются только при чтении
+(админский эндпоинт), запись — O(1) под коротким lock.
+statsd-клиент создаётся, только если задан MONITORING_STATSD_HOST;
+метрики одного запроса уходят одним UDP-пакетом (pipeline).
+"""
+import re
+import threading
+from collections import deque
+
+from django.conf import settings
+
+FIELDS = ('total_ms', 'queries', 'db_ms', 'size')
+
+_windows = {}      # view_name → {'samples': deque, 'count', 'budget_exceeded', 'statuses'}
+_lock = threading.Lock()
+_statsd = None
+_statsd_configured = False
+_UNSAFE = re.compile(r'[^A-Za-z0-9_-]+')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_statsd():
+    global _statsd, _statsd_configured
+    if not _statsd_configured:
+        host = _setting('MONITORING_STATSD_HOST', None)
+        if host:
+            import statsd
+            _statsd = statsd.StatsClient(host, _setting('MONITORING_STATSD_PORT', 8125),
+                                         prefix=_setting('MONITORING_STATSD_PREFIX', 'sociophobe'))
+        _statsd_configured = True
+    return _statsd
+
+
+def metric_name(view_name):
+    return _UNSAFE.sub('_', view_name)
+
+
+def record(view_name, status_code, total_ms, queries, db_ms, size, over_budget=False):
+    with _lock:
+        window = _windows.get(view_name)
+        if window is None:
+            window = _windows[view_name] = {
+                'samples': deque(maxlen=_setting('MONITORING_WINDOW_SIZE', 1000)),
+                'count': 0, 'budget_exceeded': 0, 'statuses': {},
+            }
+        window['samples'].append((total_ms, queries, db_ms, size))
+        window['count'] += 1
+        window['budget_exceeded'] += over_budget
+        window['statuses'][status_code] = window['statuses'].get(status_code, 0) + 1
+
+    client = get_statsd()
+    if client is not None:
+        name = metric_name(view_name)
+        pipe = client.pipeline()
+        pipe.timing(f'view.{name}.total', total_ms)
+        pipe.timing(f'view.{name}.db', db_ms)
+        pipe.timing(f'view.{name}.queries', queries)
+        if size is not None:
+            pipe.timing(f'view.{name}.size', size)
+        pipe.incr(f'view.{name}.status.{status_code}')
+        if over_budget:
+            pipe.incr(f'view.{name}.query_budget_exceeded')
+        pipe.send()
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def snapshot():
+    """{view_name: {'count', 'window', 'statuses', 'budget_exceeded', <поле>: {p50, p95, p99, max}}}."""
+    with _lock:
+        copied = {name: (list(w['samples']), w['count'], w['budget_exceeded'], dict(w['statuses']))
+                  for name, w in _windows.items()}
+    result = {}
+    for name, (samples, count, exceeded, statuses) in copied.items():
+        entry = {'count': count, 'window': len(samples), 'budget_exceeded': exceeded, 'statuses': statuses}
+        for index, field in enumerate(FIELDS):
+            ordered = sorted(s[index] for s in samples if s[index] is not None)
+            entry[field] = {
+                'p50': _percentile(ordered, 0.50), 'p95': _percentile(ordered, 0.95),
+                'p99': _percentile(ordered, 0.99), 'max': ordered[-1] if ordered else None,
+            }
+        result[name] = entry
+    return result
+
+
+def reset():
+    with _lock:
+        _windows.clear()
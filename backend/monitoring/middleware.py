@@ -0,0 +1,95 @@
+# monitoring/middleware.py
+"""
+PerformanceMiddleware: время запроса, число SQL-запросов и время в БД
+(через connection.execute_wrapper), размер ответа и имя view.
+
+Дёшево для продакшена: измеряется только доля MONITORING_SAMPLE_RATE запросов,
+для остальных middleware ничего не делает. Превышение бюджета запросов
+(MONITORING_QUERY_BUDGETS по имени view, затем манифест query_budgets.py,
+затем MONITORING_DEFAULT_QUERY_BUDGET)
+пишется в лог и считается в метриках.
+"""
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics, query_log
+from .query_budgets import budget_for
+from .sql import is_savepoint
+
+logger = logging.getLogger('monitoring')
+
+
+class QueryCounter:
+    """execute_wrapper: считает запросы и суммарное время в БД (savepoint-команды — как в query_harness — не в счёт)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            if not is_savepoint(sql):
+                self.count += 1
+
+
+def view_name_for(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+def query_budget(view_name):
+    budget = getattr(settings, 'MONITORING_QUERY_BUDGETS', {}).get(view_name)
+    if budget is None:
+        budget = budget_for(view_name)
+    return budget if budget is not None else getattr(settings, 'MONITORING_DEFAULT_QUERY_BUDGET', 30)
+
+
+class PerformanceMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # журнал SQL (query_log.py) атрибутирует запросы к view — для всех запросов, не только выборки
+        query_log.set_request(request)
+        try:
+            return self._measure(request)
+        finally:
+            query_log.set_request(None)
+
+    def _measure(self, request):
+        rate = getattr(settings, 'MONITORING_SAMPLE_RATE', 0.1)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        view_name = view_name_for(request)
+        if view_name is None:
+            # статика и 404 без view — не плодим метрики по произвольным URL
+            return response
+
+        db_ms = counter.seconds * 1000
+        size = None if response.streaming else len(response.content)
+        budget = query_budget(view_name)
+        over_budget = counter.count > budget
+        if over_budget:
+            logger.warning("[PERF ⚠️] %s %s: %d SQL-запросов (бюджет %d), %.1f мс в БД",
+                           request.method, view_name, counter.count, budget, db_ms)
+        metrics.record(view_name, response.status_code, total_ms, counter.count, db_ms, size, over_budget)
+        response['Server-Timing'] = f'total;dur={total_ms:.1f}, db;dur={db_ms:.1f};desc="{counter.count} queries"'
+        return response
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0001_stored_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryFingerprint',
+            fields=[
+                ('hash', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('fingerprint', models.TextField()),
+                ('calls', models.PositiveBigIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('slow_calls', models.PositiveBigIntegerField(default=0)),
+                ('sources', models.JSONField(default=dict)),
+                ('first_seen_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'monitoring_query_fingerprint',
+            },
+        ),
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('duration_ms', models.FloatField()),
+                ('sql', models.TextField()),
+                ('view_name', models.CharField(blank=True, default='', max_length=255)),
+                ('source', models.CharField(blank=True, default='', max_length=512)),
+                ('plan', models.TextField(blank=True, default='')),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slow_queries', to='monitoring.queryfingerprint')),
+            ],
+            options={
+                'db_table': 'monitoring_slow_query',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+# monitoring/models.py
+from django.conf import settings
+from django.db import models
+
+
+class StoredProfile(models.Model):
+    """
+    Профиль одного запроса (см. monitoring/profiling.py): свёрнутые стеки
+    в формате flamegraph.pl / speedscope и сводка SQL-запросов.
+    """
+    TRIGGER_CHOICES = [
+        ('header', 'Подписанный заголовок'),
+        ('sample', 'Выборка'),
+    ]
+    PROFILER_CHOICES = [
+        ('sampling', 'Сэмплирующий'),
+        ('cprofile', 'cProfile'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    view_name = models.CharField(max_length=255, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2048)
+    status_code = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                             related_name='+')
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    profiler = models.CharField(max_length=10, choices=PROFILER_CHOICES)
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    db_ms = models.FloatField(default=0)
+    sql_summary = models.JSONField(default=dict)
+    # строки «кадр;кадр;...;кадр вес»: для sampling вес — число выборок, для cprofile — мкс
+    stacks = models.TextField(blank=True, default='')
+
+    class Meta:
+        db_table = 'monitoring_stored_profile'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"StoredProfile({self.method} {self.view_name}, {self.duration_ms:.0f} мс)"
+
+
+class QueryFingerprint(models.Model):
+    """
+    Статистика SQL-запросов одного вида (см. monitoring/query_log.py): литералы
+    заменены на ?, счётчики — по выборке MONITORING_QUERY_SAMPLE_RATE,
+    медленные запросы (slow_calls) считаются все.
+    """
+    hash = models.CharField(max_length=40, primary_key=True)  # sha1 от fingerprint
+    fingerprint = models.TextField()
+    calls = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    # число вызовов по корзинам query_log.HISTOGRAM_BOUNDS (+ последняя — больше верхней границы)
+    histogram = models.JSONField(default=list)
+    slow_calls = models.PositiveBigIntegerField(default=0)
+    # «view | файл:строка (функция)» → число вызовов
+    sources = models.JSONField(default=dict)
+    first_seen_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        db_table = 'monitoring_query_fingerprint'
+
+    def __str__(self):
+        return f"QueryFingerprint({self.fingerprint[:60]}, {self.calls} выз.)"
+
+
+class SlowQuery(models.Model):
+    """Один медленный запрос (дольше MONITORING_SLOW_QUERY_MS) с планом выполнения."""
+    id = models.BigAutoField(primary_key=True)
+    fingerprint = models.ForeignKey(QueryFingerprint, on_delete=models.CASCADE, related_name='slow_queries')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    duration_ms = models.FloatField()
+    sql = models.TextField()
+    view_name = models.CharField(max_length=255, blank=True, default='')
+    source = models.CharField(max_length=512, blank=True, default='')
+    # пусто, если EXPLAIN для этого отпечатка недавно уже снимался
+    plan = models.TextField(blank=True, default='')
+
+    class Meta:
+        db_table = 'monitoring_slow_query'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"SlowQuery({self.view_name or '-'}, {self.duration_ms:.0f} мс)"
@@ -0,0 +1,10 @@
+# monitoring/permissions.py
+from rest_framework import permissions
+
+
+class IsModerator(permissions.BasePermission):
+    """Доступ только модератору (role == 'moderator'), как и к остальным служебным эндпоинтам."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and getattr(user, 'role', None) == 'moderator')
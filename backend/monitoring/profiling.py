@@ -0,0 +1,224 @@
+# monitoring/profiling.py
+"""
+Профилирование отдельных запросов по требованию.
+
+Запрос профилируется, если у него есть заголовок MONITORING_PROFILE_HEADER с
+токеном, подписанным для администратора (POST /api/monitoring/profiles/token/),
+или он попал в выборку MONITORING_PROFILE_SAMPLE_RATE. Результат —
+StoredProfile: свёрнутые стеки (flamegraph.pl, speedscope) и сводка SQL.
+
+Профилировщики (MONITORING_PROFILER):
+- sampling — фоновый поток раз в MONITORING_PROFILE_INTERVAL_MS снимает стек
+  потока запроса; вес стека — число выборок;
+- cprofile — детерминированный cProfile; стеки двухуровневые «вызывающий;вызванный»
+  с весом в мкс собственного времени.
+
+Когда профилирование выключено (нет выборки и MONITORING_PROFILE_ENABLED=False),
+middleware не подключается вовсе (MiddlewareNotUsed).
+"""
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .middleware import view_name_for
+from .sql import SQLRecorder
+
+TOKEN_SALT = 'monitoring.profile'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _frame_name(filename, name):
+    root = str(settings.BASE_DIR)
+    if filename.startswith(root):
+        filename = os.path.relpath(filename, root)
+    else:
+        filename = os.path.basename(filename)
+    return f"{name} ({filename})"
+
+
+# ---------- токен заголовка ----------
+
+def make_token(user):
+    """Значение заголовка профилирования, подписанное для администратора."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def check_token(value):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            value, max_age=_setting('MONITORING_PROFILE_TOKEN_MAX_AGE', 3600)
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+# ---------- профилировщики ----------
+
+class SamplingProfiler:
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None:
+            names.append(_frame_name(frame.f_code.co_filename, frame.f_code.co_name))
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, args=(threading.get_ident(),),
+                                        name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class CProfileProfiler:
+
+    def __enter__(self):
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self._profile.disable()
+
+    def collapsed(self):
+        lines = Counter()
+        for (filename, line, name), (_, _, own, _, callers) in pstats.Stats(self._profile).stats.items():
+            callee = _frame_name(filename, name)
+            if not callers:
+                lines[callee] += int(own * 1e6)
+            for (c_file, _, c_name), (_, _, c_own, _) in callers.items():
+                lines[f"{_frame_name(c_file, c_name)};{callee}"] += int(c_own * 1e6)
+        return '\n'.join(f"{stack} {weight}" for stack, weight in lines.most_common() if weight > 0)
+
+
+def make_profiler(kind):
+    if kind == 'cprofile':
+        return CProfileProfiler()
+    return SamplingProfiler(_setting('MONITORING_PROFILE_INTERVAL_MS', 5) / 1000)
+
+
+# ---------- разбор и сравнение ----------
+
+def parse_collapsed(text):
+    stacks = Counter()
+    for line in text.splitlines():
+        stack, _, weight = line.rpartition(' ')
+        if stack:
+            stacks[stack] += int(weight)
+    return stacks
+
+
+def inclusive_shares(stacks):
+    """Доля веса, в которой кадр присутствует в стеке (каждый кадр считается раз на стек)."""
+    total = sum(stacks.values()) or 1
+    shares = Counter()
+    for stack, weight in stacks.items():
+        for frame in set(stack.split(';')):
+            shares[frame] += weight
+    return {frame: weight / total for frame, weight in shares.items()}
+
+
+def diff_profiles(base, other, top=30):
+    """Сравнение двух StoredProfile: изменение долей кадров и числа SQL по отпечаткам."""
+    before, after = inclusive_shares(parse_collapsed(base.stacks)), inclusive_shares(parse_collapsed(other.stacks))
+    frames = sorted(set(before) | set(after), key=lambda f: abs(after.get(f, 0) - before.get(f, 0)), reverse=True)
+
+    sql_before = {q['sql']: q for q in base.sql_summary.get('top', [])}
+    sql_after = {q['sql']: q for q in other.sql_summary.get('top', [])}
+    sql = [
+        {'sql': fp, 'count_before': sql_before.get(fp, {}).get('count', 0),
+         'count_after': sql_after.get(fp, {}).get('count', 0)}
+        for fp in set(sql_before) | set(sql_after)
+        if sql_before.get(fp, {}).get('count', 0) != sql_after.get(fp, {}).get('count', 0)
+    ]
+    return {
+        'base': base.pk,
+        'other': other.pk,
+        'duration_ms': {'before': base.duration_ms, 'after': other.duration_ms},
+        'query_count': {'before': base.query_count, 'after': other.query_count},
+        'frames': [
+            {'frame': f, 'share_before': round(before.get(f, 0), 4), 'share_after': round(after.get(f, 0), 4)}
+            for f in frames[:top]
+        ],
+        'sql': sorted(sql, key=lambda q: abs(q['count_after'] - q['count_before']), reverse=True),
+    }
+
+
+# ---------- middleware ----------
+
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        self.header = 'HTTP_' + _setting('MONITORING_PROFILE_HEADER', 'X-Profile').upper().replace('-', '_')
+        self.sample_rate = _setting('MONITORING_PROFILE_SAMPLE_RATE', 0.0)
+        if not _setting('MONITORING_PROFILE_ENABLED', True) and self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def _trigger(self, request):
+        token = request.META.get(self.header)
+        if token is not None and check_token(token):
+            return 'header'
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    def __call__(self, request):
+        trigger = self._trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        kind = _setting('MONITORING_PROFILER', 'sampling')
+        recorder = SQLRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder), make_profiler(kind) as profiler:
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        view_name = view_name_for(request)
+        if view_name is None:
+            return response
+        from .models import StoredProfile
+        sql = recorder.summary()
+        user = getattr(request, 'user', None)
+        profile = StoredProfile.objects.create(
+            view_name=view_name, method=request.method, path=request.get_full_path()[:2048],
+            status_code=response.status_code, trigger=trigger, profiler=kind,
+            user_id=user.pk if user is not None and user.is_authenticated else None,
+            duration_ms=round(duration_ms, 3), query_count=sql['count'], db_ms=sql['ms'],
+            sql_summary=sql, stacks=profiler.collapsed(),
+        )
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
@@ -0,0 +1,171 @@
+# monitoring/query_budgets.py
+"""
+Манифест бюджетов SQL-запросов: для каждого URL проекта (по имени) — как его
+вызвать и сколько запросов ему разрешено. Проверяется тестом
+monitoring.tests.QueryBudgetHarnessTest на двух объёмах данных: число запросов
+не должно зависеть от объёма и не должно превышать бюджет.
+
+Новый URL нужно добавить сюда (или в EXCLUDED с причиной) — иначе тест упадёт.
+Бюджеты отсюда же использует PerformanceMiddleware, если view нет в
+MONITORING_QUERY_BUDGETS.
+
+Бюджет — число запросов при холодном кеше, включая загрузку пользователя по JWT.
+kwargs и data — функции от контекста build_dataset() (см. query_harness.py).
+"""
+
+
+class Call:
+
+    def __init__(self, method, user, budget, status=200, kwargs=None, data=None, format='json'):
+        self.method = method
+        self.user = user            # ключ ctx['users'] или None — анонимный запрос
+        self.budget = budget
+        self.status = status
+        self.kwargs = kwargs
+        self.data = data
+        self.format = format
+
+
+def _survey(ctx):
+    return {'survey_id': ctx['survey'].survey_id}
+
+
+def _import_file(ctx):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    content = "text_question,type_question,extra_data\nОдин,text,{}\nДва,text,{}\n".encode()
+    return {'file': SimpleUploadedFile('questions.csv', content, content_type='text/csv')}
+
+
+ENDPOINTS = {
+    # --- accounts ---
+    'register': [Call('post', None, 0, status=400, data=lambda ctx: {})],
+    'login': [Call('post', None, 1, data=lambda ctx: {
+        'email': ctx['users']['respondent'].email, 'password': 'synthetic',
+    })],
+    'change-password': [Call('post', 'respondent', 1, status=400, data=lambda ctx: {})],
+    'forgot-password': [Call('post', None, 2, data=lambda ctx: {'email': ctx['users']['respondent'].email})],
+    'reset-password': [Call('post', None, 0, status=400, data=lambda ctx: {})],
+    'generate-captcha': [Call('get', None, 1)],
+    'captcha-pool-image': [Call('get', None, 1, status=410, kwargs=lambda ctx: {'key': 'missing'})],
+    'user-me': [
+        Call('get', 'respondent', 2),
+        Call('put', 'respondent', 3, data=lambda ctx: {'name': 'Новое имя'}),
+    ],
+    'user-stats': [Call('get', 'respondent', 2)],
+    'characteristics-all': [Call('get', 'respondent', 3)],
+    'characteristics-mine': [Call('get', 'respondent', 2)],
+    'characteristics-update': [Call('post', 'respondent', 2, data=lambda ctx: [])],
+    'characteristicadminview': [Call('get', 'moderator', 3)],
+    'characteristic-detail': [Call('put', 'moderator', 5, kwargs=lambda ctx: {'pk': ctx['characteristic'].pk},
+                                   data=lambda ctx: {'name': 'Другая', 'value_type': 'choice', 'requirements': 'да;нет'})],
+
+    # --- surveys ---
+    'survey-create': [Call('post', 'customer', 2, status=201, data=lambda ctx: {'name': 'Новый опрос'})],
+    'survey-my': [Call('get', 'customer', 2)],
+    'survey-get-update-delete': [
+        Call('put', 'customer', 4, kwargs=_survey, data=lambda ctx: {'name': 'Переименованный'}),
+        Call('delete', 'customer', 19, status=204, kwargs=_survey),
+    ],
+    'survey-toggle-status': [Call('post', 'customer', 12, kwargs=_survey, data=lambda ctx: {'status': 'stopped'})],
+    'survey-archive': [Call('post', 'customer', 13, kwargs=_survey)],
+    'survey-archived-list': [Call('get', 'customer', 2)],
+    'survey-restore': [Call('post', 'customer', 6, kwargs=lambda ctx: {'archive_id': ctx['archive'].pk})],
+    'survey-available': [Call('get', 'respondent', 2)],
+    'my-survey-progress': [Call('get', 'respondent', 2)],
+    'respondent-home': [Call('get', 'respondent', 5)],
+    'survey-progress-update': [Call('post', 'respondent', 9, kwargs=_survey,
+                                    data=lambda ctx: {'status': 'in_progress'})],
+    'respondent-survey-answers': [Call('get', 'respondent', 5, kwargs=_survey)],
+    'survey-add-characteristic': [Call('post', 'customer', 6, status=201, kwargs=_survey, data=lambda ctx: {
+        'characteristic_id': ctx['spare_characteristic'].pk, 'requirements': '',
+    })],
+    'survey-characteristics-list': [Call('get', 'customer', 3, kwargs=_survey)],
+    'survey-edit-characteristic': [Call('put', 'customer', 6, kwargs=lambda ctx: {
+        'survey_id': ctx['survey'].survey_id, 'link_id': ctx['requirement'].pk,
+    }, data=lambda ctx: {'requirements': 'от 18'})],
+    'survey-delete-characteristic': [Call('delete', 'customer', 5, status=204, kwargs=lambda ctx: {
+        'survey_id': ctx['survey'].survey_id, 'link_id': ctx['requirement'].pk,
+    })],
+    'question-create': [Call('post', 'customer', 2, status=201, data=lambda ctx: {
+        'text_question': 'Новый вопрос', 'type_question': 'text', 'extra_data': {},
+    })],
+    'question-update': [Call('put', 'customer', 5, kwargs=lambda ctx: {'question_id': ctx['question'].pk},
+                             data=lambda ctx: {'text_question': 'Изменённый вопрос'})],
+    'survey-question-unlink': [Call('delete', 'customer', 11, status=204,
+                                    kwargs=lambda ctx: {'question_id': ctx['question'].pk})],
+    'question-link': [Call('post', 'customer', 8, status=201, data=lambda ctx: {
+        'survey': ctx['survey'].survey_id, 'question': ctx['spare_question'].pk, 'order': 999,
+    })],
+    'survey-questions': [Call('get', 'customer', 3, kwargs=_survey)],
+    'respondent-answer': [Call('post', 'respondent', 6, status=201, data=lambda ctx: {
+        'question_id': ctx['question'].pk, 'text_answer': (ctx['question'].extra_data.get('options') or ['5'])[0],
+    })],
+    'survey-answers': [Call('get', 'customer', 4, kwargs=_survey)],
+    'survey-export': [Call('get', 'customer', 3, kwargs=lambda ctx: {
+        'survey_id': ctx['survey'].survey_id, 'format_type': 'csv',
+    })],
+    'survey-import': [Call('post', 'customer', 7, status=201, format='multipart', data=_import_file,
+                           kwargs=lambda ctx: {'survey_id': ctx['survey'].survey_id, 'format_type': 'csv'})],
+
+    # --- analytics ---
+    'anonymized-data': [Call('get', 'customer', 5, kwargs=_survey)],
+    'export-data': [Call('post', 'customer', 5, kwargs=_survey, data=lambda ctx: {'format': 'csv'})],
+    'dashboard-data': [Call('get', 'customer', 5, kwargs=_survey)],
+    'respondent-dashboard': [Call('get', 'customer', 4, kwargs=_survey)],
+
+    # --- payments ---
+    'payments-top-up': [Call('post', 'customer', 3, status=202, data=lambda ctx: {'amount': '100.00'})],
+    'payments-top-up-survey': [Call('post', 'customer', 13, data=lambda ctx: {
+        'survey_id': ctx['survey'].survey_id, 'amount': '10.00',
+    })],
+    'payments-withdraw': [Call('post', 'respondent', 5, status=202, data=lambda ctx: {'amount': '1.00', 'destination': 'card'})],
+    'payments-payout': [Call('post', 'payout_respondent', 19, data=lambda ctx: {
+        'survey_id': ctx['open_status'].survey_id, 'respondent_id': ctx['open_status'].respondent_id,
+    })],
+    'payments-calc-cost': [Call('post', 'customer', 5, data=lambda ctx: {'survey_id': ctx['survey'].survey_id})],
+    'payments-wallet': [Call('get', 'respondent', 2)],
+    'payments-transactions': [Call('get', 'customer', 3)],
+    'payments-pricing-tiers': [Call('get', 'customer', 2)],
+    'payments-pricing-tier-detail': [Call('get', 'moderator', 2, kwargs=lambda ctx: {'pk': ctx['tier'].pk})],
+    'payments-reconciliation': [Call('get', 'moderator', 2, status=404)],
+    'payments-webhook': [Call('post', None, 0, status=403, data=lambda ctx: {})],
+    'payments-statement': [Call('get', 'customer', 6, kwargs=lambda ctx: {
+        'year': ctx['open_status'].updated_at.year, 'month': ctx['open_status'].updated_at.month, 'format_type': 'csv',
+    })],
+    'payments-report-daily': [Call('get', 'moderator', 3)],
+
+    # --- monitoring ---
+    'monitoring-metrics': [Call('get', 'moderator', 1)],
+    'monitoring-profiles': [Call('get', 'moderator', 2)],
+    'monitoring-profile-token': [Call('post', 'moderator', 1, status=201)],
+    'monitoring-profile-diff': [Call('get', 'moderator', 2, data=lambda ctx: {
+        'base': ctx['profile'].pk, 'other': ctx['profile'].pk,
+    })],
+    'monitoring-profile-detail': [Call('get', 'moderator', 2, kwargs=lambda ctx: {'pk': ctx['profile'].pk})],
+    'monitoring-profile-stacks': [Call('get', 'moderator', 2, kwargs=lambda ctx: {'pk': ctx['profile'].pk})],
+    'monitoring-queries': [Call('get', 'moderator', 2)],
+    'monitoring-query-detail': [Call('get', 'moderator', 3, kwargs=lambda ctx: {
+        'fingerprint_hash': ctx['query_fingerprint'].hash,
+    })],
+}
+
+EXCLUDED = {
+    'schema': "генерация OpenAPI-схемы, к БД не обращается",
+    'swagger-ui': "статическая страница документации",
+    'captcha-image': "стороннее приложение django-simple-captcha",
+    'captcha-image-2x': "стороннее приложение django-simple-captcha",
+    'captcha-audio': "стороннее приложение django-simple-captcha",
+    'captcha-refresh': "стороннее приложение django-simple-captcha",
+    'generate-questions': "обращается к внешнему AI-сервису",
+    'check-bias': "обращается к внешнему AI-сервису",
+    'evaluate-reliability': "обращается к внешнему AI-сервису",
+    'detect-anomalies': "обращается к внешнему AI-сервису",
+    'summarize-text': "обращается к внешнему AI-сервису",
+    'evaluate-answer-quality': "обращается к внешнему AI-сервису",
+}
+
+
+def budget_for(name):
+    """Наибольший бюджет среди вызовов URL или None, если URL нет в манифесте."""
+    calls = ENDPOINTS.get(name)
+    return max(call.budget for call in calls) if calls else None
@@ -0,0 +1,165 @@
+# monitoring/query_harness.py
+"""
+Проверка бюджетов SQL-запросов эндпоинтов (манифест — monitoring/query_budgets.py).
+
+Каждый вызов из манифеста выполняется на двух объёмах данных (n и 10n):
+число запросов не должно зависеть от объёма и не должно превышать бюджет.
+При нарушении в отчёт попадают «отпечатки» SQL (литералы заменены на ?),
+число которых выросло, — по ним сразу видно N+1.
+
+Вызовы выполняются в savepoint, который откатывается, — данные не меняются
+между эндпоинтами; кеш очищается перед каждым вызовом (замер «холодного» запроса).
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+
+from accounts.authentication import issue_tokens
+from accounts.models import Characteristics, Users
+from core.models import SurveyRequiredCharacteristics
+from payments.models import PricingTier
+from surveys.models import Questions, RespondentSurveyStatus, SurveyArchive, Surveys
+
+from .models import QueryFingerprint, SlowQuery, StoredProfile
+from .query_budgets import ENDPOINTS, EXCLUDED
+from .sql import fingerprint, is_savepoint
+
+
+def url_names(patterns=None, prefix=''):
+    """Имена всех URL проекта (для безымянных — шаблон пути)."""
+    names = set()
+    for entry in patterns if patterns is not None else get_resolver().url_patterns:
+        if isinstance(entry, URLResolver):
+            names |= url_names(entry.url_patterns, prefix + str(entry.pattern))
+        elif isinstance(entry, URLPattern):
+            names.add(entry.name or prefix + str(entry.pattern))
+    return names
+
+
+def uncovered_urls():
+    return sorted(url_names() - set(ENDPOINTS) - set(EXCLUDED))
+
+
+def build_dataset(n):
+    """
+    Синтетические данные объёма n: n опросов у одного заказчика, по n вопросов
+    и n участников в каждом, n характеристик, тарифов, архивов и отпечатков SQL.
+    Возвращает контекст для вызовов манифеста.
+    """
+    from benchmarks.synthetic import generate
+
+    characteristics = Characteristics.objects.bulk_create([
+        Characteristics(name=f'Характеристика {n}-{i}', value_type='choice') for i in range(n + 1)
+    ])
+    spare_characteristic = characteristics.pop()
+    generate(customers=1, respondents=3 * n, surveys=n, questions=n, respondents_per_survey=n, seed=n)
+
+    customer = Users.objects.filter(role='customer').latest('user_id')
+    # выплата и расчёт стоимости требуют лимита участников
+    Surveys.objects.filter(creator=customer).update(max_residents=1000)
+    surveys = list(Surveys.objects.filter(creator=customer).order_by('survey_id'))
+    survey = surveys[0]
+    completed = RespondentSurveyStatus.objects.filter(survey=survey, status='completed').first()
+    # незавершённое прохождение платного опроса — завершаем без выплаты, её сделает payments-payout
+    open_status = RespondentSurveyStatus.objects.filter(
+        survey__in=surveys, status='in_progress', survey__cost__gt=0
+    ).exclude(respondent=completed.respondent).first()
+    RespondentSurveyStatus.objects.filter(pk=open_status.pk).update(status='completed', score=0.8)
+
+    requirements = SurveyRequiredCharacteristics.objects.bulk_create([
+        SurveyRequiredCharacteristics(survey=s, characteristic=c, requirements='')
+        for s in surveys for c in characteristics
+    ])
+    archives = SurveyArchive.objects.bulk_create([SurveyArchive(survey=s) for s in surveys])
+    fingerprints = QueryFingerprint.objects.bulk_create([
+        QueryFingerprint(hash=f'{n:08d}{i:032d}', fingerprint=f'SELECT * FROM t{i} WHERE id = ?', calls=i + 1,
+                         total_ms=i + 1.0, max_ms=1.0, histogram=[i + 1], sources={'survey-my | x.py:1 (f)': i + 1})
+        for i in range(n)
+    ])
+    SlowQuery.objects.bulk_create([
+        SlowQuery(fingerprint=fingerprints[0], duration_ms=250.0, sql='SELECT 1', plan='SCAN t0') for _ in range(n)
+    ])
+    tiers = PricingTier.objects.bulk_create([
+        PricingTier(min_questions=i * 10, max_questions=i * 10 + 9, price_per_survey=10 + i) for i in range(n)
+    ])
+    return {
+        'users': {
+            'customer': customer,
+            'respondent': completed.respondent,
+            'payout_respondent': open_status.respondent,
+            'moderator': Users.objects.create_user(email=f'moderator{n}@harness.test', name='M',
+                                                   role='moderator', password='x'),
+        },
+        'survey': survey,
+        'question': survey.survey_questions.order_by('order').first().question,
+        'spare_question': Questions.objects.create(text_question='Без опроса', type_question='text', extra_data={}),
+        'open_status': open_status,
+        'characteristic': characteristics[0],
+        'spare_characteristic': spare_characteristic,
+        'requirement': next(r for r in requirements if r.survey_id == survey.survey_id),
+        'archive': archives[0],
+        'tier': tiers[0],
+        'query_fingerprint': fingerprints[0],
+        'profile': StoredProfile.objects.create(
+            view_name='dashboard-data', method='GET', path='/', status_code=200, trigger='header',
+            profiler='sampling', duration_ms=1.0, stacks='get (analytics/views.py) 1',
+        ),
+    }
+
+
+class _Rollback(Exception):
+    pass
+
+
+def measure(name, call, ctx):
+    """Выполняет вызов и возвращает (статус ответа, [SQL])."""
+    client = APIClient(HTTP_HOST='localhost')
+    if call.user:
+        # настоящий JWT: при холодном кеше в счёт входит и загрузка пользователя
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(ctx['users'][call.user]).access_token}")
+    url = reverse(name, kwargs=call.kwargs(ctx) if call.kwargs else None)
+    data = call.data(ctx) if call.data else None
+    kwargs = {'format': call.format} if data is not None else {}
+
+    cache.clear()
+    result = {}
+    try:
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured:
+                result['status'] = getattr(client, call.method)(url, data, **kwargs).status_code
+            result['queries'] = [q['sql'] for q in captured.captured_queries if not is_savepoint(q['sql'])]
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result['status'], result['queries']
+
+
+def measure_all(ctx):
+    return {
+        (name, call.method): measure(name, call, ctx)
+        for name, calls in ENDPOINTS.items() for call in calls
+    }
+
+
+def check(name, call, small, large):
+    """Пустая строка — бюджет соблюдён; иначе — описание нарушения с отпечатками SQL."""
+    (small_status, small_queries), (large_status, large_queries) = small, large
+    problems = []
+    if len(large_queries) != len(small_queries):
+        problems.append(f"число запросов зависит от объёма данных: {len(small_queries)} → {len(large_queries)}")
+    if max(len(small_queries), len(large_queries)) > call.budget:
+        problems.append(f"превышен бюджет {call.budget}: {max(len(small_queries), len(large_queries))}")
+    if {small_status, large_status} != {call.status}:
+        problems.append(f"неожиданный статус ответа: {small_status} / {large_status}")
+    if not problems:
+        return ''
+
+    before, after = Counter(map(fingerprint, small_queries)), Counter(map(fingerprint, large_queries))
+    grown = [fp for fp in after if after[fp] > before[fp]] or list(after)
+    lines = [f"{call.method.upper()} {name}: " + '; '.join(problems)]
+    lines += [f"    ×{before[fp]} → ×{after[fp]}  {fp[:300]}" for fp in grown]
+    return '\n'.join(lines)
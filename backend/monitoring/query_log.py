@@ -0,0 +1,297 @@
+# monitoring/query_log.py
+"""
+Журнал SQL-запросов по отпечаткам и захват планов медленных запросов.
+
+Обёртка выполнения (install() → connection.execute_wrappers каждого соединения)
+замеряет каждый запрос, но дальше работает только с выборкой:
+- доля MONITORING_QUERY_SAMPLE_RATE запросов попадает в статистику отпечатка
+  (число, суммарное и максимальное время, гистограмма задержек);
+- запросы дольше MONITORING_SLOW_QUERY_MS записываются всегда — с SQL,
+  view и строкой кода, из которой пришёл запрос, и с планом EXPLAIN
+  (не чаще раза в MONITORING_SLOW_QUERY_EXPLAIN_INTERVAL секунд на отпечаток).
+
+Данные копятся в памяти процесса и сбрасываются в QueryFingerprint/SlowQuery
+по окончании запроса (request_finished), не чаще раза в
+MONITORING_QUERY_FLUSH_SECONDS и только вне транзакции.
+Отчёт — manage.py slow_query_report и /api/monitoring/queries/.
+"""
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .sql import fingerprint
+
+# верхние границы корзин гистограммы, мс (последняя — всё, что больше)
+HISTOGRAM_BOUNDS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+MAX_PENDING_SLOW = 200
+MAX_SOURCES = 50                # мест вызова на отпечаток — самые частые
+
+_local = threading.local()      # busy — собственные запросы журнала; request — текущий запрос
+_lock = threading.Lock()
+_pending = {}                   # хэш → накопленная с последнего сброса статистика
+_pending_slow = []
+_last_explain = {}              # хэш → время последнего EXPLAIN
+_last_flush = 0.0
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def fingerprint_hash(text):
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def bucket(ms):
+    for i, bound in enumerate(HISTOGRAM_BOUNDS):
+        if ms <= bound:
+            return i
+    return len(HISTOGRAM_BOUNDS)
+
+
+def percentile(histogram, q):
+    """Оценка перцентиля по гистограмме: верхняя граница корзины."""
+    total = sum(histogram)
+    if not total:
+        return None
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= q * total:
+            return HISTOGRAM_BOUNDS[i] if i < len(HISTOGRAM_BOUNDS) else float('inf')
+    return None
+
+
+def set_request(request):
+    """Запрос текущего потока — для атрибуции к view (выставляет PerformanceMiddleware, None — сброс)."""
+    _local.request = request
+
+
+def _source():
+    """Ближайшая к запросу строка кода проекта (не этого модуля и не сторонних пакетов)."""
+    root = str(settings.BASE_DIR) + os.sep
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and filename != __file__ and 'site-packages' not in filename:
+            return f"{os.path.relpath(filename, root)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return None
+
+
+def _attribution():
+    """(имя view, строка кода) — «-», если определить не удалось."""
+    from .middleware import view_name_for
+    request = getattr(_local, 'request', None)
+    view = view_name_for(request) if request is not None else None
+    return view or '-', _source() or '-'
+
+
+def _explain(sql, params, context):
+    """
+    План запроса на отдельном курсоре (результат основного ещё не прочитан)
+    и в обход execute_wrappers — не попадает в счётчики запросов.
+    PostgreSQL: EXPLAIN (ANALYZE, BUFFERS) выполняет запрос повторно, поэтому
+    только для SELECT и внутри savepoint — ошибка не испортит транзакцию.
+    """
+    conn = context['connection']
+    if conn.vendor == 'postgresql':
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return ''
+        statement = f"EXPLAIN (ANALYZE, BUFFERS) {sql}"
+    elif conn.vendor == 'sqlite':
+        statement = f"EXPLAIN QUERY PLAN {sql}"
+    else:
+        statement = f"EXPLAIN {sql}"
+    savepoint = conn.vendor == 'postgresql' and conn.in_atomic_block
+    cursor = conn.create_cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT query_log_explain")
+        try:
+            cursor.execute(statement, params)
+            rows = cursor.fetchall()
+        finally:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_log_explain")
+        return '\n'.join(' '.join(str(col) for col in row) for row in rows)
+    finally:
+        cursor.close()
+
+
+def _record(sql, params, many, context, ms, sampled, slow):
+    text = fingerprint(sql)
+    key = fingerprint_hash(text)
+    view_name, source = _attribution()
+    plan = ''
+    if slow and not many:
+        now = time.monotonic()
+        interval = _setting('MONITORING_SLOW_QUERY_EXPLAIN_INTERVAL', 300)
+        if now - _last_explain.get(key, -interval) >= interval:
+            _last_explain[key] = now
+            try:
+                plan = _explain(sql, params, context)
+            except Exception as e:
+                plan = f"EXPLAIN не выполнен: {e}"
+
+    with _lock:
+        entry = _pending.get(key)
+        if entry is None:
+            entry = _pending[key] = {
+                'fingerprint': text, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'histogram': [0] * (len(HISTOGRAM_BOUNDS) + 1), 'slow_calls': 0, 'sources': {},
+            }
+        if sampled:
+            entry['calls'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['histogram'][bucket(ms)] += 1
+        if slow:
+            entry['slow_calls'] += 1
+            if len(_pending_slow) < MAX_PENDING_SLOW:
+                _pending_slow.append({
+                    'hash': key, 'duration_ms': ms, 'sql': sql[:10000], 'plan': plan,
+                    'view_name': view_name, 'source': source,
+                })
+        # ключ — «view | файл:строка (функция)»
+        where = f"{view_name} | {source}"
+        entry['sources'][where] = entry['sources'].get(where, 0) + 1
+
+
+def query_log_wrapper(execute, sql, params, many, context):
+    if getattr(_local, 'busy', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    ms = (time.perf_counter() - started) * 1000
+
+    slow = ms >= _setting('MONITORING_SLOW_QUERY_MS', 200)
+    rate = _setting('MONITORING_QUERY_SAMPLE_RATE', 0.01)
+    sampled = rate >= 1 or (rate > 0 and random.random() < rate)
+    if sampled or slow:
+        _local.busy = True
+        try:
+            _record(sql, params, many, context, ms, sampled, slow)
+        finally:
+            _local.busy = False
+    return result
+
+
+def install(sender=None, connection=None, **kwargs):
+    """Обработчик connection_created: подключает обёртку к соединению (один раз)."""
+    if query_log_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_log_wrapper)
+
+
+def flush():
+    """Пишет накопленную статистику и медленные запросы в БД. Возвращает число отпечатков."""
+    global _last_flush
+    from .models import QueryFingerprint, SlowQuery
+
+    with _lock:
+        pending, slow = dict(_pending), list(_pending_slow)
+        _pending.clear()
+        _pending_slow.clear()
+    _last_flush = time.monotonic()
+    if not pending:
+        return 0
+
+    _local.busy = True
+    try:
+        with transaction.atomic():
+            # новые отпечатки — пустыми строками; ignore_conflicts: параллельный воркер мог вставить тот же хэш
+            QueryFingerprint.objects.bulk_create([
+                QueryFingerprint(hash=key, fingerprint=entry['fingerprint'],
+                                 histogram=[0] * (len(HISTOGRAM_BOUNDS) + 1), sources={})
+                for key, entry in pending.items()
+            ], ignore_conflicts=True)
+            existing = QueryFingerprint.objects.select_for_update().in_bulk(list(pending))
+            for key, entry in pending.items():
+                row = existing[key]
+                histogram = [a + b for a, b in zip(row.histogram, entry['histogram'])]
+                sources = Counter(row.sources)
+                sources.update(entry['sources'])
+                QueryFingerprint.objects.filter(pk=key).update(
+                    calls=F('calls') + entry['calls'], total_ms=F('total_ms') + entry['total_ms'],
+                    slow_calls=F('slow_calls') + entry['slow_calls'], max_ms=max(row.max_ms, entry['max_ms']),
+                    histogram=histogram, sources=dict(sources.most_common(MAX_SOURCES)),
+                    last_seen_at=timezone.now(),
+                )
+            SlowQuery.objects.bulk_create([
+                SlowQuery(fingerprint_id=s['hash'], duration_ms=round(s['duration_ms'], 3), sql=s['sql'],
+                          plan=s['plan'], view_name=s['view_name'][:255], source=s['source'][:512])
+                for s in slow
+            ])
+    finally:
+        _local.busy = False
+    return len(pending)
+
+
+def flush_if_due(sender=None, **kwargs):
+    """Обработчик request_finished: сброс не чаще MONITORING_QUERY_FLUSH_SECONDS и только вне транзакции."""
+    if not _pending or time.monotonic() - _last_flush < _setting('MONITORING_QUERY_FLUSH_SECONDS', 30):
+        return
+    if connection.in_atomic_block:
+        return
+    try:
+        flush()
+    except Exception as e:
+        print(f"[QUERY LOG ❌] Не удалось сохранить статистику запросов: {e}")
+
+
+def reset():
+    global _last_flush
+    with _lock:
+        _pending.clear()
+        _pending_slow.clear()
+        _last_explain.clear()
+    _last_flush = 0.0
+
+
+SORT_FIELDS = {
+    'total': '-total_ms',
+    'max': '-max_ms',
+    'calls': '-calls',
+    'slow': '-slow_calls',
+    'recent': '-last_seen_at',
+}
+
+
+def _row(fp):
+    return {
+        'hash': fp.hash,
+        'fingerprint': fp.fingerprint,
+        'calls': fp.calls,
+        'total_ms': round(fp.total_ms, 3),
+        'mean_ms': round(fp.total_ms / fp.calls, 3) if fp.calls else None,
+        'p95_ms': percentile(fp.histogram, 0.95),
+        'max_ms': round(fp.max_ms, 3),
+        'slow_calls': fp.slow_calls,
+        'sources': sorted(fp.sources.items(), key=lambda item: -item[1]),
+        'last_seen_at': fp.last_seen_at,
+    }
+
+
+def report(sort='total', limit=20):
+    """Самые «дорогие» отпечатки; sort — ключ SORT_FIELDS."""
+    from .models import QueryFingerprint
+    return [_row(fp) for fp in QueryFingerprint.objects.order_by(SORT_FIELDS[sort], 'hash')[:limit]]
+
+
+def detail(fp, slow_limit=20):
+    """Отпечаток с последними медленными запросами и их планами."""
+    data = _row(fp)
+    data['histogram'] = dict(zip([f'<={b}' for b in HISTOGRAM_BOUNDS] + [f'>{HISTOGRAM_BOUNDS[-1]}'], fp.histogram))
+    data['slow_queries'] = list(fp.slow_queries.values(
+        'id', 'created_at', 'duration_ms', 'view_name', 'source', 'sql', 'plan',
+    )[:slow_limit])
+    return data
@@ -0,0 +1,44 @@
+# monitoring/sql.py
+"""Отпечатки SQL и сводка запросов запроса (для профилей и проверки бюджетов)."""
+import re
+import time
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def is_savepoint(sql):
+    """SAVEPOINT / RELEASE / ROLLBACK TO SAVEPOINT — служебные команды atomic(), в бюджеты не входят."""
+    return 'SAVEPOINT' in sql.upper()
+
+
+def fingerprint(sql):
+    """SQL без литералов: одинаковые запросы с разными параметрами дают один отпечаток."""
+    sql = _NUMBER.sub('?', _STRING.sub('?', sql))
+    return _SPACES.sub(' ', _IN_LIST.sub('(...)', sql)).strip()
+
+
+class SQLRecorder:
+    """execute_wrapper: число и время запросов по отпечаткам."""
+
+    def __init__(self):
+        self.queries = {}   # отпечаток → [число, мс]
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            entry = self.queries.setdefault(fingerprint(sql), [0, 0.0])
+            entry[0] += 1
+            entry[1] += (time.perf_counter() - started) * 1000
+
+    def summary(self, top=20):
+        ranked = sorted(self.queries.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            'count': sum(count for count, _ in self.queries.values()),
+            'ms': round(sum(ms for _, ms in self.queries.values()), 3),
+            'top': [{'sql': sql, 'count': count, 'ms': round(ms, 3)} for sql, (count, ms) in ranked[:top]],
+        }
@@ -0,0 +1,328 @@
+# monitoring/tests.py
+import shutil
+import socket
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import Users
+from django.core.exceptions import MiddlewareNotUsed
+
+from monitoring import metrics, query_log
+from monitoring.middleware import QueryCounter
+from monitoring.models import QueryFingerprint, SlowQuery, StoredProfile
+from monitoring.profiling import ProfilingMiddleware, SamplingProfiler, make_token, parse_collapsed
+from monitoring.query_budgets import ENDPOINTS
+from monitoring.query_harness import build_dataset, check, fingerprint, measure_all, uncovered_urls
+
+
+@override_settings(MONITORING_SAMPLE_RATE=1.0)
+class PerformanceMiddlewareTestCase(TestCase):
+    """📈 Метрики запросов: окно перцентилей, бюджет запросов, statsd"""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.moderator = Users.objects.create_user(
+            email='monitor_moderator@example.com', name='Moderator', role='moderator', password='Admin123'
+        )
+        self.respondent = Users.objects.create_user(
+            email='monitor_r@example.com', name='R', role='respondent', password='x'
+        )
+
+    def test_records_view_metrics_and_budget(self):
+        """✅ Время/запросы/размер по имени view; превышение бюджета — в лог и в счётчик"""
+        self.client.force_authenticate(self.respondent)
+        with override_settings(MONITORING_QUERY_BUDGETS={'respondent-home': 1}):
+            with self.assertLogs('monitoring', level='WARNING') as logs:
+                resp = self.client.get(reverse('respondent-home'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('db;dur=', resp['Server-Timing'])
+        self.assertIn('respondent-home', logs.output[0])
+
+        self.client.get(reverse('user-me'))
+        self.client.get(reverse('user-me'))
+
+        # эндпоинт метрик только для модератора; is_staff без роли не даёт доступа
+        self.assertEqual(self.client.get(reverse('monitoring-metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        staff = Users.objects.create_user(email='monitor_staff@example.com', name='S', role='customer',
+                                          password='x', is_staff=True)
+        self.client.force_authenticate(staff)
+        self.assertEqual(self.client.get(reverse('monitoring-metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(self.moderator)
+        data = self.client.get(reverse('monitoring-metrics')).data
+
+        home = data['respondent-home']
+        self.assertEqual((home['count'], home['budget_exceeded']), (1, 1))
+        self.assertGreaterEqual(home['queries']['max'], 2)
+        self.assertEqual(home['size']['max'], len(resp.content))
+        self.assertEqual(data['user-me']['count'], 2)
+        self.assertEqual(data['user-me']['statuses'], {200: 2})
+        self.assertEqual(data['user-me']['budget_exceeded'], 0)
+
+    def test_sampling_and_statsd_export(self):
+        """✅ При sample_rate=0 ничего не пишется; метрики запроса уходят в statsd одним пакетом"""
+        self.client.force_authenticate(self.respondent)
+        with override_settings(MONITORING_SAMPLE_RATE=0):
+            resp = self.client.get(reverse('user-me'))
+        self.assertNotIn('Server-Timing', resp)
+        self.assertEqual(metrics.snapshot(), {})
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.settimeout(2)
+        self.addCleanup(sock.close)
+        with override_settings(MONITORING_STATSD_HOST='127.0.0.1', MONITORING_STATSD_PORT=sock.getsockname()[1]):
+            metrics._statsd_configured = False
+            self.addCleanup(setattr, metrics, '_statsd_configured', False)
+            self.client.get(reverse('user-me'))
+            packet = sock.recv(65535).decode()
+        self.assertIn('sociophobe.view.user-me.total:', packet)
+        self.assertIn('sociophobe.view.user-me.status.200:1|c', packet)
+
+    def test_query_counter_skips_savepoints(self):
+        """✅ SAVEPOINT/RELEASE от atomic() не попадают в счётчик запросов, как и в query_harness"""
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            with transaction.atomic():
+                Users.objects.count()
+        self.assertEqual(counter.count, 1)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class QueryBudgetHarnessTest(TestCase):
+    """🧮 Бюджеты SQL-запросов всех эндпоинтов на объёмах n и 10n"""
+
+    def setUp(self):
+        # пул капч — во временном каталоге, а не в var/ дерева исходников
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        overrides = override_settings(CAPTCHA_POOL_ROOT=root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def _measure(self, n):
+        try:
+            with transaction.atomic():
+                result = measure_all(build_dataset(n))
+                raise _Rollback
+        except _Rollback:
+            return result
+
+    def test_every_url_has_budget(self):
+        """✅ Каждый URL проекта есть в манифесте или в EXCLUDED"""
+        self.assertEqual(uncovered_urls(), [])
+
+    def test_query_counts_constant_and_within_budget(self):
+        """✅ Число запросов не растёт с объёмом данных и укладывается в бюджет"""
+        small, large = self._measure(2), self._measure(20)
+        failures = [
+            check(name, call, small[(name, call.method)], large[(name, call.method)])
+            for name, calls in ENDPOINTS.items() for call in calls
+        ]
+        failures = [f for f in failures if f]
+        if failures:
+            self.fail("Нарушены бюджеты SQL-запросов (monitoring/query_budgets.py):\n" + '\n'.join(failures))
+
+    def test_fingerprint_and_report(self):
+        """✅ Отпечаток SQL без литералов; отчёт показывает выросший запрос"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x''y' AND t.col_1 > 2.5"),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? AND t.col_1 > ?",
+        )
+        call = ENDPOINTS['survey-my'][0]
+        report = check('survey-my', call, (200, ['SELECT 1']), (200, ['SELECT 1', 'SELECT a FROM b WHERE id = 7'] * 2))
+        self.assertIn('1 → 4', report)
+        self.assertIn('×0 → ×2  SELECT a FROM b WHERE id = ?', report)
+
+
+@override_settings(MONITORING_PROFILER='cprofile', MONITORING_PROFILE_SAMPLE_RATE=0.0)
+class ProfilingTestCase(TestCase):
+    """🔥 Профилирование по требованию: подписанный заголовок, хранение, сравнение"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.moderator = Users.objects.create_user(
+            email='profile_moderator@example.com', name='Moderator', role='moderator', password='Admin123'
+        )
+        self.respondent = Users.objects.create_user(
+            email='profile_r@example.com', name='R', role='respondent', password='x'
+        )
+
+    def test_signed_header_profiles_request(self):
+        """✅ Без заголовка или с чужой подписью — ничего; с токеном админа — профиль со стеками и SQL"""
+        self.client.force_authenticate(self.respondent)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('respondent-home')))
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('respondent-home'), HTTP_X_PROFILE='1:forged'))
+        self.assertFalse(StoredProfile.objects.exists())
+
+        self.client.force_authenticate(self.moderator)
+        token = self.client.post(reverse('monitoring-profile-token')).data['token']
+        self.client.force_authenticate(self.respondent)
+        first = self.client.get(reverse('respondent-home'), HTTP_X_PROFILE=token)
+        second = self.client.get(reverse('user-me'), HTTP_X_PROFILE=token)
+
+        profile = StoredProfile.objects.get(pk=first['X-Profile-Id'])
+        self.assertEqual((profile.view_name, profile.trigger, profile.user_id),
+                         ('respondent-home', 'header', self.respondent.pk))
+        self.assertGreater(profile.query_count, 0)
+        self.assertEqual(profile.query_count, sum(q['count'] for q in profile.sql_summary['top']))
+        self.assertTrue(any('views.py' in stack for stack in parse_collapsed(profile.stacks)))
+
+        # список, скачивание стеков, сравнение — только для админа
+        self.assertEqual(self.client.get(reverse('monitoring-profiles')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(self.moderator)
+        listed = self.client.get(reverse('monitoring-profiles'), {'view': 'respondent-home'}).data
+        self.assertEqual([p['id'] for p in listed], [profile.pk])
+        stacks = self.client.get(reverse('monitoring-profile-stacks', kwargs={'pk': profile.pk}))
+        self.assertEqual(stacks.content.decode(), profile.stacks)
+
+        diff = self.client.get(reverse('monitoring-profile-diff'),
+                               {'base': profile.pk, 'other': second['X-Profile-Id']}).data
+        self.assertEqual(diff['query_count']['before'], profile.query_count)
+        self.assertTrue(diff['frames'])
+
+    def test_sampling_rate_and_disabled(self):
+        """✅ Выборка профилирует без заголовка; выключенное профилирование не подключает middleware"""
+        self.client.force_authenticate(self.respondent)
+        with override_settings(MONITORING_PROFILE_SAMPLE_RATE=1.0):
+            resp = self.client.get(reverse('user-me'))
+        self.assertEqual(StoredProfile.objects.get(pk=resp['X-Profile-Id']).trigger, 'sample')
+
+        with override_settings(MONITORING_PROFILE_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: None)
+
+    def test_sampling_profiler_collapses_stacks(self):
+        """✅ Сэмплирующий профилировщик: стеки от корня к листу с числом выборок"""
+        def busy():
+            import time
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        with SamplingProfiler(0.001) as profiler:
+            busy()
+        stacks = parse_collapsed(profiler.collapsed())
+        self.assertTrue(stacks)
+        self.assertTrue(any(stack.split(';')[-1].startswith('busy ') for stack in stacks))
+        self.assertTrue(make_token(self.moderator))
+
+
+@override_settings(MONITORING_QUERY_SAMPLE_RATE=1.0, MONITORING_SLOW_QUERY_MS=10_000)
+class QueryLogTestCase(TestCase):
+    """🐢 Журнал SQL по отпечаткам: выборка, атрибуция к view, планы медленных запросов"""
+
+    def setUp(self):
+        cache.clear()
+        query_log.install(connection=connection)
+        query_log.reset()
+        self.client = APIClient()
+        self.moderator = Users.objects.create_user(
+            email='querylog_moderator@example.com', name='Moderator', role='moderator', password='Admin123'
+        )
+        self.respondent = Users.objects.create_user(
+            email='querylog_r@example.com', name='R', role='respondent', password='x'
+        )
+
+    def tearDown(self):
+        query_log.reset()
+
+    def test_fingerprints_attributed_to_view_and_line(self):
+        """✅ Запросы группируются по отпечатку, место вызова — view и строка кода проекта"""
+        self.client.force_authenticate(self.respondent)
+        self.client.get(reverse('respondent-home'))
+        self.client.get(reverse('respondent-home'))
+        # внутри транзакции теста сброс по request_finished откладывается
+        self.assertFalse(QueryFingerprint.objects.exists())
+        self.assertGreater(query_log.flush(), 0)
+
+        sources = [where for fp in QueryFingerprint.objects.all() for where in fp.sources]
+        self.assertTrue(any(where.startswith('respondent-home | surveys/') for where in sources), sources)
+        self.assertFalse(any('query_log.py' in where for where in sources))
+        fp = QueryFingerprint.objects.filter(sources__has_key=next(
+            where for where in sources if where.startswith('respondent-home | '))).first()
+        self.assertEqual(sum(fp.histogram), fp.calls)
+        self.assertNotRegex(fp.fingerprint, r"= \d")
+
+        # повторный сброс складывается с уже сохранённым
+        calls = fp.calls
+        self.client.get(reverse('respondent-home'))
+        query_log.flush()
+        fp.refresh_from_db()
+        self.assertGreater(fp.calls, calls)
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_flush_merges_rows_inserted_by_another_worker(self):
+        """✅ Отпечаток, уже вставленный параллельным воркером, складывается, а не роняет сброс"""
+        with override_settings(MONITORING_QUERY_SAMPLE_RATE=1.0):
+            Users.objects.filter(email__startswith='querylog').count()
+        key, entry = next((k, e) for k, e in query_log._pending.items() if 'LIKE' in e['fingerprint'])
+        histogram = [0] * (len(query_log.HISTOGRAM_BOUNDS) + 1)
+        histogram[0] = 5
+        QueryFingerprint.objects.create(hash=key, fingerprint=entry['fingerprint'], calls=5, total_ms=1.0,
+                                        max_ms=0.5, histogram=histogram, sources={'другой воркер': 5})
+
+        self.assertGreater(query_log.flush(), 0)
+        fp = QueryFingerprint.objects.get(pk=key)
+        self.assertEqual(fp.calls, 5 + entry['calls'])
+        self.assertEqual(sum(fp.histogram), fp.calls)
+        self.assertIn('другой воркер', fp.sources)
+
+    def test_slow_queries_with_plan_report_and_endpoints(self):
+        """✅ Медленный запрос пишется всегда, EXPLAIN — раз на отпечаток; отчёт и эндпоинты админа"""
+        with override_settings(MONITORING_QUERY_SAMPLE_RATE=0.0, MONITORING_SLOW_QUERY_MS=0):
+            for _ in range(2):
+                Users.objects.filter(email__startswith='querylog').count()
+            query_log.flush()
+
+        slow = SlowQuery.objects.filter(sql__contains='LIKE').order_by('id')
+        self.assertEqual(slow.count(), 2)
+        self.assertTrue(slow[0].plan)
+        self.assertEqual(slow[1].plan, '')
+        self.assertIn('monitoring/tests.py', slow[0].source)
+        fp = slow[0].fingerprint
+        self.assertEqual((fp.calls, fp.slow_calls), (0, 2))
+
+        out = StringIO()
+        call_command('slow_query_report', '--sort', 'slow', '--plans', stdout=out)
+        self.assertIn(fp.hash[:12], out.getvalue())
+        self.assertIn(slow[0].plan.splitlines()[0], out.getvalue())
+
+        self.client.force_authenticate(self.respondent)
+        self.assertEqual(self.client.get(reverse('monitoring-queries')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(self.moderator)
+        self.assertEqual(self.client.get(reverse('monitoring-queries'), {'sort': 'x'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        listed = self.client.get(reverse('monitoring-queries'), {'sort': 'slow', 'limit': 1}).data
+        self.assertEqual([row['hash'] for row in listed], [fp.hash])
+        detail = self.client.get(reverse('monitoring-query-detail', kwargs={'fingerprint_hash': fp.hash})).data
+        self.assertEqual(len(detail['slow_queries']), 2)
+        self.assertEqual(detail['slow_queries'][1]['plan'], slow[0].plan)
+
+    def test_histogram_percentile_and_sampling(self):
+        """✅ Перцентиль по корзинам гистограммы; при нулевой выборке быстрые запросы не учитываются"""
+        histogram = [0] * (len(query_log.HISTOGRAM_BOUNDS) + 1)
+        for ms in [0.5] * 90 + [30] * 9 + [9000]:
+            histogram[query_log.bucket(ms)] += 1
+        self.assertEqual(query_log.percentile(histogram, 0.5), 1)
+        self.assertEqual(query_log.percentile(histogram, 0.95), 50)
+        self.assertEqual(query_log.percentile(histogram, 1.0), float('inf'))
+        self.assertIsNone(query_log.percentile([0, 0], 0.95))
+
+        query_log.reset()
+        with override_settings(MONITORING_QUERY_SAMPLE_RATE=0.0):
+            Users.objects.count()
+        self.assertEqual(query_log.flush(), 0)
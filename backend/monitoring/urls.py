@@ -0,0 +1,17 @@
+from django.urls import path
+
+from .views import (
+    RequestMetricsView, ProfileTokenView, ProfileListView, ProfileDetailView, ProfileStacksView, ProfileDiffView,
+    QueryLogView, QueryLogDetailView,
+)
+
+urlpatterns = [
+    path('metrics/', RequestMetricsView.as_view(), name='monitoring-metrics'),
+    path('profiles/', ProfileListView.as_view(), name='monitoring-profiles'),
+    path('profiles/token/', ProfileTokenView.as_view(), name='monitoring-profile-token'),
+    path('profiles/diff/', ProfileDiffView.as_view(), name='monitoring-profile-diff'),
+    path('profiles/<int:pk>/', ProfileDetailView.as_view(), name='monitoring-profile-detail'),
+    path('profiles/<int:pk>/stacks/', ProfileStacksView.as_view(), name='monitoring-profile-stacks'),
+    path('queries/', QueryLogView.as_view(), name='monitoring-queries'),
+    path('queries/<str:fingerprint_hash>/', QueryLogDetailView.as_view(), name='monitoring-query-detail'),
+]
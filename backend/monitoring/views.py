@@ -0,0 +1,143 @@
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import metrics, query_log
+from .models import QueryFingerprint, StoredProfile
+from .permissions import IsModerator
+from .profiling import diff_profiles, make_token
+
+PROFILE_LIST_FIELDS = (
+    'id', 'created_at', 'view_name', 'method', 'path', 'status_code', 'trigger', 'profiler',
+    'duration_ms', 'query_count', 'db_ms',
+)
+
+
+class RequestMetricsView(APIView):
+    """Скользящие перцентили по эндпоинтам текущего процесса (см. PerformanceMiddleware)."""
+    permission_classes = [IsModerator]
+
+    @extend_schema(summary="Метрики производительности эндпоинтов", tags=['Мониторинг'])
+    def get(self, request):
+        if request.query_params.get('reset') == '1':
+            metrics.reset()
+        return Response(metrics.snapshot())
+
+
+class ProfileTokenView(APIView):
+    """Значение заголовка профилирования (см. monitoring/profiling.py)."""
+    permission_classes = [IsModerator]
+
+    @extend_schema(summary="Токен для профилирования запросов", tags=['Мониторинг'])
+    def post(self, request):
+        from django.conf import settings
+        return Response({
+            'header': getattr(settings, 'MONITORING_PROFILE_HEADER', 'X-Profile'),
+            'token': make_token(request.user),
+            'max_age': getattr(settings, 'MONITORING_PROFILE_TOKEN_MAX_AGE', 3600),
+        }, status=status.HTTP_201_CREATED)
+
+
+class ProfileListView(APIView):
+    permission_classes = [IsModerator]
+
+    @extend_schema(
+        summary="Сохранённые профили запросов",
+        parameters=[
+            OpenApiParameter('view', str, description="Имя view"),
+            OpenApiParameter('limit', int, description="Сколько последних профилей вернуть (по умолчанию 50)"),
+        ],
+        tags=['Мониторинг'],
+    )
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 500)
+        except ValueError:
+            return Response({"detail": "limit должен быть целым числом"}, status=status.HTTP_400_BAD_REQUEST)
+        profiles = StoredProfile.objects.all()
+        if request.query_params.get('view'):
+            profiles = profiles.filter(view_name=request.query_params['view'])
+        return Response(list(profiles.values(*PROFILE_LIST_FIELDS)[:limit]))
+
+
+class ProfileDetailView(APIView):
+    permission_classes = [IsModerator]
+
+    @extend_schema(summary="Профиль запроса: сводка SQL", tags=['Мониторинг'])
+    def get(self, request, pk: int):
+        profile = get_object_or_404(StoredProfile.objects.defer('stacks'), pk=pk)
+        data = {field: getattr(profile, field) for field in PROFILE_LIST_FIELDS}
+        data['sql_summary'] = profile.sql_summary
+        return Response(data)
+
+
+class ProfileStacksView(APIView):
+    permission_classes = [IsModerator]
+
+    @extend_schema(summary="Свёрнутые стеки профиля (flamegraph.pl / speedscope)", tags=['Мониторинг'])
+    def get(self, request, pk: int):
+        profile = get_object_or_404(StoredProfile.objects.only('id', 'stacks'), pk=pk)
+        response = HttpResponse(profile.stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile_{pk}.collapsed"'
+        return response
+
+
+class ProfileDiffView(APIView):
+    permission_classes = [IsModerator]
+
+    @extend_schema(
+        summary="Сравнение двух профилей",
+        parameters=[
+            OpenApiParameter('base', int, required=True, description="ID исходного профиля"),
+            OpenApiParameter('other', int, required=True, description="ID профиля для сравнения"),
+        ],
+        tags=['Мониторинг'],
+    )
+    def get(self, request):
+        try:
+            ids = int(request.query_params['base']), int(request.query_params['other'])
+        except (KeyError, ValueError):
+            return Response({"detail": "Укажите целые base и other"}, status=status.HTTP_400_BAD_REQUEST)
+        profiles = StoredProfile.objects.in_bulk(ids)
+        if len(profiles) != len(set(ids)):
+            return Response({"detail": "Профиль не найден"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(diff_profiles(profiles[ids[0]], profiles[ids[1]]))
+
+
+class QueryLogView(APIView):
+    """Отпечатки SQL-запросов с задержками и местами вызова (см. monitoring/query_log.py)."""
+    permission_classes = [IsModerator]
+
+    @extend_schema(
+        summary="Журнал SQL-запросов по отпечаткам",
+        parameters=[
+            OpenApiParameter('sort', str, enum=list(query_log.SORT_FIELDS),
+                             description="Сортировка (по умолчанию total — суммарное время)"),
+            OpenApiParameter('limit', int, description="Сколько отпечатков вернуть (по умолчанию 20)"),
+            OpenApiParameter('flush', str, description="1 — сначала сохранить накопленное в памяти процесса"),
+        ],
+        tags=['Мониторинг'],
+    )
+    def get(self, request):
+        sort = request.query_params.get('sort', 'total')
+        if sort not in query_log.SORT_FIELDS:
+            return Response({"detail": f"sort: одно из {', '.join(query_log.SORT_FIELDS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 500)
+        except ValueError:
+            return Response({"detail": "limit должен быть целым числом"}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('flush') == '1':
+            query_log.flush()
+        return Response(query_log.report(sort, limit))
+
+
+class QueryLogDetailView(APIView):
+    permission_classes = [IsModerator]
+
+    @extend_schema(summary="Отпечаток SQL-запроса: гистограмма и планы медленных запросов", tags=['Мониторинг'])
+    def get(self, request, fingerprint_hash: str):
+        return Response(query_log.detail(get_object_or_404(QueryFingerprint, pk=fingerprint_hash)))
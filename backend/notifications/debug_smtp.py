@@ -0,0 +1,85 @@
+# notifications/debug_smtp.py
+"""
+Локальный отладочный SMTP-сервер: принимает письма и печатает их (или
+складывает в server.messages), ничего не доставляя.
+
+Запуск: manage.py run_debug_smtp, затем EMAIL_HOST=127.0.0.1 EMAIL_PORT=1025.
+Поддерживает ровно то, что нужно SMTP-бэкенду Django без TLS и авторизации:
+EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT.
+"""
+import socketserver
+import threading
+
+
+class DebugSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, echo=False, reject=()):
+        self.echo = echo
+        self.reject = set(reject)   # адреса, на которые отвечаем 550
+        self.messages = []          # (mail_from, [rcpt], data)
+        self.connections = 0
+        self._lock = threading.Lock()
+        super().__init__(address, _Handler)
+
+    def store(self, mail_from, rcpt_to, data):
+        with self._lock:
+            self.messages.append((mail_from, rcpt_to, data))
+        if self.echo:
+            print(f"[DEBUG SMTP] {mail_from} → {', '.join(rcpt_to)}\n{data.decode(errors='replace')}\n")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server._lock:
+            server.connections += 1
+        mail_from, rcpt_to = None, []
+        self.reply("220 debug-smtp ready")
+        for raw in self.rfile:
+            command = raw.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self.reply("250-debug-smtp")
+                self.reply("250 8BITMIME")
+            elif verb == 'HELO':
+                self.reply("250 debug-smtp")
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command.partition(':')[2].strip().strip('<>').split('>')[0], []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                address = command.partition(':')[2].strip().strip('<>').split('>')[0]
+                if address in server.reject:
+                    self.reply("550 No such user")
+                else:
+                    rcpt_to.append(address)
+                    self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data_line in self.rfile:
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                server.store(mail_from, rcpt_to, b''.join(lines))
+                mail_from, rcpt_to = None, []
+                self.reply("250 OK")
+            elif verb == 'RSET':
+                mail_from, rcpt_to = None, []
+                self.reply("250 OK")
+            elif verb == 'NOOP':
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def make_server(host='127.0.0.1', port=1025, echo=False, reject=()):
+    return DebugSMTPServer((host, port), echo=echo, reject=reject)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from notifications.debug_smtp import make_server
+
+
+class Command(BaseCommand):
+    help = "Локальный отладочный SMTP-сервер: печатает принятые письма вместо доставки"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--reject', action='append', default=[],
+                            help="Адрес, на который сервер отвечает 550 (можно несколько раз)")
+
+    def handle(self, *args, **options):
+        server = make_server(options['host'], options['port'], echo=True, reject=options['reject'])
+        self.stdout.write(f"[DEBUG SMTP] слушаю {options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,33 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import dispatch_emails
+
+
+class Command(BaseCommand):
+    help = "Фоновая отправка писем из EmailOutbox через постоянное SMTP-соединение"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Пауза между опросами очереди, если она пуста (сек)")
+        parser.add_argument('--once', action='store_true', help="Отправить одну пачку и выйти")
+
+    def handle(self, *args, **options):
+        # одно соединение на весь процесс; при обрыве send_entry переподключается
+        mail_connection = get_connection()
+        try:
+            while True:
+                summary = dispatch_emails(batch_size=options['batch_size'], mail_connection=mail_connection)
+                if summary:
+                    self.stdout.write(f"[EMAIL OUTBOX] обработано: {summary}")
+                if options['once']:
+                    return
+                if not summary:
+                    # простаивающее соединение сервер всё равно закроет — освобождаем сами
+                    mail_connection.close()
+                    time.sleep(options['interval'])
+        finally:
+            mail_connection.close()
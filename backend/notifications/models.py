@@ -0,0 +1,47 @@
+# notifications/models.py
+from django.db import models
+from django.utils import timezone
+
+
+class EmailOutbox(models.Model):
+    """
+    Очередь исходящих писем.
+    Запрос только создаёт запись (enqueue_email); фоновый отправитель
+    (manage.py run_email_sender) доставляет письма пачками через одно SMTP-соединение.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает'),
+        ('sending', 'Отправляется'),
+        ('sent', 'Отправлено'),
+        ('failed', 'Ошибка'),
+    ]
+    KIND_CHOICES = [
+        ('generic', 'Письмо'),
+        ('password_reset', 'Восстановление пароля'),
+        ('survey_invitation', 'Приглашение в опрос'),
+        ('payout_receipt', 'Квитанция о выплате'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES, default='generic')
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=255, blank=True, default='')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'email_outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"EmailOutbox({self.kind} → {self.to_email}) [{self.status}, попыток: {self.attempts}]"
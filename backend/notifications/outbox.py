@@ -0,0 +1,130 @@
+# notifications/outbox.py
+"""
+Очередь исходящих писем.
+
+- enqueue_email() вызывается из запроса (или его транзакции) и только создаёт запись;
+- dispatch_emails() забирает пачку готовых писем (SKIP LOCKED там, где поддерживается)
+  и отправляет их через одно SMTP-соединение. Временные ошибки повторяются с
+  backoff, постоянные (5xx, отказ получателя) сразу переводят письмо в `failed`.
+
+Новые типы уведомлений добавляются значением EmailOutbox.kind и вызовом enqueue_email().
+"""
+import random
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(to_email, subject, body, kind='generic', html_body='', from_email=None):
+    """Ставит письмо в очередь. Отправка — фоновым run_email_sender."""
+    return EmailOutbox.objects.create(
+        kind=kind, to_email=to_email, subject=subject, body=body, html_body=html_body,
+        from_email=from_email or '',
+    )
+
+
+def backoff_delay(attempts):
+    """Экспоненциальная задержка с небольшим джиттером: base * 2^(n-1), не больше max."""
+    base = _setting('EMAIL_OUTBOX_BACKOFF_SECONDS', 30)
+    cap = _setting('EMAIL_OUTBOX_BACKOFF_MAX_SECONDS', 3600)
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def claim_batch(batch_size, now=None):
+    """
+    Атомарно помечает до batch_size готовых писем как `sending` и возвращает их id.
+    Зависшие в `sending` дольше EMAIL_OUTBOX_LOCK_TIMEOUT_SECONDS забираются повторно.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=_setting('EMAIL_OUTBOX_LOCK_TIMEOUT_SECONDS', 300))
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .filter(
+                Q(status='pending', next_attempt_at__lte=now) |
+                Q(status='sending', locked_at__lt=stale)
+            )
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            EmailOutbox.objects.filter(id__in=ids).update(status='sending', locked_at=now)
+    return ids
+
+
+def build_message(entry, mail_connection=None):
+    message = EmailMultiAlternatives(
+        subject=entry.subject, body=entry.body,
+        from_email=entry.from_email or _setting('DEFAULT_FROM_EMAIL', None),
+        to=[entry.to_email], connection=mail_connection,
+    )
+    if entry.html_body:
+        message.attach_alternative(entry.html_body, 'text/html')
+    return message
+
+
+def is_permanent(error):
+    """Ошибка, которую бессмысленно повторять: отказ адресата/отправителя или код 5xx."""
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def send_entry(entry, mail_connection):
+    """Отправляет одно письмо через уже открытое соединение. Возвращает новый статус."""
+    entry.attempts += 1
+    try:
+        # open() не переоткрывает живое соединение; после ошибки — подключается заново
+        mail_connection.open()
+        mail_connection.send_messages([build_message(entry, mail_connection)])
+        entry.status = 'sent'
+        entry.sent_at = timezone.now()
+        entry.last_error = None
+    except Exception as e:
+        entry.last_error = str(e)
+        if not is_permanent(e):
+            # соединение могло оборваться — следующее письмо откроет новое
+            mail_connection.close()
+        if not is_permanent(e) and entry.attempts < _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 6):
+            entry.status = 'pending'
+            entry.next_attempt_at = timezone.now() + backoff_delay(entry.attempts)
+        else:
+            entry.status = 'failed'
+    entry.locked_at = None
+    entry.save(update_fields=['status', 'attempts', 'next_attempt_at', 'locked_at', 'last_error', 'sent_at'])
+    return entry.status
+
+
+def dispatch_emails(batch_size=100, mail_connection=None, now=None):
+    """
+    Отправляет одну пачку писем. Возвращает словарь {статус: количество}.
+    mail_connection — постоянное соединение отправителя; без него открывается
+    соединение на одну пачку.
+    """
+    ids = claim_batch(batch_size, now=now)
+    if not ids:
+        return {}
+    own_connection = mail_connection is None
+    mail_connection = mail_connection or get_connection()
+    summary = {}
+    try:
+        for entry in EmailOutbox.objects.filter(id__in=ids).order_by('id'):
+            result = send_entry(entry, mail_connection)
+            summary[result] = summary.get(result, 0) + 1
+    finally:
+        if own_connection:
+            mail_connection.close()
+    return summary
@@ -0,0 +1,61 @@
+# notifications/tests.py
+import threading
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from notifications.debug_smtp import make_server
+from notifications.models import EmailOutbox
+from notifications.outbox import enqueue_email, dispatch_emails
+
+
+class EmailOutboxTestCase(TestCase):
+    """📧 Очередь писем: пачка через одно SMTP-соединение, отказы и повторы"""
+
+    def setUp(self):
+        self.server = make_server('127.0.0.1', 0, reject=['missing@example.com'])
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        overrides = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=self.server.server_address[1],
+            EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='', EMAIL_USE_TLS=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_batch_over_single_connection(self):
+        """✅ Пачка уходит через одно соединение, отказ адресата — сразу failed"""
+        for i in range(3):
+            enqueue_email(f'user{i}@example.com', 'Тема', f'Письмо {i}', html_body=f'<p>{i}</p>')
+        enqueue_email('missing@example.com', 'Тема', 'Не дойдёт', kind='payout_receipt')
+
+        summary = dispatch_emails(batch_size=10)
+
+        self.assertEqual(summary, {'sent': 3, 'failed': 1})
+        self.assertEqual(self.server.connections, 1, "[Ошибка] Соединение открывалось несколько раз")
+        self.assertEqual(sorted(rcpt[0] for _, rcpt, _ in self.server.messages),
+                         ['user0@example.com', 'user1@example.com', 'user2@example.com'])
+        failed = EmailOutbox.objects.get(to_email='missing@example.com')
+        self.assertEqual((failed.status, failed.attempts), ('failed', 1))
+        self.assertFalse(EmailOutbox.objects.filter(status__in=['pending', 'sending']).exists())
+
+        # повторный запуск ничего не отправляет
+        self.assertEqual(dispatch_emails(), {})
+
+    def test_unreachable_server_retries_with_backoff(self):
+        """✅ Недоступный SMTP — письмо остаётся pending с отложенной попыткой"""
+        entry = enqueue_email('user@example.com', 'Тема', 'Текст', kind='password_reset')
+        with override_settings(EMAIL_PORT=1, EMAIL_TIMEOUT=1):
+            self.assertEqual(dispatch_emails(), {'pending': 1})
+        entry.refresh_from_db()
+        self.assertEqual(entry.attempts, 1)
+        self.assertGreater(entry.next_attempt_at, timezone.now())
+        self.assertTrue(entry.last_error)
+
+        # попытка ещё не наступила
+        self.assertEqual(dispatch_emails(), {})
+        self.assertEqual(dispatch_emails(now=entry.next_attempt_at), {'sent': 1})
+        self.assertEqual(len(self.server.messages), 1)
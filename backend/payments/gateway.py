@@ -0,0 +1,338 @@
+# payments/gateway.py
+"""
+Асинхронная интеграция с платёжным шлюзом.
+
+1. TopUpView / WithdrawView создают PaymentTransaction в статусе `pending`
+   и через submit_to_gateway() отправляют запрос шлюзу в фоновом потоке
+   (после коммита транзакции БД) — HTTP-ответ клиенту не ждёт шлюз.
+2. Шлюз присылает результат на webhook (GatewayWebhookView): уведомление
+   проверяется по HMAC-подписи и только сохраняется (GatewayNotification),
+   повторные доставки отбрасываются по event_id.
+3. apply_notifications() пачками применяет сохранённые уведомления к транзакциям
+   и кошелькам. Дубликаты и опоздавшие (out-of-order) уведомления по уже
+   завершённой транзакции помечаются `ignored`.
+4. Попытки отправки записываются в транзакцию (submit_attempts, submitted_at,
+   next_submit_at). resubmit_stale() (задача housekeeping resubmit_gateway_requests)
+   повторяет отправку `pending`-транзакций без результата — в том числе потерянных
+   при перезапуске процесса; шлюз дедуплицирует запросы по transaction_id.
+   После PAYMENT_GATEWAY_SUBMIT_MAX_ATTEMPTS попыток транзакция становится `failed`,
+   удержанная при выводе сумма возвращается на кошелёк.
+"""
+import hashlib
+import hmac
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import PaymentTransaction, Wallet, GatewayNotification
+
+SIGNATURE_HEADER = 'X-Gateway-Signature'
+TERMINAL_EVENTS = ('succeeded', 'failed')
+DEFAULT_APPLY_BATCH_SIZE = 500
+
+_executor = None
+
+
+def _setting(name, default=None):
+    return getattr(settings, name, default)
+
+
+# -----------------------------
+# Подпись
+# -----------------------------
+def sign(body: bytes, secret=None) -> str:
+    secret = secret or _setting('PAYMENT_GATEWAY_SECRET', '')
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body: bytes, signature: str, secret=None) -> bool:
+    if not signature:
+        return False
+    return hmac.compare_digest(sign(body, secret), signature)
+
+
+# -----------------------------
+# Отправка запроса в шлюз
+# -----------------------------
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_setting('PAYMENT_GATEWAY_SUBMIT_WORKERS', 4),
+            thread_name_prefix='payment-gateway',
+        )
+    return _executor
+
+
+def build_request(tx, extra=None):
+    payload = {
+        'transaction_id': tx.transaction_id,
+        'type': tx.type,
+        'amount': str(tx.amount),
+        'currency': tx.currency,
+        'callback_url': _setting('PAYMENT_GATEWAY_CALLBACK_URL'),
+    }
+    if extra:
+        payload.update(extra)
+    return payload
+
+
+def send_request(payload):
+    """Синхронная отправка запроса в шлюз. True — шлюз принял запрос."""
+    url = _setting('PAYMENT_GATEWAY_URL')
+    body = json.dumps(payload).encode()
+    try:
+        resp = requests.post(
+            url, data=body, timeout=_setting('PAYMENT_GATEWAY_TIMEOUT_SECONDS', 10),
+            headers={'Content-Type': 'application/json', SIGNATURE_HEADER: sign(body)},
+        )
+        resp.raise_for_status()
+    except Exception as e:
+        # транзакция остаётся pending — её повторно отправит resubmit_stale()
+        print(f"[GATEWAY ❌] Не удалось отправить транзакцию {payload.get('transaction_id')}: {e}")
+        return False
+    return True
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей отправкой после неудачной попытки: base * 2^(n-1), не больше таймаута результата."""
+    base = _setting('PAYMENT_GATEWAY_RESUBMIT_AFTER_SECONDS', 300)
+    cap = _setting('PAYMENT_GATEWAY_RESULT_TIMEOUT_SECONDS', 3600)
+    return timedelta(seconds=min(cap, base * (2 ** max(attempts - 1, 0))))
+
+
+def deliver(tx_id, payload, attempt, now=None):
+    """
+    Отправляет запрос и записывает попытку в транзакцию. Принятый запрос повторяется,
+    если результат не пришёл за PAYMENT_GATEWAY_RESULT_TIMEOUT_SECONDS; неудачный — с backoff.
+    """
+    accepted = send_request(payload)
+    now = now or timezone.now()
+    fields = {'submit_attempts': attempt}
+    if accepted:
+        fields['submitted_at'] = now
+        fields['next_submit_at'] = now + timedelta(seconds=_setting('PAYMENT_GATEWAY_RESULT_TIMEOUT_SECONDS', 3600))
+    else:
+        fields['next_submit_at'] = now + retry_delay(attempt)
+    # результат мог прийти раньше, чем записана попытка, — завершённую транзакцию не трогаем
+    PaymentTransaction.objects.filter(pk=tx_id, status='pending').update(**fields)
+    return accepted
+
+
+def _deliver_in_thread(tx_id, payload):
+    try:
+        deliver(tx_id, payload, attempt=1)
+    finally:
+        connection.close()
+
+
+def submit_to_gateway(tx, extra=None):
+    """
+    Ставит отправку запроса в шлюз в фон после коммита текущей транзакции БД.
+    Если отправка не состоится (ошибка, перезапуск процесса), запрос повторит resubmit_stale().
+    """
+    if not _setting('PAYMENT_GATEWAY_URL'):
+        return
+    payload = build_request(tx, extra)
+    transaction.on_commit(lambda: _get_executor().submit(_deliver_in_thread, tx.transaction_id, payload))
+
+
+# -----------------------------
+# Повторная отправка
+# -----------------------------
+def _request_extra(tx):
+    """Поля исходного запроса, сохранённые TopUpView / WithdrawView в gateway_data."""
+    data = tx.gateway_data or {}
+    if tx.type == 'withdraw':
+        return {'destination': data.get('destination')}
+    return data.get('request')
+
+
+def stale_transactions(now=None):
+    """
+    `pending` пополнения и выводы, которым пора повторить отправку: срок next_submit_at
+    наступил, а если попыток ещё не записано — прошло PAYMENT_GATEWAY_RESUBMIT_AFTER_SECONDS
+    с создания (фоновая отправка не состоялась).
+    """
+    now = now or timezone.now()
+    never_sent = now - timedelta(seconds=_setting('PAYMENT_GATEWAY_RESUBMIT_AFTER_SECONDS', 300))
+    return PaymentTransaction.objects.filter(
+        Q(next_submit_at__lte=now) | Q(next_submit_at__isnull=True, created_at__lt=never_sent),
+        status='pending', type__in=('topup', 'withdraw'),
+    )
+
+
+def _give_up(txs, now):
+    """Транзакции без результата после всех попыток → failed; удержание вывода возвращается."""
+    wallet_deltas = defaultdict(Decimal)
+    for tx in txs:
+        tx.status = 'failed'
+        tx.processed_at = now
+        tx.gateway_data = {**(tx.gateway_data or {}),
+                           'submit': f"Нет результата от шлюза после {tx.submit_attempts} попыток"}
+        if tx.type == 'withdraw':
+            wallet_deltas[tx.user_id] += tx.amount
+    _credit_wallets(wallet_deltas)
+    PaymentTransaction.objects.bulk_update(txs, ['status', 'processed_at', 'gateway_data'])
+
+
+def resubmit_stale(batch_size=100, now=None):
+    """
+    Повторно отправляет одну пачку зависших транзакций (последовательно, в текущем потоке).
+    Возвращает словарь {'resubmitted': n, 'accepted': n, 'failed': n}.
+    """
+    if not _setting('PAYMENT_GATEWAY_URL'):
+        return {}
+    now = now or timezone.now()
+    max_attempts = _setting('PAYMENT_GATEWAY_SUBMIT_MAX_ATTEMPTS', 8)
+    with transaction.atomic():
+        txs = list(
+            stale_transactions(now)
+            .select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .order_by('transaction_id')[:batch_size]
+        )
+        if not txs:
+            return {}
+        expired = [tx for tx in txs if tx.submit_attempts >= max_attempts]
+        retry = [tx for tx in txs if tx.submit_attempts < max_attempts]
+        # пока идёт отправка, другие запуски эти транзакции не берут
+        PaymentTransaction.objects.filter(pk__in=[tx.pk for tx in retry]).update(
+            next_submit_at=now + timedelta(seconds=_setting('PAYMENT_GATEWAY_TIMEOUT_SECONDS', 10) * len(retry))
+        )
+        _give_up(expired, now)
+
+    accepted = sum(
+        deliver(tx.pk, build_request(tx, _request_extra(tx)), attempt=tx.submit_attempts + 1, now=now)
+        for tx in retry
+    )
+    return {'resubmitted': len(retry), 'accepted': accepted, 'failed': len(expired)}
+
+
+# -----------------------------
+# Приём уведомлений
+# -----------------------------
+def record_notification(data, payload=None):
+    """
+    Сохраняет уведомление шлюза. Возвращает (notification, created);
+    created=False — повторная доставка того же event_id.
+    """
+    return GatewayNotification.objects.get_or_create(
+        event_id=data['event_id'],
+        defaults={
+            'transaction_id': data['transaction_id'],
+            'event': data['event'],
+            'amount': data.get('amount'),
+            'currency': data.get('currency'),
+            'occurred_at': data.get('occurred_at'),
+            'payload': payload,
+        },
+    )
+
+
+# -----------------------------
+# Применение уведомлений
+# -----------------------------
+def _ordering_key(note):
+    return (note.occurred_at or note.received_at, note.id)
+
+
+def _resolve(tx, notes, now):
+    """
+    Решает судьбу транзакции по её уведомлениям в пачке.
+    Возвращает изменение кошелька (Decimal) и размечает уведомления.
+    """
+    delta = Decimal('0.00')
+    terminal = None
+    for note in sorted(notes, key=_ordering_key):
+        note.applied_at = now
+        if tx.status != 'pending':
+            note.status, note.note = 'ignored', f"Транзакция уже в статусе {tx.status}"
+        elif note.event not in TERMINAL_EVENTS:
+            note.status, note.note = 'ignored', "Промежуточный статус"
+        elif note.amount is not None and note.amount != tx.amount:
+            note.status, note.note = 'ignored', f"Сумма не совпадает: {note.amount} != {tx.amount}"
+        elif terminal is not None:
+            note.status, note.note = 'ignored', f"Транзакция уже завершена уведомлением {terminal.event_id}"
+        else:
+            terminal = note
+            note.status = 'applied'
+
+    if terminal is None:
+        return delta
+
+    succeeded = terminal.event == 'succeeded'
+    if tx.type == 'topup' and succeeded:
+        delta = tx.amount
+    elif tx.type == 'withdraw' and not succeeded:
+        # возвращаем удержанные при запросе средства
+        delta = tx.amount
+
+    tx.status = 'success' if succeeded else 'failed'
+    tx.processed_at = now
+    tx.gateway_data = {**(tx.gateway_data or {}), 'notification': terminal.payload or {'event_id': terminal.event_id}}
+    return delta
+
+
+def _credit_wallets(wallet_deltas):
+    """Зачисляет суммы {user_id: delta} — один UPDATE на кошелёк, недостающие кошельки создаются."""
+    if not wallet_deltas:
+        return
+    existing = set(Wallet.objects.filter(user_id__in=wallet_deltas).values_list('user_id', flat=True))
+    Wallet.objects.bulk_create([Wallet(user_id=u) for u in wallet_deltas if u not in existing])
+    for user_id, delta in wallet_deltas.items():
+        Wallet.objects.filter(user_id=user_id).update(balance=F('balance') + delta)
+
+
+def apply_notifications(batch_size=DEFAULT_APPLY_BATCH_SIZE):
+    """
+    Применяет одну пачку полученных уведомлений. Изменения кошельков
+    суммируются по пользователю и записываются одним UPDATE на кошелёк.
+    Возвращает словарь {статус уведомления: количество}.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        notes = list(
+            GatewayNotification.objects
+            .select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .filter(status='received')
+            .order_by('id')[:batch_size]
+        )
+        if not notes:
+            return {}
+
+        by_tx = defaultdict(list)
+        for note in notes:
+            by_tx[note.transaction_id].append(note)
+
+        txs = PaymentTransaction.objects.select_for_update().in_bulk(list(by_tx))
+        changed_txs = []
+        wallet_deltas = defaultdict(Decimal)
+        for tx_id, tx_notes in by_tx.items():
+            tx = txs.get(tx_id)
+            if tx is None or tx.type not in ('topup', 'withdraw'):
+                for note in tx_notes:
+                    note.status, note.note, note.applied_at = 'ignored', "Неизвестная транзакция", now
+                continue
+            was_pending = tx.status == 'pending'
+            delta = _resolve(tx, tx_notes, now)
+            if was_pending and tx.status != 'pending':
+                changed_txs.append(tx)
+            if delta:
+                wallet_deltas[tx.user_id] += delta
+
+        _credit_wallets(wallet_deltas)
+        PaymentTransaction.objects.bulk_update(changed_txs, ['status', 'processed_at', 'gateway_data'])
+        GatewayNotification.objects.bulk_update(notes, ['status', 'note', 'applied_at'])
+
+    summary = {}
+    for note in notes:
+        summary[note.status] = summary.get(note.status, 0) + 1
+    return summary
@@ -0,0 +1,123 @@
+# payments/gateway_stub.py
+"""
+Локальная заглушка платёжного шлюза для разработки и тестов.
+
+Принимает запросы в формате gateway.build_request() и через случайную задержку
+присылает подписанные уведомления на callback_url. Имитирует поведение реального
+шлюза: задержки, повторные доставки (дубликаты), промежуточный статус
+`processing`, который может прийти позже итогового, и отказы.
+
+Запуск отдельным процессом: manage.py run_gateway_stub.
+"""
+import json
+import random
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.utils import timezone
+
+from .gateway import SIGNATURE_HEADER, sign, verify_signature
+
+
+class StubGateway:
+    def __init__(self, secret, callback_url=None, fail_rate=0.0, duplicate_rate=0.2,
+                 processing_rate=0.5, min_delay=0.05, max_delay=2.0, seed=None, deliver=None):
+        self.secret = secret
+        self.callback_url = callback_url
+        self.fail_rate = fail_rate
+        self.duplicate_rate = duplicate_rate
+        self.processing_rate = processing_rate
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.random = random.Random(seed)
+        self._deliver = deliver
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        return self.random.uniform(self.min_delay, self.max_delay)
+
+    def _event(self, request, event):
+        return {
+            'event_id': uuid.UUID(int=self.random.getrandbits(128)).hex,
+            'transaction_id': request['transaction_id'],
+            'event': event,
+            'amount': request.get('amount'),
+            'currency': request.get('currency'),
+            'occurred_at': timezone.now().isoformat(),
+            'callback_url': request.get('callback_url') or self.callback_url,
+        }
+
+    def plan(self, request):
+        """Список (задержка, уведомление) для одного запроса. Порядок задержек случайный."""
+        with self._lock:
+            events = []
+            if self.random.random() < self.processing_rate:
+                # может прийти и до, и после итогового статуса
+                events.append((self._delay(), self._event(request, 'processing')))
+            outcome = 'failed' if self.random.random() < self.fail_rate else 'succeeded'
+            final = self._event(request, outcome)
+            final_delay = self._delay()
+            events.append((final_delay, final))
+            if self.random.random() < self.duplicate_rate:
+                events.append((final_delay + self._delay(), dict(final)))
+            return events
+
+    def deliver(self, event):
+        event = dict(event)
+        callback_url = event.pop('callback_url', None)
+        body = json.dumps(event).encode()
+        signature = sign(body, self.secret)
+        if self._deliver is not None:
+            return self._deliver(body, signature)
+        try:
+            requests.post(callback_url, data=body, timeout=10,
+                          headers={'Content-Type': 'application/json', SIGNATURE_HEADER: signature})
+        except Exception as e:
+            print(f"[GATEWAY STUB ❌] Не удалось доставить {event['event_id']}: {e}")
+
+    def schedule(self, request):
+        """Асинхронная доставка уведомлений по таймерам (режим отдельного процесса)."""
+        for delay, event in self.plan(request):
+            timer = threading.Timer(delay, self.deliver, args=(event,))
+            timer.daemon = True
+            timer.start()
+
+    def deliver_all(self, requests_):
+        """
+        Синхронная доставка уведомлений по нескольким запросам в порядке
+        их «времени прихода» — детерминированная имитация для тестов.
+        """
+        events = [item for request in requests_ for item in self.plan(request)]
+        events.sort(key=lambda item: item[0])
+        return [self.deliver(event) for _, event in events]
+
+
+def make_server(gateway, host='127.0.0.1', port=8765):
+    """HTTP-сервер заглушки: POST с подписанным запросом → 202 и отложенные уведомления."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if not verify_signature(body, self.headers.get(SIGNATURE_HEADER), gateway.secret):
+                self.send_response(403)
+                self.end_headers()
+                return
+            try:
+                request = json.loads(body)
+                request['transaction_id']
+            except (ValueError, KeyError):
+                self.send_response(400)
+                self.end_headers()
+                return
+            gateway.schedule(request)
+            self.send_response(202)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'accepted': True}).encode())
+
+        def log_message(self, fmt, *args):
+            print(f"[GATEWAY STUB] {fmt % args}")
+
+    return ThreadingHTTPServer((host, port), Handler)
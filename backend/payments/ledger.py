@@ -0,0 +1,107 @@
+# payments/ledger.py
+"""
+Правила влияния транзакций (PaymentTransaction) на балансы счетов.
+
+Каждая транзакция может затрагивать два счёта:
+- кошелёк пользователя `tx.user` (Wallet);
+- счёт опроса `tx.related_survey_id` (SurveyAccount).
+
+Знаки соответствуют тому, как views двигают деньги:
+- topup без опроса      — пополнение кошелька (TopUpView): wallet +
+- topup с опросом       — перевод кошелёк → счёт опроса (TopUpSurveyView): wallet −, survey +
+- commission            — комиссия платформы при пополнении опроса: wallet −
+- withdraw              — вывод средств: wallet −
+- payout                — выплата респонденту со счёта опроса: survey −, wallet респондента +
+- refund                — возврат остатка со счёта опроса заказчику: survey −, wallet +
+
+Вывод средств списывается с кошелька (hold) сразу при создании запроса, поэтому
+withdraw в статусе `pending` тоже учитывается; при отказе шлюза hold возвращается,
+а транзакция становится `failed`.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Q
+
+# Статусы, которые учитываются в балансе
+LEDGER_STATUSES = ('success',)
+# Типы, которые двигают баланс уже в статусе pending
+HELD_TYPES = ('withdraw',)
+
+# Коды типов для векторизованного расчёта
+TYPE_CODES = {
+    'topup': 0,
+    'withdraw': 1,
+    'payout': 2,
+    'commission': 3,
+    'refund': 4,
+}
+UNKNOWN_TYPE = -1
+
+
+def ledger_filter() -> Q:
+    """Условие отбора транзакций, влияющих на балансы."""
+    return Q(status__in=LEDGER_STATUSES) | Q(status='pending', type__in=HELD_TYPES)
+
+
+def wallet_sign(tx_type: str, has_survey: bool) -> int:
+    """Знак влияния транзакции на кошелёк пользователя (+1, -1 или 0)."""
+    if tx_type == 'topup':
+        return -1 if has_survey else 1
+    if tx_type in ('commission', 'withdraw'):
+        return -1
+    if tx_type in ('payout', 'refund'):
+        return 1
+    return 0
+
+
+def survey_sign(tx_type: str, has_survey: bool) -> int:
+    """Знак влияния транзакции на счёт опроса (+1, -1 или 0)."""
+    if not has_survey:
+        return 0
+    if tx_type == 'topup':
+        return 1
+    if tx_type in ('payout', 'refund'):
+        return -1
+    return 0
+
+
+def wallet_delta(tx_type: str, amount: Decimal, has_survey: bool) -> Decimal:
+    return Decimal(amount) * wallet_sign(tx_type, has_survey)
+
+
+def to_cents(amounts) -> np.ndarray:
+    """Decimal-суммы → int64 в копейках (без потерь точности float)."""
+    return np.fromiter((int(a.scaleb(2)) for a in amounts), dtype=np.int64, count=len(amounts))
+
+
+def type_codes(types) -> np.ndarray:
+    return np.fromiter((TYPE_CODES.get(t, UNKNOWN_TYPE) for t in types), dtype=np.int8, count=len(types))
+
+
+def wallet_deltas(codes: np.ndarray, has_survey: np.ndarray, cents: np.ndarray) -> np.ndarray:
+    """Векторизованный аналог wallet_delta для чанка транзакций."""
+    sign = np.select(
+        [
+            (codes == TYPE_CODES['topup']) & ~has_survey,
+            (codes == TYPE_CODES['topup']) & has_survey,
+            np.isin(codes, (TYPE_CODES['commission'], TYPE_CODES['withdraw'])),
+            np.isin(codes, (TYPE_CODES['payout'], TYPE_CODES['refund'])),
+        ],
+        [1, -1, -1, 1],
+        default=0,
+    )
+    return sign.astype(np.int64) * cents
+
+
+def survey_deltas(codes: np.ndarray, has_survey: np.ndarray, cents: np.ndarray) -> np.ndarray:
+    """Векторизованный аналог survey_sign * amount для чанка транзакций."""
+    sign = np.select(
+        [
+            (codes == TYPE_CODES['topup']) & has_survey,
+            np.isin(codes, (TYPE_CODES['payout'], TYPE_CODES['refund'])) & has_survey,
+        ],
+        [1, -1],
+        default=0,
+    )
+    return sign.astype(np.int64) * cents
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.gateway import apply_notifications, DEFAULT_APPLY_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Пакетное применение уведомлений платёжного шлюза к транзакциям и кошелькам"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_APPLY_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help="Пауза между опросами очереди, если она пуста (сек)")
+        parser.add_argument('--once', action='store_true', help="Обработать одну пачку и выйти")
+
+    def handle(self, *args, **options):
+        while True:
+            summary = apply_notifications(batch_size=options['batch_size'])
+            if summary:
+                self.stdout.write(f"[GATEWAY] уведомления: {summary}")
+            if options['once']:
+                return
+            if not summary:
+                time.sleep(options['interval'])
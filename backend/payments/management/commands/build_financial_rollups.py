@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from payments.rollups import build_rollups, get_watermark
+
+
+class Command(BaseCommand):
+    help = "Инкрементально досчитывает дневные агрегаты финансовых операций (DailyFinancialRollup)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', default=None,
+                            help="Досчитать по указанный день включительно (YYYY-MM-DD). "
+                                 "По умолчанию — последний закрытый день")
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            until = parse_date(options['until'])
+            if until is None:
+                raise CommandError("--until должен быть в формате YYYY-MM-DD")
+        written = build_rollups(until=until)
+        self.stdout.write(self.style.SUCCESS(
+            f"[ROLLUP] записано строк: {written}, watermark: {get_watermark() or '—'}"
+        ))
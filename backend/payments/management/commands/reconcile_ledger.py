@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from payments.reconciliation import run_reconciliation, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Сверка балансов кошельков и счетов опросов с журналом PaymentTransaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Размер чанка при потоковом чтении транзакций")
+        parser.add_argument('--output', default=None,
+                            help="Путь к CSV-файлу для отчёта о расхождениях")
+
+    def handle(self, *args, **options):
+        run = run_reconciliation(chunk_size=options['chunk_size'], output_path=options['output'])
+        duration = (run.finished_at - run.started_at).total_seconds()
+        self.stdout.write(
+            f"[RECONCILE] run={run.id} транзакций={run.transactions_scanned} "
+            f"счетов={run.accounts_checked} расхождений={run.discrepancies_count} "
+            f"сумма расхождений={run.total_difference} ({duration:.1f} c)"
+        )
+        if run.discrepancies_count:
+            self.stdout.write(self.style.WARNING("[RECONCILE] ⚠️ Найдены расхождения балансов"))
+        else:
+            self.stdout.write(self.style.SUCCESS("[RECONCILE] ✅ Балансы совпадают с журналом"))
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.gateway_stub import StubGateway, make_server
+
+
+class Command(BaseCommand):
+    help = "Локальная заглушка платёжного шлюза (задержки, дубликаты, уведомления не по порядку)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--fail-rate', type=float, default=0.1, help="Доля отклонённых операций")
+        parser.add_argument('--duplicate-rate', type=float, default=0.3, help="Доля повторных доставок")
+        parser.add_argument('--min-delay', type=float, default=0.2)
+        parser.add_argument('--max-delay', type=float, default=3.0)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        gateway = StubGateway(
+            secret=settings.PAYMENT_GATEWAY_SECRET,
+            callback_url=settings.PAYMENT_GATEWAY_CALLBACK_URL,
+            fail_rate=options['fail_rate'],
+            duplicate_rate=options['duplicate_rate'],
+            min_delay=options['min_delay'],
+            max_delay=options['max_delay'],
+            seed=options['seed'],
+        )
+        server = make_server(gateway, options['host'], options['port'])
+        self.stdout.write(f"[GATEWAY STUB] слушаю http://{options['host']}:{options['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.outbox import dispatch_payouts
+
+
+class Command(BaseCommand):
+    help = "Фоновый диспетчер автоматических выплат (PayoutOutbox)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help="Максимальное число одновременно выполняемых выплат")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Пауза между опросами очереди, если она пуста (сек)")
+        parser.add_argument('--once', action='store_true', help="Обработать одну пачку и выйти")
+
+    def handle(self, *args, **options):
+        while True:
+            summary = dispatch_payouts(batch_size=options['batch_size'], concurrency=options['concurrency'])
+            if summary:
+                self.stdout.write(f"[PAYOUT OUTBOX] обработано: {summary}")
+            if options['once']:
+                return
+            if not summary:
+                time.sleep(options['interval'])
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:44
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_wallet_paymenttransaction'),
+        ('surveys', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingTier',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('min_questions', models.PositiveIntegerField()),
+                ('max_questions', models.PositiveIntegerField(blank=True, null=True)),
+                ('price_per_survey', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+            options={
+                'db_table': 'payment_pricing_tier',
+                'ordering': ['min_questions'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('running', 'Выполняется'), ('completed', 'Завершена'), ('failed', 'Ошибка')], default='running', max_length=20)),
+                ('transactions_scanned', models.BigIntegerField(default=0)),
+                ('accounts_checked', models.IntegerField(default=0)),
+                ('discrepancies_count', models.IntegerField(default=0)),
+                ('total_difference', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('error', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'payment_reconciliation_run',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SurveyAccount',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('currency', models.CharField(default='RUB', max_length=10)),
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='account', to='surveys.surveys')),
+            ],
+            options={
+                'db_table': 'survey_account',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationDiscrepancy',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('account_type', models.CharField(choices=[('wallet', 'Кошелёк пользователя'), ('survey', 'Счёт опроса')], max_length=20)),
+                ('account_ref', models.IntegerField(help_text='user_id для кошелька или survey_id для счёта опроса')),
+                ('stored_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('ledger_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('difference', models.DecimalField(decimal_places=2, help_text='stored_balance - ledger_balance', max_digits=14)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discrepancies', to='payments.reconciliationrun')),
+            ],
+            options={
+                'db_table': 'payment_reconciliation_discrepancy',
+                'indexes': [models.Index(fields=['run', 'account_type'], name='payment_rec_run_id_1e32b2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:46
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_pricingtier_reconciliationrun_surveyaccount_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFinancialRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('type', models.CharField(choices=[('topup', 'Пополнение'), ('withdraw', 'Вывод'), ('payout', 'Выплата респонденту'), ('commission', 'Комиссия платформы'), ('refund', 'Возврат')], max_length=30)),
+                ('currency', models.CharField(default='RUB', max_length=10)),
+                ('related_survey_id', models.IntegerField(blank=True, null=True)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('tx_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'payment_daily_rollup',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('last_day', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'payment_rollup_watermark',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(fields=['status', 'processed_at'], name='payment_tra_status_7a5cb4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyfinancialrollup',
+            index=models.Index(fields=['related_survey_id', 'day'], name='payment_dai_related_3f2e37_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyfinancialrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'type', 'currency', 'related_survey_id'), name='uniq_payment_daily_rollup_key'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_payoutoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GatewayNotification',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_id', models.CharField(max_length=100, unique=True)),
+                ('transaction_id', models.IntegerField(db_index=True)),
+                ('event', models.CharField(choices=[('processing', 'В обработке'), ('succeeded', 'Успешно'), ('failed', 'Ошибка')], max_length=20)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('currency', models.CharField(blank=True, max_length=10, null=True)),
+                ('occurred_at', models.DateTimeField(blank=True, null=True)),
+                ('payload', models.JSONField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('received', 'Получено'), ('applied', 'Применено'), ('ignored', 'Пропущено')], default='received', max_length=20)),
+                ('note', models.TextField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'payment_gateway_notification',
+                'indexes': [models.Index(fields=['status', 'id'], name='payment_gat_status_25c9f2_idx')],
+            },
+        ),
+    ]
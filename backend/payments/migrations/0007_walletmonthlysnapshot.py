@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:54
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_gatewaynotification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletMonthlySnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('month', models.DateField(help_text='Первый день месяца')),
+                ('opening_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('closing_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('credit_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('debit_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('entries_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'payment_wallet_monthly_snapshot',
+                'constraints': [models.UniqueConstraint(fields=('user', 'month'), name='uniq_wallet_snapshot_user_month')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_walletmonthlysnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(condition=models.Q(('status', 'success'), ('type', 'payout')), fields=['related_survey_id', 'related_respondent_id'], name='tx_success_payout_idx'),
+        ),
+    ]
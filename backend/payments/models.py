@@ -148,12 +148,21 @@ class PaymentTransaction(models.Model):
     related_respondent_id = models.IntegerField(null=True, blank=True)
     gateway_data = models.JSONField(null=True, blank=True)
     processed_at = models.DateTimeField(null=True, blank=True)
+    # отправка в платёжный шлюз (payments/gateway.py): число попыток, последняя принятая, следующая проверка
+    submit_attempts = models.PositiveIntegerField(default=0)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    next_submit_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'payment_transactions'
         indexes = [
             models.Index(fields=['user', 'type']),
             models.Index(fields=['related_survey_id', 'related_respondent_id']),
+            models.Index(fields=['status', 'processed_at']),
+            models.Index(fields=['status', 'next_submit_at']),
+            # проверка двойной выплаты (payout_exists, save) — только успешные выплаты
+            models.Index(fields=['related_survey_id', 'related_respondent_id'],
+                         condition=models.Q(type='payout', status='success'), name='tx_success_payout_idx'),
         ]
 
     def mark_success(self, gateway_data=None):
@@ -280,4 +289,200 @@ def create_default_pricing(sender, **kwargs):
             defaults={"price_per_survey": d['price_per_survey']}
         )
         if created:
-            print(f"[INIT] Добавлен тариф: {obj.min_questions} - {obj.max_questions or '∞'} => {obj.price_per_survey}")
\ No newline at end of file
+            print(f"[INIT] Добавлен тариф: {obj.min_questions} - {obj.max_questions or '∞'} => {obj.price_per_survey}")
+
+class ReconciliationRun(models.Model):
+    """
+    Запуск сверки балансов (Wallet / SurveyAccount) с журналом PaymentTransaction.
+    Сами расхождения хранятся в ReconciliationDiscrepancy.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Выполняется'),
+        ('completed', 'Завершена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    transactions_scanned = models.BigIntegerField(default=0)
+    accounts_checked = models.IntegerField(default=0)
+    discrepancies_count = models.IntegerField(default=0)
+    total_difference = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'payment_reconciliation_run'
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Reconciliation {self.id} [{self.status}]: {self.discrepancies_count} расхождений"
+
+
+class ReconciliationDiscrepancy(models.Model):
+    ACCOUNT_CHOICES = [
+        ('wallet', 'Кошелёк пользователя'),
+        ('survey', 'Счёт опроса'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='discrepancies')
+    account_type = models.CharField(max_length=20, choices=ACCOUNT_CHOICES)
+    account_ref = models.IntegerField(help_text="user_id для кошелька или survey_id для счёта опроса")
+    stored_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    ledger_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    difference = models.DecimalField(max_digits=14, decimal_places=2, help_text="stored_balance - ledger_balance")
+
+    class Meta:
+        db_table = 'payment_reconciliation_discrepancy'
+        indexes = [
+            models.Index(fields=['run', 'account_type']),
+        ]
+
+
+class DailyFinancialRollup(models.Model):
+    """
+    Предагрегированные суммы успешных транзакций за день.
+    Ключ: (day, type, currency, related_survey_id); день определяется по processed_at.
+    """
+    id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+    type = models.CharField(max_length=30, choices=PaymentTransaction.TYPE_CHOICES)
+    currency = models.CharField(max_length=10, default='RUB')
+    related_survey_id = models.IntegerField(null=True, blank=True)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    tx_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'payment_daily_rollup'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'type', 'currency', 'related_survey_id'],
+                name='uniq_payment_daily_rollup_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['related_survey_id', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.type} {self.total_amount} {self.currency} ({self.tx_count})"
+
+
+class RollupWatermark(models.Model):
+    """
+    High-water mark инкрементальных агрегатов: последний полностью посчитанный день.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    last_day = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'payment_rollup_watermark'
+
+
+class PayoutOutbox(models.Model):
+    """
+    Transactional outbox автоматических выплат.
+    Запись создаётся в той же транзакции, что и перевод статуса респондента в `completed`;
+    фоновый диспетчер (manage.py run_payout_dispatcher) выполняет выплаты пачками.
+    Одна запись на пару (survey, respondent) — дедупликация повторных попыток.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает'),
+        ('processing', 'Обрабатывается'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    survey = models.ForeignKey(Surveys, on_delete=models.CASCADE, related_name='payout_outbox')
+    respondent = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='payout_outbox')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, null=True)
+    payment_transaction = models.ForeignKey(PaymentTransaction, on_delete=models.SET_NULL, null=True, blank=True,
+                                            related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'payment_payout_outbox'
+        constraints = [
+            models.UniqueConstraint(fields=['survey', 'respondent'], name='uniq_payout_outbox_survey_respondent'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"PayoutOutbox({self.survey_id}, {self.respondent_id}) [{self.status}, попыток: {self.attempts}]"
+
+
+class GatewayNotification(models.Model):
+    """
+    Уведомление (webhook) платёжного шлюза о результате операции.
+    Webhook только сохраняет запись (дедупликация по event_id), а к кошелькам
+    уведомления применяются пачками фоновой задачей (manage.py apply_gateway_notifications).
+    """
+    EVENT_CHOICES = [
+        ('processing', 'В обработке'),
+        ('succeeded', 'Успешно'),
+        ('failed', 'Ошибка'),
+    ]
+    STATUS_CHOICES = [
+        ('received', 'Получено'),
+        ('applied', 'Применено'),
+        ('ignored', 'Пропущено'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    event_id = models.CharField(max_length=100, unique=True)
+    transaction_id = models.IntegerField(db_index=True)
+    event = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    currency = models.CharField(max_length=10, blank=True, null=True)
+    occurred_at = models.DateTimeField(null=True, blank=True)
+    payload = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='received')
+    note = models.TextField(blank=True, null=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'payment_gateway_notification'
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"GatewayNotification({self.event_id}): tx {self.transaction_id} {self.event} [{self.status}]"
+
+
+class WalletMonthlySnapshot(models.Model):
+    """
+    Баланс кошелька на начало и конец закрытого месяца.
+    Входящий остаток выписки берётся из снимка предыдущего месяца —
+    без суммирования всей истории транзакций.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wallet_snapshots')
+    month = models.DateField(help_text="Первый день месяца")
+    opening_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    closing_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    credit_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    debit_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    entries_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'payment_wallet_monthly_snapshot'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='uniq_wallet_snapshot_user_month'),
+        ]
+
+    def __str__(self):
+        return f"WalletSnapshot({self.user_id}, {self.month:%Y-%m}): {self.opening_balance} → {self.closing_balance}"
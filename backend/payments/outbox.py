@@ -0,0 +1,129 @@
+# payments/outbox.py
+"""
+Outbox автоматических выплат за завершённые опросы.
+
+- enqueue_payout() вызывается в транзакции перевода статуса в `completed`;
+- dispatch_payouts() забирает пачку готовых записей (SKIP LOCKED там, где поддерживается)
+  и выполняет выплаты с ограниченным параллелизмом, повторяя неудачные попытки с backoff.
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PayoutOutbox
+from .services import perform_payout, PayoutError
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_payout(survey, respondent):
+    """
+    Ставит выплату в очередь (идемпотентно по паре survey/respondent).
+    Должна вызываться внутри той же транзакции, что и смена статуса.
+    """
+    entry, created = PayoutOutbox.objects.get_or_create(survey=survey, respondent=respondent)
+    if not created and entry.status == 'failed':
+        # повторное завершение опроса «перезаряжает» упавшую выплату
+        entry.status = 'pending'
+        entry.attempts = 0
+        entry.next_attempt_at = timezone.now()
+        entry.save(update_fields=['status', 'attempts', 'next_attempt_at', 'updated_at'])
+    return entry
+
+
+def backoff_delay(attempts):
+    """Экспоненциальная задержка с небольшим джиттером: base * 2^(n-1), не больше max."""
+    base = _setting('PAYOUT_OUTBOX_BACKOFF_SECONDS', 30)
+    cap = _setting('PAYOUT_OUTBOX_BACKOFF_MAX_SECONDS', 3600)
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def claim_batch(batch_size, now=None):
+    """
+    Атомарно помечает до batch_size готовых записей как `processing` и возвращает их id.
+    Зависшие в `processing` дольше PAYOUT_OUTBOX_LOCK_TIMEOUT_SECONDS забираются повторно.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=_setting('PAYOUT_OUTBOX_LOCK_TIMEOUT_SECONDS', 300))
+    with transaction.atomic():
+        ids = list(
+            PayoutOutbox.objects
+            .select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .filter(
+                Q(status='pending', next_attempt_at__lte=now) |
+                Q(status='processing', locked_at__lt=stale)
+            )
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            PayoutOutbox.objects.filter(id__in=ids).update(status='processing', locked_at=now, updated_at=now)
+    return ids
+
+
+def process_entry(entry_id):
+    """Выполняет одну выплату и переводит запись в итоговое состояние. Возвращает новый статус."""
+    entry = PayoutOutbox.objects.select_related('survey', 'respondent').get(pk=entry_id)
+    entry.attempts += 1
+    try:
+        tx, _, _ = perform_payout(entry.survey, entry.respondent)
+        entry.status = 'done'
+        entry.payment_transaction = tx
+        entry.last_error = None
+    except PayoutError as e:
+        entry.last_error = e.detail
+        if e.already_paid:
+            # выплата уже сделана (например, вручную через PayoutView) — дубликат, закрываем
+            entry.status = 'done'
+        elif e.retryable and entry.attempts < _setting('PAYOUT_OUTBOX_MAX_ATTEMPTS', 8):
+            entry.status = 'pending'
+            entry.next_attempt_at = timezone.now() + backoff_delay(entry.attempts)
+        else:
+            entry.status = 'failed'
+    except Exception as e:
+        entry.last_error = str(e)
+        if entry.attempts < _setting('PAYOUT_OUTBOX_MAX_ATTEMPTS', 8):
+            entry.status = 'pending'
+            entry.next_attempt_at = timezone.now() + backoff_delay(entry.attempts)
+        else:
+            entry.status = 'failed'
+    entry.locked_at = None
+    entry.save(update_fields=[
+        'status', 'attempts', 'next_attempt_at', 'locked_at', 'last_error', 'payment_transaction', 'updated_at'
+    ])
+    return entry.status
+
+
+def _process_in_thread(entry_id):
+    try:
+        return process_entry(entry_id)
+    finally:
+        # каждый поток работает со своим соединением — закрываем его
+        connection.close()
+
+
+def dispatch_payouts(batch_size=100, concurrency=4, now=None):
+    """
+    Обрабатывает одну пачку outbox. Возвращает словарь {статус: количество}.
+    При concurrency <= 1 выплаты выполняются последовательно в текущем потоке.
+    """
+    ids = claim_batch(batch_size, now=now)
+    if not ids:
+        return {}
+    if concurrency <= 1:
+        results = [process_entry(entry_id) for entry_id in ids]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(_process_in_thread, ids))
+    summary = {}
+    for result in results:
+        summary[result] = summary.get(result, 0) + 1
+    return summary
@@ -0,0 +1,160 @@
+# payments/reconciliation.py
+"""
+Сверка сохранённых балансов (Wallet.balance, SurveyAccount.balance)
+с суммой проведённых транзакций PaymentTransaction (см. ledger.ledger_filter).
+
+Транзакции читаются потоково чанками (`.iterator()`), каждый чанк агрегируется
+векторно (numpy + pandas group-by), в памяти держатся только суммы по счетам —
+объём памяти зависит от количества счетов, а не от количества транзакций.
+"""
+import csv
+from decimal import Decimal
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+from . import ledger
+from .models import (
+    PaymentTransaction, Wallet, SurveyAccount,
+    ReconciliationRun, ReconciliationDiscrepancy,
+)
+
+DEFAULT_CHUNK_SIZE = 50_000
+DISCREPANCY_BATCH_SIZE = 1_000
+
+
+def iter_transaction_chunks(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Отдаёт списки кортежей (user_id, type, amount, related_survey_id) размером до chunk_size."""
+    rows = (
+        PaymentTransaction.objects
+        .filter(ledger.ledger_filter())
+        .order_by()
+        .values_list('user_id', 'type', 'amount', 'related_survey_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def aggregate_chunk(chunk):
+    """Возвращает (wallet_sums, survey_sums) — pd.Series в копейках, индекс = id счёта."""
+    user_ids, types, amounts, survey_ids = zip(*chunk)
+    user_ids = np.fromiter(user_ids, dtype=np.int64, count=len(chunk))
+    has_survey = np.fromiter((s is not None for s in survey_ids), dtype=bool, count=len(chunk))
+    survey_ids = np.fromiter((s or 0 for s in survey_ids), dtype=np.int64, count=len(chunk))
+    codes = ledger.type_codes(types)
+    cents = ledger.to_cents(amounts)
+
+    frame = pd.DataFrame({
+        'user_id': user_ids,
+        'survey_id': survey_ids,
+        'wallet': ledger.wallet_deltas(codes, has_survey, cents),
+        'survey': ledger.survey_deltas(codes, has_survey, cents),
+    })
+    wallet_sums = frame.groupby('user_id', sort=False)['wallet'].sum()
+    survey_sums = frame[has_survey].groupby('survey_id', sort=False)['survey'].sum()
+    return wallet_sums, survey_sums
+
+
+def compute_ledger_balances(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Потоково суммирует журнал. Возвращает (wallet_sums, survey_sums, scanned)."""
+    wallet_totals = pd.Series(dtype=np.int64)
+    survey_totals = pd.Series(dtype=np.int64)
+    scanned = 0
+    for chunk in iter_transaction_chunks(chunk_size):
+        wallet_sums, survey_sums = aggregate_chunk(chunk)
+        wallet_totals = wallet_totals.add(wallet_sums, fill_value=0)
+        survey_totals = survey_totals.add(survey_sums, fill_value=0)
+        scanned += len(chunk)
+    return wallet_totals.astype(np.int64), survey_totals.astype(np.int64), scanned
+
+
+def load_stored_balances(queryset, key_field):
+    """Сохранённые балансы → pd.Series в копейках, индекс = key_field."""
+    keys, balances = [], []
+    for key, balance in queryset.order_by().values_list(key_field, 'balance').iterator(chunk_size=DEFAULT_CHUNK_SIZE):
+        keys.append(key)
+        balances.append(balance)
+    return pd.Series(ledger.to_cents(balances), index=pd.Index(keys, dtype=np.int64), dtype=np.int64)
+
+
+def compare_balances(stored: pd.Series, computed: pd.Series) -> pd.DataFrame:
+    """Внешнее объединение сохранённых и вычисленных балансов; оставляет только расхождения."""
+    frame = pd.concat({'stored': stored, 'ledger': computed}, axis=1).fillna(0).astype(np.int64)
+    frame['difference'] = frame['stored'] - frame['ledger']
+    return frame[frame['difference'] != 0]
+
+
+def _cents_to_decimal(value) -> Decimal:
+    return Decimal(int(value)).scaleb(-2)
+
+
+def _iter_discrepancies(run, account_type, frame):
+    for account_ref, row in frame.iterrows():
+        yield ReconciliationDiscrepancy(
+            run=run,
+            account_type=account_type,
+            account_ref=int(account_ref),
+            stored_balance=_cents_to_decimal(row['stored']),
+            ledger_balance=_cents_to_decimal(row['ledger']),
+            difference=_cents_to_decimal(row['difference']),
+        )
+
+
+def run_reconciliation(chunk_size=DEFAULT_CHUNK_SIZE, output_path=None):
+    """
+    Выполняет сверку и сохраняет отчёт (ReconciliationRun + ReconciliationDiscrepancy).
+    Если задан output_path — дополнительно пишет CSV-отчёт с расхождениями.
+    """
+    run = ReconciliationRun.objects.create()
+    try:
+        wallet_ledger, survey_ledger, scanned = compute_ledger_balances(chunk_size)
+        wallet_stored = load_stored_balances(Wallet.objects.all(), 'user_id')
+        survey_stored = load_stored_balances(SurveyAccount.objects.all(), 'survey_id')
+
+        wallet_diff = compare_balances(wallet_stored, wallet_ledger)
+        survey_diff = compare_balances(survey_stored, survey_ledger)
+
+        for account_type, frame in (('wallet', wallet_diff), ('survey', survey_diff)):
+            objs = _iter_discrepancies(run, account_type, frame)
+            while True:
+                batch = list(islice(objs, DISCREPANCY_BATCH_SIZE))
+                if not batch:
+                    break
+                ReconciliationDiscrepancy.objects.bulk_create(batch)
+
+        if output_path:
+            write_csv_report(run, output_path)
+
+        run.status = 'completed'
+        run.transactions_scanned = scanned
+        run.accounts_checked = len(wallet_stored.index.union(wallet_ledger.index)) + \
+            len(survey_stored.index.union(survey_ledger.index))
+        run.discrepancies_count = len(wallet_diff) + len(survey_diff)
+        run.total_difference = _cents_to_decimal(
+            wallet_diff['difference'].abs().sum() + survey_diff['difference'].abs().sum()
+        )
+    except Exception as e:
+        run.status = 'failed'
+        run.error = str(e)
+        raise
+    finally:
+        run.finished_at = timezone.now()
+        run.save()
+    return run
+
+
+def write_csv_report(run, output_path):
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['account_type', 'account_ref', 'stored_balance', 'ledger_balance', 'difference'])
+        rows = run.discrepancies.order_by('account_type', 'account_ref').values_list(
+            'account_type', 'account_ref', 'stored_balance', 'ledger_balance', 'difference'
+        )
+        for row in rows.iterator(chunk_size=DISCREPANCY_BATCH_SIZE):
+            writer.writerow(row)
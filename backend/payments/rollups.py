@@ -0,0 +1,156 @@
+# payments/rollups.py
+"""
+Инкрементальные дневные агрегаты финансовых операций (DailyFinancialRollup).
+
+Агрегаты строятся только по «закрытым» дням (день закончился и прошло
+PAYMENT_ROLLUP_SETTLE_MINUTES минут), продвигая high-water mark RollupWatermark.
+Отчёт за произвольный диапазон = агрегаты до watermark + «хвост» (в т.ч. сегодня),
+который считается по сырым транзакциям через индекс (status, processed_at).
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import PaymentTransaction, DailyFinancialRollup, RollupWatermark
+
+ROLLUP_NAME = 'daily_financial'
+WINDOW_DAYS = 31
+# Допустимый диапазон отчёта: раньше транзакций нет, а крайние даты
+# (0001-01-01, 9999-12-31) переполняют datetime при сдвиге на день
+REPORT_MIN_DATE = date(2000, 1, 1)
+REPORT_MAX_DAYS = 366
+
+
+def _settle_delay():
+    return timedelta(minutes=getattr(settings, 'PAYMENT_ROLLUP_SETTLE_MINUTES', 60))
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def last_closed_day(now=None):
+    """Последний день, который можно агрегировать окончательно."""
+    now = timezone.localtime(now or timezone.now())
+    return (now - _settle_delay()).date() - timedelta(days=1)
+
+
+def success_transactions(date_from, date_to):
+    """Успешные транзакции, обработанные в днях [date_from, date_to]."""
+    return PaymentTransaction.objects.filter(
+        status='success',
+        processed_at__gte=day_start(date_from),
+        processed_at__lt=day_start(date_to + timedelta(days=1)),
+    )
+
+
+def aggregate_transactions(date_from, date_to):
+    """GROUP BY (day, type, currency, related_survey_id) по сырым транзакциям."""
+    return (
+        success_transactions(date_from, date_to)
+        .annotate(day=TruncDate('processed_at'))
+        .values('day', 'type', 'currency', 'related_survey_id')
+        .annotate(total_amount=Sum('amount'), tx_count=Count('pk'))
+        .order_by()
+    )
+
+
+def _first_transaction_day():
+    first = (
+        PaymentTransaction.objects.filter(status='success', processed_at__isnull=False)
+        .order_by('processed_at').values_list('processed_at', flat=True).first()
+    )
+    return timezone.localtime(first).date() if first else None
+
+
+def get_watermark():
+    return RollupWatermark.objects.filter(name=ROLLUP_NAME).values_list('last_day', flat=True).first()
+
+
+def build_rollups(until=None, now=None):
+    """
+    Досчитывает агрегаты от watermark до `until` (по умолчанию — последний закрытый день;
+    позже него — нельзя: транзакции незакрытого дня пропали бы из отчёта за watermark).
+    Каждое окно WINDOW_DAYS пересчитывается и фиксируется в отдельной транзакции.
+    Возвращает количество записанных строк агрегатов.
+    """
+    closed = last_closed_day(now)
+    target = min(until, closed) if until else closed
+    written = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=ROLLUP_NAME)
+            if watermark.last_day:
+                start = watermark.last_day + timedelta(days=1)
+            else:
+                start = _first_transaction_day()
+                if start is None:
+                    return written
+            if start > target:
+                return written
+            end = min(start + timedelta(days=WINDOW_DAYS - 1), target)
+
+            rows = [DailyFinancialRollup(**row) for row in aggregate_transactions(start, end)]
+            DailyFinancialRollup.objects.filter(day__gte=start, day__lte=end).delete()
+            DailyFinancialRollup.objects.bulk_create(rows, batch_size=1000)
+            written += len(rows)
+
+            watermark.last_day = end
+            watermark.save(update_fields=['last_day', 'updated_at'])
+
+
+def daily_report(date_from, date_to, tx_type=None, currency=None, survey_id=None):
+    """
+    Суммы по (day, type, currency) за диапазон дат:
+    дни до watermark берутся из агрегатов, остальные — из сырых транзакций.
+    """
+    filters = {}
+    if tx_type:
+        filters['type'] = tx_type
+    if currency:
+        filters['currency'] = currency
+    if survey_id is not None:
+        filters['related_survey_id'] = survey_id
+
+    watermark = get_watermark()
+    rows = []
+    if watermark and date_from <= watermark:
+        rolled = (
+            DailyFinancialRollup.objects
+            .filter(day__gte=date_from, day__lte=min(date_to, watermark), **filters)
+            .values('day', 'type', 'currency')
+            .annotate(total_amount=Sum('total_amount'), tx_count=Sum('tx_count'))
+            .order_by()
+        )
+        rows.extend(rolled)
+
+    tail_from = max(date_from, watermark + timedelta(days=1)) if watermark else date_from
+    if tail_from <= date_to:
+        tail = (
+            success_transactions(tail_from, date_to)
+            .filter(**filters)
+            .annotate(day=TruncDate('processed_at'))
+            .values('day', 'type', 'currency')
+            .annotate(total_amount=Sum('amount'), tx_count=Count('pk'))
+            .order_by()
+        )
+        rows.extend(tail)
+
+    rows.sort(key=lambda r: (r['day'], r['type'], r['currency']))
+    totals = {}
+    for r in rows:
+        key = (r['type'], r['currency'])
+        total = totals.setdefault(key, {'type': r['type'], 'currency': r['currency'],
+                                        'total_amount': 0, 'tx_count': 0})
+        total['total_amount'] += r['total_amount']
+        total['tx_count'] += r['tx_count']
+
+    return {
+        'watermark': watermark,
+        'days': rows,
+        'totals': sorted(totals.values(), key=lambda t: (t['type'], t['currency'])),
+    }
@@ -3,7 +3,8 @@ from rest_framework import serializers
 from decimal import Decimal
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from .models import Wallet, PaymentTransaction
+from core.projection import Projection, decimal_string
+from .models import Wallet, PaymentTransaction, ReconciliationRun, ReconciliationDiscrepancy
 User = get_user_model()
 
 
@@ -48,6 +49,24 @@ class TransactionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['transaction_id', 'created_at', 'processed_at', 'status']
 
+
+# поля TransactionSerializer через values_list() — для TransactionsListView
+TRANSACTION_ROWS = Projection({
+    'transaction_id': 'transaction_id',
+    'created_at': 'created_at',
+    'user': 'user_id',
+    'type': 'type',
+    'status': 'status',
+    'amount': ('amount', decimal_string),
+    'currency': 'currency',
+    'description': 'description',
+    'related_survey_id': 'related_survey_id',
+    'related_respondent_id': 'related_respondent_id',
+    'gateway_data': 'gateway_data',
+    'processed_at': 'processed_at',
+})
+
+
 class CalculateCostSerializer(serializers.Serializer):
     survey_id = serializers.IntegerField(required=False)
     questions_count = serializers.IntegerField(required=False, min_value=1)
@@ -91,3 +110,50 @@ class PricingTierSerializer(serializers.Serializer):
             raise serializers.ValidationError("min_questions не может быть больше max_questions")
         return data
 
+
+
+class ReconciliationDiscrepancySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReconciliationDiscrepancy
+        fields = ['account_type', 'account_ref', 'stored_balance', 'ledger_balance', 'difference']
+
+
+class ReconciliationRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReconciliationRun
+        fields = [
+            'id', 'started_at', 'finished_at', 'status', 'transactions_scanned',
+            'accounts_checked', 'discrepancies_count', 'total_difference', 'error'
+        ]
+
+
+class DailyReportRowSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    type = serializers.CharField()
+    currency = serializers.CharField()
+    total_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    tx_count = serializers.IntegerField()
+
+
+class DailyReportTotalSerializer(serializers.Serializer):
+    type = serializers.CharField()
+    currency = serializers.CharField()
+    total_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    tx_count = serializers.IntegerField()
+
+
+class DailyReportSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    watermark = serializers.DateField(allow_null=True)
+    days = DailyReportRowSerializer(many=True)
+    totals = DailyReportTotalSerializer(many=True)
+
+
+class GatewayNotificationSerializer(serializers.Serializer):
+    event_id = serializers.CharField(max_length=100)
+    transaction_id = serializers.IntegerField()
+    event = serializers.ChoiceField(choices=['processing', 'succeeded', 'failed'])
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, required=False, allow_null=True)
+    currency = serializers.CharField(max_length=10, required=False, allow_null=True)
+    occurred_at = serializers.DateTimeField(required=False, allow_null=True)
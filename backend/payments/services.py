@@ -0,0 +1,128 @@
+# payments/services.py
+"""
+Общие операции с деньгами, которые вызываются и из views, и из фоновых обработчиков.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from accounts.stats import record_earning
+from surveys.models import RespondentSurveyStatus
+from .models import Wallet, PaymentTransaction, SurveyAccount
+
+
+class PayoutError(Exception):
+    """
+    Ошибка выплаты. `retryable` — имеет ли смысл повторить позже
+    (например, на счёте опроса пока недостаточно средств).
+    """
+
+    def __init__(self, detail, status_code=status.HTTP_400_BAD_REQUEST, retryable=False, already_paid=False):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retryable = retryable
+        self.already_paid = already_paid
+
+
+# -----------------------------
+# Помощник: получить или создать кошелёк
+# -----------------------------
+def get_or_create_wallet(user):
+    wallet, _ = Wallet.objects.get_or_create(user=user, defaults={'balance': Decimal('0.00')})
+    return wallet
+
+
+def payout_exists(survey_id, respondent_id):
+    return PaymentTransaction.objects.filter(
+        type="payout",
+        related_survey_id=survey_id,
+        related_respondent_id=respondent_id,
+        status="success",
+    ).exists()
+
+
+def perform_payout(survey, respondent, description=""):
+    """
+    Перевод со счёта опроса на кошелёк респондента за завершённый опрос.
+    Возвращает (tx, survey_acc, wallet_respondent); при невозможности выплаты — PayoutError.
+    """
+    if getattr(respondent, "role", None) != "respondent":
+        raise PayoutError("Только респонденты могут запрашивать выплаты", status.HTTP_403_FORBIDDEN)
+
+    try:
+        rs = RespondentSurveyStatus.objects.get(survey=survey, respondent=respondent)
+    except RespondentSurveyStatus.DoesNotExist:
+        raise PayoutError("Респондент не участвовал в этом опросе", status.HTTP_404_NOT_FOUND)
+
+    if rs.status != "completed":
+        raise PayoutError("Опрос должен быть завершён перед выплатой")
+
+    # Определяем сумму выплаты одному респонденту.
+    # Возможные случаи:
+    # - Если survey.cost сохранён как TOTAL (price_per_survey * max_residents * 1.10),
+    #   то вычисляем price_per_survey = survey.cost / (max_residents * 1.10)
+    # - Если survey.cost уже хранит цену за одного респондента — используем её.
+    if survey.cost is None or survey.cost <= Decimal('0.00'):
+        raise PayoutError("Для опроса не задана корректная сумма (cost)")
+
+    # Требуем max_residents, чтобы корректно понять структуру cost
+    if not survey.max_residents or survey.max_residents <= 0:
+        raise PayoutError("У опроса не задан max_residents")
+
+    try:
+        # Предполагаем, что survey.cost == total (price_per_survey * max_residents * 1.10)
+        price_per_survey = survey.cost
+    except Exception:
+        # fallback: если расчёт не прошёл, используем survey.cost как сумму выплаты (на случай несовместимости)
+        price_per_survey = Decimal(survey.cost).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    payout_amount = price_per_survey
+    if payout_amount <= Decimal('0.00'):
+        raise PayoutError("Вычисленная сумма выплаты некорректна")
+
+    # Проверяем, что выплату не делали раньше
+    if payout_exists(survey.survey_id, respondent.id):
+        raise PayoutError("Выплата за этот опрос уже была выполнена", already_paid=True)
+
+    # Берём счёт опроса
+    survey_acc, _ = SurveyAccount.objects.get_or_create(survey=survey, defaults={'currency': 'RUB'})
+
+    if survey_acc.balance < payout_amount:
+        raise PayoutError('На счёте опроса недостаточно средств', retryable=True)
+
+    wallet_respondent = get_or_create_wallet(respondent)
+
+    with transaction.atomic():
+        # блокируем счёт опроса: параллельные попытки выплаты одному респонденту сериализуются здесь
+        survey_acc = SurveyAccount.objects.select_for_update().get(pk=survey_acc.pk)
+        if payout_exists(survey.survey_id, respondent.id):
+            raise PayoutError("Выплата за этот опрос уже была выполнена", already_paid=True)
+        if survey_acc.balance < payout_amount:
+            raise PayoutError('На счёте опроса недостаточно средств', retryable=True)
+
+        tx = PaymentTransaction.objects.create(
+            user=respondent,
+            type='payout',
+            status='pending',
+            amount=payout_amount,
+            currency=survey_acc.currency,
+            description=description or f"Выплата за опрос '{survey.name}'",
+            related_survey_id=survey.survey_id,
+            related_respondent_id=respondent.id
+        )
+
+        # перевод
+        survey_acc = survey_acc.withdraw(payout_amount)
+        wallet_respondent = wallet_respondent.deposit(payout_amount)
+
+        tx.mark_success(gateway_data={
+            'from_survey_account': survey.survey_id,
+            'to_respondent': respondent.email,
+            'transferred_at': timezone.now().isoformat()
+        })
+        record_earning(respondent.pk, payout_amount, tx.processed_at)
+
+    return tx, survey_acc, wallet_respondent
@@ -0,0 +1,374 @@
+# payments/statements.py
+"""
+Месячные выписки по кошельку (CSV / XLSX / PDF).
+
+Строки выписки читаются потоково (`.iterator()`), в памяти одновременно держится
+только текущая строка. Движения кошелька (см. ledger.py):
+- обычные успешные операции — в момент processed_at;
+- вывод средств — удержание в момент created_at (в т.ч. ещё pending),
+  а при отказе шлюза — отдельная строка возврата удержания в момент processed_at.
+
+Входящий остаток берётся из WalletMonthlySnapshot предыдущего месяца (снимки
+досчитываются инкрементально от последнего существующего). Выписки закрытых
+месяцев неизменны: файл строится один раз и дальше отдаётся с диска.
+"""
+import csv
+import heapq
+import os
+import tempfile
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import openpyxl
+from django.conf import settings
+from django.db.models import Count, Sum, Min, Q, ExpressionWrapper, BooleanField
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from . import ledger
+from .models import PaymentTransaction, WalletMonthlySnapshot
+from .rollups import last_closed_day
+
+FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+HEADER = ['date', 'transaction_id', 'operation', 'status', 'description', 'survey_id', 'amount', 'currency', 'balance']
+ITERATOR_CHUNK_SIZE = 2000
+
+Entry = namedtuple('Entry', ['at', 'transaction_id', 'operation', 'status', 'description',
+                             'survey_id', 'amount', 'currency'])
+Statement = namedtuple('Statement', ['user_id', 'month', 'opening_balance', 'closing_balance', 'closed'])
+
+_ENTRY_FIELDS = ('transaction_id', 'type', 'status', 'amount', 'currency', 'description', 'related_survey_id')
+
+
+# -----------------------------
+# Месяцы
+# -----------------------------
+def month_start(day) -> date:
+    return date(day.year, day.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def prev_month(month: date) -> date:
+    return date(month.year - (month.month == 1), (month.month - 2) % 12 + 1, 1)
+
+
+def month_bounds(month: date):
+    """[начало, конец) месяца как aware datetime."""
+    start = timezone.make_aware(datetime.combine(month, time.min))
+    end = timezone.make_aware(datetime.combine(next_month(month), time.min))
+    return start, end
+
+
+def last_closed_month(now=None) -> date:
+    """Последний месяц, по которому больше не появятся движения."""
+    return prev_month(month_start(last_closed_day(now) + timedelta(days=1)))
+
+
+# -----------------------------
+# Движения кошелька
+# -----------------------------
+def _posted(user_id, start, end):
+    return (
+        PaymentTransaction.objects
+        .filter(user_id=user_id, status='success', processed_at__gte=start, processed_at__lt=end)
+        .exclude(type='withdraw')
+    )
+
+
+def _holds(user_id, start, end):
+    return PaymentTransaction.objects.filter(user_id=user_id, type='withdraw',
+                                             created_at__gte=start, created_at__lt=end)
+
+
+def _releases(user_id, start, end):
+    return PaymentTransaction.objects.filter(user_id=user_id, type='withdraw', status='failed',
+                                             processed_at__gte=start, processed_at__lt=end)
+
+
+def _rows(queryset, time_field):
+    return (
+        queryset.order_by(time_field, 'transaction_id')
+        .values_list(time_field, *_ENTRY_FIELDS)
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+
+
+def iter_entries(user_id, start, end):
+    """Движения кошелька за [start, end) в хронологическом порядке."""
+    def posted():
+        for at, tx_id, tx_type, tx_status, amount, currency, description, survey_id in _rows(
+                _posted(user_id, start, end), 'processed_at'):
+            delta = ledger.wallet_delta(tx_type, amount, survey_id is not None)
+            yield Entry(at, tx_id, tx_type, tx_status, description, survey_id, delta, currency)
+
+    def holds():
+        for at, tx_id, _, tx_status, amount, currency, description, survey_id in _rows(
+                _holds(user_id, start, end), 'created_at'):
+            yield Entry(at, tx_id, 'withdraw', tx_status, description, survey_id, -amount, currency)
+
+    def releases():
+        for at, tx_id, _, tx_status, amount, currency, description, survey_id in _rows(
+                _releases(user_id, start, end), 'processed_at'):
+            yield Entry(at, tx_id, 'withdraw_release', tx_status, description, survey_id, amount, currency)
+
+    return heapq.merge(posted(), holds(), releases(), key=lambda e: (e.at, e.transaction_id))
+
+
+def month_movements(user_id, start, end):
+    """
+    Суммы движений по месяцам за [start, end): {month: [credit, debit, count]}.
+    Три агрегирующих запроса вместо чтения строк.
+    """
+    has_survey = ExpressionWrapper(Q(related_survey_id__isnull=False), output_field=BooleanField())
+    totals = {}
+
+    def add(month_dt, delta, count):
+        month = month_start(timezone.localtime(month_dt))
+        bucket = totals.setdefault(month, [Decimal('0.00'), Decimal('0.00'), 0])
+        if delta >= 0:
+            bucket[0] += delta
+        else:
+            bucket[1] += -delta
+        bucket[2] += count
+
+    posted = (
+        _posted(user_id, start, end)
+        .annotate(month=TruncMonth('processed_at'), has_survey=has_survey)
+        .values('month', 'type', 'has_survey')
+        .annotate(total=Sum('amount'), n=Count('pk'))
+        .order_by()
+    )
+    for row in posted:
+        add(row['month'], ledger.wallet_delta(row['type'], row['total'], row['has_survey']), row['n'])
+
+    for queryset, field, sign in ((_holds(user_id, start, end), 'created_at', -1),
+                                  (_releases(user_id, start, end), 'processed_at', 1)):
+        rows = (
+            queryset.annotate(month=TruncMonth(field)).values('month')
+            .annotate(total=Sum('amount'), n=Count('pk')).order_by()
+        )
+        for row in rows:
+            add(row['month'], row['total'] * sign, row['n'])
+    return totals
+
+
+def _first_entry_month(user_id):
+    first = PaymentTransaction.objects.filter(user_id=user_id).aggregate(first=Min('created_at'))['first']
+    return month_start(timezone.localtime(first)) if first else None
+
+
+# -----------------------------
+# Снимки и остатки
+# -----------------------------
+def ensure_snapshots(user_id, until_month):
+    """
+    Досчитывает снимки закрытых месяцев до until_month включительно, начиная
+    с последнего существующего. Возвращает снимок until_month (или None, если
+    до этого месяца у пользователя не было операций).
+    """
+    last = (
+        WalletMonthlySnapshot.objects
+        .filter(user_id=user_id, month__lte=until_month)
+        .order_by('-month').first()
+    )
+    if last and last.month == until_month:
+        return last
+    if last:
+        month, balance = next_month(last.month), last.closing_balance
+    else:
+        month, balance = _first_entry_month(user_id), Decimal('0.00')
+        if month is None or month > until_month:
+            return None
+
+    movements = month_movements(user_id, month_bounds(month)[0], month_bounds(until_month)[1])
+    snapshots = []
+    while month <= until_month:
+        credit, debit, count = movements.get(month, (Decimal('0.00'), Decimal('0.00'), 0))
+        closing = balance + credit - debit
+        snapshots.append(WalletMonthlySnapshot(
+            user_id=user_id, month=month, opening_balance=balance, closing_balance=closing,
+            credit_total=credit, debit_total=debit, entries_count=count,
+        ))
+        balance, month = closing, next_month(month)
+    WalletMonthlySnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+    return snapshots[-1]
+
+
+def opening_balance(user_id, month, closed_until=None):
+    """Остаток на начало месяца: снимок последнего закрытого месяца + движения после него."""
+    closed_until = closed_until or last_closed_month()
+    base_month = min(prev_month(month), closed_until)
+    snapshot = ensure_snapshots(user_id, base_month)
+    balance = snapshot.closing_balance if snapshot else Decimal('0.00')
+    gap_from = next_month(base_month)
+    if gap_from < month:
+        for credit, debit, _ in month_movements(user_id, month_bounds(gap_from)[0], month_bounds(month)[0]).values():
+            balance += credit - debit
+    return balance
+
+
+def build_statement(user_id, month, now=None):
+    closed_until = last_closed_month(now)
+    closed = month <= closed_until
+    if closed:
+        snapshot = ensure_snapshots(user_id, month)
+        if snapshot:
+            return Statement(user_id, month, snapshot.opening_balance, snapshot.closing_balance, True)
+    opening = opening_balance(user_id, month, closed_until)
+    closing = opening
+    for credit, debit, _ in month_movements(user_id, *month_bounds(month)).values():
+        closing += credit - debit
+    return Statement(user_id, month, opening, closing, closed)
+
+
+def iter_rows(statement):
+    """Строки выписки с нарастающим остатком."""
+    balance = statement.opening_balance
+    for e in iter_entries(statement.user_id, *month_bounds(statement.month)):
+        balance += e.amount
+        yield [timezone.localtime(e.at).strftime('%Y-%m-%d %H:%M:%S'), e.transaction_id, e.operation, e.status,
+               e.description or '', e.survey_id or '', e.amount, e.currency, balance]
+
+
+# -----------------------------
+# Форматы
+# -----------------------------
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _summary_rows(statement):
+    return (
+        ['opening_balance', str(statement.opening_balance)],
+        ['closing_balance', str(statement.closing_balance)],
+    )
+
+
+def stream_csv(statement):
+    """Генератор CSV-строк для StreamingHttpResponse."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['statement', f"{statement.month:%Y-%m}"])
+    for row in _summary_rows(statement):
+        yield writer.writerow(row)
+    yield writer.writerow(HEADER)
+    for row in iter_rows(statement):
+        yield writer.writerow(row)
+
+
+def write_csv(statement, fileobj):
+    for line in stream_csv(statement):
+        fileobj.write(line.encode('utf-8'))
+
+
+def write_xlsx(statement, fileobj):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=f"{statement.month:%Y-%m}")
+    ws.append(['statement', f"{statement.month:%Y-%m}"])
+    for label, value in _summary_rows(statement):
+        ws.append([label, Decimal(value)])
+    ws.append(HEADER)
+    for row in iter_rows(statement):
+        ws.append(row)
+    wb.save(fileobj)
+
+
+def _pdf_font():
+    path = getattr(settings, 'PAYMENT_STATEMENT_PDF_FONT', None)
+    if path and os.path.exists(path):
+        if 'StatementFont' not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont('StatementFont', path))
+        return 'StatementFont'
+    return 'Helvetica'
+
+
+def write_pdf(statement, fileobj):
+    """PDF рисуется построчно на canvas — страницы сбрасываются по мере заполнения."""
+    font = _pdf_font()
+    page_w, page_h = landscape(A4)
+    columns = [40, 160, 230, 330, 400, 600, 660, 730, 780]
+    line_h, margin = 14, 40
+
+    pdf = canvas.Canvas(fileobj, pagesize=(page_w, page_h))
+    pdf.setTitle(f"Statement {statement.month:%Y-%m}")
+
+    def header(y):
+        pdf.setFont(font, 8)
+        for x, title in zip(columns, HEADER):
+            pdf.drawString(x, y, title)
+        return y - line_h
+
+    pdf.setFont(font, 12)
+    y = page_h - margin
+    pdf.drawString(columns[0], y, f"Statement {statement.month:%Y-%m}")
+    y -= line_h * 1.5
+    pdf.setFont(font, 9)
+    for label, value in _summary_rows(statement):
+        pdf.drawString(columns[0], y, f"{label}: {value}")
+        y -= line_h
+    y = header(y - line_h / 2)
+
+    for row in iter_rows(statement):
+        if y < margin:
+            pdf.showPage()
+            y = header(page_h - margin)
+        pdf.setFont(font, 8)
+        for x, value in zip(columns, row):
+            pdf.drawString(x, y, str(value)[:40])
+        y -= line_h
+    pdf.save()
+
+
+WRITERS = {'csv': write_csv, 'xlsx': write_xlsx, 'pdf': write_pdf}
+
+
+# -----------------------------
+# Кэш закрытых месяцев
+# -----------------------------
+def _statements_root() -> Path:
+    return Path(getattr(settings, 'PAYMENT_STATEMENTS_ROOT', Path(settings.BASE_DIR) / 'var' / 'statements'))
+
+
+def statement_filename(month, fmt):
+    return f"statement_{month:%Y-%m}.{fmt}"
+
+
+def cached_statement_path(statement, fmt) -> Path:
+    """
+    Путь к неизменяемому файлу выписки закрытого месяца; файл строится при первом
+    обращении во временный файл и атомарно переименовывается.
+    """
+    path = _statements_root() / str(statement.user_id) / statement_filename(statement.month, fmt)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            WRITERS[fmt](statement, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return path
+
+
+def render_to_tempfile(statement, fmt):
+    """Выписка открытого месяца во временный файл (удаляется при закрытии)."""
+    f = tempfile.TemporaryFile()
+    WRITERS[fmt](statement, f)
+    f.seek(0)
+    return f
@@ -1,17 +1,37 @@
 # payments/tests.py
+import csv
+import io
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
 from decimal import Decimal
+
+import openpyxl
+from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 from surveys.models import Surveys, RespondentSurveyStatus, Questions, SurveyQuestions
 from payments.models import Wallet, PaymentTransaction, Payment, SurveyAccount, PricingTier
+from payments.gateway import apply_notifications, resubmit_stale, sign, SIGNATURE_HEADER
+from payments.gateway_stub import StubGateway, make_server
 
 User = get_user_model()
 
 
+def _webhook_deliver(client):
+    """Доставка уведомлений заглушки шлюза прямо в webhook через тестовый клиент."""
+    def deliver(body, signature):
+        return client.generic('POST', reverse('payments-webhook'), body, content_type='application/json',
+                              headers={SIGNATURE_HEADER: signature})
+    return deliver
+
+
 class PaymentsFullTestCase(APITestCase):
     """
     Полный набор тестов для payments:
@@ -173,14 +193,27 @@ class PaymentsFullTestCase(APITestCase):
         url_topup = reverse('payments-top-up')
         self.client.force_authenticate(user=self.customer)
         resp = self.client.post(url_topup, {"amount": "100.00"}, format="json")
-        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.data['status'], 'pending')
+        # до подтверждения шлюза баланс не меняется
         self.customer_wallet.refresh_from_db()
-        self.assertEqual(self.customer_wallet.balance, Decimal('1100.00'))
+        self.assertEqual(self.customer_wallet.balance, Decimal('1000.00'))
 
-        # withdraw
+        # withdraw: сумма удерживается сразу
         url_withdraw = reverse('payments-withdraw')
         resp2 = self.client.post(url_withdraw, {"amount": "50.00", "destination": "card_1111"}, format="json")
-        self.assertEqual(resp2.status_code, 200)
+        self.assertEqual(resp2.status_code, 202)
+        self.customer_wallet.refresh_from_db()
+        self.assertEqual(self.customer_wallet.balance, Decimal('950.00'))
+
+        # шлюз подтверждает обе операции
+        gateway = StubGateway(secret=settings.PAYMENT_GATEWAY_SECRET, duplicate_rate=0, processing_rate=0,
+                              seed=1, deliver=_webhook_deliver(self.client))
+        gateway.deliver_all([
+            {'transaction_id': resp.data['transaction_id'], 'amount': '100.00', 'currency': 'RUB'},
+            {'transaction_id': resp2.data['transaction_id'], 'amount': '50.00', 'currency': 'RUB'},
+        ])
+        apply_notifications()
         self.customer_wallet.refresh_from_db()
         self.assertEqual(self.customer_wallet.balance, Decimal('1050.00'))
 
@@ -271,3 +304,461 @@ class PaymentsFullTestCase(APITestCase):
         other_user = User.objects.create_user(email="new@test.com", password="123")
         wallet = Wallet.objects.create(user=other_user, balance=Decimal("10.00"))
         self.assertEqual(wallet.currency, "RUB")
+
+
+class ReconciliationTestCase(APITestCase):
+    """Сверка балансов Wallet / SurveyAccount с журналом PaymentTransaction"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email="rc_customer@test.com", password="12345", role="customer", name="Customer"
+        )
+        self.respondent = User.objects.create_user(
+            email="rc_respondent@test.com", password="12345", role="respondent", name="Respondent"
+        )
+        self.moderator = User.objects.create_user(
+            email="rc_moderator@test.com", password="12345", role="moderator", name="Moderator"
+        )
+        self.survey = Surveys.objects.create(name="RC Survey", creator=self.customer, status="active",
+                                             max_residents=10, cost=Decimal('40.00'))
+
+        # Согласованная история: пополнение 500, перевод 200 (+20 комиссии) на опрос, выплата 40, возврат 160
+        self._tx(self.customer, 'topup', '500.00')
+        self._tx(self.customer, 'topup', '200.00', survey=True)
+        self._tx(self.customer, 'commission', '20.00', survey=True)
+        self._tx(self.respondent, 'payout', '40.00', survey=True, respondent=True)
+        self._tx(self.customer, 'refund', '160.00', survey=True)
+        self._tx(self.respondent, 'withdraw', '15.00')
+        # неуспешные транзакции не учитываются
+        self._tx(self.customer, 'topup', '999.00', status='failed')
+
+        self.customer_wallet = Wallet.objects.create(user=self.customer, balance=Decimal('440.00'))
+        self.respondent_wallet = Wallet.objects.create(user=self.respondent, balance=Decimal('25.00'))
+        self.survey_acc = SurveyAccount.objects.create(survey=self.survey, balance=Decimal('0.00'))
+        self.client = APIClient()
+
+    def _tx(self, user, tx_type, amount, survey=False, respondent=False, status='success'):
+        return PaymentTransaction.objects.create(
+            user=user, type=tx_type, status=status, amount=Decimal(amount),
+            related_survey_id=self.survey.survey_id if survey else None,
+            related_respondent_id=user.id if respondent else None,
+        )
+
+    def test_consistent_balances_have_no_discrepancies(self):
+        from payments.reconciliation import run_reconciliation
+        run = run_reconciliation(chunk_size=2)
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual(run.transactions_scanned, 6)
+        self.assertEqual(run.discrepancies_count, 0, list(run.discrepancies.values()))
+
+    def test_drift_is_reported(self):
+        from payments.reconciliation import run_reconciliation
+        # баланс изменён в обход журнала
+        Wallet.objects.filter(pk=self.customer_wallet.pk).update(balance=Decimal('450.50'))
+        SurveyAccount.objects.filter(pk=self.survey_acc.pk).update(balance=Decimal('5.00'))
+
+        run = run_reconciliation(chunk_size=4)
+        self.assertEqual(run.discrepancies_count, 2)
+        wallet_d = run.discrepancies.get(account_type='wallet')
+        self.assertEqual(wallet_d.account_ref, self.customer.id)
+        self.assertEqual(wallet_d.ledger_balance, Decimal('440.00'))
+        self.assertEqual(wallet_d.difference, Decimal('10.50'))
+        survey_d = run.discrepancies.get(account_type='survey')
+        self.assertEqual(survey_d.account_ref, self.survey.survey_id)
+        self.assertEqual(survey_d.difference, Decimal('5.00'))
+        self.assertEqual(run.total_difference, Decimal('15.50'))
+
+    def test_reconciliation_endpoint_moderator_only(self):
+        url = reverse('payments-reconciliation')
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.post(url).status_code, 403)
+
+        self.client.force_authenticate(user=self.moderator)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        Wallet.objects.filter(pk=self.respondent_wallet.pk).update(balance=Decimal('0.00'))
+        resp = self.client.post(url)
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data['discrepancies_count'], 1)
+
+        run_id = resp.data['id']
+        resp = self.client.get(url, {'run_id': run_id})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data['discrepancies']), 1)
+        self.assertEqual(resp.data['discrepancies'][0]['account_ref'], self.respondent.id)
+
+        resp = self.client.get(url, {'run_id': 'abc'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.client.get(url, {'run_id': run_id + 1}).status_code, 404)
+
+
+class DailyRollupTestCase(APITestCase):
+    """Дневные агрегаты финансовых операций и отчёт по диапазону дат"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email="ru_customer@test.com", password="12345", role="customer", name="Customer"
+        )
+        self.moderator = User.objects.create_user(
+            email="ru_moderator@test.com", password="12345", role="moderator", name="Moderator"
+        )
+        self.survey = Surveys.objects.create(name="Rollup Survey", creator=self.customer, status="active")
+        self.today = timezone.localdate()
+        self.client = APIClient()
+
+    def _tx(self, tx_type, amount, days_ago, survey=True, status='success'):
+        tx = PaymentTransaction.objects.create(
+            user=self.customer, type=tx_type, status=status, amount=Decimal(amount),
+            related_survey_id=self.survey.survey_id if survey else None,
+        )
+        processed = timezone.now() - timedelta(days=days_ago)
+        PaymentTransaction.objects.filter(pk=tx.pk).update(processed_at=processed)
+        return tx
+
+    def test_build_is_incremental_and_report_includes_today(self):
+        from payments.models import DailyFinancialRollup
+        from payments.rollups import build_rollups, daily_report, get_watermark
+
+        self._tx('commission', '10.00', days_ago=3)
+        self._tx('commission', '5.00', days_ago=3)
+        self._tx('topup', '100.00', days_ago=2)
+        self._tx('payout', '30.00', days_ago=2, status='failed')
+
+        yesterday = self.today - timedelta(days=1)
+        build_rollups(until=yesterday)
+        self.assertEqual(get_watermark(), yesterday)
+        self.assertEqual(DailyFinancialRollup.objects.count(), 2)
+        comm = DailyFinancialRollup.objects.get(type='commission')
+        self.assertEqual((comm.total_amount, comm.tx_count), (Decimal('15.00'), 2))
+
+        # Повторный запуск ничего не пересчитывает
+        self.assertEqual(build_rollups(until=yesterday), 0)
+
+        # until в незакрытом дне не сдвигает watermark дальше вчерашнего дня
+        self.assertEqual(build_rollups(until=self.today + timedelta(days=1)), 0)
+        self.assertEqual(get_watermark(), yesterday)
+
+        # Сегодняшний «хвост» считается по сырым транзакциям
+        self._tx('commission', '7.50', days_ago=0)
+        report = daily_report(self.today - timedelta(days=7), self.today)
+        totals = {t['type']: t for t in report['totals']}
+        self.assertEqual(totals['commission']['total_amount'], Decimal('22.50'))
+        self.assertEqual(totals['commission']['tx_count'], 3)
+        self.assertEqual(totals['topup']['total_amount'], Decimal('100.00'))
+        self.assertNotIn('payout', totals)
+
+    def test_daily_report_endpoint(self):
+        from payments.rollups import build_rollups
+        self._tx('commission', '10.00', days_ago=2)
+        self._tx('refund', '40.00', days_ago=1, survey=True)
+        build_rollups(until=self.today - timedelta(days=1))
+
+        url = reverse('payments-report-daily')
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(user=self.moderator)
+        resp = self.client.get(url, {'type': 'commission'})
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(len(resp.data['totals']), 1)
+        self.assertEqual(Decimal(resp.data['totals'][0]['total_amount']), Decimal('10.00'))
+
+        resp = self.client.get(url, {'date_from': 'bad'})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.get(url, {'date_to': '2024-02-30'})
+        self.assertEqual(resp.status_code, 400)
+
+        # крайние даты не должны переполнять datetime, длинный диапазон — отклоняется
+        for params in ({'date_to': '9999-12-31'}, {'date_to': '0001-01-05'},
+                       {'date_from': '1999-12-31', 'date_to': '2000-01-10'},
+                       {'date_from': '2000-01-01', 'date_to': '2010-01-01'}):
+            resp = self.client.get(url, params)
+            self.assertEqual(resp.status_code, 400, params)
+        resp = self.client.get(url, {'date_to': '2000-01-05'})
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data['date_from'], '2000-01-01')
+
+
+class PayoutOutboxTestCase(APITestCase):
+    """Автоматическая выплата через outbox при завершении опроса"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email="ob_customer@test.com", password="12345", role="customer", name="Customer"
+        )
+        self.respondent = User.objects.create_user(
+            email="ob_respondent@test.com", password="12345", role="respondent", name="Respondent"
+        )
+        self.survey = Surveys.objects.create(name="Outbox Survey", creator=self.customer, status="active",
+                                             max_residents=5, cost=Decimal('25.00'))
+        self.survey_acc = SurveyAccount.objects.create(survey=self.survey, balance=Decimal('100.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.respondent)
+
+    def _complete(self):
+        url = reverse('survey-progress-update', args=[self.survey.survey_id])
+        resp = self.client.post(url, {'status': 'completed', 'score': 0.8}, format='json')
+        self.assertEqual(resp.status_code, 200, resp.data)
+
+    def test_completion_enqueues_single_payout(self):
+        from payments.models import PayoutOutbox
+        from payments.outbox import dispatch_payouts
+
+        self._complete()
+        self._complete()  # повторное завершение не создаёт дубль
+        self.assertEqual(PayoutOutbox.objects.count(), 1)
+
+        summary = dispatch_payouts(concurrency=1)
+        self.assertEqual(summary, {'done': 1})
+        self.assertEqual(Wallet.objects.get(user=self.respondent).balance, Decimal('25.00'))
+        self.survey_acc.refresh_from_db()
+        self.assertEqual(self.survey_acc.balance, Decimal('75.00'))
+
+        # очередь пуста, повторный прогон ничего не делает
+        self.assertEqual(dispatch_payouts(concurrency=1), {})
+        self.assertEqual(PaymentTransaction.objects.filter(type='payout').count(), 1)
+
+    def test_insufficient_funds_is_retried_with_backoff(self):
+        from payments.models import PayoutOutbox
+        from payments.outbox import dispatch_payouts
+
+        SurveyAccount.objects.filter(pk=self.survey_acc.pk).update(balance=Decimal('10.00'))
+        self._complete()
+        self.assertEqual(dispatch_payouts(concurrency=1), {'pending': 1})
+        entry = PayoutOutbox.objects.get()
+        self.assertEqual(entry.attempts, 1)
+        self.assertGreater(entry.next_attempt_at, timezone.now())
+        self.assertIn('недостаточно', entry.last_error)
+
+        # до наступления next_attempt_at запись не берётся
+        self.assertEqual(dispatch_payouts(concurrency=1), {})
+
+        SurveyAccount.objects.filter(pk=self.survey_acc.pk).update(balance=Decimal('50.00'))
+        later = timezone.now() + timedelta(hours=2)
+        self.assertEqual(dispatch_payouts(concurrency=1, now=later), {'done': 1})
+
+    def test_manual_payout_deduplicates_outbox(self):
+        from payments.models import PayoutOutbox
+        from payments.outbox import dispatch_payouts
+
+        self._complete()
+        resp = self.client.post(reverse('payments-payout'),
+                                {"survey_id": self.survey.survey_id, "respondent_id": self.respondent.id},
+                                format="json")
+        self.assertEqual(resp.status_code, 200, resp.data)
+
+        self.assertEqual(dispatch_payouts(concurrency=1), {'done': 1})
+        self.assertIsNone(PayoutOutbox.objects.get().payment_transaction)
+        self.assertEqual(PaymentTransaction.objects.filter(type='payout').count(), 1)
+        self.assertEqual(Wallet.objects.get(user=self.respondent).balance, Decimal('25.00'))
+
+
+class GatewayWebhookTestCase(APITestCase):
+    """Асинхронные пополнение/вывод: webhook + пакетное применение уведомлений"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="gw_customer@test.com", password="12345", role="customer", name="Customer"
+        )
+        self.wallet = Wallet.objects.create(user=self.user, balance=Decimal('100.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _top_up(self, amount):
+        resp = self.client.post(reverse('payments-top-up'), {"amount": amount}, format="json")
+        self.assertEqual(resp.status_code, 202)
+        return {'transaction_id': resp.data['transaction_id'], 'amount': amount, 'currency': 'RUB'}
+
+    def test_webhook_rejects_bad_signature(self):
+        resp = self.client.generic('POST', reverse('payments-webhook'), b'{"event_id": "x"}',
+                                   content_type='application/json', headers={SIGNATURE_HEADER: 'bad'})
+        self.assertEqual(resp.status_code, 403)
+
+    def test_duplicates_and_out_of_order_callbacks_apply_once(self):
+        requests_ = [self._top_up(a) for a in ('10.00', '20.00', '30.00', '40.00')]
+        gateway = StubGateway(secret=settings.PAYMENT_GATEWAY_SECRET, duplicate_rate=1.0, processing_rate=1.0,
+                              seed=42, deliver=_webhook_deliver(self.client))
+        responses = gateway.deliver_all(requests_)
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        # повторные доставки того же event_id отбрасываются на входе
+        self.assertEqual(sum(r.data['duplicate'] for r in responses), 4)
+
+        summary = apply_notifications(batch_size=3)
+        summary2 = apply_notifications()
+        self.assertEqual(summary.get('applied', 0) + summary2.get('applied', 0), 4)
+
+        # повторная доставка после применения не меняет баланс
+        gateway.deliver_all(requests_[:1])
+        apply_notifications()
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('200.00'))
+        self.assertEqual(PaymentTransaction.objects.filter(type='topup', status='success').count(), 4)
+
+    def test_failed_withdraw_releases_hold(self):
+        resp = self.client.post(reverse('payments-withdraw'), {"amount": "60.00", "destination": "card"},
+                                format="json")
+        self.assertEqual(resp.status_code, 202)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('40.00'))
+
+        # при недостатке средств новый вывод не создаётся
+        resp2 = self.client.post(reverse('payments-withdraw'), {"amount": "60.00", "destination": "card"},
+                                 format="json")
+        self.assertEqual(resp2.status_code, 400)
+
+        gateway = StubGateway(secret=settings.PAYMENT_GATEWAY_SECRET, fail_rate=1.0, duplicate_rate=1.0,
+                              seed=7, deliver=_webhook_deliver(self.client))
+        gateway.deliver_all([{'transaction_id': resp.data['transaction_id'], 'amount': '60.00'}])
+        apply_notifications()
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('100.00'))
+        self.assertEqual(PaymentTransaction.objects.get(pk=resp.data['transaction_id']).status, 'failed')
+
+    def test_stale_requests_resubmitted_then_failed_with_hold_released(self):
+        """✅ Неотправленные запросы повторяются; после всех попыток — failed и возврат удержания"""
+        from housekeeping.scheduler import run_task
+
+        topup = self._top_up('50.00')['transaction_id']
+        withdraw = self.client.post(reverse('payments-withdraw'), {"amount": "60.00", "destination": "card"},
+                                    format="json").data['transaction_id']
+        later = timezone.now() + timedelta(minutes=10)
+
+        # шлюз недоступен (фоновая отправка тоже не состоялась) — попытка записана, следующая с паузой
+        with override_settings(PAYMENT_GATEWAY_URL='http://127.0.0.1:1/'):
+            self.assertEqual(resubmit_stale(now=later), {'resubmitted': 2, 'accepted': 0, 'failed': 0})
+            self.assertEqual(resubmit_stale(now=later), {})
+        tx = PaymentTransaction.objects.get(pk=withdraw)
+        self.assertEqual((tx.submit_attempts, tx.submitted_at, tx.status), (1, None, 'pending'))
+
+        server = make_server(StubGateway(secret=settings.PAYMENT_GATEWAY_SECRET, duplicate_rate=0,
+                                         deliver=lambda body, signature: None), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_address[1]}/payments/'
+        with override_settings(PAYMENT_GATEWAY_URL=url):
+            summary = resubmit_stale(now=tx.next_submit_at + timedelta(seconds=1))
+            self.assertEqual(summary, {'resubmitted': 2, 'accepted': 2, 'failed': 0})
+            self.assertIsNotNone(PaymentTransaction.objects.get(pk=topup).submitted_at)
+
+            # результата так и нет: после последней попытки — failed, удержанная сумма вернулась
+            with override_settings(PAYMENT_GATEWAY_SUBMIT_MAX_ATTEMPTS=2):
+                self.assertEqual(run_task('resubmit_gateway_requests', dry_run=True)['affected'], 0)
+                self.assertEqual(resubmit_stale(now=later + timedelta(days=1)),
+                                 {'resubmitted': 0, 'accepted': 0, 'failed': 2})
+        self.assertEqual(
+            set(PaymentTransaction.objects.filter(pk__in=[topup, withdraw]).values_list('status', flat=True)),
+            {'failed'},
+        )
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('100.00'))
+
+    def test_reconciliation_counts_held_withdrawals(self):
+        from payments.reconciliation import run_reconciliation
+
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal('0.00'))
+        tx = self._top_up('100.00')
+        body = (
+            '{"event_id": "evt-1", "transaction_id": %d, "event": "succeeded", "amount": "100.00"}'
+            % tx['transaction_id']
+        ).encode()
+        self.client.generic('POST', reverse('payments-webhook'), body, content_type='application/json',
+                            headers={SIGNATURE_HEADER: sign(body)})
+        apply_notifications()
+        self.client.post(reverse('payments-withdraw'), {"amount": "30.00", "destination": "card"}, format="json")
+
+        run = run_reconciliation()
+        self.assertEqual(run.discrepancies_count, 0)
+
+
+class StatementExportTestCase(APITestCase):
+    """Месячные выписки: остатки из снимков, кэш закрытых месяцев, Range"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        override = self.settings(PAYMENT_STATEMENTS_ROOT=self.tmpdir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(
+            email="st_customer@test.com", password="12345", role="customer", name="Customer"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        today = timezone.localdate()
+        self.this_month = today.replace(day=1)
+        self.last_month = (self.this_month - timedelta(days=1)).replace(day=1)
+        self.two_months_ago = (self.last_month - timedelta(days=1)).replace(day=1)
+
+    def _tx(self, tx_type, amount, month, day, status='success', survey=None):
+        at = timezone.make_aware(timezone.datetime.combine(month.replace(day=day), timezone.datetime.min.time()))
+        tx = PaymentTransaction.objects.create(user=self.user, type=tx_type, status=status,
+                                               amount=Decimal(amount), related_survey_id=survey)
+        PaymentTransaction.objects.filter(pk=tx.pk).update(created_at=at, processed_at=at)
+
+    def _url(self, month, fmt):
+        return reverse('payments-statement', args=[month.year, month.month, fmt])
+
+    def _csv_rows(self, resp):
+        return list(csv.reader(io.StringIO(b''.join(resp.streaming_content).decode('utf-8'))))
+
+    def test_closed_month_statement_uses_snapshots_and_is_cached(self):
+        from payments.models import WalletMonthlySnapshot
+
+        self._tx('topup', '100.00', self.two_months_ago, 5)
+        self._tx('topup', '50.00', self.last_month, 3)
+        self._tx('withdraw', '30.00', self.last_month, 10)
+        self._tx('withdraw', '20.00', self.last_month, 12, status='failed')
+        self._tx('topup', '999.00', self.last_month, 15, status='failed')
+
+        resp = self.client.get(self._url(self.last_month, 'csv'))
+        self.assertEqual(resp.status_code, 200)
+        content = b''.join(resp.streaming_content)
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8'))))
+        self.assertEqual(rows[1], ['opening_balance', '100.00'])
+        self.assertEqual(rows[2], ['closing_balance', '120.00'])
+        # topup, withdraw, удержание + возврат по отклонённому выводу
+        self.assertEqual([r[2] for r in rows[4:]], ['topup', 'withdraw', 'withdraw', 'withdraw_release'])
+        self.assertEqual(rows[-1][-1], '120.00')
+        self.assertEqual(
+            list(WalletMonthlySnapshot.objects.filter(user=self.user).order_by('month')
+                 .values_list('closing_balance', flat=True)),
+            [Decimal('100.00'), Decimal('120.00')],
+        )
+
+        # файл закрытого месяца не меняется и отдаётся с поддержкой Range
+        self._tx('topup', '1.00', self.last_month, 20)
+        resp2 = self.client.get(self._url(self.last_month, 'csv'), HTTP_RANGE='bytes=0-9')
+        self.assertEqual(resp2.status_code, 206)
+        self.assertEqual(b''.join(resp2.streaming_content), content[:10])
+
+    def test_current_month_streams_and_other_formats(self):
+        self._tx('topup', '100.00', self.last_month, 1)
+        self._tx('payout', '25.00', self.this_month, 1, survey=1)
+
+        resp = self.client.get(self._url(self.this_month, 'csv'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        rows = self._csv_rows(resp)
+        self.assertEqual(rows[1], ['opening_balance', '100.00'])
+        self.assertEqual(rows[2], ['closing_balance', '125.00'])
+
+        resp = self.client.get(self._url(self.last_month, 'xlsx'))
+        self.assertEqual(resp.status_code, 200)
+        wb = openpyxl.load_workbook(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(wb.active.max_row, 5)
+
+        resp = self.client.get(self._url(self.this_month, 'pdf'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(b''.join(resp.streaming_content).startswith(b'%PDF'))
+
+        self.assertEqual(self.client.get(self._url(self.this_month, 'doc')).status_code, 400)
+
+    def test_invalid_year_returns_400(self):
+        for year in (0, 1, 10000):
+            url = reverse('payments-statement', args=[year, 1, 'csv'])
+            self.assertEqual(self.client.get(url).status_code, 400, year)
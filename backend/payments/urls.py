@@ -2,7 +2,9 @@
 from django.urls import path
 from .views import (
     TopUpView, WithdrawView, PayoutView, WalletView, TransactionsListView,
-    CalculateCostView, TopUpSurveyView, PricingTierListView, PricingTierDetailView
+    CalculateCostView, TopUpSurveyView, PricingTierListView, PricingTierDetailView,
+    ReconciliationView, DailyFinancialReportView, GatewayWebhookView,
+    StatementExportView
 )
 
 urlpatterns = [
@@ -15,4 +17,9 @@ urlpatterns = [
     path('transactions/', TransactionsListView.as_view(), name='payments-transactions'),
     path('pricing-tiers/', PricingTierListView.as_view(), name='payments-pricing-tiers'),
     path('pricing-tier/<int:pk>/', PricingTierDetailView.as_view(), name='payments-pricing-tier-detail'),
+    path('reconciliation/', ReconciliationView.as_view(), name='payments-reconciliation'),
+    path('webhook/', GatewayWebhookView.as_view(), name='payments-webhook'),
+    path('statements/<int:year>/<int:month>/<str:format_type>/', StatementExportView.as_view(),
+         name='payments-statement'),
+    path('reports/daily/', DailyFinancialReportView.as_view(), name='payments-report-daily'),
 ]
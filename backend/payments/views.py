@@ -1,22 +1,33 @@
 # payments/views.py
 from django.db import transaction
 from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiResponse
+from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiResponse, OpenApiParameter
 from .serializers import (
     TopUpSerializer, WithdrawSerializer, PayoutSerializer,
-    WalletSerializer, TransactionSerializer, CalculateCostSerializer, SurveyTopUpSerializer,
-    PricingTierSerializer
+    WalletSerializer, TransactionSerializer, TRANSACTION_ROWS, CalculateCostSerializer, SurveyTopUpSerializer,
+    PricingTierSerializer, ReconciliationRunSerializer, ReconciliationDiscrepancySerializer,
+    DailyReportSerializer, GatewayNotificationSerializer
 )
-from .models import Wallet, PaymentTransaction, PricingTier, SurveyAccount
-from surveys.models import Surveys, RespondentSurveyStatus,SurveyQuestions
+from .models import PaymentTransaction, PricingTier, SurveyAccount, ReconciliationRun
+from .reconciliation import run_reconciliation
+from .services import get_or_create_wallet, perform_payout, PayoutError
+from .gateway import submit_to_gateway, verify_signature, record_notification, SIGNATURE_HEADER
+from .rollups import daily_report, REPORT_MIN_DATE, REPORT_MAX_DAYS
+from . import statements
+from core.renderers import LIST_RENDERERS
+from surveys.models import Surveys, SurveyQuestions
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from ranged_response import RangedFileResponse
 
+from datetime import MAXYEAR, MINYEAR, date, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 from django.db.models import F
 
@@ -24,14 +35,6 @@ from django.db.models import F
 User = get_user_model()
 
 
-# -----------------------------
-# Помощник: получить или создать кошелёк
-# -----------------------------
-def get_or_create_wallet(user):
-    wallet, _ = Wallet.objects.get_or_create(user=user, defaults={'balance': Decimal('0.00')})
-    return wallet
-
-
 # -----------------------------
 # 1) Пополнение баланса (Top-up)
 # POST /api/payments/top-up/
@@ -47,12 +50,12 @@ class TopUpView(APIView):
             "- `payment_token` — токен/криптограмма карты/идентификатор платежа от фронта;\n"
             "- `return_url` — callback/redirect URL после 3DS;\n"
             "- `metadata` — произвольный JSON с данными транзакции.\n\n"
-            "Логика: создаём запись PaymentTransaction со статусом `pending`. "
-            "После успешного подтверждения платежного провайдера пометить транзакцию `success` и обновить кошелёк."
+            "Логика: создаём запись PaymentTransaction со статусом `pending`, отправляем запрос в платёжный шлюз "
+            "в фоне и сразу отвечаем `202`. Кошелёк пополняется, когда шлюз подтвердит платёж через webhook."
         ),
         request=TopUpSerializer,
         responses={
-            200: inline_serializer(
+            202: inline_serializer(
                 name='TopUpResponse',
                 fields={
                     'transaction_id': serializers.IntegerField(),
@@ -73,38 +76,27 @@ class TopUpView(APIView):
         amount = Decimal(data['amount'])
         currency = data.get('currency', 'RUB')
         description = data.get('description', '')
+        gateway_request = {k: v for k, v in data.items() if k in ('payment_token', 'metadata', 'return_url')}
 
-        # Создаём транзакцию в базе
-        tx = PaymentTransaction.objects.create(
-            user=user,
-            type='topup',
-            status='pending',
-            amount=amount,
-            currency=currency,
-            description=description,
-            gateway_data={'request': {k: v for k, v in data.items() if k in ('payment_token','metadata','return_url')}}
-        )
-
-        # NOTE: здесь интеграция с CloudPayments:
-        #  - отправляем payment_token на CloudPayments, получаем ответ,
-        #  - если success => tx.mark_success(gateway_data=resp), wallet.deposit(...)
-        #  - если pending (3ds) => вернуть ссылку/инструкции фронту
-        #
-        # Для тестовой реализации — принимаем платеж как успешный автоматически:
-        try:
-            with transaction.atomic():
-                wallet = get_or_create_wallet(user)
-                wallet.deposit(amount)
-                tx.mark_success(gateway_data={'simulated': True, 'received_at': timezone.now().isoformat()})
-        except Exception as e:
-            tx.mark_failed(gateway_data={'error': str(e)})
-            return Response({'detail': 'Ошибка при обработке пополнения', 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        with transaction.atomic():
+            # Создаём транзакцию в базе; результат придёт от шлюза на webhook
+            tx = PaymentTransaction.objects.create(
+                user=user,
+                type='topup',
+                status='pending',
+                amount=amount,
+                currency=currency,
+                description=description,
+                gateway_data={'request': gateway_request}
+            )
+            submit_to_gateway(tx, gateway_request)
 
+        wallet = get_or_create_wallet(user)
         return Response({
             'transaction_id': tx.transaction_id,
             'status': tx.status,
             'balance': str(wallet.balance)
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 # -----------------------------
@@ -121,11 +113,13 @@ class WithdrawView(APIView):
             "Поля:\n"
             "- amount: сумма вывода\n"
             "- destination: реквизиты (например, номер карты)\n\n"
-            "Логика: если на кошельке достаточно средств — создаём транзакцию withdraw со статусом `pending`.\n"
-            "В реальной интеграции: отправлять запрос в платёжный провайдер для исполнения выплаты.\n"
+            "Логика: если на кошельке достаточно средств — сумма сразу удерживается с кошелька, "
+            "создаётся транзакция withdraw со статусом `pending`, запрос уходит в платёжный шлюз в фоне, ответ `202`.\n"
+            "Если шлюз отклонит вывод или результат так и не придёт (см. resubmit_gateway_requests), "
+            "удержанная сумма вернётся на кошелёк.\n"
         ),
         request=WithdrawSerializer,
-        responses={200: TransactionSerializer},
+        responses={202: TransactionSerializer},
         tags=['Платежи']
     )
     def post(self, request):
@@ -140,31 +134,24 @@ class WithdrawView(APIView):
 
         wallet = get_or_create_wallet(user)
 
-        # Проверка баланса
-        if wallet.balance < amount:
-            return Response({'detail': 'Недостаточно средств'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Создаём транзакцию и переводим в pending (реальное списание — после подтверждения провайдера)
-        tx = PaymentTransaction.objects.create(
-            user=user,
-            type='withdraw',
-            status='pending',
-            amount=amount,
-            currency=wallet.currency,
-            description=description,
-            gateway_data={'destination': destination}
-        )
-
-        # Для простоты — сразу подтверждаем и списываем (в реальном — ждать провайдера)
         try:
             with transaction.atomic():
-                wallet.withdraw(amount)
-                tx.mark_success(gateway_data={'simulated': True, 'sent_to': destination, 'processed_at': timezone.now().isoformat()})
-        except Exception as e:
-            tx.mark_failed(gateway_data={'error': str(e)})
-            return Response({'detail': 'Ошибка при обработке вывода', 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                # Удерживаем сумму (проверка баланса — под блокировкой кошелька)
+                wallet = wallet.withdraw(amount)
+                tx = PaymentTransaction.objects.create(
+                    user=user,
+                    type='withdraw',
+                    status='pending',
+                    amount=amount,
+                    currency=wallet.currency,
+                    description=description,
+                    gateway_data={'destination': destination, 'hold': True}
+                )
+                submit_to_gateway(tx, {'destination': destination})
+        except ValueError:
+            return Response({'detail': 'Недостаточно средств'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(TransactionSerializer(tx).data, status=status.HTTP_200_OK)
+        return Response(TransactionSerializer(tx).data, status=status.HTTP_202_ACCEPTED)
 
 
 # -----------------------------
@@ -206,81 +193,10 @@ class PayoutView(APIView):
         respondent = request.user
         survey = get_object_or_404(Surveys, pk=survey_id)
 
-        if getattr(respondent, "role", None) != "respondent":
-            return Response({"detail": "Только респонденты могут запрашивать выплаты"},
-                            status=status.HTTP_403_FORBIDDEN)
-
         try:
-            rs = RespondentSurveyStatus.objects.get(survey=survey, respondent=respondent)
-        except RespondentSurveyStatus.DoesNotExist:
-            return Response({"detail": "Респондент не участвовал в этом опросе"}, status=status.HTTP_404_NOT_FOUND)
-
-        if rs.status != "completed":
-            return Response({"detail": "Опрос должен быть завершён перед выплатой"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Определяем сумму выплаты одному респонденту.
-        # Возможные случаи:
-        # - Если survey.cost сохранён как TOTAL (price_per_survey * max_residents * 1.10),
-        #   то вычисляем price_per_survey = survey.cost / (max_residents * 1.10)
-        # - Если survey.cost уже хранит цену за одного респондента — используем её.
-        if survey.cost is None or survey.cost <= Decimal('0.00'):
-            return Response({"detail": "Для опроса не задана корректная сумма (cost)"},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        # Требуем max_residents, чтобы корректно понять структуру cost
-        if not survey.max_residents or survey.max_residents <= 0:
-            return Response({"detail": "У опроса не задан max_residents"}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            # Предполагаем, что survey.cost == total (price_per_survey * max_residents * 1.10)
-            price_per_survey = survey.cost
-        except Exception:
-            # fallback: если расчёт не прошёл, используем survey.cost как сумму выплаты (на случай несовместимости)
-            price_per_survey = Decimal(survey.cost).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-        payout_amount = price_per_survey
-        if payout_amount <= Decimal('0.00'):
-            return Response({"detail": "Вычисленная сумма выплаты некорректна"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Проверяем, что выплату не делали раньше
-        already = PaymentTransaction.objects.filter(
-            type="payout",
-            related_survey_id=survey_id,
-            related_respondent_id=respondent.id,
-            status="success",
-        ).exists()
-        if already:
-            return Response({"detail": "Выплата за этот опрос уже была выполнена"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Берём счёт опроса
-        survey_acc, _ = SurveyAccount.objects.get_or_create(survey=survey, defaults={'currency': 'RUB'})
-
-        if survey_acc.balance < payout_amount:
-            return Response({'detail': 'На счёте опроса недостаточно средств'}, status=status.HTTP_400_BAD_REQUEST)
-
-        wallet_respondent = get_or_create_wallet(respondent)
-
-        with transaction.atomic():
-            tx = PaymentTransaction.objects.create(
-                user=respondent,
-                type='payout',
-                status='pending',
-                amount=payout_amount,
-                currency=survey_acc.currency,
-                description=description or f"Выплата за опрос '{survey.name}'",
-                related_survey_id=survey_id,
-                related_respondent_id=respondent.id
-            )
-
-            # перевод
-            survey_acc.withdraw(payout_amount)
-            wallet_respondent.deposit(payout_amount)
-
-            tx.mark_success(gateway_data={
-                'from_survey_account': survey.survey_id,
-                'to_respondent': respondent.email,
-                'transferred_at': timezone.now().isoformat()
-            })
+            tx, survey_acc, wallet_respondent = perform_payout(survey, respondent, description)
+        except PayoutError as e:
+            return Response({"detail": e.detail}, status=e.status_code)
 
         return Response({
             "transaction_id": tx.transaction_id,
@@ -311,6 +227,7 @@ class WalletView(APIView):
 
 class TransactionsListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = LIST_RENDERERS
 
     @extend_schema(
         summary="Список транзакций текущего пользователя (для респондента и заказчика)",
@@ -339,7 +256,7 @@ class TransactionsListView(APIView):
 
         qs = qs.order_by('-created_at')
 
-        return Response(TransactionSerializer(qs, many=True).data)
+        return Response(TRANSACTION_ROWS.rows(qs))
 
 class CalculateCostView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -549,4 +466,215 @@ class PricingTierDetailView(APIView):
         serializer.is_valid(raise_exception=True)
         with transaction.atomic():
             serializer.save()
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+# -----------------------------
+# 5) Сверка балансов с журналом транзакций
+# GET  /api/payments/reconciliation/ -> последний отчёт (или ?run_id=)
+# POST /api/payments/reconciliation/ -> запустить сверку
+# -----------------------------
+class ReconciliationView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        summary="Отчёт сверки балансов (только модератор)",
+        description=(
+            "Возвращает результаты последней (или указанной через `run_id`) сверки "
+            "Wallet.balance / SurveyAccount.balance с суммой успешных транзакций.\n\n"
+            "Список расхождений ограничивается параметром `limit` (по умолчанию 500)."
+        ),
+        responses={200: inline_serializer(name='ReconciliationReport', fields={
+            'run': ReconciliationRunSerializer(),
+            'discrepancies': ReconciliationDiscrepancySerializer(many=True),
+        })},
+        tags=['Платежи']
+    )
+    def get(self, request):
+        if getattr(request.user, 'role', None) != 'moderator':
+            return Response({'detail': 'Доступ запрещён'}, status=status.HTTP_403_FORBIDDEN)
+
+        run_id = request.query_params.get('run_id')
+        if run_id:
+            try:
+                run_id = int(run_id)
+            except ValueError:
+                return Response({'detail': 'run_id должен быть числом'}, status=status.HTTP_400_BAD_REQUEST)
+            run = get_object_or_404(ReconciliationRun, pk=run_id)
+        else:
+            run = ReconciliationRun.objects.first()
+            if run is None:
+                return Response({'detail': 'Сверка ещё не запускалась'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            limit = int(request.query_params.get('limit', 500))
+        except ValueError:
+            return Response({'detail': 'limit должен быть числом'}, status=status.HTTP_400_BAD_REQUEST)
+
+        discrepancies = run.discrepancies.order_by('account_type', 'account_ref')[:max(limit, 0)]
+        return Response({
+            'run': ReconciliationRunSerializer(run).data,
+            'discrepancies': ReconciliationDiscrepancySerializer(discrepancies, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Запустить сверку балансов (только модератор)",
+        description=(
+            "Синхронно выполняет сверку и возвращает сводку. "
+            "Для больших объёмов используйте команду `manage.py reconcile_ledger`."
+        ),
+        request=None,
+        responses={201: ReconciliationRunSerializer},
+        tags=['Платежи']
+    )
+    def post(self, request):
+        if getattr(request.user, 'role', None) != 'moderator':
+            return Response({'detail': 'Доступ запрещён'}, status=status.HTTP_403_FORBIDDEN)
+        run = run_reconciliation()
+        return Response(ReconciliationRunSerializer(run).data, status=status.HTTP_201_CREATED)
+
+
+# -----------------------------
+# 6) Финансовые отчёты по дням (комиссии, пополнения, выплаты, возвраты)
+# GET /api/payments/reports/daily/?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD&type=&currency=&survey_id=
+# -----------------------------
+class DailyFinancialReportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        summary="Дневной финансовый отчёт (только модератор)",
+        description=(
+            "Суммы успешных транзакций по дням и типам за диапазон дат. "
+            "Закрытые дни берутся из предагрегированных DailyFinancialRollup, "
+            "дни после watermark (включая сегодня) — из журнала транзакций.\n\n"
+            "По умолчанию — последние 30 дней. Даты — не раньше 2000-01-01 и не позже завтрашнего дня, "
+            f"диапазон — не длиннее {REPORT_MAX_DAYS} дней."
+        ),
+        parameters=[
+            OpenApiParameter(name='date_from', type=str, required=False, description="YYYY-MM-DD"),
+            OpenApiParameter(name='date_to', type=str, required=False, description="YYYY-MM-DD"),
+            OpenApiParameter(name='type', type=str, required=False,
+                             enum=[c[0] for c in PaymentTransaction.TYPE_CHOICES]),
+            OpenApiParameter(name='currency', type=str, required=False),
+            OpenApiParameter(name='survey_id', type=int, required=False),
+        ],
+        responses={200: DailyReportSerializer},
+        tags=['Платежи']
+    )
+    def get(self, request):
+        if getattr(request.user, 'role', None) != 'moderator':
+            return Response({'detail': 'Доступ запрещён'}, status=status.HTTP_403_FORBIDDEN)
+
+        params = request.query_params
+        today = timezone.localdate()
+        # parse_date: None для чужого формата, ValueError для несуществующей даты (2024-02-30)
+        try:
+            date_to = parse_date(params['date_to']) if params.get('date_to') else today
+            date_from = parse_date(params['date_from']) if params.get('date_from') else None
+        except ValueError:
+            date_to = None
+        if date_to is None or (params.get('date_from') and date_from is None):
+            return Response({'detail': 'Даты должны быть в формате YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        max_date = today + timedelta(days=1)
+        if not REPORT_MIN_DATE <= date_to <= max_date or (date_from and date_from < REPORT_MIN_DATE):
+            return Response({'detail': f'Даты должны быть в диапазоне {REPORT_MIN_DATE} — {max_date}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        date_from = date_from or max(date_to - timedelta(days=29), REPORT_MIN_DATE)
+        if date_from > date_to:
+            return Response({'detail': 'date_from не может быть больше date_to'}, status=status.HTTP_400_BAD_REQUEST)
+        if (date_to - date_from).days >= REPORT_MAX_DAYS:
+            return Response({'detail': f'Диапазон отчёта не может превышать {REPORT_MAX_DAYS} дней'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        tx_type = params.get('type')
+        if tx_type and tx_type not in dict(PaymentTransaction.TYPE_CHOICES):
+            return Response({'detail': 'Недопустимый тип транзакции'}, status=status.HTTP_400_BAD_REQUEST)
+
+        survey_id = params.get('survey_id')
+        if survey_id is not None:
+            try:
+                survey_id = int(survey_id)
+            except ValueError:
+                return Response({'detail': 'survey_id должен быть числом'}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = daily_report(date_from, date_to, tx_type=tx_type,
+                              currency=params.get('currency'), survey_id=survey_id)
+        report.update({'date_from': date_from, 'date_to': date_to})
+        return Response(DailyReportSerializer(report).data, status=status.HTTP_200_OK)
+
+
+# -----------------------------
+# Webhook платёжного шлюза
+# POST /api/payments/webhook/
+# -----------------------------
+class GatewayWebhookView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(
+        summary="Webhook платёжного шлюза",
+        description=(
+            "Принимает уведомление шлюза о результате операции. Тело подписывается HMAC-SHA256 "
+            f"(заголовок `{SIGNATURE_HEADER}`).\n"
+            "Уведомление только сохраняется (повторы с тем же `event_id` отбрасываются); "
+            "к кошелькам оно применяется пачками фоновой задачей `apply_gateway_notifications`."
+        ),
+        request=GatewayNotificationSerializer,
+        responses={200: inline_serializer(
+            name='GatewayWebhookResponse',
+            fields={'accepted': serializers.BooleanField(), 'duplicate': serializers.BooleanField()}
+        )},
+        tags=['Платежи']
+    )
+    def post(self, request):
+        if not verify_signature(request.body, request.headers.get(SIGNATURE_HEADER)):
+            return Response({'detail': 'Неверная подпись'}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = GatewayNotificationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        _, created = record_notification(serializer.validated_data, payload=request.data)
+        return Response({'accepted': True, 'duplicate': not created}, status=status.HTTP_200_OK)
+
+
+# -----------------------------
+# Выписка по кошельку за месяц
+# GET /api/payments/statements/<year>/<month>/<csv|xlsx|pdf>/
+# -----------------------------
+class StatementExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        summary="Выписка по кошельку за месяц (CSV / XLSX / PDF)",
+        description=(
+            "Операции кошелька текущего пользователя за месяц с входящим/исходящим остатком и нарастающим балансом.\n"
+            "Остатки берутся из месячных снимков (WalletMonthlySnapshot). Выписки закрытых месяцев кэшируются "
+            "на диске как неизменяемые файлы и отдаются с поддержкой `Range`; текущий месяц строится на лету."
+        ),
+        responses={200: OpenApiResponse(description="Файл выписки")},
+        tags=['Платежи']
+    )
+    def get(self, request, year: int, month: int, format_type: str):
+        if format_type not in statements.FORMATS:
+            return Response({"detail": "Неподдерживаемый формат"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= month <= 12:
+            return Response({"detail": "Некорректный месяц"}, status=status.HTTP_400_BAD_REQUEST)
+        # MINYEAR исключён: для выписки нужен и предыдущий месяц
+        if not MINYEAR < year <= MAXYEAR:
+            return Response({"detail": "Некорректный год"}, status=status.HTTP_400_BAD_REQUEST)
+        month_date = date(year, month, 1)
+        if month_date > statements.month_start(timezone.localdate()):
+            return Response({"detail": "Выписка за будущий месяц недоступна"}, status=status.HTTP_400_BAD_REQUEST)
+
+        statement = statements.build_statement(request.user.pk, month_date)
+        content_type = statements.FORMATS[format_type]
+        filename = statements.statement_filename(month_date, format_type)
+
+        if statement.closed:
+            path = statements.cached_statement_path(statement, format_type)
+            response = RangedFileResponse(request, open(path, 'rb'), content_type=content_type)
+            response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        elif format_type == 'csv':
+            response = StreamingHttpResponse(statements.stream_csv(statement), content_type=content_type)
+        else:
+            response = FileResponse(statements.render_to_tempfile(statement, format_type), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -39,7 +39,7 @@ from datetime import timedelta
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -74,10 +74,16 @@ INSTALLED_APPS = [
     'surveys',
     'AI',
     'payments',
-    'analytics'
+    'analytics',
+    'notifications',
+    'housekeeping',
+    'monitoring',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.PerformanceMiddleware',
+    'monitoring.profiling.ProfilingMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -116,6 +122,7 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_HEADERS = [
     'content-type',
     'authorization',
+    'x-profile',
 ]
 
 
@@ -175,3 +182,119 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Payments: фоновые задачи
+# https://docs.djangoproject.com/en/5.2/topics/settings/#custom-default-settings
+
+# Сколько минут ждать после окончания дня, прежде чем считать его закрытым (build_financial_rollups)
+PAYMENT_ROLLUP_SETTLE_MINUTES = 60
+
+# Outbox автоматических выплат (run_payout_dispatcher)
+PAYOUT_OUTBOX_MAX_ATTEMPTS = 8
+PAYOUT_OUTBOX_BACKOFF_SECONDS = 30
+PAYOUT_OUTBOX_BACKOFF_MAX_SECONDS = 3600
+PAYOUT_OUTBOX_LOCK_TIMEOUT_SECONDS = 300
+
+# Платёжный шлюз: запросы отправляются асинхронно, результат приходит на webhook
+# (для локальной разработки: manage.py run_gateway_stub)
+PAYMENT_GATEWAY_URL = 'http://127.0.0.1:8765/payments/'
+PAYMENT_GATEWAY_CALLBACK_URL = 'http://127.0.0.1:8000/api/payments/webhook/'
+PAYMENT_GATEWAY_SECRET = 'django-insecure-gateway-secret'
+PAYMENT_GATEWAY_TIMEOUT_SECONDS = 10
+PAYMENT_GATEWAY_SUBMIT_WORKERS = 4
+# повторная отправка pending-транзакций без результата (задача housekeeping resubmit_gateway_requests)
+PAYMENT_GATEWAY_RESUBMIT_AFTER_SECONDS = 300
+PAYMENT_GATEWAY_RESULT_TIMEOUT_SECONDS = 3600
+PAYMENT_GATEWAY_SUBMIT_MAX_ATTEMPTS = 8
+
+# Выписки по кошельку: кэш файлов закрытых месяцев и TTF-шрифт с кириллицей для PDF
+PAYMENT_STATEMENTS_ROOT = BASE_DIR / 'var' / 'statements'
+PAYMENT_STATEMENT_PDF_FONT = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+
+# Канонизация значений строковых характеристик (accounts/normalization.py)
+CHARACTERISTIC_FUZZY_THRESHOLD = 90
+CHARACTERISTIC_INDEX_TTL_SECONDS = 300
+
+# Кэш: Redis (общий для всех воркеров gunicorn), если задан REDIS_URL; иначе — память процесса
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Кэш principal для JWT-аутентификации (accounts/authentication.py)
+PRINCIPAL_CACHE_TTL_SECONDS = 60
+
+# Пул заранее отрисованных капч (accounts/captcha_pool.py, manage.py refill_captcha_pool)
+CAPTCHA_POOL_ENABLED = True
+CAPTCHA_POOL_ROOT = BASE_DIR / 'var' / 'captcha_pool'
+CAPTCHA_POOL_SIZE = 500
+CAPTCHA_POOL_ITEM_TTL_MINUTES = 60
+
+# Почта: письма ставятся в EmailOutbox и отправляются manage.py run_email_sender.
+# Для разработки: manage.py run_debug_smtp и EMAIL_HOST=127.0.0.1, EMAIL_PORT=1025
+FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'no-reply@localhost')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', '127.0.0.1')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 1025))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '') == '1'
+EMAIL_TIMEOUT = 10
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_BACKOFF_SECONDS = 30
+EMAIL_OUTBOX_BACKOFF_MAX_SECONDS = 3600
+EMAIL_OUTBOX_LOCK_TIMEOUT_SECONDS = 300
+
+# Обслуживание таблиц (housekeeping/, manage.py run_housekeeping)
+HOUSEKEEPING_IN_PROCESS = os.environ.get('HOUSEKEEPING_IN_PROCESS', '') == '1'
+HOUSEKEEPING_BATCH_SIZE = 1000
+HOUSEKEEPING_MAX_BATCHES = 50
+HOUSEKEEPING_STALE_PROGRESS_DAYS = 30
+HOUSEKEEPING_SENT_EMAIL_RETENTION_DAYS = 14
+HOUSEKEEPING_INTERVALS = {}  # имя задачи → интервал в секундах (переопределяет значение по умолчанию)
+
+# Метрики запросов (monitoring/middleware.py); statsd — только если задан хост
+MONITORING_SAMPLE_RATE = float(os.environ.get('MONITORING_SAMPLE_RATE', 0.1))
+MONITORING_WINDOW_SIZE = 1000
+MONITORING_DEFAULT_QUERY_BUDGET = 30
+MONITORING_QUERY_BUDGETS = {}  # имя view → допустимое число SQL-запросов
+MONITORING_STATSD_HOST = os.environ.get('STATSD_HOST')
+MONITORING_STATSD_PORT = int(os.environ.get('STATSD_PORT', 8125))
+MONITORING_STATSD_PREFIX = 'sociophobe'
+
+# Профилирование запросов по требованию (monitoring/profiling.py)
+MONITORING_PROFILE_ENABLED = True  # принимать подписанный заголовок
+MONITORING_PROFILE_HEADER = 'X-Profile'
+MONITORING_PROFILE_TOKEN_MAX_AGE = 3600
+MONITORING_PROFILE_SAMPLE_RATE = float(os.environ.get('MONITORING_PROFILE_SAMPLE_RATE', 0))
+MONITORING_PROFILER = 'sampling'  # 'sampling' | 'cprofile'
+MONITORING_PROFILE_INTERVAL_MS = 5
+HOUSEKEEPING_PROFILE_RETENTION_DAYS = 7
+
+# Журнал SQL-запросов по отпечаткам и планы медленных запросов (monitoring/query_log.py)
+MONITORING_QUERY_LOG_ENABLED = os.environ.get('MONITORING_QUERY_LOG_ENABLED', '1') == '1'
+MONITORING_QUERY_SAMPLE_RATE = float(os.environ.get('MONITORING_QUERY_SAMPLE_RATE', 0.01))
+MONITORING_SLOW_QUERY_MS = 200  # медленные запросы пишутся всегда, независимо от выборки
+MONITORING_SLOW_QUERY_EXPLAIN_INTERVAL = 300  # не чаще раза в N секунд на отпечаток
+MONITORING_QUERY_FLUSH_SECONDS = 30
+HOUSEKEEPING_SLOW_QUERY_RETENTION_DAYS = 14
+
+# Секции respondent_answers по диапазонам survey_id (surveys/partitioning.py, только PostgreSQL).
+# Размер диапазона не менять после миграции surveys 0004.
+SURVEYS_ANSWER_PARTITION_SIZE = 1000
+SURVEYS_ANSWER_PARTITIONS_AHEAD = 2  # сколько пустых секций держать впереди
+
+# Снимок списка вопросов опроса (surveys/definition.py). Ответ одинаков для всех
+# пользователей: общий кэш (CDN) может его хранить, но обязан перепроверять по ETag.
+SURVEYS_DEFINITION_CACHE_TTL = 24 * 60 * 60
+SURVEYS_DEFINITION_CACHE_CONTROL = 'public, no-cache'
@@ -10,4 +10,5 @@ urlpatterns = [
     path('api/AI/', include('AI.urls')),
     path('api/analytics/', include('analytics.urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/monitoring/', include('monitoring.urls')),
 ]
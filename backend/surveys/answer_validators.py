@@ -0,0 +1,171 @@
+# surveys/answer_validators.py
+"""
+Проверка ответа респондента по типу вопроса и extra_data.
+
+extra_data разбирается один раз: compile_validator() проверяет его по JSON Schema
+для типа вопроса и превращает вопрос в объект с готовыми данными (frozenset
+вариантов, границы числа, формат даты), а
+get_validator() держит его в кэше процесса по question_id. Запись кэша
+сверяется с Questions.version — QuestionUpdateView увеличивает версию и
+сбрасывает запись, так что другие процессы тоже не проверят ответ по старым
+правилам (версия приходит вместе с вопросом, который всё равно загружается).
+
+check(text) возвращает текст ошибки или None. Пустой ответ не проверяется.
+"""
+import json
+from datetime import datetime
+
+from django.utils.dateparse import parse_date, parse_datetime
+from jsonschema import Draft202012Validator
+
+from .answer_values import CHOICE_TYPES, MULTI_CHOICE_TYPES, parse_number, split_choices
+
+CACHE_SIZE = 4096
+
+# {question_id: (version, validator)}; при переполнении очищается целиком
+_cache = {}
+
+# схемы extra_data; не прошедший проверку extra_data заменяется правилами по умолчанию
+EXTRA_SCHEMAS = {
+    'choice': {
+        'type': 'object',
+        'properties': {'options': {'type': 'array', 'items': {'type': 'string'}, 'minItems': 1}},
+        'required': ['options'],
+    },
+    'likert': {'type': 'object', 'properties': {'scale': {'type': 'integer', 'minimum': 2}}},
+    'number': {'type': 'object', 'properties': {'min': {'type': 'number'}, 'max': {'type': 'number'}}},
+    'date': {'type': 'object', 'properties': {'format': {'type': 'string'}}},
+}
+_schemas = {name: Draft202012Validator(schema) for name, schema in EXTRA_SCHEMAS.items()}
+
+
+def _key(value):
+    return str(value).strip().casefold()
+
+
+class AnyAnswer:
+    __slots__ = ()
+
+    def check(self, text):
+        return None
+
+
+class ChoiceAnswer:
+    __slots__ = ('options', 'multiple')
+
+    def __init__(self, options, multiple=False):
+        self.options = frozenset(_key(option) for option in options)
+        self.multiple = multiple
+
+    def check(self, text):
+        chosen = split_choices(text, self.options) if self.multiple else [text]
+        if not all(_key(choice) in self.options for choice in chosen):
+            return "Недопустимый вариант ответа."
+        return None
+
+
+class NumberAnswer:
+    __slots__ = ('minimum', 'maximum', 'integer', 'out_of_range')
+
+    def __init__(self, minimum=None, maximum=None, integer=False, out_of_range=None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.integer = integer
+        self.out_of_range = out_of_range
+
+    def check(self, text):
+        value = parse_number(text)
+        if value is None:
+            return "Ответ должен быть числом."
+        if self.integer and not value.is_integer():
+            return "Ответ должен быть целым числом."
+        if self.minimum is not None and value < self.minimum:
+            return self.out_of_range or f"Минимальное значение: {self.minimum}."
+        if self.maximum is not None and value > self.maximum:
+            return self.out_of_range or f"Максимальное значение: {self.maximum}."
+        return None
+
+
+class DateAnswer:
+    __slots__ = ('format',)
+
+    def __init__(self, format=None):
+        self.format = format
+
+    def check(self, text):
+        if self.format:
+            try:
+                datetime.strptime(str(text).strip(), self.format)
+            except ValueError:
+                return f"Дата должна быть в формате {self.format}."
+            return None
+        text = str(text).strip()
+        try:
+            if parse_datetime(text) is not None or parse_date(text) is not None:
+                return None
+        except ValueError:
+            pass
+        return "Ответ должен быть датой."
+
+
+def _extra(question):
+    extra = question.extra_data or {}
+    if isinstance(extra, str):
+        try:
+            extra = json.loads(extra)
+        except ValueError:
+            extra = {}
+    return extra if isinstance(extra, dict) else {}
+
+
+def _conforms(schema, extra):
+    return _schemas[schema].is_valid(extra)
+
+
+def compile_validator(question):
+    """Валидатор для типа вопроса; некорректный extra_data не ужесточает проверку."""
+    kind = question.type_question
+    extra = _extra(question)
+    if kind in CHOICE_TYPES or kind in MULTI_CHOICE_TYPES:
+        if not _conforms('choice', extra):
+            return AnyAnswer()
+        return ChoiceAnswer(extra['options'], multiple=kind in MULTI_CHOICE_TYPES)
+    if kind == 'likert':
+        scale = int(extra.get('scale', 5)) if _conforms('likert', extra) else 5
+        return NumberAnswer(1, scale, integer=True, out_of_range="Значение вне допустимого диапазона шкалы.")
+    if kind in ('rating', 'number'):
+        if not _conforms('number', extra):
+            return NumberAnswer()
+        return NumberAnswer(extra.get('min'), extra.get('max'))
+    if kind in ('date', 'date_time'):
+        return DateAnswer(extra.get('format') if _conforms('date', extra) else None)
+    return AnyAnswer()
+
+
+def get_validator(question):
+    question_id = question.question_id
+    if question_id is None:
+        return compile_validator(question)
+    entry = _cache.get(question_id)
+    if entry is not None and entry[0] == question.version:
+        return entry[1]
+    validator = compile_validator(question)
+    if len(_cache) >= CACHE_SIZE:
+        _cache.clear()
+    _cache[question_id] = (question.version, validator)
+    return validator
+
+
+def validate_answer(question, text):
+    """Текст ошибки или None."""
+    if text is None or str(text).strip() == '':
+        return None
+    return get_validator(question).check(text)
+
+
+def invalidate(question_id):
+    _cache.pop(question_id, None)
+
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,139 @@
+# surveys/answer_values.py
+"""
+Разбор текстового ответа в типизированные колонки RespondentAnswers —
+при записи, чтобы аналитика агрегировала в SQL (Avg/Min/Max), а не float() в цикле:
+
+- number_value   — rating, likert, number;
+- datetime_value — date_time, date;
+- choice_key     — выбранные варианты в нижнем регистре через ';' (одиночный выбор — один вариант);
+- choice_indexes — номера выбранных вариантов из extra_data['options'] (по возрастанию).
+
+Неразборчивый ответ оставляет колонки пустыми — text_answer хранится как есть.
+"""
+import json
+import math
+from datetime import datetime, time
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import RespondentAnswers
+
+NUMBER_TYPES = ('rating', 'likert', 'number')
+DATETIME_TYPES = ('date_time', 'date')
+CHOICE_TYPES = ('single_choice', 'dropdown')
+MULTI_CHOICE_TYPES = ('multi_choice', 'checkbox')
+TYPED_FIELDS = ('number_value', 'datetime_value', 'choice_key', 'choice_indexes')
+
+
+def _options(question):
+    extra = question.extra_data or {}
+    if isinstance(extra, str):
+        try:
+            extra = json.loads(extra)
+        except ValueError:
+            extra = {}
+    options = extra.get('options') if isinstance(extra, dict) else None
+    return options if isinstance(options, list) else []
+
+
+def _normalize(value):
+    return str(value).strip().casefold()
+
+
+def parse_number(text):
+    """Конечное число или None: 'nan', 'inf', '1e400' числом не считаются."""
+    try:
+        value = float(str(text).strip().replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def parse_moment(text):
+    text = str(text).strip()
+    try:
+        moment = parse_datetime(text)
+        if moment is None:
+            day = parse_date(text)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def split_choices(text, options):
+    """
+    Выбранные варианты множественного выбора: JSON-список, иначе через ';' или ','.
+    options — список вариантов или frozenset уже нормализованных (как в answer_validators).
+    """
+    text = str(text).strip()
+    if text.startswith('['):
+        try:
+            parsed = json.loads(text)
+            if isinstance(parsed, list):
+                return [str(item) for item in parsed]
+        except ValueError:
+            pass
+    known = options if isinstance(options, frozenset) else {_normalize(option) for option in options}
+    if _normalize(text) in known:
+        return [text]
+    for separator in (';', ','):
+        parts = [part for part in (p.strip() for p in text.split(separator)) if part]
+        if len(parts) > 1 and (not known or all(_normalize(part) in known for part in parts)):
+            return parts
+    return [text]
+
+
+def typed_values(question, text):
+    """{колонка: значение} для всех TYPED_FIELDS по типу вопроса."""
+    values = dict.fromkeys(TYPED_FIELDS)
+    if text is None or str(text).strip() == '':
+        return values
+    kind = question.type_question
+    if kind in NUMBER_TYPES:
+        values['number_value'] = parse_number(text)
+    elif kind in DATETIME_TYPES:
+        values['datetime_value'] = parse_moment(text)
+    elif kind in CHOICE_TYPES or kind in MULTI_CHOICE_TYPES:
+        options = _options(question)
+        chosen = split_choices(text, options) if kind in MULTI_CHOICE_TYPES else [str(text)]
+        positions = {_normalize(option): i for i, option in enumerate(options)}
+        keys = [_normalize(choice) for choice in chosen]
+        values['choice_key'] = ';'.join(keys)[:255]
+        indexes = sorted({positions[key] for key in keys if key in positions})
+        values['choice_indexes'] = indexes or None
+    return values
+
+
+def fill(answer, question):
+    """Заполняет типизированные колонки ответа (без сохранения)."""
+    for field, value in typed_values(question, answer.text_answer).items():
+        setattr(answer, field, value)
+    return answer
+
+
+def backfill(batch_size=2000, survey_ids=None, verbose=False):
+    """
+    Пересчитывает типизированные колонки существующих ответов пачками по answer_id
+    (каждая пачка — bulk_update в своей транзакции). Возвращает число обработанных ответов.
+    """
+    answers = RespondentAnswers.objects.select_related('survey_question__question').order_by('answer_id')
+    if survey_ids:
+        answers = answers.filter(survey_id__in=survey_ids)
+    last, total = 0, 0
+    while True:
+        batch = list(answers.filter(answer_id__gt=last)[:batch_size])
+        if not batch:
+            return total
+        for answer in batch:
+            fill(answer, answer.survey_question.question)
+        with transaction.atomic():
+            RespondentAnswers.objects.bulk_update(batch, TYPED_FIELDS)
+        last = batch[-1].answer_id
+        total += len(batch)
+        if verbose:
+            print(f"[ANSWER VALUES] обработано ответов: {total}")
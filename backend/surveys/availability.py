@@ -0,0 +1,37 @@
+# surveys/availability.py
+"""
+Опросы, доступные респонденту, одним запросом.
+
+Раньше AvailableSurveysView перебирала активные опросы в Python и для каждого
+с лимитом max_residents считала респондентов отдельным запросом. Здесь те же
+условия выражены в SQL:
+- опрос активен и не истёк по date_finished;
+- у платного опроса (cost > 0) на счёте хватает на одну выплату;
+- число респондентов, уже отвечавших на опрос, меньше max_residents (если лимит задан).
+"""
+from decimal import Decimal
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Surveys, RespondentAnswers
+
+
+def available_surveys(now=None):
+    now = now or timezone.now()
+    respondents = (
+        RespondentAnswers.objects.filter(survey=OuterRef('pk'))
+        .order_by()
+        .values('survey')
+        .annotate(count=Count('respondent', distinct=True))
+        .values('count')
+    )
+    return (
+        Surveys.objects
+        .filter(status='active')
+        .filter(Q(date_finished__isnull=True) | Q(date_finished__gt=now))
+        .filter(Q(cost__isnull=True) | Q(cost__lte=Decimal('0.00')) | Q(account__balance__gte=F('cost')))
+        .annotate(respondents_count=Coalesce(Subquery(respondents, output_field=IntegerField()), 0))
+        .filter(Q(max_residents__isnull=True) | Q(max_residents=0) | Q(respondents_count__lt=F('max_residents')))
+    )
@@ -0,0 +1,72 @@
+# surveys/definition.py
+"""
+Снимок определения опроса — упорядоченный список вопросов, уже сериализованный
+в JSON, — для SurveyQuestionsListView.
+
+Снимок хранится в кэше (CACHES['default']) вместе с сильным ETag (sha1 тела),
+так что повторное открытие опроса стоит одного чтения Surveys.definition_version,
+а запрос с If-None-Match получает 304. Ключ содержит эту версию и FORMAT_VERSION:
+версия лежит в БД, поэтому её видят все воркеры и при кэше в памяти процесса,
+а снимки старых версий просто перестают читаться.
+
+Снимок пересобирается при активации опроса и при любом изменении списка
+вопросов (привязка, удаление, редактирование вопроса, импорт) — refresh()
+увеличивает версию сразу и собирает новый снимок после коммита. Изменения в обход
+этих view (админка, shell) видны не позже чем через SURVEYS_DEFINITION_CACHE_TTL.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+
+from .models import SurveyQuestions, Surveys
+from .serializers import QuestionSerializer
+
+FORMAT_VERSION = 1
+DEFINITION_CACHE_KEY = 'surveys:definition:v{format}:{survey_id}:{version}'
+
+
+def _key(survey_id, version):
+    return DEFINITION_CACHE_KEY.format(format=FORMAT_VERSION, survey_id=survey_id, version=version)
+
+
+def _version(survey_id):
+    return Surveys.objects.filter(pk=survey_id).values_list('definition_version', flat=True).first()
+
+
+def _timeout():
+    return getattr(settings, 'SURVEYS_DEFINITION_CACHE_TTL', 24 * 60 * 60)
+
+
+def compile_definition(survey_id, version=None):
+    """{'etag', 'body'} по данным из БД; None — опроса нет."""
+    version = _version(survey_id) if version is None else version
+    if version is None:
+        return None
+    links = SurveyQuestions.objects.filter(survey_id=survey_id).select_related('question').order_by('order')
+    body = JSONRenderer().render(QuestionSerializer([link.question for link in links], many=True).data)
+    snapshot = {'etag': f'"survey-{survey_id}-{hashlib.sha1(body).hexdigest()}"', 'body': body}
+    cache.set(_key(survey_id, version), snapshot, timeout=_timeout())
+    return snapshot
+
+
+def load(survey_id):
+    """Снимок текущей версии из кэша или собранный заново. None — опроса нет."""
+    version = _version(survey_id)
+    if version is None:
+        return None
+    return cache.get(_key(survey_id, version)) or compile_definition(survey_id, version)
+
+
+def refresh(*survey_ids):
+    """Новая версия снимков (сразу, для всех воркеров) и пересборка после коммита."""
+    Surveys.objects.filter(pk__in=survey_ids).update(definition_version=F('definition_version') + 1)
+
+    def rebuild():
+        for survey_id in survey_ids:
+            compile_definition(survey_id)
+
+    transaction.on_commit(rebuild)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys import partitioning
+
+
+class Command(BaseCommand):
+    help = "Секции respondent_answers по диапазонам survey_id: список, создание, отключение, удаление"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ensure', action='store_true', help="Создать секции для следующих диапазонов")
+        parser.add_argument('--detach', type=int, metavar='SURVEY_ID',
+                            help="Отключить секцию опроса (все опросы диапазона архивированы или удалены)")
+        parser.add_argument('--attach', type=int, metavar='SURVEY_ID', help="Подключить отключённую секцию опроса")
+        parser.add_argument('--drop', type=int, metavar='SURVEY_ID',
+                            help="Удалить секцию опроса (все опросы диапазона удалены)")
+
+    def handle(self, *args, **options):
+        if not partitioning.supported():
+            self.stdout.write("[PARTITIONS] СУБД без секционирования — respondent_answers обычная таблица")
+            return
+
+        if options['ensure']:
+            self.stdout.write(f"[PARTITIONS] создано секций: {partitioning.ensure_partitions()}")
+        for option, action in (('detach', partitioning.detach_range), ('drop', partitioning.drop_range)):
+            if options[option] is not None:
+                start, end = partitioning.bounds(options[option])
+                if not action(start):
+                    raise CommandError(f"Диапазон [{start}, {end}): операция невозможна — "
+                                       f"есть активные опросы или секции нет")
+                self.stdout.write(self.style.SUCCESS(f"[PARTITIONS] {option}: [{start}, {end})"))
+        if options['attach'] is not None:
+            attached = partitioning.ensure_attached(options['attach'])
+            self.stdout.write(f"[PARTITIONS] attach: {'подключена' if attached else 'уже подключена или нет секции'}")
+
+        for name, bound, attached, rows in partitioning.partitions():
+            state = bound if attached else 'ОТКЛЮЧЕНА'
+            self.stdout.write(f"[PARTITIONS] {name:<36} ~{rows:>10} строк  {state}")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from surveys.answer_values import backfill
+
+
+class Command(BaseCommand):
+    help = "Заполнение типизированных колонок ответов (число, дата, варианты выбора) из text_answer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--survey', type=int, action='append', dest='surveys',
+                            help="ID опроса (можно несколько раз); по умолчанию — все ответы")
+
+    def handle(self, *args, **options):
+        count = backfill(options['batch_size'], options['surveys'], verbose=options['verbosity'] > 1)
+        self.stdout.write(self.style.SUCCESS(f"[ANSWER VALUES] Обработано ответов: {count}"))
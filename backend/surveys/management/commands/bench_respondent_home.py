@@ -0,0 +1,97 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.authentication import issue_tokens
+from accounts.models import Users
+from payments.models import SurveyAccount, Wallet
+from surveys.models import Surveys, RespondentSurveyStatus
+
+FOUR_CALLS = [
+    '/api/surveys/available/',
+    '/api/surveys/my-progress/',
+    '/api/payments/wallet/',
+    '/api/users/me/',
+]
+HOME = '/api/surveys/home/'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Задержка главного экрана респондента: четыре запроса (available, my-progress, wallet, me) "
+        "против одного /api/surveys/home/. Синтетические данные создаются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--surveys', type=int, default=200, help="Число активных опросов")
+        parser.add_argument('--progress', type=int, default=100, help="Число прохождений респондента")
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def _measure(self, client, urls, iterations, expected=200, **headers):
+        timings = []
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                for url in urls:
+                    resp = client.get(url, **headers)
+                    assert resp.status_code == expected, f"{url} → {resp.status_code}"
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            'p50': statistics.median(timings),
+            'p95': timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0],
+            'queries': len(ctx.captured_queries) / iterations,
+        }
+
+    def _report(self, title, result):
+        self.stdout.write(f"[BENCH] {title}: p50={result['p50']:.1f} мс, p95={result['p95']:.1f} мс, "
+                          f"запросов к БД: {result['queries']:.0f}")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        customer = Users.objects.create_user(email='bench_home_c@example.com', name='C', role='customer',
+                                             password='x')
+        respondent = Users.objects.create_user(email='bench_home_r@example.com', name='R', role='respondent',
+                                               password='x')
+        surveys = Surveys.objects.bulk_create([
+            Surveys(name=f"Bench {i}", creator=customer, status='active', max_residents=50, cost=Decimal('10.00'))
+            for i in range(options['surveys'])
+        ])
+        SurveyAccount.objects.bulk_create([SurveyAccount(survey=s, balance=Decimal('1000.00')) for s in surveys])
+        RespondentSurveyStatus.objects.bulk_create([
+            RespondentSurveyStatus(respondent=respondent, survey=s, status='in_progress')
+            for s in surveys[:options['progress']]
+        ])
+        Wallet.objects.create(user=respondent, balance=Decimal('123.45'))
+
+        client = APIClient(HTTP_HOST='localhost')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(respondent).access_token}')
+        iterations = options['iterations']
+        # прогрев (кэш principal, импорт сериализаторов)
+        self._measure(client, FOUR_CALLS + [HOME], 1)
+
+        four = self._measure(client, FOUR_CALLS, iterations)
+        home = self._measure(client, [HOME], iterations)
+        etag = client.get(HOME)['ETag']
+        not_modified = self._measure(client, [HOME], iterations, expected=304, HTTP_IF_NONE_MATCH=etag)
+
+        self._report("4 запроса", four)
+        self._report("home", home)
+        self._report("home (304)", not_modified)
+        self.stdout.write(self.style.SUCCESS(f"[BENCH] ускорение p50: x{four['p50'] / home['p50']:.1f}"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='respondentsurveystatus',
+            name='status',
+            field=models.CharField(choices=[('in_progress', 'В процессе'), ('completed', 'Пройден'), ('abandoned', 'Заброшен')], default='in_progress', max_length=20),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL_BATCH = 10000
+
+
+def backfill_answer_survey(apps, schema_editor):
+    """respondent_answers.survey_id из survey_questions — диапазонами answer_id, короткими транзакциями."""
+    from django.db import transaction
+    from django.db.models import Max, OuterRef, Subquery
+
+    RespondentAnswers = apps.get_model('surveys', 'RespondentAnswers')
+    SurveyQuestions = apps.get_model('surveys', 'SurveyQuestions')
+    survey_id = Subquery(SurveyQuestions.objects.filter(pk=OuterRef('survey_question_id')).values('survey_id')[:1])
+
+    last = RespondentAnswers.objects.aggregate(last=Max('answer_id'))['last'] or 0
+    for start in range(0, last + 1, BACKFILL_BATCH):
+        with transaction.atomic(using=schema_editor.connection.alias):
+            RespondentAnswers.objects.filter(
+                answer_id__gte=start, answer_id__lt=start + BACKFILL_BATCH, survey__isnull=True
+            ).update(survey_id=survey_id)
+
+
+class Migration(migrations.Migration):
+    # заполнение идёт пачками, каждая в своей транзакции
+    atomic = False
+
+    dependencies = [
+        ('surveys', '0002_respondent_status_abandoned'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respondentanswers',
+            name='survey',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='surveys.surveys'),
+        ),
+        migrations.RunPython(backfill_answer_survey, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='respondentanswers',
+            name='survey',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='surveys.surveys'),
+        ),
+        migrations.AddIndex(
+            model_name='respondentanswers',
+            index=models.Index(fields=['survey', 'respondent'], name='answers_survey_respondent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='respondentsurveystatus',
+            index=models.Index(fields=['survey', 'status'], name='rss_survey_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='respondentsurveystatus',
+            index=models.Index(condition=models.Q(('status', 'in_progress')), fields=['updated_at'], name='rss_in_progress_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyquestions',
+            index=models.Index(fields=['survey', 'order'], name='survey_questions_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveys',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['date_finished'], name='surveys_active_finish_idx'),
+        ),
+        # одиночные индексы FK удаляются после того, как появились составные с тем же префиксом
+        migrations.AlterField(
+            model_name='respondentsurveystatus',
+            name='survey',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='respondent_statuses', to='surveys.surveys'),
+        ),
+        migrations.AlterField(
+            model_name='surveyquestions',
+            name='survey',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='survey_questions', to='surveys.surveys'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Секционирование respondent_answers по диапазонам survey_id (PostgreSQL; на других СУБД — no-op)
+
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    from surveys.partitioning import convert
+    convert(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    from surveys.partitioning import revert
+    revert(schema_editor)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY и VALIDATE CONSTRAINT — вне транзакции
+    atomic = False
+
+    dependencies = [
+        ('surveys', '0003_answers_survey_and_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
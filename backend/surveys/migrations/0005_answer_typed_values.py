@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0004_partition_respondent_answers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respondentanswers',
+            name='choice_indexes',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='respondentanswers',
+            name='choice_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='respondentanswers',
+            name='datetime_value',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='respondentanswers',
+            name='number_value',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
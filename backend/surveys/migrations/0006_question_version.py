@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0005_answer_typed_values'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questions',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
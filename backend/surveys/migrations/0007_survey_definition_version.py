@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0006_question_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveys',
+            name='definition_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
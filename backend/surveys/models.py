@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 from django.utils import timezone
 from django.core.serializers.json import DjangoJSONEncoder
@@ -32,10 +33,16 @@ class Surveys(models.Model):
         blank=True,
         help_text="Стоимость (или вознаграждение) за прохождение опроса"
     )
+    # версия снимка списка вопросов (surveys/definition.py): общая для всех воркеров, в отличие от кэша
+    definition_version = models.PositiveIntegerField(default=1)
 
     class Meta:
         db_table = 'surveys'
         managed = True
+        indexes = [
+            # доступные опросы: только активные, фильтр по сроку окончания
+            models.Index(fields=['date_finished'], condition=Q(status='active'), name='surveys_active_finish_idx'),
+        ]
 
     def is_active(self):
         if self.status != 'active':
@@ -61,6 +68,8 @@ class Questions(models.Model):
     text_question = models.TextField()
     type_question = models.CharField(max_length=50, choices=QUESTION_TYPES, default='text')
     extra_data = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    # увеличивается при редактировании — по ней сверяется кэш валидаторов ответа (answer_validators.py)
+    version = models.PositiveIntegerField(default=1)
 
     class Meta:
         db_table = 'questions'
@@ -68,7 +77,8 @@ class Questions(models.Model):
 
 class SurveyQuestions(models.Model):
     survey_question_id = models.AutoField(primary_key=True)
-    survey = models.ForeignKey(Surveys, on_delete=models.CASCADE, related_name='survey_questions')
+    # отдельный индекс не нужен: survey — префикс unique (survey, question) и (survey, order)
+    survey = models.ForeignKey(Surveys, on_delete=models.CASCADE, related_name='survey_questions', db_index=False)
     question = models.ForeignKey(Questions, on_delete=models.CASCADE, related_name='survey_questions')
     order = models.IntegerField(default=0)
 
@@ -76,18 +86,39 @@ class SurveyQuestions(models.Model):
         db_table = 'survey_questions'
         managed = True
         unique_together = ('survey', 'question')
+        indexes = [
+            models.Index(fields=['survey', 'order'], name='survey_questions_order_idx'),
+        ]
 
 class RespondentAnswers(models.Model):
     answer_id = models.AutoField(primary_key=True)
     survey_question = models.ForeignKey(SurveyQuestions, on_delete=models.CASCADE, related_name='answers')
+    # копия survey_question.survey: выборки ответов по опросу без JOIN с survey_questions
+    survey = models.ForeignKey(Surveys, on_delete=models.CASCADE, related_name='answers', db_index=False)
     respondent = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     text_answer = models.TextField(null=True, blank=True)
+    # разобранный text_answer (surveys/answer_values.py) — для агрегатов в SQL
+    number_value = models.FloatField(null=True, blank=True)
+    datetime_value = models.DateTimeField(null=True, blank=True)
+    choice_key = models.CharField(max_length=255, null=True, blank=True)
+    choice_indexes = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'respondent_answers'
         managed = True
         unique_together = ('survey_question', 'respondent')
+        indexes = [
+            models.Index(fields=['survey', 'respondent'], name='answers_survey_respondent_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # bulk_create обходит save() — там survey и типизированные колонки нужно заполнять явно
+        from .answer_values import fill
+        if self.survey_id is None:
+            self.survey_id = self.survey_question.survey_id
+        fill(self, self.survey_question.question)
+        super().save(*args, **kwargs)
 
 class SurveyArchive(models.Model):
     """
@@ -105,7 +136,10 @@ class RespondentSurveyStatus(models.Model):
     STATUS_CHOICES = [
         ('in_progress', 'В процессе'),
         ('completed', 'Пройден'),
+        ('abandoned', 'Заброшен'),
     ]
+    # статусы, которые выставляет сам респондент; `abandoned` ставит housekeeping
+    CLIENT_STATUSES = ('in_progress', 'completed')
 
     id = models.AutoField(primary_key=True)
     respondent = models.ForeignKey(
@@ -116,7 +150,8 @@ class RespondentSurveyStatus(models.Model):
     survey = models.ForeignKey(
         Surveys,
         on_delete=models.CASCADE,
-        related_name='respondent_statuses'
+        related_name='respondent_statuses',
+        db_index=False,  # префикс индекса (survey, status)
     )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     score = models.FloatField(
@@ -130,6 +165,11 @@ class RespondentSurveyStatus(models.Model):
         db_table = 'respondent_survey_status'
         managed = True
         unique_together = ('respondent', 'survey')
+        indexes = [
+            models.Index(fields=['survey', 'status'], name='rss_survey_status_idx'),
+            # housekeeping: зависшие прохождения
+            models.Index(fields=['updated_at'], condition=Q(status='in_progress'), name='rss_in_progress_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.respondent} — {self.survey.name}: {self.status} ({self.score if self.score is not None else 'нет оценки'})"
@@ -0,0 +1,312 @@
+# surveys/partitioning.py
+"""
+Секционирование respondent_answers по диапазонам survey_id (только PostgreSQL).
+
+Секция respondent_answers_p<start> хранит ответы опросов
+[start, start + SURVEYS_ANSWER_PARTITION_SIZE); запросы с фильтром по survey
+(аналитика, экспорт, удаление опроса) читают и блокируют одну секцию.
+Ответы, существовавшие до миграции, остаются в respondent_answers_legacy —
+она подключена как первая секция (MINVALUE, граница), данные не копируются.
+Секция DEFAULT ловит вставки за последней границей; ensure_partitions()
+(задача housekeeping answer_partitions) заранее создаёт следующие секции.
+
+Секцию, все опросы которой архивированы или удалены, можно отключить
+(detach_range) — таблица остаётся в БД, чтение и блокировки её больше не
+затрагивают; восстановление опроса из архива подключает её обратно.
+
+На других СУБД (SQLite в тестах) таблица обычная, все функции — no-op.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+
+TABLE = 'respondent_answers'
+LEGACY = 'respondent_answers_legacy'
+DEFAULT = 'respondent_answers_default'
+
+
+def partition_size():
+    return getattr(settings, 'SURVEYS_ANSWER_PARTITION_SIZE', 1000)
+
+
+def supported(conn=None):
+    return (conn or connection).vendor == 'postgresql'
+
+
+def bounds(survey_id):
+    """Границы секции [start, end) для опроса."""
+    size = partition_size()
+    start = survey_id // size * size
+    return start, start + size
+
+
+def partition_name(start):
+    return f'{TABLE}_p{start}'
+
+
+def create_partition_sql(start):
+    return (f'CREATE TABLE IF NOT EXISTS "{partition_name(start)}" PARTITION OF "{TABLE}" '
+            f'FOR VALUES FROM ({start}) TO ({start + partition_size()})')
+
+
+def _fetch(cursor, sql, params=None):
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def _attached(cursor):
+    """{имя секции: выражение границ} для подключённых секций."""
+    return dict(_fetch(cursor, """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, [TABLE]))
+
+
+def _is_partitioned(cursor):
+    return bool(_fetch(cursor, "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE]))
+
+
+# --- миграция ---------------------------------------------------------------------------------
+
+def convert(schema_editor):
+    """
+    Перевод обычной таблицы в секционированную без копирования данных.
+    Долгие шаги (индексы CONCURRENTLY, VALIDATE CONSTRAINT) не блокируют запись;
+    под ACCESS EXCLUSIVE — только переименование, замена ключей на готовые индексы
+    и подключение (без сканирования таблицы и построения индексов).
+    Каждый шаг повторяем: после сбоя миграцию можно просто запустить снова.
+    """
+    conn = schema_editor.connection
+    if not supported(conn):
+        return
+    with conn.cursor() as cursor:
+        if not _is_partitioned(cursor):
+            _prepare(cursor)
+            _swap(cursor, conn.alias)
+    ensure_partitions(conn=conn)
+
+
+def _prepare(cursor):
+    """Уникальные индексы и ограничение границ для будущей секции — без блокировки записи."""
+    # индексы, из которых в _swap() получатся PRIMARY KEY и UNIQUE секции
+    for name, columns in ((f'{LEGACY}_pk_idx', 'answer_id, survey_id'),
+                          (f'{LEGACY}_uniq_idx', 'survey_question_id, respondent_id, survey_id')):
+        # прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс — строим заново
+        if _fetch(cursor, "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(%s) AND NOT indisvalid", [name]):
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+        cursor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{TABLE}" ({columns})')
+
+    # ограничение границ: после VALIDATE подключение секции не сканирует таблицу
+    last = _fetch(cursor, f'SELECT GREATEST((SELECT COALESCE(MAX(survey_id), 0) FROM "{TABLE}"), '
+                          f'(SELECT COALESCE(MAX(survey_id), 0) FROM surveys))')[0][0]
+    _, legacy_end = bounds(last)
+    current = _bounds_check_end(cursor)
+    if current is not None and current < legacy_end:
+        # с прошлого запуска появились опросы за старой границей
+        cursor.execute(f'ALTER TABLE "{TABLE}" DROP CONSTRAINT "{LEGACY}_bounds"')
+        current = None
+    if current is None:
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{LEGACY}_bounds" '
+                       f'CHECK (survey_id IS NOT NULL AND survey_id < {legacy_end}) NOT VALID')
+    cursor.execute(f'ALTER TABLE "{TABLE}" VALIDATE CONSTRAINT "{LEGACY}_bounds"')
+
+
+def _bounds_check_end(cursor):
+    """Верхняя граница survey_id из ограничения {LEGACY}_bounds; None — ограничения нет."""
+    rows = _fetch(cursor, "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+                          "WHERE conrelid = %s::regclass AND conname = %s", [TABLE, f'{LEGACY}_bounds'])
+    if not rows:
+        return None
+    # CHECK (((survey_id IS NOT NULL) AND (survey_id < N)))
+    return int(rows[0][0].rsplit('<', 1)[1].strip(' ()'))
+
+
+def _swap(cursor, alias):
+    """Переименование и подключение старой таблицы как секции — одна короткая транзакция."""
+    # определения снимаются до переименования — с исходными именами, для родительской таблицы
+    index_defs = _fetch(cursor, """
+        SELECT i.relname, pg_get_indexdef(x.indexrelid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass AND NOT x.indisprimary AND NOT x.indisunique
+    """, [TABLE])
+    foreign_keys = _fetch(cursor, """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+    """, [TABLE])
+    # первичный ключ (answer_id) и unique_together (survey_question_id, respondent_id) без survey_id
+    old_keys = [name for (name,) in _fetch(cursor, """
+        SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u')
+    """, [TABLE])]
+    legacy_end = _bounds_check_end(cursor)
+
+    with transaction.atomic(using=alias):
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY}"')
+        # PRIMARY KEY и UNIQUE родителя подхватываются при подключении, только если у секции
+        # есть такие же ограничения: делаем их из готовых индексов, без построения под блокировкой
+        for name in old_keys:
+            cursor.execute(f'ALTER TABLE "{LEGACY}" DROP CONSTRAINT "{name}"')
+        cursor.execute(f'ALTER TABLE "{LEGACY}" ADD CONSTRAINT "{LEGACY}_pkey" '
+                       f'PRIMARY KEY USING INDEX "{LEGACY}_pk_idx"')
+        cursor.execute(f'ALTER TABLE "{LEGACY}" ADD CONSTRAINT "{LEGACY}_answer_uniq" '
+                       f'UNIQUE USING INDEX "{LEGACY}_uniq_idx"')
+        # имена индексов общие для схемы: старые уступают имена индексам родителя
+        for name, _ in index_defs:
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:50]}_legacy"')
+        cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY}" INCLUDING DEFAULTS) PARTITION BY RANGE (survey_id)')
+        _share_sequence(cursor)
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (answer_id, survey_id)')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_answer_uniq" '
+                       f'UNIQUE (survey_question_id, respondent_id, survey_id)')
+        # те же внешние ключи и индексы: при подключении секции существующие у неё подхватываются
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+        for _, definition in index_defs:
+            cursor.execute(definition)
+        cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{LEGACY}" '
+                       f'FOR VALUES FROM (MINVALUE) TO ({legacy_end})')
+        cursor.execute(f'CREATE TABLE "{DEFAULT}" PARTITION OF "{TABLE}" DEFAULT')
+
+
+def _share_sequence(cursor):
+    """
+    answer_id всех секций — из одной последовательности, принадлежащей родителю.
+    IDENTITY старой таблицы (Django ≥ 4.1) заменяется обычной последовательностью
+    с тем же текущим значением; таблица в этот момент заблокирована переименованием.
+    """
+    sequence = f'{TABLE}_answer_id_seq'
+    identity = _fetch(cursor, "SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass "
+                              "AND attname = 'answer_id'", [LEGACY])[0][0]
+    if identity:
+        current = _fetch(cursor, f"""
+            SELECT GREATEST(
+                (SELECT COALESCE(MAX(answer_id), 0) FROM "{LEGACY}"),
+                (SELECT last_value FROM {_fetch(cursor, "SELECT pg_get_serial_sequence(%s, 'answer_id')", [LEGACY])[0][0]})
+            )
+        """)[0][0]
+        cursor.execute(f'ALTER TABLE "{LEGACY}" ALTER COLUMN answer_id DROP IDENTITY')
+        cursor.execute(f'CREATE SEQUENCE "{sequence}"')
+        cursor.execute("SELECT setval(%s, %s)", [sequence, max(current, 1)])
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN answer_id SET DEFAULT nextval(\'"{sequence}"\'::regclass)')
+        cursor.execute(f'ALTER TABLE "{LEGACY}" ALTER COLUMN answer_id SET DEFAULT nextval(\'"{sequence}"\'::regclass)')
+    # serial: LIKE ... INCLUDING DEFAULTS уже перенёс nextval(); владелец — родитель
+    cursor.execute(f'ALTER SEQUENCE "{sequence}" OWNED BY "{TABLE}".answer_id')
+
+
+def revert(schema_editor):
+    if supported(schema_editor.connection):
+        from django.db.migrations.exceptions import IrreversibleError
+        raise IrreversibleError("Секционирование respondent_answers не откатывается автоматически")
+
+
+# --- обслуживание -----------------------------------------------------------------------------
+
+def ensure_partitions(ahead=None, conn=None):
+    """
+    Создаёт секции от последней существующей до опроса max(survey_id) + ahead диапазонов.
+    Строки, попавшие в DEFAULT в диапазон новой секции, переносятся в неё.
+    Возвращает число созданных секций.
+    """
+    conn = conn or connection
+    if not supported(conn):
+        return 0
+    ahead = getattr(settings, 'SURVEYS_ANSWER_PARTITIONS_AHEAD', 2) if ahead is None else ahead
+    size = partition_size()
+    created = 0
+    with conn.cursor() as cursor:
+        if not _is_partitioned(cursor):
+            return 0
+        last_survey = _fetch(cursor, 'SELECT COALESCE(MAX(survey_id), 0) FROM surveys')[0][0]
+        existing = {name for name in _attached(cursor)} | {
+            name for (name,) in _fetch(cursor, "SELECT tablename FROM pg_tables WHERE tablename LIKE %s",
+                                       [f'{TABLE}\\_p%'])
+        }
+        start = _legacy_end(cursor)
+        target = bounds(last_survey)[0] + ahead * size
+        while start <= target:
+            if partition_name(start) not in existing:
+                with transaction.atomic(using=conn.alias):
+                    _create_with_default_rows(cursor, start)
+                created += 1
+            start += size
+    return created
+
+
+def _legacy_end(cursor):
+    bound = _attached(cursor).get(LEGACY)
+    if not bound:
+        return 0
+    # FOR VALUES FROM (MINVALUE) TO (N)
+    return int(bound.rsplit('(', 1)[1].rstrip(')'))
+
+
+def _create_with_default_rows(cursor, start):
+    end = start + partition_size()
+    moved = _fetch(cursor, f'SELECT 1 FROM "{DEFAULT}" WHERE survey_id >= %s AND survey_id < %s LIMIT 1',
+                   [start, end])
+    if not moved:
+        cursor.execute(create_partition_sql(start))
+        return
+    # новая секция не создаётся, пока в DEFAULT есть её строки: временно отключаем DEFAULT
+    cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT}"')
+    cursor.execute(create_partition_sql(start))
+    cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{DEFAULT}" WHERE survey_id >= %s AND survey_id < %s',
+                   [start, end])
+    cursor.execute(f'DELETE FROM "{DEFAULT}" WHERE survey_id >= %s AND survey_id < %s', [start, end])
+    cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{DEFAULT}" DEFAULT')
+
+
+def partitions():
+    """[(имя секции, границы, подключена, примерное число строк)]."""
+    if not supported():
+        return []
+    with connection.cursor() as cursor:
+        if not _is_partitioned(cursor):
+            return []
+        attached = _attached(cursor)
+        rows = _fetch(cursor, "SELECT relname, GREATEST(reltuples, 0)::bigint FROM pg_class "
+                              "WHERE relkind = 'r' AND (relname LIKE %s OR relname IN (%s, %s)) ORDER BY relname",
+                      [f'{TABLE}\\_p%', LEGACY, DEFAULT])
+    return [(name, attached.get(name), name in attached, count) for name, count in rows]
+
+
+def _range_releasable(start):
+    """Все опросы диапазона удалены или в архиве — ответы секции больше не читаются."""
+    from .models import Surveys
+    return not Surveys.objects.filter(
+        survey_id__gte=start, survey_id__lt=start + partition_size(), archived_copy__isnull=True
+    ).exists()
+
+
+def detach_range(start):
+    """Отключает секцию диапазона. False — в диапазоне есть неархивированные опросы или секции нет."""
+    if not supported() or not _range_releasable(start):
+        return False
+    with connection.cursor() as cursor:
+        if partition_name(start) not in _attached(cursor):
+            return False
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{partition_name(start)}"')
+    return True
+
+
+def ensure_attached(survey_id):
+    """Подключает секцию опроса, если её отключили (восстановление из архива). True — подключили."""
+    if not supported():
+        return False
+    start, end = bounds(survey_id)
+    name = partition_name(start)
+    with connection.cursor() as cursor:
+        if name in _attached(cursor) or not _fetch(cursor, "SELECT 1 FROM pg_tables WHERE tablename = %s", [name]):
+            return False
+        cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM ({start}) TO ({end})')
+    return True
+
+
+def drop_range(start):
+    """Удаляет отключённую секцию, если все опросы диапазона удалены (DROP вместо DELETE по строкам)."""
+    from .models import Surveys
+    if not supported() or Surveys.objects.filter(survey_id__gte=start, survey_id__lt=start + partition_size()).exists():
+        return False
+    with connection.cursor() as cursor:
+        if partition_name(start) in _attached(cursor):
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{partition_name(start)}"')
+        cursor.execute(f'DROP TABLE IF EXISTS "{partition_name(start)}"')
+    return True
@@ -25,7 +25,7 @@ class IsSurveyParticipantOrAdmin(permissions.BasePermission):
             from surveys.models import RespondentAnswers
             has_answers = RespondentAnswers.objects.filter(
                 respondent=user,
-                survey_question__survey=obj
+                survey=obj
             ).exists()
             print(f"[PERM DEBUG] Проверка ответов респондента → {has_answers}")
             return has_answers
@@ -6,7 +6,9 @@ from .models import Surveys, Questions, SurveyQuestions, RespondentAnswers, Surv
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from .models import RespondentAnswers
+from .answer_validators import validate_answer
 from core.models import SurveyRequiredCharacteristics
+from core.projection import Projection, decimal_string
 
 
 def log_validation_error(serializer_name: str, field_name: str, data, error):
@@ -35,6 +37,19 @@ class SurveyDetailSerializer(serializers.ModelSerializer):
         fields = ['survey_id', 'name', 'creator', 'date_finished', 'max_residents', 'status', 'type_survey', 'cost']
 
 
+# те же поля через values_list() — для длинных списков (MySurveysView)
+SURVEY_DETAIL_ROWS = Projection({
+    'survey_id': 'survey_id',
+    'name': 'name',
+    'creator': 'creator_id',
+    'date_finished': 'date_finished',
+    'max_residents': 'max_residents',
+    'status': 'status',
+    'type_survey': 'type_survey',
+    'cost': ('cost', decimal_string),
+})
+
+
 class SurveyUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Surveys
@@ -142,48 +157,13 @@ class RespondentAnswerCreateSerializer(serializers.ModelSerializer):
             if not survey.is_active():
                 raise serializers.ValidationError("Опрос не активен или завершён.")
 
-            # --- проверяем extra_data для типа вопроса ---
-            extra = question.extra_data or {}
-            if isinstance(extra, str):
-                try:
-                    extra = json.loads(extra)
-                except Exception:
-                    extra = {}
-
-            # === Дополнительная валидация значения ===
-            text_answer = data.get("text_answer")
-
-            # if question.type_question in ['single_choice', 'multi_choice', 'checkbox', 'dropdown']:
-            #     allowed = extra.get('options', [])
-            #     if allowed and text_answer not in allowed:
-            #         raise serializers.ValidationError("Недопустимый вариант ответа.")
-            #
-            # elif question.type_question == 'likert':
-            #     divisions = extra.get('scale', 5)
-            #     try:
-            #         val = int(text_answer)
-            #     except (ValueError, TypeError):
-            #         raise serializers.ValidationError("Ответ должен быть числом.")
-            #     if not (1 <= val <= divisions):
-            #         raise serializers.ValidationError("Значение вне допустимого диапазона шкалы.")
-            #
-            # elif question.type_question == 'number':
-            #     try:
-            #         val = float(text_answer)
-            #     except (ValueError, TypeError):
-            #         raise serializers.ValidationError("Ответ должен быть числом.")
-            #     min_val = extra.get('min')
-            #     max_val = extra.get('max')
-            #     if min_val is not None and val < min_val:
-            #         raise serializers.ValidationError(f"Минимальное значение: {min_val}.")
-            #     if max_val is not None and val > max_val:
-            #         raise serializers.ValidationError(f"Максимальное значение: {max_val}.")
-            #
-            # elif question.type_question == 'date':
-            #     # Можно добавить проверку формата, если задан
-            #     pass
-
-            # --- сохраняем объект связи ---
+            # === Проверка значения по типу вопроса (валидатор скомпилирован и закэширован) ===
+            error = validate_answer(question, data.get("text_answer"))
+            if error:
+                raise serializers.ValidationError(error)
+
+            # --- сохраняем объект связи (вопрос уже загружен — нужен для разбора ответа в save()) ---
+            link.question = question
             data['survey_question'] = link
             data['respondent'] = user
 
@@ -205,6 +185,7 @@ class RespondentAnswerCreateSerializer(serializers.ModelSerializer):
         ).first()
 
         if existing:
+            existing.survey_question = survey_question
             existing.text_answer = text_answer
             existing.save()
             print(f"🔁 Обновлён ответ пользователя {user} на вопрос {survey_question.question_id}")
@@ -221,6 +202,17 @@ class RespondentAnswerCreateSerializer(serializers.ModelSerializer):
 
 
 
+# строки SurveyAnswersView
+SURVEY_ANSWER_ROWS = Projection({
+    'answer_id': 'answer_id',
+    'survey_question_id': 'survey_question_id',
+    'question_id': 'survey_question__question_id',
+    'respondent_id': 'respondent_id',
+    'text_answer': 'text_answer',
+    'created_at': 'created_at',
+})
+
+
 class SurveyArchiveSerializer(serializers.ModelSerializer):
     class Meta:
         model = SurveyArchive
@@ -1,6 +1,8 @@
 import csv
 import io
 import openpyxl
+from unittest import skipIf, skipUnless
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -237,3 +239,328 @@ class SurveyFullFlowTest(TestCase):
         self.log_response("Импорт XLSX", resp2)
         self.assertEqual(resp2.status_code, status.HTTP_201_CREATED)
         self.assertTrue("created_questions" in resp2.data)
+
+
+class RespondentHomeTest(TestCase):
+    """🏠 Главный экран респондента: фиксированное число запросов, страницы, 304"""
+
+    def setUp(self):
+        from decimal import Decimal
+        from payments.models import SurveyAccount, Wallet
+        from .models import RespondentSurveyStatus
+
+        self.client = APIClient()
+        customer = User.objects.create_user(name='c', email='home_c@example.com', password='pass', role='customer')
+        self.respondent = User.objects.create_user(name='r', email='home_r@example.com', password='pass',
+                                                   role='respondent')
+        other = User.objects.create_user(name='o', email='home_o@example.com', password='pass', role='respondent')
+
+        self.funded = Surveys.objects.create(name='Funded', creator=customer, status='active', cost=Decimal('10.00'))
+        SurveyAccount.objects.create(survey=self.funded, balance=Decimal('50.00'))
+        unfunded = Surveys.objects.create(name='Unfunded', creator=customer, status='active', cost=Decimal('10.00'))
+        SurveyAccount.objects.create(survey=unfunded, balance=Decimal('5.00'))
+        self.free = Surveys.objects.create(name='Free', creator=customer, status='active')
+        full = Surveys.objects.create(name='Full', creator=customer, status='active', max_residents=1)
+        question = Questions.objects.create(text_question='Q?', type_question='text')
+        link = SurveyQuestions.objects.create(survey=full, question=question)
+        RespondentAnswers.objects.create(survey_question=link, respondent=other, text_answer='A')
+        Surveys.objects.create(name='Expired', creator=customer, status='active',
+                               date_finished=timezone.now() - timedelta(days=1))
+
+        for survey in (self.funded, unfunded, self.free):
+            RespondentSurveyStatus.objects.create(respondent=self.respondent, survey=survey)
+        Wallet.objects.create(user=self.respondent, balance=Decimal('12.50'))
+        self.client.force_authenticate(self.respondent)
+
+    def test_home_aggregates_with_fixed_queries(self):
+        """✅ Те же опросы, что у /available/, страницы без COUNT, ETag → 304"""
+        url = reverse('respondent-home')
+        available = {s['survey_id'] for s in self.client.get(reverse('survey-available')).data}
+        self.assertEqual(available, {self.funded.survey_id, self.free.survey_id})
+
+        # профиль (force_authenticate даёт полного пользователя), опросы, прохождения, кошелёк
+        with self.assertNumQueries(3):
+            resp = self.client.get(url, {'limit': 1})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        data = json.loads(resp.content)
+        self.assertEqual(data['user']['email'], 'home_r@example.com')
+        self.assertEqual(data['wallet'], {'balance': '12.50', 'currency': 'RUB'})
+        self.assertEqual([s['survey_id'] for s in data['available']['results']], [self.funded.survey_id])
+        self.assertEqual(data['available']['next_offset'], 1)
+        self.assertEqual(len(data['progress']['results']), 1)
+        self.assertEqual(data['progress']['next_offset'], 1)
+
+        resp = self.client.get(url, {'limit': 1, 'available_offset': 1, 'progress_offset': 2})
+        data = json.loads(resp.content)
+        self.assertEqual([s['survey_id'] for s in data['available']['results']], [self.free.survey_id])
+        self.assertIsNone(data['available']['next_offset'])
+        self.assertIsNone(data['progress']['next_offset'])
+
+        etag = self.client.get(url)['ETag']
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.post(reverse('survey-progress-update', args=[self.funded.survey_id]),
+                         {'status': 'completed', 'score': 1}, format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AnswerPartitioningTest(TestCase):
+    """🧱 Секции respondent_answers: границы диапазонов, обычная таблица на SQLite, секции на PostgreSQL"""
+
+    def test_bounds_and_ddl(self):
+        """✅ Опрос попадает в свой диапазон; DDL секции с теми же границами"""
+        from django.test import override_settings
+        from . import partitioning
+
+        with override_settings(SURVEYS_ANSWER_PARTITION_SIZE=100):
+            self.assertEqual(partitioning.bounds(0), (0, 100))
+            self.assertEqual(partitioning.bounds(199), (100, 200))
+            self.assertEqual(partitioning.bounds(200), (200, 300))
+            self.assertEqual(
+                partitioning.create_partition_sql(200),
+                'CREATE TABLE IF NOT EXISTS "respondent_answers_p200" PARTITION OF "respondent_answers" '
+                'FOR VALUES FROM (200) TO (300)',
+            )
+
+    @skipIf(connection.vendor == 'postgresql', "проверка обычной таблицы")
+    def test_sqlite_fallback_is_noop(self):
+        """✅ Без PostgreSQL: обслуживание ничего не делает, команда и housekeeping отрабатывают"""
+        from django.core.management import call_command
+        from housekeeping.scheduler import run_task
+        from . import partitioning
+
+        self.assertFalse(partitioning.supported())
+        with self.assertNumQueries(0):
+            self.assertEqual(partitioning.ensure_partitions(), 0)
+            self.assertFalse(partitioning.ensure_attached(1))
+            self.assertFalse(partitioning.detach_range(0))
+            self.assertEqual(partitioning.partitions(), [])
+        self.assertEqual(run_task('answer_partitions')['affected'], 0)
+
+        out = io.StringIO()
+        call_command('answer_partitions', '--ensure', stdout=out)
+        self.assertIn('обычная таблица', out.getvalue())
+
+    @skipUnless(connection.vendor == 'postgresql', "секционирование есть только на PostgreSQL")
+    def test_postgresql_layout_after_migration(self):
+        """✅ После миграции: старая таблица — секция с PK и UNIQUE родителя, повторный convert() — no-op"""
+        from . import partitioning
+
+        with connection.cursor() as cursor:
+            self.assertTrue(partitioning._is_partitioned(cursor))
+            self.assertIn(partitioning.LEGACY, partitioning._attached(cursor))
+            cursor.execute("""
+                SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint
+                WHERE conrelid = %s::regclass AND contype IN ('p', 'u') ORDER BY contype
+            """, [partitioning.LEGACY])
+            self.assertEqual(cursor.fetchall(), [
+                (f'{partitioning.LEGACY}_pkey', 'p', 'PRIMARY KEY (answer_id, survey_id)'),
+                (f'{partitioning.LEGACY}_answer_uniq', 'u', 'UNIQUE (survey_question_id, respondent_id, survey_id)'),
+            ])
+        with connection.schema_editor() as editor:
+            partitioning.convert(editor)
+
+
+class TypedAnswerValuesTest(TestCase):
+    """🔢 Типизированные колонки ответа: разбор при записи и пересчёт командой"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(name='c', email='typed_c@example.com', password='pass', role='customer')
+        self.respondent = User.objects.create_user(name='r', email='typed_r@example.com', password='pass',
+                                                   role='respondent')
+        self.survey = Surveys.objects.create(name='Типы', creator=self.customer, status='active')
+
+    def _link(self, type_question, extra_data=None, order=0):
+        question = Questions.objects.create(text_question=f'{type_question}?', type_question=type_question,
+                                            extra_data=extra_data)
+        return SurveyQuestions.objects.create(survey=self.survey, question=question, order=order)
+
+    def test_parsing_by_question_type(self):
+        """✅ Число, дата, вариант и набор вариантов; неразборчивое — пусто"""
+        from .answer_values import typed_values
+
+        options = {'options': ['Красный', 'Зелёный', 'Синий, голубой']}
+        rating = Questions(type_question='likert')
+        self.assertEqual(typed_values(rating, ' 4,5 ')['number_value'], 4.5)
+        self.assertIsNone(typed_values(rating, 'много')['number_value'])
+        for text in ('nan', 'inf', '-Infinity', '1e400'):
+            self.assertIsNone(typed_values(rating, text)['number_value'], text)
+        self.assertEqual(typed_values(Questions(type_question='date'), '2026-02-03')['datetime_value'].day, 3)
+        self.assertIsNone(typed_values(Questions(type_question='date_time'), 'вчера')['datetime_value'])
+
+        single = typed_values(Questions(type_question='dropdown', extra_data=options), ' зелёный ')
+        self.assertEqual((single['choice_key'], single['choice_indexes']), ('зелёный', [1]))
+        multi = Questions(type_question='multi_choice', extra_data=options)
+        self.assertEqual(typed_values(multi, 'Синий, голубой;Красный')['choice_indexes'], [0, 2])
+        self.assertEqual(typed_values(multi, '["Зелёный", "Красный"]')['choice_key'], 'зелёный;красный')
+        self.assertEqual(typed_values(multi, 'Синий, голубой')['choice_indexes'], [2])
+        self.assertEqual(typed_values(multi, ''), dict.fromkeys(typed_values(multi, '')))
+
+    def test_answer_endpoint_and_backfill(self):
+        """✅ Ответ через API сразу типизирован; backfill_answer_values заполняет старые строки"""
+        from django.core.management import call_command
+
+        link = self._link('rating', order=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.respondent)
+        resp = self.client.post(reverse('respondent-answer'), {'question_id': link.question_id, 'text_answer': '7'},
+                                format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED, resp.data)
+        answer = RespondentAnswers.objects.get(survey_question=link)
+        self.assertEqual(answer.number_value, 7.0)
+
+        # строки, записанные до появления колонок
+        RespondentAnswers.objects.update(number_value=None)
+        out = io.StringIO()
+        call_command('backfill_answer_values', '--batch-size', '1', stdout=out)
+        self.assertIn('Обработано ответов: 1', out.getvalue())
+        answer.refresh_from_db()
+        self.assertEqual(answer.number_value, 7.0)
+
+
+class AnswerValidatorsTest(TestCase):
+    """🛡 Проверка ответа по типу вопроса: скомпилированные валидаторы и их кэш"""
+
+    def setUp(self):
+        from . import answer_validators
+        answer_validators.clear()
+        self.customer = User.objects.create_user(name='c', email='val_c@example.com', password='pass', role='customer')
+        self.respondent = User.objects.create_user(name='r', email='val_r@example.com', password='pass',
+                                                   role='respondent')
+        self.survey = Surveys.objects.create(name='Проверка', creator=self.customer, status='active')
+        self.question = Questions.objects.create(text_question='Цвет?', type_question='single_choice',
+                                                 extra_data={'options': ['Красный', 'Синий']})
+        SurveyQuestions.objects.create(survey=self.survey, question=self.question, order=1)
+        self.client = APIClient()
+
+    def _answer(self, text):
+        self.client.force_authenticate(self.respondent)
+        return self.client.post(reverse('respondent-answer'),
+                                {'question_id': self.question.question_id, 'text_answer': text}, format='json')
+
+    def test_rules_by_question_type(self):
+        """✅ Варианты, шкала Лайкерта, границы числа, дата; некорректный extra_data не ужесточает проверку"""
+        from .answer_validators import validate_answer
+
+        multi = Questions(type_question='checkbox', extra_data={'options': ['Кино', 'Театр']})
+        self.assertIsNone(validate_answer(multi, 'театр;Кино'))
+        self.assertEqual(validate_answer(multi, 'Кино;Цирк'), "Недопустимый вариант ответа.")
+
+        likert = Questions(type_question='likert', extra_data='{"scale": 7}')
+        self.assertIsNone(validate_answer(likert, '7'))
+        self.assertEqual(validate_answer(likert, '8'), "Значение вне допустимого диапазона шкалы.")
+        self.assertEqual(validate_answer(likert, '2.5'), "Ответ должен быть целым числом.")
+
+        rating = Questions(type_question='rating', extra_data={'min': 1, 'max': 10})
+        self.assertIsNone(validate_answer(rating, '9,5'))
+        self.assertEqual(validate_answer(rating, '11'), "Максимальное значение: 10.")
+        self.assertEqual(validate_answer(rating, 'много'), "Ответ должен быть числом.")
+        self.assertEqual(validate_answer(rating, 'nan'), "Ответ должен быть числом.")
+
+        self.assertIsNone(validate_answer(Questions(type_question='date_time'), '2026-05-17T12:30'))
+        self.assertEqual(validate_answer(Questions(type_question='date_time'), 'вчера'), "Ответ должен быть датой.")
+        dated = Questions(type_question='date', extra_data={'format': '%d.%m.%Y'})
+        self.assertIsNone(validate_answer(dated, '17.05.2026'))
+        self.assertIsNotNone(validate_answer(dated, '2026-05-17'))
+
+        self.assertIsNone(validate_answer(Questions(type_question='dropdown', extra_data={'options': 'x'}), 'любой'))
+        self.assertIsNone(validate_answer(Questions(type_question='rating', extra_data={'max': 'десять'}), '50'))
+        self.assertIsNone(validate_answer(Questions(type_question='likert', extra_data={'scale': 1}), '5'))
+        self.assertIsNone(validate_answer(Questions(type_question='text'), 'что угодно'))
+        self.assertIsNone(validate_answer(rating, '  '))
+
+    def test_endpoint_rejects_and_update_invalidates_cache(self):
+        """✅ Недопустимый ответ — 400; после правки вопроса проверка идёт по новым вариантам"""
+        from . import answer_validators
+
+        resp = self._answer('Зелёный')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._answer('Синий').status_code, status.HTTP_201_CREATED)
+        cached = answer_validators.get_validator(self.question)
+
+        self.client.force_authenticate(self.customer)
+        resp = self.client.put(reverse('question-update', args=[self.question.question_id]),
+                               {'extra_data': {'options': ['Красный', 'Синий', 'Зелёный']}}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.version, 2)
+        self.assertIsNot(answer_validators.get_validator(self.question), cached)
+
+        # запись кэша другого процесса со старой версией не используется
+        answer_validators._cache[self.question.question_id] = (1, cached)
+        self.assertEqual(self._answer('Зелёный').status_code, status.HTTP_201_CREATED)
+
+
+class SurveyDefinitionSnapshotTest(TestCase):
+    """📦 Снимок списка вопросов опроса: кэш, ETag и пересборка при изменениях"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.customer = User.objects.create_user(name='c', email='def_c@example.com', password='pass', role='customer')
+        self.respondent = User.objects.create_user(name='r', email='def_r@example.com', password='pass',
+                                                   role='respondent')
+        self.survey = Surveys.objects.create(name='Снимок', creator=self.customer, status='active')
+        for order, text in ((2, 'Второй?'), (1, 'Первый?')):
+            question = Questions.objects.create(text_question=text, type_question='text')
+            SurveyQuestions.objects.create(survey=self.survey, question=question, order=order)
+        self.url = reverse('survey-questions', args=[self.survey.survey_id])
+        self.client = APIClient()
+        self.client.force_authenticate(self.respondent)
+
+    def test_cached_snapshot_and_not_modified(self):
+        """✅ Порядок вопросов, повторный запрос — одно чтение версии, If-None-Match → 304"""
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual([q['text_question'] for q in resp.json()], ['Первый?', 'Второй?'])
+        self.assertEqual(resp['Cache-Control'], 'public, no-cache')
+        etag = resp['ETag']
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url)['ETag'], etag)
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.assertEqual(self.client.get(reverse('survey-questions', args=[999999])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_link_update_and_unlink_rebuild_snapshot(self):
+        """✅ Привязка, правка и удаление вопроса пересобирают снимок после коммита"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.customer)
+        question = Questions.objects.create(text_question='Третий?', type_question='text')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(reverse('question-link'),
+                                    {'survey': self.survey.survey_id, 'question': question.pk, 'order': 3})
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(1):
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()[-1]['text_question'], 'Третий?')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.put(reverse('question-update', args=[question.pk]),
+                                   {'text_question': 'Третий!', 'extra_data': {}}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url).json()[-1]['text_question'], 'Третий!')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('survey-question-unlink', args=[question.pk]))
+        self.assertEqual(len(self.client.get(self.url).json()), 2)
+
+    def test_change_in_another_worker_is_visible(self):
+        """✅ Снимок, изменённый другим воркером (свой кэш, общая БД), не отдаётся устаревшим"""
+        from django.db.models import F
+
+        etag = self.client.get(self.url)['ETag']
+        # другой воркер: привязал вопрос и увеличил версию, в кэш этого процесса не заходил
+        question = Questions.objects.create(text_question='Третий?', type_question='text')
+        SurveyQuestions.objects.create(survey=self.survey, question=question, order=3)
+        Surveys.objects.filter(pk=self.survey.pk).update(definition_version=F('definition_version') + 1)
+
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()[-1]['text_question'], 'Третий?')
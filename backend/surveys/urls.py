@@ -7,7 +7,7 @@ from .views import (
     RespondentAnswerView, SurveyAnswersView,
     SurveyToggleStatusView, AvailableSurveysView,
     ExportSurveyQuestionsView, ImportSurveyQuestionsView,
-    MySurveyProgressView, SurveyProgressUpdateView,
+    MySurveyProgressView, SurveyProgressUpdateView, RespondentHomeView,
     RespondentSurveyAnswersView, RespondentAnswerDetailView,
     SurveyAddCharacteristicView,
     SurveyCharacteristicsListView,
@@ -26,6 +26,7 @@ urlpatterns = [
     path('archived/<int:archive_id>/restore/', SurveyRestoreView.as_view(), name='survey-restore'),
     path('available/', AvailableSurveysView.as_view(), name='survey-available'),
     path('my-progress/', MySurveyProgressView.as_view(), name='my-survey-progress'),
+    path('home/', RespondentHomeView.as_view(), name='respondent-home'),
     path('<int:survey_id>/progress/', SurveyProgressUpdateView.as_view(), name='survey-progress-update'),
     path('respondent/<int:survey_id>/answers/', RespondentSurveyAnswersView.as_view(), name='respondent-survey-answers'),
     path('<int:survey_id>/characteristics/add/', SurveyAddCharacteristicView.as_view(),
@@ -1,28 +1,39 @@
 import csv
+import hashlib
 import io
 from decimal import Decimal
 
 import openpyxl
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from rest_framework import status, permissions, serializers
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser, MultiPartParser
-from drf_spectacular.utils import extend_schema, inline_serializer
+from rest_framework.renderers import JSONRenderer
+from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiParameter
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
-from django.db import models, transaction
+from django.db import transaction
 import json
 
 from payments.views import get_or_create_wallet
+from payments.models import Wallet
+from accounts.serializers_profile import UserMeSerializer
+from payments.outbox import enqueue_payout
+from accounts.stats import record_status_change
 from .permissions import IsSurveyParticipantOrAdmin
+from .availability import available_surveys
+from core.renderers import LIST_RENDERERS
+from . import answer_validators, definition, partitioning
 
 from .serializers import (
     SurveyCreateSerializer, SurveyDetailSerializer, SurveyUpdateSerializer,
     QuestionSerializer, QuestionUpdateSerializer,
     SurveyQuestionLinkSerializer, RespondentAnswerCreateSerializer,
     SurveyArchiveSerializer, RespondentSurveyStatusSerializer,
-    RespondentAnswerDetailSerializer, SurveyRequiredCharacteristicSerializer
+    RespondentAnswerDetailSerializer, SurveyRequiredCharacteristicSerializer,
+    SURVEY_DETAIL_ROWS, SURVEY_ANSWER_ROWS,
 )
 from .models import Surveys, Questions, SurveyQuestions, RespondentAnswers, SurveyArchive, RespondentSurveyStatus
 from core.models import SurveyRequiredCharacteristics
@@ -57,11 +68,12 @@ class SurveyCreateView(APIView):
 
 class MySurveysView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = LIST_RENDERERS
 
     @extend_schema(summary="Мои опросы", responses={200: SurveyDetailSerializer(many=True)}, tags=tag)
     def get(self, request):
         qs = Surveys.objects.filter(creator=request.user)
-        return Response(SurveyDetailSerializer(qs, many=True).data, status=status.HTTP_200_OK)
+        return Response(SURVEY_DETAIL_ROWS.rows(qs), status=status.HTTP_200_OK)
 
 
 class SurveyRetrieveUpdateDeleteView(APIView):
@@ -83,6 +95,7 @@ class SurveyRetrieveUpdateDeleteView(APIView):
         survey = get_object_or_404(Surveys, pk=survey_id)
         if not (survey.creator == request.user or request.user.role == 'moderator'):
             return Response({"detail": "Доступ запрещён"}, status=status.HTTP_403_FORBIDDEN)
+        # снимок удалённого опроса больше не читается: load() не найдёт его версию
         survey.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -125,9 +138,10 @@ class SurveyArchiveView(APIView):
                         related_survey_id=survey.survey_id
                     )
                     tx.mark_success(gateway_data={'returned_to_creator': True})
-        except Exception:
-            # не фейлим архивацию из-за проблем с возвратом, но логируем серверно (или можно вернуть ошибку)
-            pass
+        except Exception as e:
+            # не фейлим архивацию из-за проблем с возвратом, но логируем серверно;
+            # возможное расхождение балансов покажет сверка (manage.py reconcile_ledger)
+            print(f"[REFUND ❌] Не удалось вернуть остаток по опросу {survey.survey_id}: {e}")
 
         return Response(SurveyDetailSerializer(survey).data, status=status.HTTP_200_OK)
 
@@ -153,6 +167,8 @@ class SurveyRestoreView(APIView):
             return Response({"detail": "Доступ запрещён"}, status=status.HTTP_403_FORBIDDEN)
 
         archive.delete()
+        # ответы опроса могли быть в отключённой секции (partitioning.detach_range)
+        partitioning.ensure_attached(survey.survey_id)
         survey.status = 'draft'
         survey.save()
         return Response(SurveyDetailSerializer(survey).data, status=status.HTTP_200_OK)
@@ -191,7 +207,9 @@ class QuestionUpdateView(APIView):
             return Response({"detail": "Доступ запрещён"}, status=status.HTTP_403_FORBIDDEN)
         serializer = QuestionUpdateSerializer(question, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save(version=question.version + 1)
+        answer_validators.invalidate(question.pk)
+        definition.refresh(*SurveyQuestions.objects.filter(question=question).values_list('survey_id', flat=True))
         return Response(QuestionSerializer(question).data, status=status.HTTP_200_OK)
 
 
@@ -213,7 +231,9 @@ class SurveyQuestionDeleteView(APIView):
         if not (link.survey.creator == request.user or request.user.role == 'moderator'):
             return Response({"detail": "Доступ запрещён"}, status=status.HTTP_403_FORBIDDEN)
 
+        survey_ids = list(SurveyQuestions.objects.filter(question=question).values_list('survey_id', flat=True))
         question.delete()
+        definition.refresh(*survey_ids)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -238,19 +258,32 @@ class SurveyQuestionLinkView(APIView):
             return Response({"detail": "Нельзя добавлять вопросы в чужой опрос"},
                             status=status.HTTP_403_FORBIDDEN)
         sq = serializer.save()
+        definition.refresh(survey.survey_id)
         return Response({'survey_question_id': sq.survey_question_id}, status=status.HTTP_201_CREATED)
 
 
 class SurveyQuestionsListView(APIView):
+    """
+    Вопросы опроса по порядку — из готового снимка (surveys/definition.py) по одному чтению версии.
+    Сильный ETag: повторный запрос с If-None-Match получает 304. Содержимое не зависит
+    от пользователя, поэтому ответ можно хранить в общем кэше (CDN) с обязательной
+    перепроверкой — её проходит только запрос с действующим токеном.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     @extend_schema(summary="Список вопросов опроса",
-                   responses={200: QuestionSerializer(many=True)}, tags=tag)
+                   responses={200: QuestionSerializer(many=True), 304: None}, tags=tag)
     def get(self, request, survey_id: int):
-        survey = get_object_or_404(Surveys, pk=survey_id)
-        qlinks = SurveyQuestions.objects.filter(survey=survey).select_related('question').order_by('order')
-        questions = [ql.question for ql in qlinks]
-        return Response(QuestionSerializer(questions, many=True).data, status=status.HTTP_200_OK)
+        snapshot = definition.load(survey_id)
+        if snapshot is None:
+            return Response({"detail": "Опрос не найден"}, status=status.HTTP_404_NOT_FOUND)
+        if snapshot['etag'] in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(snapshot['body'], content_type='application/json')
+        response['ETag'] = snapshot['etag']
+        response['Cache-Control'] = settings.SURVEYS_DEFINITION_CACHE_CONTROL
+        return response
 
 
 # ------------------- ОТВЕТЫ -------------------
@@ -278,6 +311,7 @@ class RespondentAnswerView(APIView):
 
 class SurveyAnswersView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = LIST_RENDERERS
 
     @extend_schema(
         summary="Все ответы на опрос",
@@ -290,20 +324,8 @@ class SurveyAnswersView(APIView):
         survey = get_object_or_404(Surveys, pk=survey_id)
         if not (survey.creator == request.user or request.user.role == 'moderator'):
             return Response({"detail": "Доступ запрещён"}, status=status.HTTP_403_FORBIDDEN)
-        answers = RespondentAnswers.objects.filter(
-            survey_question__survey=survey
-        ).select_related('respondent', 'survey_question', 'survey_question__question')
-        out = []
-        for a in answers:
-            out.append({
-                'answer_id': a.answer_id,
-                'survey_question_id': a.survey_question.survey_question_id,
-                'question_id': a.survey_question.question.question_id,
-                'respondent_id': a.respondent.user_id,
-                'text_answer': a.text_answer,
-                'created_at': a.created_at,
-            })
-        return Response({'answers': out}, status=status.HTTP_200_OK)
+        answers = SURVEY_ANSWER_ROWS.rows(RespondentAnswers.objects.filter(survey=survey))
+        return Response({'answers': answers}, status=status.HTTP_200_OK)
 
 
 # ------------------- СТАТУСЫ и ДОСТУПНЫЕ -------------------
@@ -352,11 +374,13 @@ class SurveyToggleStatusView(APIView):
                             related_survey_id=survey.survey_id
                         )
                         tx.mark_success(gateway_data={'returned_to_creator': True})
-            except Exception:
-                # swallow errors or log
-                pass
+            except Exception as e:
+                # не блокируем смену статуса; расхождение покажет сверка (manage.py reconcile_ledger)
+                print(f"[REFUND ❌] Не удалось вернуть остаток по опросу {survey.survey_id}: {e}")
         survey.status = desired_status
         survey.save()
+        if desired_status == 'active':
+            definition.refresh(survey.survey_id)
         return Response({'survey_id': survey.survey_id, 'status': survey.status},
                         status=status.HTTP_200_OK)
 
@@ -367,35 +391,8 @@ class AvailableSurveysView(APIView):
     @extend_schema(summary="Доступные опросы для респондента",
                    responses={200: SurveyDetailSerializer(many=True)}, tags=tag)
     def get(self, request):
-        now = timezone.now()
-        # активные опросы по времени
-        qs = Surveys.objects.filter(status='active').filter(
-            models.Q(date_finished__isnull=True) | models.Q(date_finished__gt=now)
-        )
-
-        # Фильтруем те, у которых нет денег на счёте (если cost задан)
-        # Если у опроса cost задан и >0 — проверяем SurveyAccount.balance >= cost
-        # Если cost==None или <=0 — считаем, что опрос не оплачиваемый и не показываем (или можно показать — решите сами)
-        qs = qs.select_related('account')  # требуется, если SurveyAccount OneToOne named 'account'
-
-        available = []
-        for s in qs:
-            # если задан cost, то проверяем счёт опроса
-            if s.cost and s.cost > Decimal('0.00'):
-                acc = getattr(s, 'account', None)
-                if not acc or acc.balance < s.cost:
-                    # пропускаем опрос без средств
-                    continue
-
-            # проверяем лимит по max_residents (если есть)
-            if s.max_residents:
-                respondents_count = RespondentAnswers.objects.filter(
-                    survey_question__survey=s
-                ).values('respondent').distinct().count()
-                if respondents_count >= s.max_residents:
-                    continue
-            available.append(s)
-
+        # все условия доступности — в одном запросе (см. surveys/availability.py)
+        available = available_surveys()
         return Response(SurveyDetailSerializer(available, many=True).data, status=status.HTTP_200_OK)
 
 
@@ -488,6 +485,7 @@ class ImportSurveyQuestionsView(APIView):
         else:
             return Response({"detail": "Неподдерживаемый формат"}, status=status.HTTP_400_BAD_REQUEST)
 
+        definition.refresh(survey.survey_id)
         return Response({"created_questions": created}, status=status.HTTP_201_CREATED)
 
 
@@ -508,6 +506,83 @@ class MySurveyProgressView(APIView):
         serializer = RespondentSurveyStatusSerializer(statuses, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+HOME_PAGE_SIZE = 20
+HOME_MAX_PAGE_SIZE = 100
+
+
+def _page(queryset, offset, limit):
+    """Страница без COUNT(*): берём limit + 1 строку, лишняя означает, что есть продолжение."""
+    rows = list(queryset[offset:offset + limit + 1])
+    return rows[:limit], (offset + limit if len(rows) > limit else None)
+
+
+class RespondentHomeView(APIView):
+    """
+    Главный экран респондента за один запрос: профиль, кошелёк, доступные опросы
+    и прохождения (постранично). Фиксированное число запросов к БД независимо от
+    числа опросов; ETag по содержимому ответа — повторный запрос без изменений получает 304.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        summary="Главный экран респондента (профиль, кошелёк, опросы, прохождения)",
+        parameters=[
+            OpenApiParameter('limit', int, description=f"Размер страниц списков (по умолчанию {HOME_PAGE_SIZE})"),
+            OpenApiParameter('available_offset', int, description="Смещение в списке доступных опросов"),
+            OpenApiParameter('progress_offset', int, description="Смещение в списке прохождений"),
+        ],
+        responses={200: inline_serializer(
+            name='ГлавныйЭкранРеспондента',
+            fields={
+                'user': UserMeSerializer(),
+                'wallet': serializers.DictField(),
+                'available': serializers.DictField(),
+                'progress': serializers.DictField(),
+            }
+        ), 304: None},
+        tags=tag
+    )
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', HOME_PAGE_SIZE)), 1), HOME_MAX_PAGE_SIZE)
+            available_offset = max(int(request.query_params.get('available_offset', 0)), 0)
+            progress_offset = max(int(request.query_params.get('progress_offset', 0)), 0)
+        except ValueError:
+            return Response({"detail": "limit и offset должны быть целыми числами"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        available, available_next = _page(available_surveys().order_by('survey_id'), available_offset, limit)
+        progress, progress_next = _page(
+            RespondentSurveyStatus.objects.filter(respondent=user).select_related('survey').order_by('-updated_at', '-id'),
+            progress_offset, limit,
+        )
+        wallet = Wallet.objects.filter(user=user).values('balance', 'currency').first() or {
+            'balance': Decimal('0.00'), 'currency': 'RUB'
+        }
+
+        body = JSONRenderer().render({
+            'user': UserMeSerializer(user).data,
+            'wallet': {'balance': str(wallet['balance']), 'currency': wallet['currency']},
+            'available': {
+                'results': SurveyDetailSerializer(available, many=True).data,
+                'next_offset': available_next,
+            },
+            'progress': {
+                'results': RespondentSurveyStatusSerializer(progress, many=True).data,
+                'next_offset': progress_next,
+            },
+        })
+        etag = f'"home-{hashlib.sha1(body).hexdigest()}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
 class SurveyProgressUpdateView(APIView):
     """
     Обновить или создать статус опроса для респондента.
@@ -549,7 +624,7 @@ class SurveyProgressUpdateView(APIView):
         score_value = request.data.get('score')
 
         # Проверка допустимости статуса
-        if status_value not in dict(RespondentSurveyStatus.STATUS_CHOICES):
+        if status_value not in RespondentSurveyStatus.CLIENT_STATUSES:
             return Response({"detail": "Недопустимый статус"}, status=status.HTTP_400_BAD_REQUEST)
 
         # Если статус "completed", проверяем наличие оценки
@@ -572,12 +647,22 @@ class SurveyProgressUpdateView(APIView):
             # Для статуса "in_progress" оценка сбрасывается
             score_value = None
 
-        # Обновление или создание записи
-        record, created = RespondentSurveyStatus.objects.update_or_create(
-            respondent=user,
-            survey=survey,
-            defaults={'status': status_value, 'score': score_value}
-        )
+        # Обновление или создание записи; при переходе в 'completed' в той же транзакции
+        # ставим автоматическую выплату в outbox (её выполнит run_payout_dispatcher)
+        with transaction.atomic():
+            previous_status = RespondentSurveyStatus.objects.select_for_update().filter(
+                respondent=user, survey=survey
+            ).values_list('status', flat=True).first()
+            record, created = RespondentSurveyStatus.objects.update_or_create(
+                respondent=user,
+                survey=survey,
+                defaults={'status': status_value, 'score': score_value}
+            )
+            if (status_value == 'completed' and previous_status != 'completed'
+                    and role_allowed(user, ['respondent']) and survey.cost and survey.cost > Decimal('0.00')):
+                enqueue_payout(survey, user)
+            if role_allowed(user, ['respondent']):
+                record_status_change(user.pk, previous_status, status_value)
 
         action = "Создан" if created else "Обновлён"
         print(f"🔄 [{user}] {action} статус: {survey.name} → {status_value} (оценка: {score_value})")
@@ -613,16 +698,16 @@ class RespondentSurveyAnswersView(APIView):
 
         role = getattr(user, 'role', None)
         if role in ["moderator", "customer"] and survey.creator == user:
-            answers = RespondentAnswers.objects.filter(
-                survey_question__survey=survey
-            ).select_related("respondent", "survey_question__question")
-            print(f"[DEBUG] ✅ Администратор/модератор видит {answers.count()} ответов.")
+            answers = list(RespondentAnswers.objects.filter(
+                survey=survey
+            ).select_related("respondent", "survey_question__question"))
+            print(f"[DEBUG] ✅ Администратор/модератор видит {len(answers)} ответов.")
         else:
-            answers = RespondentAnswers.objects.filter(
+            answers = list(RespondentAnswers.objects.filter(
                 respondent=user,
-                survey_question__survey=survey
-            ).select_related("survey_question__question")
-            print(f"[DEBUG] ✅ Респондент видит {answers.count()} своих ответов.")
+                survey=survey
+            ).select_related("survey_question__question"))
+            print(f"[DEBUG] ✅ Респондент видит {len(answers)} своих ответов.")
 
         answers_list = [
             {
@@ -742,7 +827,7 @@ class SurveyCharacteristicsListView(APIView):
     )
     def get(self, request, survey_id: int):
         survey = get_object_or_404(Surveys, pk=survey_id)
-        links = SurveyRequiredCharacteristics.objects.filter(survey=survey)
+        links = SurveyRequiredCharacteristics.objects.filter(survey=survey).select_related('characteristic')
         serializer = SurveyRequiredCharacteristicSerializer(links, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 